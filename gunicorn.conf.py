@@ -0,0 +1,41 @@
+# Runs the app outside Lambda, in a long running container:
+#
+#   gunicorn -c gunicorn.conf.py www.server:app
+#
+# The app is loaded and warmed once in the master process (see: WarmupService) before the workers are forked,
+# so every worker starts with the SSM values, configs, Synapse login and table columns already loaded.
+# The values the workers load later can be shared through the SharedCache (SHARED_CACHE_BACKEND).
+import os
+import multiprocessing
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = True
+accesslog = '-'
+
+# Each thread of a worker checks out its own Synapse client (see: Synapse.checkout).
+os.environ.setdefault('SYNAPSE_CLIENT_POOL_SIZE', str(threads))
+
+# Each worker keeps its own cache by default. The disk and redis backends (SHARED_CACHE_BACKEND) share the values
+# loaded after the fork with the other workers, and store them in plain text.
+os.environ.setdefault('SHARED_CACHE_BACKEND', 'memory')
+
+
+def when_ready(server):
+    """Warms the app in the master process, after it is loaded and before the workers are forked."""
+    from www.services.warmup_service import WarmupService
+    service = WarmupService().execute()
+    server.log.info('Warmed up: {0}'.format(service.to_dict()))
+
+
+def post_fork(server, worker):
+    """Gives each worker its own connections, the sockets of the master cannot be shared."""
+    from sls_tools.param_store import ParamStore
+    from www.core import Synapse
+
+    # boto3 clients are not safe to share between processes.
+    ParamStore._ssm_client = None
+    Synapse.reset_connections()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import os
+import time
+import yaml
+
+script_dir = os.path.dirname(__file__)
+src_root_dir = os.path.abspath(os.path.join(script_dir, '..'))
+sys.path.append(src_root_dir)
+from flask import Flask
+from www.core.template_cache import TemplateBytecodeCache
+
+
+def build(output_dir):
+    """Compiles the templates in www/templates into a Jinja bytecode cache.
+
+    The templates are compiled with the same Jinja options as the app (see: www/server.py). The cache is only used
+    by the same Python version that built it, so build it with the Python version of the Lambda runtime.
+
+    Args:
+        output_dir: The directory to write the compiled templates to.
+
+    Returns:
+        List of the compiled template names.
+    """
+    bytecode_cache = TemplateBytecodeCache(directory=output_dir, packaged_dir=output_dir)
+    bytecode_cache.clear()
+
+    app = Flask('www.server', root_path=os.path.join(src_root_dir, 'www'))
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=bytecode_cache)
+
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+
+    return names
+
+
+def lambda_runtime():
+    """Gets the Python version of the Lambda runtime from serverless.yml (e.g., "3.7")."""
+    with open(os.path.join(src_root_dir, 'serverless.yml')) as f:
+        runtime = yaml.safe_load(f)['provider']['runtime']
+    return runtime.replace('python', '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompiles the Jinja templates so cold starts do not compile them.')
+    parser.add_argument('-o', '--output',
+                        help='The directory to write the compiled templates to.',
+                        default=TemplateBytecodeCache.PACKAGED_DIR)
+    args = parser.parse_args()
+
+    python_version = '{0}.{1}'.format(*sys.version_info[:2])
+    if python_version != lambda_runtime():
+        print('WARNING: Building with Python {0} but Lambda runs Python {1}. '
+              'Lambda will ignore the cache and compile the templates.'.format(python_version, lambda_runtime()))
+
+    start = time.perf_counter()
+    names = build(args.output)
+    print('Compiled {0} templates into: {1} ({2:.1f} ms)'.format(
+        len(names), args.output, (time.perf_counter() - start) * 1000))
+
+
+if __name__ == "__main__":
+    main()
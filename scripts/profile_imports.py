@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+import argparse
+import sys
+import os
+import subprocess
+
+script_dir = os.path.dirname(__file__)
+src_root_dir = os.path.abspath(os.path.join(script_dir, '..'))
+
+
+def profile(module, env=None):
+    """Imports a module in a new Python process and records how long each module took to import.
+
+    Args:
+        module: The name of the module to import.
+        env: Dict of environment variables to add to the new process.
+
+    Returns:
+        List of dicts with the module name, its depth in the import tree, its own import time and its
+        cumulative import time (including the modules it imported) in milliseconds. In import order.
+    """
+    process_env = dict(os.environ, **(env or {}))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {0}'.format(module)],
+                            cwd=src_root_dir,
+                            env=process_env,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE,
+                            universal_newlines=True)
+
+    if result.returncode != 0:
+        raise Exception('Failed to import: {0}\n{1}'.format(module, result.stderr))
+
+    return parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    """Parses the output of "python -X importtime".
+
+    Args:
+        output: The stderr of the Python process.
+
+    Returns:
+        List of dicts with the module name, depth, self_ms and cumulative_ms.
+    """
+    modules = []
+
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+
+    return modules
+
+
+def report(modules, top=25, prefix=None):
+    """Prints the modules that took the longest to import.
+
+    Args:
+        modules: The modules from profile().
+        top: The number of modules to print.
+        prefix: Only print modules whose name starts with this prefix.
+
+    Returns:
+        None
+    """
+    total_ms = sum(m['self_ms'] for m in modules)
+    selected = [m for m in modules if prefix is None or m['module'].startswith(prefix)]
+    selected.sort(key=lambda m: m['cumulative_ms'], reverse=True)
+
+    print('{0:>14} {1:>10}  {2}'.format('cumulative ms', 'self ms', 'module'))
+    for m in selected[:top]:
+        print('{0:>14.1f} {1:>10.1f}  {2}'.format(m['cumulative_ms'], m['self_ms'], m['module']))
+    print('')
+    print('Total: {0:.1f} ms for {1} modules'.format(total_ms, len(modules)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reports the import time of each module loaded by a module.')
+    parser.add_argument('-m', '--module',
+                        help='The module to import.',
+                        default='www.server')
+    parser.add_argument('-t', '--top',
+                        type=int,
+                        help='The number of modules to report.',
+                        default=25)
+    parser.add_argument('-p', '--prefix',
+                        help='Only report modules whose name starts with this prefix (e.g., "www.").')
+    parser.add_argument('-c', '--check-not-loaded',
+                        nargs='*',
+                        default=[],
+                        help='Fail if any of these modules were imported (e.g., synapseclient pytz).')
+    args = parser.parse_args()
+
+    modules = profile(args.module)
+    report(modules, top=args.top, prefix=args.prefix)
+
+    loaded = [name for name in args.check_not_loaded
+              if any(m['module'] == name or m['module'].startswith(name + '.') for m in modules)]
+    if loaded:
+        print('')
+        print('ERROR: Modules loaded at import time: {0}'.format(', '.join(loaded)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
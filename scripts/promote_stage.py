@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+import argparse
+import contextlib
+import hashlib
+import json
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+script_dir = os.path.dirname(__file__)
+sys.path.append(os.path.join(script_dir, '..'))
+try:
+    from sls_tools.param_store import ParamStore
+    import www.config as config
+    from ssm_sync import SsmSync
+    from set_ssm import get_service_name, init_env
+except Exception as ex:
+    print('WARNING: Failed to load param_store: {0}'.format(ex))
+
+# The keys promoted by default. The other keys (credentials, folder IDs, etc.) are different in each stage.
+CONFIG_KEYS = [
+    'SYNAPSE_SPACE_DCA_CREATE_CONFIG',
+    'SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG',
+    'SYNAPSE_SPACE_BASIC_CREATE_CONFIG'
+]
+
+# The keys that identify the items of a list of objects in the configs, in the order they are tried
+# (e.g., configs and entities by "id", additional parties by "code" and data collections by "name").
+IDENTITY_KEYS = ['id', 'code', 'name']
+
+
+def fingerprint(value):
+    """Gets the content hash of a value.
+
+    Args:
+        value: The value.
+
+    Returns:
+        String
+    """
+    return None if value is None else hashlib.sha256(value.encode('utf-8')).hexdigest()[:16]
+
+
+def diff_json(old, new, path=''):
+    """Compares two JSON values.
+
+    Objects are compared by key. Lists of objects are matched by the first of IDENTITY_KEYS that uniquely identifies
+    every item, lists of values are compared as sets, and other lists (e.g., with duplicate identity values) are
+    compared as a whole.
+
+    Args:
+        old: The current value.
+        new: The new value.
+        path: The path of the values.
+
+    Returns:
+        List of dicts with the path and the change ("added" or "removed" with the value, "changed" with
+        the old and new values).
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in list(old) + [k for k in new if k not in old]:
+            separator = '' if key.startswith('[') or not path else '.'
+            key_path = '{0}{1}{2}'.format(path, separator, key)
+            if key not in new:
+                changes.append({'path': key_path, 'change': 'removed', 'value': old[key]})
+            elif key not in old:
+                changes.append({'path': key_path, 'change': 'added', 'value': new[key]})
+            else:
+                changes += diff_json(old[key], new[key], key_path)
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list):
+        identity_key = _identity_key(old, new)
+        if identity_key:
+            old_items = {'[{0}={1}]'.format(identity_key, i[identity_key]): i for i in old}
+            new_items = {'[{0}={1}]'.format(identity_key, i[identity_key]): i for i in new}
+            return diff_json(old_items, new_items, path=path)
+
+        if all(not isinstance(i, (dict, list)) for i in old + new):
+            return [{'path': path, 'change': 'removed', 'value': i} for i in old if i not in new] + \
+                   [{'path': path, 'change': 'added', 'value': i} for i in new if i not in old]
+
+    if old != new:
+        return [{'path': path, 'change': 'changed', 'old': old, 'new': new}]
+    return []
+
+
+def _identity_key(old, new):
+    items = old + new
+    if not items or not all(isinstance(i, dict) for i in items):
+        return None
+    for key in IDENTITY_KEYS:
+        if all(key in i for i in items):
+            # Items with the same identity value cannot be matched.
+            if any(len(set(json.dumps(i[key]) for i in side)) != len(side) for side in [old, new]):
+                return None
+            return key
+    return None
+
+
+def _parse_json(value):
+    try:
+        return json.loads(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def compare(source_values, target_values, keys):
+    """Compares the values of keys in the source and target stages by their content hash.
+
+    Args:
+        source_values: Dict of the source stage values by key.
+        target_values: Dict of the target stage values by key.
+        keys: The keys to compare.
+
+    Returns:
+        List of dicts with the key, its action (see: SsmSync.diff), the hash of each value and, for JSON values
+        that changed, the structured diff.
+    """
+    changes = []
+    for key in keys:
+        source, target = source_values.get(key), target_values.get(key)
+        source_hash, target_hash = fingerprint(source), fingerprint(target)
+
+        if source is None:
+            action = SsmSync.SKIPPED
+        elif target is None:
+            action = SsmSync.CREATE
+        elif source_hash != target_hash:
+            action = SsmSync.UPDATE
+        else:
+            action = SsmSync.UNCHANGED
+
+        change = {'key': key, 'action': action, 'source_hash': source_hash, 'target_hash': target_hash}
+
+        source_json, target_json = _parse_json(source), _parse_json(target)
+        if action == SsmSync.CREATE and isinstance(source_json, (dict, list)):
+            change['diff'] = diff_json(type(source_json)(), source_json)
+        elif action == SsmSync.UPDATE and isinstance(source_json, (dict, list)) and \
+                isinstance(target_json, (dict, list)):
+            change['diff'] = diff_json(target_json, source_json)
+
+        changes.append(change)
+    return changes
+
+
+def promote(service_name, source_stage, target_stage, keys, dry_run=False, json_diff=False):
+    """Copies the changed values of keys from one stage to another.
+
+    Both stages are read in bulk and each value is compared by its content hash, so only the keys whose
+    value changed are written.
+
+    Args:
+        service_name: The name of the service.
+        source_stage: The stage to copy from.
+        target_stage: The stage to copy to.
+        keys: The keys to copy.
+        dry_run: True to only show what would change.
+        json_diff: True to print the diff as JSON instead of text.
+
+    Returns:
+        List of changes (see: compare).
+    """
+    start = time.perf_counter()
+    client = ParamStore._get_ssm_client()
+    source = SsmSync(client, service_name, source_stage)
+    target = SsmSync(client, service_name, target_stage)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        source_values, target_values = executor.map(lambda sync: sync.get_all_values(), [source, target])
+
+    changes = compare(source_values, target_values, keys)
+    if not dry_run:
+        target.apply(changes, source_values)
+
+    if json_diff:
+        print(json.dumps({'source': source_stage, 'target': target_stage, 'dry_run': dry_run, 'changes': changes},
+                         indent=2))
+        return changes
+
+    print('{0} {1} to {2}'.format('Comparing' if dry_run else 'Promoting', source_stage, target_stage))
+    for change in changes:
+        print('')
+        print('{0}: {1}{2}'.format(change['key'], change['action'], ' (dry run)' if dry_run else ''))
+        if change['action'] == SsmSync.SKIPPED:
+            print('  - WARNING: Not set in {0}.'.format(source_stage))
+        elif change['action'] != SsmSync.UNCHANGED:
+            print('  - {0} -> {1}'.format(change['target_hash'], change['source_hash']))
+        for item in change.get('diff', []):
+            if item['change'] == 'changed':
+                print('  {0}: {1} -> {2}'.format(item['path'], json.dumps(item['old']), json.dumps(item['new'])))
+            else:
+                print('  {0} {1}: {2}'.format('+' if item['change'] == 'added' else '-', item['path'],
+                                              json.dumps(item['value'])))
+
+    print('')
+    print('{0} of {1} keys changed in {2:.1f}s'.format(
+        len([c for c in changes if c['action'] in [SsmSync.CREATE, SsmSync.UPDATE]]), len(changes),
+        time.perf_counter() - start))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Promotes the configs from one stage to another.')
+    parser.add_argument('-f', '--from',
+                        dest='source',
+                        choices=config.Envs.ALL,
+                        help='The stage to copy from.',
+                        default=config.Envs.STAGING)
+    parser.add_argument('-t', '--to',
+                        dest='target',
+                        choices=config.Envs.ALL,
+                        help='The stage to copy to.',
+                        required=True)
+    parser.add_argument('-k', '--key',
+                        dest='keys',
+                        action='append',
+                        help='A key to copy. Defaults to the DCA, DAA and Basic configs.')
+    parser.add_argument('--apply',
+                        action='store_true',
+                        help='Write the changes. Without it only shows what would change.')
+    parser.add_argument('--json',
+                        action='store_true',
+                        help='Print the diff as JSON.')
+    args = parser.parse_args()
+
+    if args.source == args.target:
+        parser.error('The stages must be different.')
+
+    service_name = get_service_name()
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        init_env(service_name, args.target)
+    promote(service_name, args.source, args.target, args.keys or CONFIG_KEYS, dry_run=not args.apply,
+            json_diff=args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import sys
 import os
+import json
+import time
 import yaml
 
 script_dir = os.path.dirname(__file__)
@@ -9,6 +12,7 @@ sys.path.append(os.path.join(script_dir, '..'))
 try:
     from sls_tools.param_store import ParamStore
     import www.config as config
+    from ssm_sync import SsmSync
 except Exception as ex:
     print('WARNING: Failed to load param_store: {0}'.format(ex))
 
@@ -18,35 +22,52 @@ def load_yaml(path):
         return yaml.load(f)
 
 
-def import_into_ssm(stage):
+def import_into_ssm(stage, dry_run=False, json_diff=False):
     """Imports the key/values from private.ssm.env.json into SSM.
 
+    The current values are read in batches, and only the keys that were added or changed are written.
+
     Args:
         stage: The service stage to configure.
+        dry_run: True to only show what would change.
+        json_diff: True to print the diff as JSON instead of text.
 
     Returns:
-        None
+        List of dicts with the key and its action (see: SsmSync.diff).
     """
-    print('Setting SSM Values for: {0}'.format(stage))
-    print('')
+    start = time.perf_counter()
 
-    ssm_config = config.open_local(stage, 'private.ssm.env.json')
+    # Keep stdout for the JSON diff.
+    with contextlib.redirect_stdout(sys.stderr if json_diff else sys.stdout):
+        ssm_config = config.open_local(stage, 'private.ssm.env.json')
 
-    for key, value in ssm_config.items():
-        print('')
-        print(key)
+    sync = SsmSync(ParamStore._get_ssm_client(), ParamStore.get('SERVICE_NAME', store=ParamStore.Stores.OS).value,
+                   stage)
+    changes = sync.diff(sync.get_values(ssm_config.keys()), ssm_config)
+    if not dry_run:
+        sync.apply(changes, ssm_config)
 
-        if value:
-            current_value = ParamStore.get(key, store=ParamStore.Stores.SSM).value
-            if current_value != value:
-                ParamStore.set(key, value, store=ParamStore.Stores.SSM)
-                print('  - Value has been set to: {0}'.format(value))
-            else:
-                print('  - Key/value already set.')
-        else:
-            print('  - WARNING: Key value not set in configuration file. Key/value NOT set in SSM.')
+    if json_diff:
+        print(json.dumps({'stage': stage, 'dry_run': dry_run, 'changes': changes}, indent=2))
+        return changes
 
+    print('{0} SSM Values for: {1}'.format('Comparing' if dry_run else 'Setting', stage))
     print('')
+    for change in changes:
+        if change['action'] == SsmSync.SKIPPED:
+            print('WARNING: {0}: Key value not set in configuration file. Key/value NOT set in SSM.'.format(
+                change['key']))
+        elif change['action'] != SsmSync.UNCHANGED:
+            print('{0}: {1}{2}'.format(change['key'], change['action'], ' (dry run)' if dry_run else ''))
+
+    counts = {a: len([c for c in changes if c['action'] == a]) for a in [SsmSync.CREATE, SsmSync.UPDATE,
+                                                                        SsmSync.UNCHANGED, SsmSync.SKIPPED]}
+    print('')
+    print('{0} created, {1} updated, {2} unchanged, {3} skipped in {4:.1f}s'.format(
+        counts[SsmSync.CREATE], counts[SsmSync.UPDATE], counts[SsmSync.UNCHANGED], counts[SsmSync.SKIPPED],
+        time.perf_counter() - start))
+
+    return changes
 
 
 def get_service_name():
@@ -97,12 +118,19 @@ def main():
                         choices=config.Envs.ALL,
                         help='The deploy stage.',
                         default=config.Envs.DEVELOPMENT)
+    parser.add_argument('--dry-run',
+                        action='store_true',
+                        help='Only show what would change.')
+    parser.add_argument('--json',
+                        action='store_true',
+                        help='Print the diff as JSON.')
     args = parser.parse_args()
 
     service_name = get_service_name()
     service_stage = args.stage
-    init_env(service_name, service_stage)
-    import_into_ssm(service_stage)
+    with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+        init_env(service_name, service_stage)
+    import_into_ssm(service_stage, dry_run=args.dry_run, json_diff=args.json)
 
 
 if __name__ == "__main__":
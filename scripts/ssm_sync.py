@@ -0,0 +1,137 @@
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SsmSync:
+    """Reads and writes the SSM values of a service stage in bulk.
+
+    The values are read with GetParameters (10 names per call) or GetParametersByPath, and written with one
+    PutParameter call per changed key. The calls run in parallel threads, and throttled calls are retried with
+    exponential backoff and full jitter.
+    """
+
+    # The most names GetParameters accepts per call.
+    BATCH_SIZE = 10
+    MAX_WORKERS = 8
+    MAX_RETRIES = 8
+    BACKOFF_BASE = 0.2
+    BACKOFF_MAX = 5
+    THROTTLE_ERROR_CODES = ['ThrottlingException', 'Throttling', 'TooManyUpdates', 'RequestLimitExceeded']
+
+    # The type of the parameters written (the same as ParamStore.set).
+    PARAMETER_TYPE = 'SecureString'
+
+    CREATE = 'create'
+    UPDATE = 'update'
+    UNCHANGED = 'unchanged'
+    SKIPPED = 'skipped'
+
+    def __init__(self, client, service_name, stage, max_workers=None):
+        """Instantiates a new instance.
+
+        Args:
+            client: The boto3 SSM client.
+            service_name: The name of the service.
+            stage: The stage to read and write.
+            max_workers: The most calls made at the same time. Defaults to MAX_WORKERS.
+        """
+        self.client = client
+        self.prefix = '/{0}/{1}/'.format(service_name, stage)
+        self.max_workers = max_workers or self.MAX_WORKERS
+        self._random = random.Random()
+
+    def get_values(self, keys):
+        """Gets the current values of keys.
+
+        Args:
+            keys: The keys (without the stage prefix) to get.
+
+        Returns:
+            Dict of the values by key. Keys not in SSM are not included.
+        """
+        keys = list(keys)
+        batches = [keys[i:i + self.BATCH_SIZE] for i in range(0, len(keys), self.BATCH_SIZE)]
+
+        def _get(batch):
+            response = self._call(self.client.get_parameters, Names=[self.prefix + k for k in batch],
+                                  WithDecryption=True)
+            return response['Parameters']
+
+        values = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for parameters in executor.map(_get, batches):
+                values.update({p['Name'][len(self.prefix):]: p['Value'] for p in parameters})
+        return values
+
+    def get_all_values(self):
+        """Gets all the values of the stage.
+
+        Returns:
+            Dict of the values by key.
+        """
+        values = {}
+        kwargs = {'Path': self.prefix, 'Recursive': True, 'WithDecryption': True}
+        while True:
+            response = self._call(self.client.get_parameters_by_path, **kwargs)
+            values.update({p['Name'][len(self.prefix):]: p['Value'] for p in response['Parameters']})
+            if not response.get('NextToken'):
+                return values
+            kwargs['NextToken'] = response['NextToken']
+
+    @classmethod
+    def diff(cls, current, desired):
+        """Compares the current values with the desired values.
+
+        Args:
+            current: Dict of the current values by key.
+            desired: Dict of the desired values by key. Empty values are skipped.
+
+        Returns:
+            List of dicts with the key and its action (CREATE, UPDATE, UNCHANGED or SKIPPED), in the order of desired.
+        """
+        changes = []
+        for key, value in desired.items():
+            if not value:
+                action = cls.SKIPPED
+            elif key not in current:
+                action = cls.CREATE
+            elif current[key] != value:
+                action = cls.UPDATE
+            else:
+                action = cls.UNCHANGED
+            changes.append({'key': key, 'action': action})
+        return changes
+
+    def apply(self, changes, desired):
+        """Writes the created and updated keys.
+
+        Args:
+            changes: The changes from diff().
+            desired: Dict of the desired values by key.
+
+        Returns:
+            List of the keys written.
+        """
+        keys = [c['key'] for c in changes if c['action'] in [self.CREATE, self.UPDATE]]
+
+        def _put(key):
+            self._call(self.client.put_parameter, Name=self.prefix + key, Value=desired[key],
+                       Type=self.PARAMETER_TYPE, Overwrite=True)
+            return key
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(_put, keys))
+
+    def _call(self, fn, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return fn(**kwargs)
+            except Exception as ex:
+                code = getattr(ex, 'response', {}).get('Error', {}).get('Code')
+                if code not in self.THROTTLE_ERROR_CODES or attempt >= self.MAX_RETRIES:
+                    raise
+
+            time.sleep(self._random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt))))
+            attempt += 1
@@ -0,0 +1,64 @@
+import pytest
+import json
+
+# Results recorded by the benchmarks and reported at the end of the test session.
+BENCHMARK_RESULTS = []
+TEMPLATE_RESULTS = []
+
+
+@pytest.fixture
+def benchmark_synapse(fake_synapse, request):
+    """Provides the fake Synapse server with the latency from --benchmark-latency applied to every endpoint."""
+    fake_synapse.latency = {'default': request.config.getoption('--benchmark-latency')}
+    yield fake_synapse
+
+
+@pytest.fixture
+def record_benchmark():
+    def _record(service, size, duration, server):
+        BENCHMARK_RESULTS.append({
+            'service': service,
+            'size': size,
+            'duration_ms': round(duration * 1000, 1),
+            'calls': len(server.calls),
+            'calls_by_endpoint': server.call_counts()
+        })
+
+    yield _record
+
+
+@pytest.fixture
+def record_template_benchmark():
+    def _record(cache, templates, duration):
+        TEMPLATE_RESULTS.append({
+            'cache': cache,
+            'templates': templates,
+            'duration_ms': round(duration * 1000, 1)
+        })
+
+    yield _record
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if TEMPLATE_RESULTS:
+        terminalreporter.section('Template Benchmarks (first render)')
+        terminalreporter.write_line('{0:<12} {1:>10} {2:>12}'.format('Cache', 'Templates', 'Wall (ms)'))
+        for result in TEMPLATE_RESULTS:
+            terminalreporter.write_line('{0:<12} {1:>10} {2:>12}'.format(
+                result['cache'], result['templates'], result['duration_ms']))
+
+    if not BENCHMARK_RESULTS:
+        return
+
+    terminalreporter.section('Service Benchmarks (latency: {0}s per call)'.format(
+        config.getoption('--benchmark-latency')))
+    terminalreporter.write_line('{0:<10} {1:<10} {2:>12} {3:>8}  {4}'.format(
+        'Service', 'Size', 'Wall (ms)', 'Calls', 'Calls by Endpoint'))
+
+    for result in BENCHMARK_RESULTS:
+        terminalreporter.write_line('{0:<10} {1:<10} {2:>12} {3:>8}  {4}'.format(
+            result['service'],
+            result['size'],
+            result['duration_ms'],
+            result['calls'],
+            json.dumps(result['calls_by_endpoint'], sort_keys=True)))
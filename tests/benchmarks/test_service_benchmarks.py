@@ -0,0 +1,126 @@
+import pytest
+import time
+from datetime import date, timedelta
+from www.services.synapse_space.dca import CreateDcaSpaceService
+from www.services.synapse_space.basic import CreateBasicSpaceService
+from www.services.synapse_space.daa import GrantDaaAccessService
+from www.services.synapse_space.encrypt_space_service import EncryptSpaceService
+from tests.fake_synapse import FakeSynapseServer
+
+pytestmark = pytest.mark.benchmark
+
+# The number of items in each list of the service configs.
+SIZES = {
+    'small': 1,
+    'typical': 4,
+    'large': 20
+}
+
+TABLE_COLUMNS = [
+    'Organization',
+    'Contact',
+    'Synapse_Project_ID',
+    'Synapse_Team_ID',
+    'Granted_Entity_IDs',
+    'Agreement_Link',
+    'Start_Date',
+    'End_Date',
+    'Comments'
+]
+
+
+def mk_emails(count):
+    return ['user{0}@test.com'.format(i) for i in range(count)]
+
+
+def seed_entities(server, count):
+    return [server.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Entity {0}'.format(i), server.admin_project['id'])
+            for i in range(count)]
+
+
+@pytest.mark.parametrize('size', SIZES.keys())
+def test_dca_create_space(benchmark_synapse, record_benchmark, set_dca_config, size):
+    count = SIZES[size]
+    server = benchmark_synapse
+    wiki_project = server.seed_project('Wiki Project')
+    server.seed_wiki(wiki_project['id'], 'Wiki', '# Wiki')
+
+    set_dca_config([{
+        'id': '1',
+        'name': 'Config 01',
+        'wiki_project_id': wiki_project['id'],
+        'contribution_agreement_table_id': server.seed_table(server.admin_project['id'], TABLE_COLUMNS)['id'],
+        'contributor_tracking_view_id': server.seed_view(server.admin_project['id'])['id'],
+        'team_manager_user_ids': list(range(1, count + 1)),
+        'folder_names': ['Folder {0}'.format(i) for i in range(count)],
+        'project_access': [{'id': i, 'permission': 'CAN_VIEW'} for i in range(1, count + 1)],
+        'team_entity_access': [{'id': e['id'], 'permission': 'CAN_DOWNLOAD'} for e in seed_entities(server, count)],
+        'additional_parties': []
+    }])
+    server.reset_calls()
+
+    service = CreateDcaSpaceService('1', 'Project', 'Institution', 'INST', 'user@test.com',
+                                    agreement_url='https://test.com/doc.pdf',
+                                    emails=mk_emails(count),
+                                    start_date=date.today(),
+                                    end_date=date.today() + timedelta(days=30))
+    start = time.perf_counter()
+    service.execute()
+    record_benchmark('dca', size, time.perf_counter() - start, server)
+    assert not service.errors
+
+
+@pytest.mark.parametrize('size', SIZES.keys())
+def test_basic_create_space(benchmark_synapse, record_benchmark, set_basic_config, size):
+    server = benchmark_synapse
+    set_basic_config([{'id': '1', 'name': 'Config 01'}])
+    server.reset_calls()
+
+    service = CreateBasicSpaceService('1', 'Project', 'user@test.com', team_name='Team', comments=size)
+    start = time.perf_counter()
+    service.execute()
+    record_benchmark('basic', size, time.perf_counter() - start, server)
+    assert not service.errors
+
+
+@pytest.mark.parametrize('size', SIZES.keys())
+def test_daa_grant_access(benchmark_synapse, record_benchmark, set_daa_config, size):
+    count = SIZES[size]
+    server = benchmark_synapse
+
+    set_daa_config([{
+        'id': '1',
+        'name': 'Config 01',
+        'agreement_table_id': server.seed_table(server.admin_project['id'], TABLE_COLUMNS)['id'],
+        'team_manager_user_ids': list(range(1, count + 1)),
+        'data_collections': [{
+            'name': 'Collection 1',
+            'include_collection_name_in_team_name': True,
+            'entities': [{'id': e['id'], 'name': e['name']} for e in seed_entities(server, count)]
+        }],
+        'additional_parties': []
+    }])
+    server.reset_calls()
+
+    service = GrantDaaAccessService('1', 'Team', 'Institution', 'INST', 'Collection 1', 'user@test.com',
+                                    agreement_url='https://test.com/doc.pdf',
+                                    emails=mk_emails(count),
+                                    start_date=date.today(),
+                                    end_date=date.today() + timedelta(days=30))
+    start = time.perf_counter()
+    service.execute()
+    record_benchmark('daa', size, time.perf_counter() - start, server)
+    assert not service.errors
+
+
+@pytest.mark.parametrize('size', SIZES.keys())
+def test_encrypt_space(benchmark_synapse, record_benchmark, size):
+    server = benchmark_synapse
+    project = server.seed_project('Project')
+    server.reset_calls()
+
+    service = EncryptSpaceService(project['id'])
+    start = time.perf_counter()
+    service.execute()
+    record_benchmark('encrypt', size, time.perf_counter() - start, server)
+    assert not service.errors
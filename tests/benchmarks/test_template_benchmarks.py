@@ -0,0 +1,36 @@
+import os
+import time
+import pytest
+from flask import Flask
+from www.core.template_cache import TemplateBytecodeCache
+from scripts.build_template_cache import build
+
+pytestmark = pytest.mark.benchmark
+
+WWW_DIR = os.path.dirname(TemplateBytecodeCache.PACKAGED_DIR)
+
+
+def load_templates(bytecode_cache=None):
+    """Loads every template with a new Jinja environment, like the first render after a cold start."""
+    app = Flask('www.server', root_path=WWW_DIR)
+    if bytecode_cache:
+        app.jinja_options = dict(app.jinja_options, bytecode_cache=bytecode_cache)
+
+    names = app.jinja_env.list_templates(extensions=['html'])
+    start = time.perf_counter()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names, time.perf_counter() - start
+
+
+def test_first_render(record_template_benchmark, tmpdir):
+    packaged_dir = str(tmpdir.join('packaged'))
+    build(packaged_dir)
+
+    names, duration = load_templates()
+    record_template_benchmark('none', len(names), duration)
+
+    runtime_dir = str(tmpdir.join('runtime'))
+    names, duration = load_templates(TemplateBytecodeCache(directory=runtime_dir, packaged_dir=packaged_dir))
+    record_template_benchmark('packaged', len(names), duration)
+    assert not os.path.exists(runtime_dir)
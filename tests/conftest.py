@@ -1,5 +1,6 @@
 import pytest
 import os
+import contextlib
 import json
 import tempfile
 
@@ -12,11 +13,55 @@ config.load_local(config.Envs.TEST)
 from www import server
 from www.server import app
 from tests.synapse_test_helper import SynapseTestHelper
+from tests.consistency_waiter import ConsistencyWaiter
+from tests.fake_synapse import FakeSynapseServer, FakeSynapseClient
+from tests.synapse_call_recorder import SynapseCallRecorder
+from tests.synapse_cassette import SynapseCassette
 from www.core import Synapse, Env
+from www.core.synapse import SynapseGovernor, SynapseCircuitBreaker
+from www.core.async_synapse import AsyncSynapseClient
+from www.core.checkpoint import CheckpointStore
+from www.core.shared_cache import SharedCache
 
 assert Env.FLASK_ENV() == config.Envs.TEST
 
 
+def pytest_addoption(parser):
+    parser.addoption('--run-benchmarks', action='store_true', default=False,
+                     help='Run the benchmarks in tests/benchmarks.')
+    parser.addoption('--benchmark-latency', action='store', type=float, default=0.05,
+                     help='Seconds of latency the fake Synapse server adds to each call when benchmarking.')
+    parser.addoption('--synapse-cassettes', action='store', choices=SynapseCassette.MODES, default=None,
+                     help='Record the Synapse calls of each test to tests/cassettes, or replay them without Synapse.')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: Benchmark that only runs with --run-benchmarks.')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--run-benchmarks'):
+        return
+    skip_benchmark = pytest.mark.skip(reason='Benchmarks only run with --run-benchmarks.')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+def pytest_terminal_summary(terminalreporter):
+    """Reports how long the tests waited for Synapse to be consistent (see: ConsistencyWaiter)."""
+    observed = ConsistencyWaiter.observed()
+    if not observed:
+        return
+
+    terminalreporter.section('Synapse consistency waits')
+    for name in sorted(set(o['name'] for o in observed)):
+        waits = [o for o in observed if o['name'] == name]
+        terminalreporter.write_line('{0}: {1} waits, {2:.2f}s total, {3:.2f}s max, {4} timed out'.format(
+            name, len(waits), sum(o['seconds'] for o in waits), max(o['seconds'] for o in waits),
+            len([o for o in waits if o['timed_out']])))
+
+
 @pytest.fixture
 def test_app():
     with app.app_context():
@@ -38,6 +83,50 @@ def login_enabled(test_app):
     server.init_all()
 
 
+@pytest.fixture(scope='session', autouse=True)
+def synapse_cassettes(request):
+    """Sends the Synapse calls through the cassettes when running with --synapse-cassettes."""
+    mode = request.config.getoption('--synapse-cassettes')
+    if mode is None:
+        yield None
+        return
+
+    SynapseCassette.install(mode)
+    if mode == SynapseCassette.REPLAY:
+        # Don't log in, the calls are served from the cassettes.
+        Synapse.set_client(SynapseCassette.client())
+    yield mode
+    Synapse.set_client(None)
+    SynapseCassette.uninstall()
+
+
+@pytest.fixture(autouse=True)
+def synapse_cassette(request, synapse_cassettes, monkeypatch):
+    """Records or replays the Synapse calls of a test to its cassette (see: SynapseCassette).
+
+    The tests that use the fake Synapse server are not recorded.
+    """
+    if synapse_cassettes is None or 'fake_synapse' in request.fixturenames:
+        yield None
+        return
+
+    if synapse_cassettes == SynapseCassette.REPLAY:
+        Synapse.set_client(SynapseCassette.client())
+        # Don't rate limit or back off from the recorded calls.
+        monkeypatch.setattr(Synapse, 'governor', SynapseGovernor(max_requests_per_second=0, backoff_base=0))
+    else:
+        # Log in before recording and don't use values cached by another test, so each cassette has every call.
+        monkeypatch.setattr(Synapse.client(), 'cache', SynapseCassette.client().cache)
+        monkeypatch.setattr(Synapse, 'TABLE_COL_CACHE', {})
+        monkeypatch.setattr(Synapse, 'WIKI_TEMPLATE_CACHE', {})
+        SharedCache.clear(Synapse.SHARED_CACHE_PREFIX)
+
+    with SynapseCassette(SynapseCassette.path_for(request.node.nodeid), synapse_cassettes) as cassette:
+        AsyncSynapseClient.set_transport(cassette.async_transport())
+        yield cassette
+        AsyncSynapseClient.set_transport(None)
+
+
 @pytest.fixture(scope='session')
 def syn_client():
     return Synapse.client()
@@ -51,6 +140,71 @@ def syn_test_helper():
     helper.dispose()
 
 
+@pytest.fixture
+def checkpoint_dir(monkeypatch, tmp_path):
+    """Stores the service checkpoints in a temp directory (and not in Synapse) per function."""
+    path = str(tmp_path / 'checkpoints')
+    monkeypatch.setattr(CheckpointStore, 'LOCAL_DIR', path)
+    monkeypatch.setenv('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID', '')
+    yield path
+
+
+@pytest.fixture
+def fake_synapse(monkeypatch, checkpoint_dir):
+    """Points Synapse.client() (and AsyncSynapseClient) at an in-process FakeSynapseServer per function.
+
+    The server is seeded with an admin project containing the log folder so the services can write their log files.
+    """
+    server = FakeSynapseServer()
+    admin_project = server.seed_project('Admin Project')
+    log_folder = server.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Logs', admin_project['id'])
+    server.admin_project = admin_project
+    server.log_folder = log_folder
+    server.reset_calls()
+
+    monkeypatch.setenv('SYNAPSE_SPACE_LOG_FOLDER_ID', log_folder['id'])
+    monkeypatch.setenv('SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID', '1')
+
+    # Don't rate limit or back off from the fake server.
+    monkeypatch.setattr(Synapse, 'governor', SynapseGovernor(max_requests_per_second=0, backoff_base=0))
+    monkeypatch.setattr(Synapse, 'circuit_breaker', SynapseCircuitBreaker())
+
+    # The fake server reuses IDs, so don't use wikis cached from another server.
+    monkeypatch.setattr(Synapse, 'WIKI_TEMPLATE_CACHE', {})
+
+    Synapse.set_client(FakeSynapseClient(server), factory=lambda: FakeSynapseClient(server))
+    AsyncSynapseClient.set_transport(server.async_transport())
+    yield server
+    Synapse.set_client(None)
+    AsyncSynapseClient.set_transport(None)
+
+
+@pytest.fixture
+def synapse_calls():
+    """Records the Synapse REST calls made during a test."""
+    with SynapseCallRecorder() as recorder:
+        yield recorder
+
+
+@pytest.fixture
+def call_budget():
+    """Provides a context manager that fails the test if the block makes more Synapse calls than the budget.
+
+    Example:
+
+        with call_budget(40, 'DCA create'):
+            service.execute()
+    """
+
+    @contextlib.contextmanager
+    def _budget(budget, name=''):
+        with SynapseCallRecorder() as recorder:
+            yield recorder
+        recorder.assert_within_budget(budget, name=name)
+
+    yield _budget
+
+
 @pytest.fixture
 def fake_synapse_id(syn_test_helper):
     """Provides a Synapse entity ID that does not exist."""
@@ -0,0 +1,86 @@
+import time
+import threading
+
+
+class ConsistencyWaiter:
+    """Waits for a change made in Synapse to be visible.
+
+    Synapse is eventually consistent: a team, project or ACL that was just created can take a moment to be returned
+    by the queries. The waiter calls a function until it returns a ready value, starting with a short delay that
+    doubles after each try, up to a total timeout.
+
+    The delay observed by each wait that did not succeed on the first try is recorded, and reported at the end of
+    the test run (see: conftest.pytest_terminal_summary).
+    """
+
+    INITIAL_DELAY = 0.05
+    BACKOFF_MULTIPLIER = 2
+    MAX_DELAY = 2
+    TIMEOUT = 30
+
+    _observed = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def wait(cls, name, fn, is_ready=bool, retry_exceptions=(), timeout=None, initial_delay=None):
+        """Calls a function until it returns a ready value.
+
+        Args:
+            name: What is being waited for (e.g., "team"). Used to report the delays.
+            fn: The function to call.
+            is_ready: Function that takes the result and returns True when it is ready. Defaults to a truthy result.
+            retry_exceptions: The exceptions raised by fn while the change is not visible.
+            timeout: The most seconds to wait. Defaults to TIMEOUT.
+            initial_delay: The seconds to wait after the first try. Defaults to INITIAL_DELAY.
+
+        Returns:
+            The ready result.
+
+        Raises:
+            TimeoutError: The result was not ready before the timeout.
+        """
+        timeout = cls.TIMEOUT if timeout is None else timeout
+        delay = cls.INITIAL_DELAY if initial_delay is None else initial_delay
+        start = time.monotonic()
+        attempts = 0
+
+        while True:
+            attempts += 1
+            error = None
+            try:
+                result = fn()
+                if is_ready(result):
+                    if attempts > 1:
+                        cls._record(name, attempts, time.monotonic() - start)
+                    return result
+            except retry_exceptions as ex:
+                error = ex
+
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                cls._record(name, attempts, time.monotonic() - start, timed_out=True)
+                raise TimeoutError('Timed out after {0:.1f}s waiting for {1} to be visible in Synapse{2}'.format(
+                    time.monotonic() - start, name, ': {0}'.format(error) if error else '.'))
+
+            time.sleep(min(delay, remaining))
+            delay = min(delay * cls.BACKOFF_MULTIPLIER, cls.MAX_DELAY)
+
+    @classmethod
+    def observed(cls):
+        """Gets the waits that did not succeed on the first try.
+
+        Returns:
+            List of dicts with the name, attempts, seconds and timed_out of each wait.
+        """
+        with cls._lock:
+            return list(cls._observed)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._observed.clear()
+
+    @classmethod
+    def _record(cls, name, attempts, seconds, timed_out=False):
+        with cls._lock:
+            cls._observed.append({'name': name, 'attempts': attempts, 'seconds': seconds, 'timed_out': timed_out})
@@ -0,0 +1,725 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import time
+import uuid
+import random
+import asyncio
+import tempfile
+import threading
+from datetime import datetime
+from urllib.parse import unquote_plus
+import requests
+import httpx
+import synapseclient
+from synapseclient.core import exceptions
+
+
+class FakeSynapseServer:
+    """In-process stand-in for the Synapse REST endpoints used by the services.
+
+    Endpoints are grouped by family (entity, acl, team, membershipInvitation, table, wiki, projectSettings, file)
+    so latency and errors can be injected per family.
+
+    Example:
+
+        server = FakeSynapseServer(latency={'entity': 0.05}, errors={'wiki': 500})
+        Synapse.set_client(FakeSynapseClient(server))
+    """
+
+    # Pre-signed URLs returned by the fake are served by FakeSynapseClient instead of S3.
+    FILE_URL_PREFIX = 'fake-synapse://fileHandle/'
+
+    ENDPOINTS = ['entity', 'acl', 'team', 'membershipInvitation', 'table', 'wiki', 'projectSettings', 'file', 'other']
+
+    PROJECT_TYPE = 'org.sagebionetworks.repo.model.Project'
+    FOLDER_TYPE = 'org.sagebionetworks.repo.model.Folder'
+
+    def __init__(self, latency=None, errors=None, error_rate=1.0, seed=None):
+        """Instantiates a new instance.
+
+        Args:
+            latency: Dict of endpoint family to seconds of latency added to each call (or a number for all).
+            errors: Dict of endpoint family to the HTTP status code returned by the endpoint.
+            error_rate: The probability (0..1) that an endpoint with an injected error will fail.
+            seed: Seed for the random number generator used by error_rate.
+        """
+        self.latency = latency if latency is not None else {}
+        self.errors = errors or {}
+        self.error_rate = error_rate
+        self.calls = []
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._next_id = 1000
+        self.user_id = self._mk_id()
+        self.entities = {}
+        self.annotations = {}
+        self.acls = {}
+        self.teams = {}
+        self.team_acls = {}
+        self.invitations = []
+        self.wikis = {}
+        self.project_settings = {}
+        self.storage_locations = {}
+        self.table_columns = {}
+        self.table_rows = {}
+        self.file_handles = {}
+        self.file_contents = {}
+        self.async_jobs = {}
+
+        self._routes = [
+            ('POST', r'/entity/child', 'entity', self._find_entity_id),
+            ('POST', r'/entity/(syn\d+)/bundle2', 'entity', self._get_entity_bundle),
+            ('GET', r'/entity/(syn\d+)/benefactor', 'acl', self._get_benefactor),
+            ('GET', r'/entity/(syn\d+)/acl', 'acl', self._get_acl),
+            ('PUT', r'/entity/(syn\d+)/acl', 'acl', self._put_acl),
+            ('POST', r'/entity/(syn\d+)/acl', 'acl', self._post_acl),
+            ('GET', r'/entity/(syn\d+)/annotations2', 'entity', self._get_annotations),
+            ('PUT', r'/entity/(syn\d+)/annotations2', 'entity', self._put_annotations),
+            ('GET', r'/entity/(syn\d+)/column', 'table', self._get_table_columns),
+            ('POST', r'/entity/(syn\d+)/table/transaction/async/start', 'table', self._start_table_append),
+            ('GET', r'/entity/(syn\d+)/table/transaction/async/get/(\w+)', 'table', self._get_table_append),
+            ('GET', r'/entity/(syn\d+)/uploadDestination', 'file', self._get_upload_destination),
+            ('GET', r'/entity/(syn\d+)/wiki', 'wiki', self._get_root_wiki),
+            ('GET', r'/entity/(syn\d+)/wiki2', 'wiki', self._get_root_wiki2),
+            ('GET', r'/entity/(syn\d+)/wiki2/(\d+)', 'wiki', self._get_wiki2),
+            ('GET', r'/entity/(syn\d+)/wikiheadertree', 'wiki', self._get_wiki_header_tree),
+            ('POST', r'/entity/(syn\d+)/wiki', 'wiki', self._post_wiki),
+            ('POST', r'/entity/(syn\d+)/wiki2', 'wiki', self._post_wiki),
+            ('DELETE', r'/entity/(syn\d+)/wiki2?/(\d+)', 'wiki', self._delete_wiki),
+            ('POST', r'/entity/children', 'entity', self._get_children),
+            ('GET', r'/entity/(syn\d+)', 'entity', self._get_entity),
+            ('PUT', r'/entity/(syn\d+)', 'entity', self._put_entity),
+            ('DELETE', r'/entity/(syn\d+)', 'entity', self._delete_entity),
+            ('POST', r'/entity', 'entity', self._post_entity),
+            ('POST', r'/team', 'team', self._post_team),
+            ('GET', r'/teams', 'team', self._find_teams),
+            ('PUT', r'/team/acl', 'team', self._put_team_acl),
+            ('GET', r'/team/(\d+)/acl', 'team', self._get_team_acl),
+            ('GET', r'/team/(\d+)', 'team', self._get_team),
+            ('DELETE', r'/team/(\d+)', 'team', self._delete_team),
+            ('POST', r'/membershipInvitation', 'membershipInvitation', self._post_invitation),
+            ('GET', r'/projectSettings/(syn\d+)/type/(\w+)', 'projectSettings', self._get_project_setting),
+            ('POST', r'/projectSettings', 'projectSettings', self._post_project_setting),
+            ('PUT', r'/projectSettings', 'projectSettings', self._put_project_setting),
+            ('GET', r'/storageLocation/(\d+)', 'projectSettings', self._get_storage_location),
+            ('POST', r'/file/multipart', 'file', self._post_multipart_upload),
+            ('POST', r'/fileHandle/batch', 'file', self._get_file_handle_batch),
+            ('GET', r'/fileHandle/(\d+)', 'file', self._get_file_handle),
+            ('POST', r'/filehandles/copy', 'file', self._copy_file_handles),
+            ('GET', r'/userProfile', 'other', self._get_user_profile),
+        ]
+
+    ###########################################################################
+    # Request Handling
+    ###########################################################################
+
+    def handle(self, method, uri, data=None):
+        """Handles a REST call.
+
+        Args:
+            method: The HTTP method (get, post, put, delete).
+            uri: The URI of the call, relative to the Synapse endpoint.
+            data: The request body (JSON string or None).
+
+        Returns:
+            Tuple of HTTP status code and response body (dict or None).
+        """
+        method = method.upper()
+        path = uri.split('?')[0]
+        query = dict(q.split('=', 1) for q in uri.split('?')[1].split('&') if '=' in q) if '?' in uri else {}
+        body = json.loads(data) if data else None
+
+        for route_method, pattern, endpoint, handler in self._routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                break
+        else:
+            endpoint, handler, match = 'other', None, None
+
+        start = time.perf_counter()
+        self._sleep(endpoint)
+
+        status = self.errors.get(endpoint)
+        if status and self._random.random() < self.error_rate:
+            result = (status, {'reason': 'Injected error for endpoint: {0}'.format(endpoint)})
+        elif handler is None:
+            result = (404, {'reason': 'Fake Synapse endpoint not found: {0} {1}'.format(method, path)})
+        else:
+            with self._lock:
+                result = handler(*match.groups(), body=body, query=query)
+
+        self.calls.append({
+            'method': method,
+            'path': path,
+            'endpoint': endpoint,
+            'status': result[0],
+            'latency': time.perf_counter() - start
+        })
+        return result
+
+    def async_transport(self):
+        """Gets an HTTP transport for AsyncSynapseClient that sends the calls to this server.
+
+        Each call is handled in a thread so the injected latency overlaps like it does for real calls.
+
+        Returns:
+            httpx.MockTransport
+        """
+
+        async def _handle(request):
+            # Strip the endpoint (e.g., /repo/v1) from the path.
+            uri = re.sub(r'^/\w+/v1', '', request.url.raw_path.decode('utf-8'))
+            data = request.content.decode('utf-8') or None
+            status, body = await asyncio.get_event_loop().run_in_executor(None, self.handle, request.method, uri, data)
+            return httpx.Response(status, json=body) if body is not None else httpx.Response(status)
+
+        return httpx.MockTransport(_handle)
+
+    def call_counts(self):
+        """Gets the number of calls made to each endpoint family.
+
+        Returns:
+            Dict
+        """
+        counts = {}
+        for call in self.calls:
+            counts[call['endpoint']] = counts.get(call['endpoint'], 0) + 1
+        return counts
+
+    def reset_calls(self):
+        self.calls = []
+
+    def _sleep(self, endpoint):
+        if isinstance(self.latency, dict):
+            seconds = self.latency.get(endpoint, self.latency.get('default', 0))
+        else:
+            seconds = self.latency
+        if seconds:
+            time.sleep(seconds)
+
+    def _mk_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def _now(self):
+        return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+    def _not_found(self, obj_id):
+        return 404, {'reason': 'The resource you are attempting to access cannot be found: {0}'.format(obj_id)}
+
+    ###########################################################################
+    # Seeding
+    ###########################################################################
+
+    def seed_entity(self, concrete_type, name, parent_id=None, **properties):
+        """Creates an entity directly on the server (not counted as a call).
+
+        Returns:
+            The entity dict.
+        """
+        with self._lock:
+            entity = dict(properties, concreteType=concrete_type, name=name, parentId=parent_id)
+            return self._create_entity(entity)
+
+    def seed_project(self, name=None):
+        return self.seed_entity(self.PROJECT_TYPE, name or uuid.uuid4().hex)
+
+    def seed_table(self, parent_id, column_names):
+        with self._lock:
+            table = self._create_entity({
+                'concreteType': 'org.sagebionetworks.repo.model.table.TableEntity',
+                'name': uuid.uuid4().hex,
+                'parentId': parent_id
+            })
+            self.table_columns[table['id']] = [
+                {'id': str(self._mk_id()), 'name': name, 'columnType': 'STRING', 'maximumSize': 1000}
+                for name in column_names
+            ]
+            table['columnIds'] = [c['id'] for c in self.table_columns[table['id']]]
+            return table
+
+    def seed_view(self, parent_id):
+        with self._lock:
+            return self._create_entity({
+                'concreteType': 'org.sagebionetworks.repo.model.table.EntityView',
+                'name': uuid.uuid4().hex,
+                'parentId': parent_id,
+                'scopeIds': [],
+                'viewTypeMask': 1
+            })
+
+    def seed_file(self, parent_id, name, content):
+        """Creates a file entity with content that can be downloaded with synapseclient.get()."""
+        with self._lock:
+            file_handle = self._create_file_handle(name, content=content, content_type='application/json')
+            return self._create_entity({
+                'concreteType': 'org.sagebionetworks.repo.model.FileEntity',
+                'name': name,
+                'parentId': parent_id,
+                'dataFileHandleId': file_handle['id']
+            })
+
+    def seed_wiki(self, owner_id, title, markdown, parent_wiki_id=None, attachments=None):
+        """Creates a wiki page.
+
+        Args:
+            owner_id: The ID of the entity that owns the wiki.
+            title: The title of the page.
+            markdown: The markdown of the page.
+            parent_wiki_id: The ID of the parent page or None to create the root page.
+            attachments: Dict of attachment file names and contents.
+        """
+        with self._lock:
+            attachment_ids = [self._create_file_handle(name, content=content)['id']
+                              for name, content in (attachments or {}).items()]
+            return self._create_wiki(owner_id, {'title': title,
+                                                'markdown': markdown,
+                                                'parentWikiId': parent_wiki_id,
+                                                'attachmentFileHandleIds': attachment_ids})
+
+    ###########################################################################
+    # Entity
+    ###########################################################################
+
+    def _create_entity(self, entity):
+        entity = dict(entity)
+        entity['id'] = 'syn{0}'.format(self._mk_id())
+        entity['etag'] = uuid.uuid4().hex
+        entity['createdOn'] = entity['modifiedOn'] = self._now()
+        entity['createdBy'] = entity['modifiedBy'] = str(self.user_id)
+        entity['versionNumber'] = 1
+        if entity['concreteType'] == self.PROJECT_TYPE:
+            entity['parentId'] = 'syn4489'
+            self.acls[entity['id']] = {
+                'id': entity['id'],
+                'etag': uuid.uuid4().hex,
+                'resourceAccess': [{'principalId': self.user_id, 'accessType': ['ADMIN']}]
+            }
+        self.entities[entity['id']] = entity
+        self.annotations[entity['id']] = {}
+        return entity
+
+    def _post_entity(self, body, query):
+        for existing in self.entities.values():
+            if existing['name'] == body['name'] and existing.get('parentId') == body.get('parentId') and \
+                    body['concreteType'] != self.PROJECT_TYPE:
+                return 409, {'reason': 'An entity with the name: {0} already exists'.format(body['name'])}
+            if body['concreteType'] == self.PROJECT_TYPE and existing['name'] == body['name']:
+                return 409, {'reason': 'An entity with the name: {0} already exists'.format(body['name'])}
+        return 201, self._create_entity(body)
+
+    def _get_entity(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+        return 200, self.entities[entity_id]
+
+    def _put_entity(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+        entity = dict(body, etag=uuid.uuid4().hex, modifiedOn=self._now())
+        self.entities[entity_id] = entity
+        return 200, entity
+
+    def _get_entity_bundle(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+        entity = self.entities[entity_id]
+        bundle = {
+            'entity': entity,
+            'entityType': entity['concreteType'].split('.')[-1],
+            'annotations': self._annotations(entity_id),
+            'fileHandles': [self.file_handles[entity['dataFileHandleId']]] if entity.get('dataFileHandleId') else [],
+            'restrictionInformation': {'hasUnmetAccessRequirement': False, 'restrictionLevel': 'OPEN'}
+        }
+        return 200, bundle
+
+    def _annotations(self, entity_id):
+        entity = self.entities[entity_id]
+        return {'id': entity_id, 'etag': entity['etag'], 'annotations': self.annotations[entity_id]}
+
+    def _get_annotations(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+        return 200, self._annotations(entity_id)
+
+    def _put_annotations(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+        self.annotations[entity_id] = body.get('annotations') or {}
+        self.entities[entity_id]['etag'] = uuid.uuid4().hex
+        return 200, self._annotations(entity_id)
+
+    def _delete_entity(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+
+        # The children are deleted with their parent.
+        deleted = [entity_id]
+        for deleted_id in deleted:
+            deleted += [e['id'] for e in self.entities.values() if e.get('parentId') == deleted_id]
+        for deleted_id in deleted:
+            self.entities.pop(deleted_id)
+            self.annotations.pop(deleted_id, None)
+            self.acls.pop(deleted_id, None)
+            self.wikis.pop(deleted_id, None)
+        return 200, None
+
+    def _find_entity_id(self, body, query):
+        parent_id = body.get('parentId')
+        for entity in self.entities.values():
+            if entity['name'] == body['entityName'] and (parent_id is None or entity.get('parentId') == parent_id):
+                if parent_id is not None or entity['concreteType'] == self.PROJECT_TYPE:
+                    return 200, {'id': entity['id']}
+        return self._not_found(body['entityName'])
+
+    def _get_children(self, body, query):
+        include_types = body.get('includeTypes') or []
+        children = [
+            {'id': e['id'], 'name': e['name'], 'type': e['concreteType'], 'createdOn': e['createdOn']}
+            for e in self.entities.values()
+            if e.get('parentId') == body.get('parentId') and
+               (not include_types or e['concreteType'].split('.')[-1].lower().replace('entity', '') in
+                [t.replace('entity', '') for t in include_types] or
+                (e['concreteType'].endswith('FileEntity') and 'file' in include_types))
+        ]
+        return 200, {'page': children}
+
+    ###########################################################################
+    # ACL
+    ###########################################################################
+
+    def _benefactor_id(self, entity_id):
+        while entity_id not in self.acls:
+            entity_id = self.entities[entity_id].get('parentId')
+            if entity_id not in self.entities:
+                return None
+        return entity_id
+
+    def _get_benefactor(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+        benefactor_id = self._benefactor_id(entity_id) or entity_id
+        return 200, {'id': benefactor_id, 'name': self.entities[benefactor_id]['name']}
+
+    def _get_acl(self, entity_id, body, query):
+        if entity_id not in self.acls:
+            return self._not_found(entity_id)
+        return 200, self.acls[entity_id]
+
+    def _put_acl(self, entity_id, body, query):
+        if entity_id not in self.acls:
+            return self._not_found(entity_id)
+        self.acls[entity_id] = dict(body, id=entity_id, etag=uuid.uuid4().hex)
+        return 200, self.acls[entity_id]
+
+    def _post_acl(self, entity_id, body, query):
+        if entity_id not in self.entities:
+            return self._not_found(entity_id)
+        if entity_id in self.acls:
+            return 409, {'reason': 'ACL already exists for: {0}'.format(entity_id)}
+        self.acls[entity_id] = dict(body, id=entity_id, etag=uuid.uuid4().hex)
+        return 201, self.acls[entity_id]
+
+    ###########################################################################
+    # Team
+    ###########################################################################
+
+    def _post_team(self, body, query):
+        if any(t['name'] == body['name'] for t in self.teams.values()):
+            return 409, {'reason': 'Team with name: {0} already exists'.format(body['name'])}
+        team_id = str(self._mk_id())
+        team = dict(body, id=team_id, etag=uuid.uuid4().hex, createdOn=self._now(), modifiedOn=self._now())
+        self.teams[team_id] = team
+        self.team_acls[team_id] = {
+            'id': team_id,
+            'etag': uuid.uuid4().hex,
+            'resourceAccess': [{'principalId': self.user_id, 'accessType': ['READ', 'UPDATE', 'DELETE']}]
+        }
+        return 201, team
+
+    def _get_team(self, team_id, body, query):
+        if team_id not in self.teams:
+            return self._not_found(team_id)
+        return 200, self.teams[team_id]
+
+    def _find_teams(self, body, query):
+        fragment = unquote_plus(query.get('fragment', '')).lower()
+        results = [t for t in self.teams.values() if t['name'].lower().startswith(fragment)]
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', len(results) or 1))
+        return 200, {'results': results[offset:offset + limit], 'totalNumberOfResults': len(results)}
+
+    def _delete_team(self, team_id, body, query):
+        if team_id not in self.teams:
+            return self._not_found(team_id)
+        self.teams.pop(team_id)
+        self.team_acls.pop(team_id, None)
+        return 200, None
+
+    def _get_team_acl(self, team_id, body, query):
+        if team_id not in self.team_acls:
+            return self._not_found(team_id)
+        return 200, self.team_acls[team_id]
+
+    def _put_team_acl(self, body, query):
+        team_id = str(body['id'])
+        if team_id not in self.team_acls:
+            return self._not_found(team_id)
+        self.team_acls[team_id] = dict(body, etag=uuid.uuid4().hex)
+        return 200, self.team_acls[team_id]
+
+    def _post_invitation(self, body, query):
+        if str(body['teamId']) not in self.teams:
+            return self._not_found(body['teamId'])
+        invitation = dict(body, id=str(self._mk_id()), createdOn=self._now())
+        self.invitations.append(invitation)
+        return 201, invitation
+
+    ###########################################################################
+    # Wiki
+    ###########################################################################
+
+    def _create_wiki(self, owner_id, body):
+        wiki = dict(body,
+                    id=str(self._mk_id()),
+                    etag=uuid.uuid4().hex,
+                    createdOn=self._now(),
+                    modifiedOn=self._now(),
+                    attachmentFileHandleIds=body.get('attachmentFileHandleIds') or [])
+        # Wikis created with the v2 API reference an existing markdown file handle.
+        if not wiki.get('markdownFileHandleId'):
+            markdown_handle = self._create_file_handle('{0}.md.gz'.format(wiki['id']),
+                                                       gzip.compress((wiki.get('markdown') or '').encode('utf-8')))
+            wiki['markdownFileHandleId'] = markdown_handle['id']
+        self.wikis.setdefault(owner_id, {})[wiki['id']] = wiki
+        return wiki
+
+    def _root_wiki(self, owner_id):
+        return next((w for w in self.wikis.get(owner_id, {}).values() if not w.get('parentWikiId')), None)
+
+    def _get_root_wiki(self, owner_id, body, query):
+        wiki = self._root_wiki(owner_id)
+        if wiki is None:
+            return self._not_found(owner_id)
+        return 200, wiki
+
+    def _get_root_wiki2(self, owner_id, body, query):
+        status, wiki = self._get_root_wiki(owner_id, body, query)
+        if status != 200:
+            return status, wiki
+        return status, {k: v for k, v in wiki.items() if k != 'markdown'}
+
+    def _get_wiki2(self, owner_id, wiki_id, body, query):
+        wiki = self.wikis.get(owner_id, {}).get(wiki_id)
+        if wiki is None:
+            return self._not_found(wiki_id)
+        return 200, {k: v for k, v in wiki.items() if k != 'markdown'}
+
+    def _get_wiki_header_tree(self, owner_id, body, query):
+        headers = [{'id': w['id'], 'title': w.get('title'), 'parentId': w.get('parentWikiId')}
+                   for w in self.wikis.get(owner_id, {}).values()]
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', 10))
+        return 200, {'results': headers[offset:offset + limit], 'totalNumberOfResults': len(headers)}
+
+    def _post_wiki(self, owner_id, body, query):
+        if owner_id not in self.entities:
+            return self._not_found(owner_id)
+        if not body.get('parentWikiId') and self._root_wiki(owner_id):
+            return 409, {'reason': 'A root wiki already exists for: {0}'.format(owner_id)}
+        return 201, self._create_wiki(owner_id, body)
+
+    def _delete_wiki(self, owner_id, wiki_id, body, query):
+        wikis = self.wikis.get(owner_id, {})
+        if wiki_id not in wikis:
+            return self._not_found(wiki_id)
+
+        # The sub-pages are deleted with their parent.
+        deleted = [wiki_id]
+        for deleted_id in deleted:
+            deleted += [w['id'] for w in wikis.values() if w.get('parentWikiId') == deleted_id]
+        for deleted_id in deleted:
+            wikis.pop(deleted_id)
+        return 200, None
+
+    ###########################################################################
+    # Project Settings
+    ###########################################################################
+
+    def _get_project_setting(self, project_id, setting_type, body, query):
+        setting = self.project_settings.get((project_id, setting_type))
+        if setting is None:
+            return 204, None
+        return 200, setting
+
+    def _post_project_setting(self, body, query):
+        key = (body['projectId'], body['settingsType'])
+        if key in self.project_settings:
+            return 409, {'reason': 'Project setting already exists.'}
+        self.project_settings[key] = dict(body, id=str(self._mk_id()), etag=uuid.uuid4().hex)
+        return 201, self.project_settings[key]
+
+    def _put_project_setting(self, body, query):
+        key = (body['projectId'], body['settingsType'])
+        self.project_settings[key] = dict(body, etag=uuid.uuid4().hex)
+        return 200, None
+
+    def _get_storage_location(self, storage_location_id, body, query):
+        return 200, self.storage_locations.get(storage_location_id, {
+            'storageLocationId': int(storage_location_id),
+            'concreteType': 'org.sagebionetworks.repo.model.project.ExternalS3StorageLocationSetting',
+            'uploadType': 'S3'
+        })
+
+    ###########################################################################
+    # Table
+    ###########################################################################
+
+    def _get_table_columns(self, table_id, body, query):
+        if table_id not in self.table_columns:
+            return self._not_found(table_id)
+        columns = self.table_columns[table_id]
+        return 200, {'results': columns, 'totalNumberOfResults': len(columns)}
+
+    def _start_table_append(self, table_id, body, query):
+        if table_id not in self.table_columns:
+            return self._not_found(table_id)
+        token = str(self._mk_id())
+        self.async_jobs[token] = body
+        self.table_rows.setdefault(table_id, []).append(body)
+        return 201, {'token': token}
+
+    def _get_table_append(self, table_id, token, body, query):
+        if token not in self.async_jobs:
+            return self._not_found(token)
+        return 201, {
+            'concreteType': 'org.sagebionetworks.repo.model.table.TableUpdateTransactionResponse',
+            'results': [{
+                'concreteType': 'org.sagebionetworks.repo.model.table.UploadToTableResult',
+                'rowsProcessed': 1,
+                'etag': uuid.uuid4().hex
+            }]
+        }
+
+    ###########################################################################
+    # File
+    ###########################################################################
+
+    def _get_upload_destination(self, entity_id, body, query):
+        return 200, {
+            'concreteType': 'org.sagebionetworks.repo.model.file.S3UploadDestination',
+            'storageLocationId': 1,
+            'uploadType': 'S3'
+        }
+
+    def _create_file_handle(self, file_name, content=None, content_type=None, content_size=None, content_md5=None):
+        file_handle = {
+            'id': str(self._mk_id()),
+            'concreteType': 'org.sagebionetworks.repo.model.file.S3FileHandle',
+            'fileName': file_name,
+            'contentType': content_type,
+            'contentSize': len(content) if content is not None else content_size,
+            'contentMd5': hashlib.md5(content).hexdigest() if content is not None else content_md5,
+            'etag': uuid.uuid4().hex,
+            'createdOn': self._now(),
+            'createdBy': str(self.user_id)
+        }
+        self.file_handles[file_handle['id']] = file_handle
+        self.file_contents[file_handle['id']] = content if content is not None else b''
+        return file_handle
+
+    def _post_multipart_upload(self, body, query):
+        """Completes the upload immediately so no bytes are sent to a pre-signed URL."""
+        file_handle = self._create_file_handle(body['fileName'],
+                                               content_type=body.get('contentType'),
+                                               content_size=body.get('fileSizeBytes'),
+                                               content_md5=body.get('contentMD5Hex'))
+        return 201, {'uploadId': str(self._mk_id()), 'state': 'COMPLETED', 'resultFileHandleId': file_handle['id']}
+
+    def _get_file_handle(self, file_handle_id, body, query):
+        if file_handle_id not in self.file_handles:
+            return self._not_found(file_handle_id)
+        return 200, self.file_handles[file_handle_id]
+
+    def _copy_file_handles(self, body, query):
+        """Copies file handles without copying their content, like Synapse does."""
+        results = []
+        for copy_request in body.get('copyRequests') or []:
+            file_handle_id = str(copy_request['originalFile']['fileHandleId'])
+            original = self.file_handles.get(file_handle_id)
+            if original is None:
+                results.append({'originalFileHandleId': file_handle_id, 'failureCode': 'NOT_FOUND'})
+                continue
+
+            new_file_handle = dict(original,
+                                   id=str(self._mk_id()),
+                                   fileName=copy_request.get('newFileName') or original['fileName'],
+                                   etag=uuid.uuid4().hex,
+                                   createdOn=self._now())
+            self.file_handles[new_file_handle['id']] = new_file_handle
+            self.file_contents[new_file_handle['id']] = self.file_contents[file_handle_id]
+            results.append({'originalFileHandleId': file_handle_id, 'newFileHandle': new_file_handle})
+        return 201, {'copyResults': results}
+
+    def _get_file_handle_batch(self, body, query):
+        results = []
+        for requested in body.get('requestedFiles') or []:
+            file_handle_id = str(requested['fileHandleId'])
+            if file_handle_id in self.file_handles:
+                results.append({
+                    'fileHandleId': file_handle_id,
+                    'fileHandle': self.file_handles[file_handle_id],
+                    'preSignedURL': '{0}{1}'.format(self.FILE_URL_PREFIX, file_handle_id)
+                })
+            else:
+                results.append({'fileHandleId': file_handle_id, 'failureCode': 'NOT_FOUND'})
+        return 201, {'requestedFiles': results}
+
+    ###########################################################################
+    # Other
+    ###########################################################################
+
+    def _get_user_profile(self, body, query):
+        return 200, {'ownerId': str(self.user_id), 'userName': 'fake-synapse-user'}
+
+
+class FakeSynapseClient(synapseclient.Synapse):
+    """A synapseclient whose REST transport is served by a FakeSynapseServer.
+
+    All the high level synapseclient methods (store, get, setPermissions, etc.) run unmodified,
+    only the HTTP layer is replaced.
+    """
+
+    def __init__(self, server=None):
+        super().__init__(skip_checks=True)
+        # The fake reuses file handle IDs so don't share the download cache with other clients.
+        self.cache = synapseclient.core.cache.Cache(tempfile.mkdtemp())
+        self.server = server or FakeSynapseServer()
+        self.credentials = None
+
+    def _rest_call(self, method, uri, data, endpoint, headers, retryPolicy, requests_session, **kwargs):
+        status, body = self.server.handle(method, uri, data)
+
+        response = requests.Response()
+        response.status_code = status
+        if body is not None:
+            response.headers['content-type'] = 'application/json'
+            response._content = json.dumps(body).encode('utf-8')
+        else:
+            response._content = b''
+        response.url = '{0}{1}'.format(endpoint or self.repoEndpoint, uri)
+        response.request = requests.Request(method.upper(), response.url).prepare()
+
+        exceptions._raise_for_status(response, verbose=self.debug)
+        return response
+
+    def _download_from_URL(self, url, destination, fileHandleId=None, expected_md5=None):
+        file_handle_id = url[len(FakeSynapseServer.FILE_URL_PREFIX):]
+        if os.path.isdir(destination):
+            destination = os.path.join(destination, self.server.file_handles[file_handle_id]['fileName'])
+        with open(destination, mode='wb') as f:
+            f.write(self.server.file_contents.get(file_handle_id, b''))
+        return destination
@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+
+# The scripts import each other as top level modules.
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'scripts'))
+
+
+@pytest.fixture
+def ssm_client(monkeypatch):
+    """An SSM client backed by moto."""
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    for key in ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN']:
+        monkeypatch.setenv(key, 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        yield boto3.client('ssm')
+
+
+@pytest.fixture
+def ssm_calls(ssm_client):
+    """The names of the SSM API calls made with ssm_client."""
+    calls = []
+    ssm_client.meta.events.register('before-call.ssm.*', lambda model, **kwargs: calls.append(model.name))
+    return calls
@@ -0,0 +1,116 @@
+import sys
+import json
+import pytest
+import promote_stage
+from promote_stage import fingerprint, diff_json, compare
+from ssm_sync import SsmSync
+
+
+def test_fingerprint():
+    assert fingerprint(None) is None
+    assert fingerprint('value') == fingerprint('value')
+    assert fingerprint('value') != fingerprint('other')
+    assert len(fingerprint('value')) == 16
+
+
+def test_diff_json_compares_the_object_keys():
+    old = {'a': 1, 'b': {'c': 2}, 'removed': 3}
+    new = {'a': 1, 'b': {'c': 4}, 'added': 5}
+    assert diff_json(old, new) == [
+        {'path': 'b.c', 'change': 'changed', 'old': 2, 'new': 4},
+        {'path': 'removed', 'change': 'removed', 'value': 3},
+        {'path': 'added', 'change': 'added', 'value': 5}
+    ]
+
+
+def test_diff_json_matches_the_list_items_by_identity():
+    old = [{'id': '1', 'name': 'A'}, {'id': '2', 'name': 'B'}]
+    new = [{'id': '3', 'name': 'C'}, {'id': '1', 'name': 'Z'}]
+    assert diff_json(old, new, path='configs') == [
+        {'path': 'configs[id=1].name', 'change': 'changed', 'old': 'A', 'new': 'Z'},
+        {'path': 'configs[id=2]', 'change': 'removed', 'value': {'id': '2', 'name': 'B'}},
+        {'path': 'configs[id=3]', 'change': 'added', 'value': {'id': '3', 'name': 'C'}}
+    ]
+
+    # The first identity key every item has is used.
+    assert diff_json([{'code': 'A', 'x': 1}], [{'code': 'A', 'x': 2}]) == [
+        {'path': '[code=A].x', 'change': 'changed', 'old': 1, 'new': 2}
+    ]
+
+
+def test_diff_json_compares_lists_of_values_as_sets():
+    assert diff_json(['a', 'b'], ['b', 'a']) == []
+    assert diff_json(['a', 'b'], ['b', 'c'], path='names') == [
+        {'path': 'names', 'change': 'removed', 'value': 'a'},
+        {'path': 'names', 'change': 'added', 'value': 'c'}
+    ]
+
+
+def test_diff_json_compares_lists_with_duplicate_identities_as_a_whole():
+    old = [{'id': '1', 'name': 'A'}, {'id': '1', 'name': 'B'}]
+    new = [{'id': '1', 'name': 'A'}]
+    assert diff_json(old, new, path='configs') == [{'path': 'configs', 'change': 'changed', 'old': old, 'new': new}]
+    assert diff_json(old, list(old)) == []
+
+
+def test_compare():
+    source = {'NEW': '[{"id": "1"}]', 'CHANGED': '{"a": 2}', 'SAME': 'value'}
+    target = {'CHANGED': '{"a": 1}', 'SAME': 'value', 'NOT_IN_SOURCE': 'value'}
+    changes = {c['key']: c for c in compare(source, target, ['NEW', 'CHANGED', 'SAME', 'NOT_IN_SOURCE'])}
+
+    assert changes['NEW']['action'] == SsmSync.CREATE
+    assert changes['NEW']['target_hash'] is None
+    assert changes['NEW']['diff'] == [{'path': '[id=1]', 'change': 'added', 'value': {'id': '1'}}]
+
+    assert changes['CHANGED']['action'] == SsmSync.UPDATE
+    assert changes['CHANGED']['source_hash'] == fingerprint(source['CHANGED'])
+    assert changes['CHANGED']['target_hash'] == fingerprint(target['CHANGED'])
+    assert changes['CHANGED']['diff'] == [{'path': 'a', 'change': 'changed', 'old': 1, 'new': 2}]
+
+    assert changes['SAME']['action'] == SsmSync.UNCHANGED
+    assert 'diff' not in changes['SAME']
+
+    assert changes['NOT_IN_SOURCE']['action'] == SsmSync.SKIPPED
+    assert changes['NOT_IN_SOURCE']['source_hash'] is None
+
+
+@pytest.fixture
+def promoted(monkeypatch):
+    calls = []
+    monkeypatch.setattr(promote_stage, 'get_service_name', lambda: 'service')
+    monkeypatch.setattr(promote_stage, 'init_env', lambda service_name, stage: None)
+    monkeypatch.setattr(promote_stage, 'promote', lambda *args, **kwargs: calls.append((args, kwargs)))
+    return calls
+
+
+def test_main_only_shows_the_changes_by_default(promoted, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['promote_stage.py', '--to', 'production'])
+    promote_stage.main()
+    assert promoted[0][0][1:3] == ('staging', 'production')
+    assert promoted[0][1]['dry_run'] is True
+
+    monkeypatch.setattr(sys, 'argv', ['promote_stage.py', '--to', 'production', '--apply'])
+    promote_stage.main()
+    assert promoted[1][1]['dry_run'] is False
+
+
+def test_main_requires_the_target_stage(promoted, monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['promote_stage.py', '--apply'])
+    with pytest.raises(SystemExit):
+        promote_stage.main()
+    assert promoted == []
+
+
+def test_promote_does_not_write_on_a_dry_run(ssm_client, ssm_calls, monkeypatch, capsys):
+    from sls_tools.param_store import ParamStore
+    monkeypatch.setattr(ParamStore, '_ssm_client', ssm_client)
+    ssm_client.put_parameter(Name='/service/staging/KEY', Value='{"a": 2}', Type='SecureString')
+    ssm_client.put_parameter(Name='/service/production/KEY', Value='{"a": 1}', Type='SecureString')
+    ssm_calls.clear()
+
+    changes = promote_stage.promote('service', 'staging', 'production', ['KEY'], dry_run=True, json_diff=True)
+    assert changes[0]['action'] == SsmSync.UPDATE
+    assert json.loads(capsys.readouterr().out)['dry_run'] is True
+    assert 'PutParameter' not in ssm_calls
+    assert ssm_client.get_parameter(Name='/service/production/KEY', WithDecryption=True)['Parameter']['Value'] == \
+           '{"a": 1}'
@@ -0,0 +1,44 @@
+import json
+import pytest
+import set_ssm
+from sls_tools.param_store import ParamStore
+from ssm_sync import SsmSync
+
+DESIRED = {'NEW': 'b', 'SAME': 'a', 'CHANGED': 'b', 'EMPTY': ''}
+
+
+@pytest.fixture
+def ssm(ssm_client, monkeypatch):
+    monkeypatch.setenv('SERVICE_NAME', 'service')
+    monkeypatch.setattr(ParamStore, '_ssm_client', ssm_client)
+    monkeypatch.setattr(set_ssm.config, 'open_local', lambda stage, filename: dict(DESIRED))
+    for key, value in {'SAME': 'a', 'CHANGED': 'a'}.items():
+        ssm_client.put_parameter(Name='/service/test/' + key, Value=value, Type='SecureString')
+    return ssm_client
+
+
+def values(ssm_client):
+    return {p['Name']: p['Value'] for p in
+            ssm_client.get_parameters_by_path(Path='/service/test/', WithDecryption=True)['Parameters']}
+
+
+def test_it_sets_the_changed_values(ssm):
+    changes = set_ssm.import_into_ssm('test')
+    assert {c['key']: c['action'] for c in changes} == {
+        'NEW': SsmSync.CREATE, 'SAME': SsmSync.UNCHANGED, 'CHANGED': SsmSync.UPDATE, 'EMPTY': SsmSync.SKIPPED}
+    assert values(ssm) == {'/service/test/NEW': 'b', '/service/test/SAME': 'a', '/service/test/CHANGED': 'b'}
+
+
+def test_it_does_not_write_on_a_dry_run(ssm, ssm_calls):
+    changes = set_ssm.import_into_ssm('test', dry_run=True)
+    assert [c['action'] for c in changes] == [SsmSync.CREATE, SsmSync.UNCHANGED, SsmSync.UPDATE, SsmSync.SKIPPED]
+    assert 'PutParameter' not in ssm_calls
+    assert values(ssm) == {'/service/test/SAME': 'a', '/service/test/CHANGED': 'a'}
+
+
+def test_it_prints_the_diff_as_json(ssm, capsys):
+    set_ssm.import_into_ssm('test', dry_run=True, json_diff=True)
+    diff = json.loads(capsys.readouterr().out)
+    assert diff['stage'] == 'test'
+    assert diff['dry_run'] is True
+    assert [c['key'] for c in diff['changes']] == list(DESIRED.keys())
@@ -0,0 +1,100 @@
+import pytest
+import botocore.exceptions
+from ssm_sync import SsmSync
+
+PREFIX = '/service/test/'
+
+
+@pytest.fixture
+def sync(ssm_client, monkeypatch):
+    monkeypatch.setattr('ssm_sync.time.sleep', lambda seconds: None)
+    return SsmSync(ssm_client, 'service', 'test')
+
+
+def put(ssm_client, values):
+    for key, value in values.items():
+        ssm_client.put_parameter(Name=PREFIX + key, Value=value, Type='SecureString', Overwrite=True)
+
+
+def throttle(fn, times):
+    """Wraps an SSM call so it is throttled the first times it is called."""
+    calls = []
+
+    def _call(**kwargs):
+        calls.append(kwargs)
+        if len(calls) <= times:
+            raise botocore.exceptions.ClientError({'Error': {'Code': 'ThrottlingException'}}, 'GetParameters')
+        return fn(**kwargs)
+
+    return _call, calls
+
+
+def test_it_gets_the_values_in_batches(sync, ssm_client, ssm_calls):
+    put(ssm_client, {'KEY_{0}'.format(i): str(i) for i in range(25)})
+    ssm_calls.clear()
+
+    keys = ['KEY_{0}'.format(i) for i in range(25)] + ['MISSING']
+    values = sync.get_values(keys)
+    assert values == {'KEY_{0}'.format(i): str(i) for i in range(25)}
+    assert ssm_calls == ['GetParameters'] * 3
+
+
+def test_it_gets_all_the_values(sync, ssm_client):
+    put(ssm_client, {'KEY_{0}'.format(i): str(i) for i in range(15)})
+    ssm_client.put_parameter(Name='/service/other/KEY_0', Value='other', Type='SecureString')
+    assert sync.get_all_values() == {'KEY_{0}'.format(i): str(i) for i in range(15)}
+
+
+def test_diff():
+    current = {'SAME': 'a', 'CHANGED': 'a', 'EMPTY': 'a'}
+    desired = {'NEW': 'b', 'SAME': 'a', 'CHANGED': 'b', 'EMPTY': ''}
+    assert SsmSync.diff(current, desired) == [
+        {'key': 'NEW', 'action': SsmSync.CREATE},
+        {'key': 'SAME', 'action': SsmSync.UNCHANGED},
+        {'key': 'CHANGED', 'action': SsmSync.UPDATE},
+        {'key': 'EMPTY', 'action': SsmSync.SKIPPED}
+    ]
+
+
+def test_it_only_writes_the_created_and_updated_keys(sync, ssm_client, ssm_calls):
+    put(ssm_client, {'SAME': 'a', 'CHANGED': 'a'})
+    desired = {'NEW': 'b', 'SAME': 'a', 'CHANGED': 'b', 'EMPTY': ''}
+    changes = sync.diff(sync.get_values(desired.keys()), desired)
+    ssm_calls.clear()
+
+    assert sorted(sync.apply(changes, desired)) == ['CHANGED', 'NEW']
+    assert ssm_calls == ['PutParameter'] * 2
+    assert sync.get_values(desired.keys()) == {'NEW': 'b', 'SAME': 'a', 'CHANGED': 'b'}
+
+
+def test_it_retries_throttled_calls(sync, ssm_client):
+    put(ssm_client, {'KEY': 'value'})
+    sync.client = type('Client', (), {})()
+    sync.client.get_parameters, calls = throttle(ssm_client.get_parameters, 2)
+
+    assert sync.get_values(['KEY']) == {'KEY': 'value'}
+    assert len(calls) == 3
+
+
+def test_it_stops_retrying_throttled_calls(sync, ssm_client, monkeypatch):
+    monkeypatch.setattr(SsmSync, 'MAX_RETRIES', 2)
+    sync.client = type('Client', (), {})()
+    sync.client.get_parameters, calls = throttle(ssm_client.get_parameters, 10)
+
+    with pytest.raises(botocore.exceptions.ClientError):
+        sync.get_values(['KEY'])
+    assert len(calls) == 3
+
+
+def test_it_does_not_retry_other_errors(sync, ssm_client):
+    sync.client = type('Client', (), {})()
+    calls = []
+
+    def _get_parameters(**kwargs):
+        calls.append(kwargs)
+        raise botocore.exceptions.ClientError({'Error': {'Code': 'AccessDeniedException'}}, 'GetParameters')
+
+    sync.client.get_parameters = _get_parameters
+    with pytest.raises(botocore.exceptions.ClientError):
+        sync.get_values(['KEY'])
+    assert len(calls) == 1
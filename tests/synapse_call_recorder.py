@@ -0,0 +1,84 @@
+import re
+import threading
+from www.core import Synapse
+
+
+class SynapseCallRecorder:
+    """Records every Synapse REST call (method, path, latency) made through Synapse.client().
+
+    Example:
+
+        with SynapseCallRecorder() as recorder:
+            service.execute()
+        assert len(recorder.calls) <= 40
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        Synapse.add_rest_call_listener(self._on_rest_call)
+
+    def stop(self):
+        Synapse.remove_rest_call_listener(self._on_rest_call)
+
+    def reset(self):
+        with self._lock:
+            self.calls = []
+
+    def _on_rest_call(self, method, uri, duration, error):
+        with self._lock:
+            self.calls.append({
+                'method': method.upper(),
+                'path': uri.split('?')[0],
+                'latency': duration,
+                'error': str(error) if error else None
+            })
+
+    def count(self, method=None, path=None):
+        """Gets the number of recorded calls.
+
+        Args:
+            method: Only count calls with this HTTP method.
+            path: Only count calls whose path matches this regular expression.
+
+        Returns:
+            Integer
+        """
+        return len([c for c in self.calls
+                    if (method is None or c['method'] == method.upper()) and
+                    (path is None or re.search(path, c['path']))])
+
+    def summary(self):
+        """Gets the number of calls for each method and path with the entity/team IDs normalized.
+
+        Returns:
+            Dict of "METHOD /path" to the number of calls.
+        """
+        summary = {}
+        for call in self.calls:
+            key = '{0} {1}'.format(call['method'], re.sub(r'/(syn)?\d+', r'/{id}', call['path']))
+            summary[key] = summary.get(key, 0) + 1
+        return summary
+
+    def assert_within_budget(self, budget, name=''):
+        """Fails if more calls were recorded than the budget allows.
+
+        Args:
+            budget: The maximum number of calls.
+            name: Name of what is being measured for the failure message.
+        """
+        total = len(self.calls)
+        assert total <= budget, 'Synapse call budget exceeded{0}: {1} calls (budget: {2})\n{3}'.format(
+            ' for {0}'.format(name) if name else '',
+            total,
+            budget,
+            '\n'.join('  {0}: {1}'.format(k, v) for k, v in sorted(self.summary().items(), key=lambda i: -i[1])))
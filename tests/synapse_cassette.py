@@ -0,0 +1,371 @@
+import os
+import re
+import json
+import base64
+import hashlib
+import tempfile
+import threading
+import httpx
+import requests
+import synapseclient
+
+
+class CassetteError(Exception):
+    """A call was made that is not in the cassette."""
+
+
+class SynapseCassette:
+    """Records the Synapse HTTP calls made by a test to a file (a cassette) and replays them offline.
+
+    Every call sent with requests (the synapseclient, including the file uploads and downloads) and with the
+    AsyncSynapseClient transport is captured. In replay mode the calls are served from the cassette in the order they
+    were recorded. A call is matched by its method and URL, and then by its body, with the unique names (uuid hex)
+    and timestamps normalized, so the values the services generate on each run do not break the replay. The unique
+    names generated by the SynapseTestHelper are recorded too, and handed out again in the same order when replaying.
+
+    The credentials are never recorded: the client is logged in before the recording starts, the request headers are
+    not saved and the secret keys are redacted from the bodies.
+
+    Example:
+
+        SynapseCassette.install(SynapseCassette.REPLAY)
+        with SynapseCassette(SynapseCassette.path_for(request.node.nodeid), SynapseCassette.REPLAY):
+            service.execute()
+    """
+
+    RECORD = 'record'
+    REPLAY = 'replay'
+    MODES = [RECORD, REPLAY]
+
+    DIR = os.path.join(os.path.dirname(__file__), 'cassettes')
+
+    REDACTED_KEYS = ['password', 'apiKey', 'sessionToken', 'accessToken', 'secretKey']
+    REDACTED = '<redacted>'
+
+    # The response headers that are not saved (the content is saved decoded).
+    SKIPPED_HEADERS = ['set-cookie', 'content-encoding', 'transfer-encoding', 'content-length']
+
+    # The values that change on each run and are ignored when matching the calls.
+    NORMALIZED_PATTERNS = [
+        (re.compile(r'[0-9a-f]{32}'), '{uniq}'),
+        (re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?Z?'), '{time}')
+    ]
+
+    _mode = None
+    _send = None
+    _active = None
+
+    def __init__(self, path, mode):
+        """Instantiates a new instance.
+
+        Args:
+            path: The path of the cassette file.
+            mode: RECORD or REPLAY.
+        """
+        self.path = path
+        self.mode = mode
+        self.test_id = None
+        self.uniq_values = []
+        self.interactions = []
+        self._used = set()
+        self._uniq_index = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @classmethod
+    def path_for(cls, nodeid):
+        """Gets the path of the cassette of a test.
+
+        Args:
+            nodeid: The pytest node ID of the test (e.g., "tests/www/test_a.py::test_b[1]").
+
+        Returns:
+            String
+        """
+        module, _, name = nodeid.partition('::')
+        module = re.sub(r'^tests/', '', os.path.splitext(module)[0])
+        return os.path.join(cls.DIR, module, '{0}.json'.format(re.sub(r'[^\w.-]+', '_', name)))
+
+    @classmethod
+    def install(cls, mode):
+        """Sends the requests calls through the active cassette.
+
+        When no cassette is active the calls are sent as usual in RECORD mode and fail in REPLAY mode.
+
+        Args:
+            mode: RECORD or REPLAY.
+
+        Returns:
+            None
+        """
+        if cls._send is None:
+            cls._send = requests.adapters.HTTPAdapter.send
+
+            def _send(adapter, request, **kwargs):
+                return cls._handle_request(adapter, request, **kwargs)
+
+            requests.adapters.HTTPAdapter.send = _send
+        cls._mode = mode
+
+    @classmethod
+    def uninstall(cls):
+        if cls._send is not None:
+            requests.adapters.HTTPAdapter.send = cls._send
+        cls._send = None
+        cls._mode = None
+
+    @classmethod
+    def client(cls):
+        """Gets a synapseclient that is not logged in, to replay the calls with.
+
+        Returns:
+            synapseclient.Synapse
+        """
+        client = synapseclient.Synapse(skip_checks=True)
+        client.cache = synapseclient.core.cache.Cache(tempfile.mkdtemp())
+        return client
+
+    @classmethod
+    def uniq(cls, value):
+        """Gets a unique value that is the same when the test is replayed.
+
+        Args:
+            value: The new unique value.
+
+        Returns:
+            The value recorded in the same order when replaying, else the value.
+        """
+        cassette = cls._active
+        if cassette is None:
+            return value
+        with cassette._lock:
+            if cassette.mode == cls.RECORD:
+                cassette.uniq_values.append(value)
+            elif cassette._uniq_index < len(cassette.uniq_values):
+                value = cassette.uniq_values[cassette._uniq_index]
+                cassette._uniq_index += 1
+        return value
+
+    @classmethod
+    def active_test_id(cls, value):
+        """Gets the test ID that is the same when the test is replayed.
+
+        Args:
+            value: The test ID of this run.
+
+        Returns:
+            The recorded test ID when replaying, else the value.
+        """
+        cassette = cls._active
+        if cassette is None:
+            return value
+        if cassette.mode == cls.RECORD:
+            cassette.test_id = value
+        return cassette.test_id or value
+
+    def start(self):
+        if self.mode == self.REPLAY:
+            self.load()
+        self._uniq_index = 0
+        SynapseCassette._active = self
+
+    def stop(self):
+        SynapseCassette._active = None
+        if self.mode == self.RECORD and (self.interactions or self.uniq_values):
+            self.save()
+
+    def load(self):
+        self.test_id = None
+        self.uniq_values = []
+        self.interactions = []
+        if os.path.isfile(self.path):
+            with open(self.path, mode='r') as f:
+                data = json.load(f)
+            self.test_id = data.get('test_id')
+            self.uniq_values = data.get('uniq', [])
+            self.interactions = data.get('interactions', [])
+        self._used = set()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, mode='w') as f:
+            json.dump({'test_id': self.test_id, 'uniq': self.uniq_values, 'interactions': self.interactions}, f,
+                      indent=2)
+
+    def async_transport(self, transport=None):
+        """Gets an HTTP transport for AsyncSynapseClient that records to or replays from this cassette.
+
+        Args:
+            transport: The transport to record from. Defaults to an httpx.AsyncHTTPTransport.
+
+        Returns:
+            httpx.AsyncBaseTransport
+        """
+        return _CassetteAsyncTransport(self, transport or httpx.AsyncHTTPTransport())
+
+    def record(self, method, url, body, status, reason, headers, content):
+        """Adds a call to the cassette.
+
+        Args:
+            method: The HTTP method.
+            url: The URL.
+            body: The request body (bytes, str or None).
+            status: The response status code.
+            reason: The response reason.
+            headers: Dict of the response headers.
+            content: The response content (bytes).
+
+        Returns:
+            None
+        """
+        response = {
+            'status': status,
+            'reason': reason,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in self.SKIPPED_HEADERS}
+        }
+        try:
+            response['body'] = self._redact(content.decode('utf-8'))
+        except UnicodeDecodeError:
+            response['body_base64'] = base64.b64encode(content).decode('ascii')
+
+        with self._lock:
+            self.interactions.append({
+                'request': {'method': method.upper(), 'url': url, 'body': self._request_body(body)},
+                'response': response
+            })
+
+    def play(self, method, url, body):
+        """Gets the recorded response of a call.
+
+        Args:
+            method: The HTTP method.
+            url: The URL.
+            body: The request body (bytes, str or None).
+
+        Returns:
+            Tuple of the status code, reason, dict of headers and content (bytes).
+
+        Raises:
+            CassetteError: The call is not in the cassette.
+        """
+        method, url = method.upper(), self._normalize(url)
+        body = self._normalize(self._request_body(body))
+
+        with self._lock:
+            candidates = [i for i, interaction in enumerate(self.interactions)
+                          if i not in self._used and
+                          interaction['request']['method'] == method and
+                          self._normalize(interaction['request']['url']) == url]
+            if not candidates:
+                raise CassetteError(
+                    'No recorded response for {0} {1} in {2}. Record it again with --synapse-cassettes={3}.'.format(
+                        method, url, self.path, self.RECORD))
+
+            matching = [i for i in candidates if self._normalize(self.interactions[i]['request']['body']) == body]
+            index = (matching or candidates)[0]
+            self._used.add(index)
+
+        response = self.interactions[index]['response']
+        if 'body_base64' in response:
+            content = base64.b64decode(response['body_base64'])
+        else:
+            content = response.get('body', '').encode('utf-8')
+        return response['status'], response.get('reason'), response.get('headers', {}), content
+
+    @classmethod
+    def _handle_request(cls, adapter, request, **kwargs):
+        cassette = cls._active
+        if cls._mode == cls.RECORD:
+            response = cls._send(adapter, request, **kwargs)
+            if cassette is not None:
+                cassette.record(request.method, request.url, request.body, response.status_code, response.reason,
+                                response.headers, response.content)
+            return response
+
+        if cassette is None:
+            raise CassetteError('Synapse calls cannot be sent while replaying: {0} {1}'.format(request.method,
+                                                                                             request.url))
+
+        status, reason, headers, content = cassette.play(request.method, request.url, request.body)
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers.update(headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = content
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+    @classmethod
+    def _request_body(cls, body):
+        if body is None:
+            return None
+        if isinstance(body, str):
+            return cls._redact(body)
+        if isinstance(body, (bytes, bytearray)):
+            try:
+                return cls._redact(bytes(body).decode('utf-8'))
+            except UnicodeDecodeError:
+                return 'sha256:{0}'.format(hashlib.sha256(body).hexdigest())
+        # Streamed bodies (e.g., file uploads) are matched by the URL only.
+        return None
+
+    @classmethod
+    def _redact(cls, text):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return text
+
+        def _redact_value(value):
+            if isinstance(value, dict):
+                return {k: cls.REDACTED if k in cls.REDACTED_KEYS else _redact_value(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [_redact_value(v) for v in value]
+            return value
+
+        redacted = _redact_value(data)
+        return json.dumps(redacted) if redacted != data else text
+
+    @classmethod
+    def _normalize(cls, value):
+        if value is None:
+            return None
+        for pattern, replacement in cls.NORMALIZED_PATTERNS:
+            value = pattern.sub(replacement, value)
+        return value
+
+
+class _CassetteAsyncTransport(httpx.AsyncBaseTransport):
+
+    def __init__(self, cassette, transport):
+        self.cassette = cassette
+        self.transport = transport
+
+    async def handle_async_request(self, request):
+        body = await request.aread() or None
+        if self.cassette.mode == SynapseCassette.RECORD:
+            response = await self.transport.handle_async_request(request)
+            content = await response.aread()
+            self.cassette.record(request.method, str(request.url), body, response.status_code,
+                                 response.reason_phrase, dict(response.headers), content)
+            return httpx.Response(response.status_code, headers=self._headers(response.headers), content=content)
+
+        status, _, headers, content = self.cassette.play(request.method, str(request.url), body)
+        return httpx.Response(status, headers=self._headers(headers), content=content)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    @staticmethod
+    def _headers(headers):
+        return {k: v for k, v in dict(headers).items() if k.lower() not in SynapseCassette.SKIPPED_HEADERS}
@@ -1,7 +1,11 @@
 import uuid
 import time
+from concurrent.futures import ThreadPoolExecutor
 from www.core import Synapse
+from tests.consistency_waiter import ConsistencyWaiter
+from tests.synapse_cassette import SynapseCassette
 from synapseclient import Project, Folder, File, Team, Wiki
+from synapseclient.core.exceptions import SynapseHTTPError
 
 
 class SynapseTestHelper:
@@ -15,10 +19,10 @@ class SynapseTestHelper:
 
         This string can be used to help identify the test instance that created the object.
         """
-        return self._test_id
+        return SynapseCassette.active_test_id(self._test_id)
 
     def uniq_name(self, prefix='', postfix=''):
-        return "{0}{1}_{2}{3}".format(prefix, self.test_id(), uuid.uuid4().hex, postfix)
+        return "{0}{1}_{2}{3}".format(prefix, self.test_id(), SynapseCassette.uniq(uuid.uuid4().hex), postfix)
 
     def fake_synapse_id(self):
         """Gets a Synapse entity ID that does not exist in Synapse.
@@ -34,70 +38,101 @@ class SynapseTestHelper:
             if syn_object not in self._trash:
                 self._trash.append(syn_object)
 
+    # The most objects deleted at the same time.
+    DISPOSE_MAX_WORKERS = 8
+
+    # The number of times to try deleting an object, and the seconds to wait before the first retry (doubled after
+    # each retry).
+    DISPOSE_MAX_ATTEMPTS = 3
+    DISPOSE_RETRY_SECONDS = 0.5
+
     def dispose(self):
         """Cleans up any Synapse objects that were created during testing.
 
         This method needs to be manually called after each or all tests are done.
+
+        The objects are deleted a tier at a time (wikis and teams, files, folders, then projects), the objects of a
+        tier at the same time. Objects inside a project or folder that is being deleted are not deleted separately
+        since they are deleted with it. Objects that could not be deleted are reported and returned.
+
+        Returns:
+            List of (object, exception) that could not be deleted.
         """
-        projects = []
-        folders = []
-        files = []
-        teams = []
-        wikis = []
-        others = []
-
-        for obj in self._trash:
-            if isinstance(obj, Project):
-                projects.append(obj)
-            elif isinstance(obj, Folder):
-                folders.append(obj)
+        trash = list(self._trash)
+        self._trash.clear()
+
+        tiers = [[], [], [], []]
+        for obj in trash:
+            if isinstance(obj, (Wiki, Team)):
+                tiers[0].append(obj)
             elif isinstance(obj, File):
-                files.append(obj)
-            elif isinstance(obj, Team):
-                teams.append(obj)
-            elif isinstance(obj, Wiki):
-                wikis.append(obj)
+                tiers[1].append(obj)
+            elif isinstance(obj, Folder):
+                tiers[2].append(obj)
+            elif isinstance(obj, Project):
+                tiers[3].append(obj)
             else:
-                others.append(obj)
-
-        for syn_obj in wikis:
-            try:
-                Synapse.client().delete(syn_obj)
-            except:
-                pass
-            self._trash.remove(syn_obj)
+                print('WARNING: Non-Supported object found: {0}'.format(obj))
 
-        for syn_obj in files:
-            try:
-                Synapse.client().delete(syn_obj)
-            except:
-                pass
-            self._trash.remove(syn_obj)
+        # The objects deleted with a container (or a parent wiki page) being deleted.
+        parents = {o.id: getattr(o, 'parentId', None) for o in tiers[1] + tiers[2] + tiers[3]}
+        container_ids = set(o.id for o in tiers[2] + tiers[3])
+        wiki_ids = set(o.id for o in trash if isinstance(o, Wiki))
 
-        for syn_obj in folders:
-            try:
-                Synapse.client().delete(syn_obj)
-            except:
-                pass
-            self._trash.remove(syn_obj)
+        def _is_cascaded(obj):
+            if isinstance(obj, Wiki):
+                return obj.get('parentWikiId') in wiki_ids or self._has_ancestor(obj.ownerId, parents, container_ids,
+                                                                                 include_self=True)
+            elif isinstance(obj, Team):
+                return False
+            return self._has_ancestor(obj.id, parents, container_ids)
+
+        leaked = []
+        with ThreadPoolExecutor(max_workers=self.DISPOSE_MAX_WORKERS) as executor:
+            for tier in tiers:
+                for obj, error in executor.map(self._delete, [o for o in tier if not _is_cascaded(o)]):
+                    if error is not None:
+                        leaked.append((obj, error))
+
+        for obj, error in leaked:
+            print('WARNING: Leaked Synapse object: {0} {1}: {2}'.format(type(obj).__name__, obj.id, error))
+
+        return leaked
+
+    @staticmethod
+    def _has_ancestor(entity_id, parents, container_ids, include_self=False):
+        if include_self and entity_id in container_ids:
+            return True
+        parent_id = parents.get(entity_id)
+        while parent_id is not None:
+            if parent_id in container_ids:
+                return True
+            parent_id = parents.get(parent_id)
+        return False
+
+    def _delete(self, obj):
+        """Deletes an object, retrying failed deletes. An object that is not found has already been deleted.
 
-        for syn_obj in projects:
+        Returns:
+            Tuple of the object and the exception that stopped it from being deleted (or None).
+        """
+        delay = self.DISPOSE_RETRY_SECONDS
+        for attempt in range(1, self.DISPOSE_MAX_ATTEMPTS + 1):
             try:
-                Synapse.client().delete(syn_obj)
-            except:
-                pass
-            self._trash.remove(syn_obj)
+                Synapse.client().delete(obj)
+                return obj, None
+            except SynapseHTTPError as ex:
+                if ex.response is not None and ex.response.status_code == 404:
+                    return obj, None
+                error = ex
+            except Exception as ex:
+                error = ex
 
-        for syn_obj in teams:
-            try:
-                Synapse.client().delete(syn_obj)
-            except:
-                pass
-            self._trash.remove(syn_obj)
+            if attempt < self.DISPOSE_MAX_ATTEMPTS:
+                time.sleep(delay)
+                delay *= 2
 
-        for obj in others:
-            print('WARNING: Non-Supported object found: {0}'.format(obj))
-            self._trash.remove(obj)
+        return obj, error
 
     def create_project(self, **kwargs):
         """Creates a new Project and adds it to the trash queue."""
@@ -129,23 +164,43 @@ class SynapseTestHelper:
         kwargs.pop('prefix', None)
 
         team = Synapse.client().store(Team(**kwargs))
-
-        # Wait for the team to be available in Synapse.
-        tries = 0
-        while True:
-            tries += 1
-            try:
-                Synapse.client().getTeam(team.name)
-                break
-            except ValueError:
-                if tries >= 10:
-                    raise Exception('Timed out waiting for Team to be available in Synapse.')
-                else:
-                    time.sleep(3)
+        self.wait_for_team(team.name)
 
         self.dispose_of(team)
         return team
 
+    def wait_for_team(self, name):
+        """Waits for a Team to be found by its name.
+
+        Returns:
+            Team
+        """
+        return ConsistencyWaiter.wait('team', lambda: Synapse.client().getTeam(name), retry_exceptions=(ValueError,))
+
+    def wait_for_project(self, name):
+        """Waits for a Project to be found by its name.
+
+        Returns:
+            The ID of the Project.
+        """
+        return ConsistencyWaiter.wait('project', lambda: Synapse.client().findEntityId(name))
+
+    def wait_for_permissions(self, entity, principal_id, permissions=None):
+        """Waits for a principal's permissions on an entity to be visible.
+
+        Args:
+            entity: The entity or its ID.
+            principal_id: The ID of the user or team.
+            permissions: The permissions to wait for. Defaults to any permissions.
+
+        Returns:
+            List of the permissions.
+        """
+        return ConsistencyWaiter.wait(
+            'acl',
+            lambda: Synapse.client().getPermissions(entity, principalId=principal_id),
+            is_ready=lambda perms: bool(perms) and (permissions is None or sorted(perms) == sorted(permissions)))
+
     def create_wiki(self, **kwargs):
         """Creates a new Wiki and adds it to the trash queue."""
         if 'title' not in kwargs:
@@ -0,0 +1,58 @@
+import pytest
+from tests.consistency_waiter import ConsistencyWaiter
+
+
+@pytest.fixture
+def waiter(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('tests.consistency_waiter.time.sleep', lambda seconds: sleeps.append(seconds))
+    ConsistencyWaiter.reset()
+    yield sleeps
+    ConsistencyWaiter.reset()
+
+
+def test_it_returns_without_waiting_when_ready(waiter):
+    assert ConsistencyWaiter.wait('team', lambda: 'team') == 'team'
+    assert waiter == []
+    assert ConsistencyWaiter.observed() == []
+
+
+def test_it_retries_with_growing_delays_until_ready(waiter):
+    results = iter([None, [], ['READ']])
+    assert ConsistencyWaiter.wait('permissions', lambda: next(results)) == ['READ']
+    assert waiter == [ConsistencyWaiter.INITIAL_DELAY, ConsistencyWaiter.INITIAL_DELAY * 2]
+
+    observed = ConsistencyWaiter.observed()
+    assert len(observed) == 1
+    assert observed[0]['name'] == 'permissions'
+    assert observed[0]['attempts'] == 3
+    assert observed[0]['timed_out'] is False
+
+
+def test_it_caps_the_delay(waiter):
+    results = iter([None] * 10 + [True])
+    ConsistencyWaiter.wait('project', lambda: next(results), initial_delay=1)
+    assert max(waiter) == ConsistencyWaiter.MAX_DELAY
+
+
+def test_it_retries_the_listed_exceptions(waiter):
+    calls = []
+
+    def _get_team():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ValueError('Team not found')
+        return 'team'
+
+    assert ConsistencyWaiter.wait('team', _get_team, retry_exceptions=(ValueError,)) == 'team'
+    assert len(calls) == 2
+
+    with pytest.raises(KeyError):
+        ConsistencyWaiter.wait('team', lambda: {}['a'], retry_exceptions=(ValueError,))
+
+
+def test_it_times_out(waiter):
+    with pytest.raises(TimeoutError) as ex:
+        ConsistencyWaiter.wait('team', lambda: None, timeout=0)
+    assert 'waiting for team' in str(ex.value)
+    assert ConsistencyWaiter.observed()[0]['timed_out'] is True
@@ -0,0 +1,62 @@
+import pytest
+import time
+from www.core import Synapse
+from tests.fake_synapse import FakeSynapseServer
+import synapseclient as syn
+from synapseclient.core.exceptions import SynapseHTTPError
+
+
+def test_it_serves_the_synapseclient(fake_synapse):
+    project = Synapse.client().store(syn.Project(name='Test Project'))
+    assert project.id.startswith('syn')
+
+    folder = Synapse.client().store(syn.Folder(name='Test Folder', parent=project))
+    assert Synapse.client().get(folder.id).parentId == project.id
+
+    team = Synapse.client().store(syn.Team(name='Test Team'))
+    assert Synapse.client().getTeam('Test Team').id == team.id
+
+    Synapse.client().setPermissions(folder, team.id, accessType=Synapse.CAN_VIEW_PERMS)
+    assert Synapse.client().getPermissions(folder, team.id) == Synapse.CAN_VIEW_PERMS
+
+
+def test_it_counts_calls_by_endpoint(fake_synapse):
+    Synapse.client().store(syn.Project(name='Test Project'))
+    counts = fake_synapse.call_counts()
+    assert counts['entity'] > 0
+    assert sum(counts.values()) == len(fake_synapse.calls)
+
+    fake_synapse.reset_calls()
+    assert fake_synapse.call_counts() == {}
+
+
+def test_it_injects_latency(fake_synapse):
+    fake_synapse.latency = {'entity': 0.05}
+    start = time.perf_counter()
+    Synapse.client().store(syn.Project(name='Test Project'))
+    assert time.perf_counter() - start >= 0.05
+    assert all(c['latency'] >= 0.05 for c in fake_synapse.calls if c['endpoint'] == 'entity')
+
+
+def test_it_injects_errors(fake_synapse):
+    fake_synapse.errors = {'team': 500}
+    Synapse.governor.max_retries = 0
+    project = Synapse.client().store(syn.Project(name='Test Project'))
+    assert project.id
+
+    with pytest.raises(SynapseHTTPError) as ex:
+        Synapse.client().store(syn.Team(name='Test Team'))
+    assert ex.value.response.status_code == 500
+
+
+def test_it_injects_errors_at_a_rate():
+    server = FakeSynapseServer(errors={'entity': 503}, error_rate=0.5, seed=1)
+    statuses = [server.handle('GET', '/entity/syn1')[0] for _ in range(100)]
+    assert 0 < statuses.count(503) < 100
+
+
+def test_it_returns_not_found_for_unknown_endpoints():
+    server = FakeSynapseServer()
+    status, body = server.handle('GET', '/not/an/endpoint')
+    assert status == 404
+    assert server.calls[0]['endpoint'] == 'other'
@@ -0,0 +1,123 @@
+import re
+import json
+import uuid
+import asyncio
+import httpx
+import pytest
+import requests
+from urllib.parse import urlsplit
+from synapseclient import Project, Folder
+from tests.fake_synapse import FakeSynapseServer
+from tests.synapse_cassette import SynapseCassette, CassetteError
+
+
+@pytest.fixture
+def fake_transport(monkeypatch):
+    """Sends the requests calls to a FakeSynapseServer, in place of the network."""
+    server = FakeSynapseServer()
+
+    def _send(adapter, request, **kwargs):
+        url = urlsplit(request.url)
+        uri = re.sub(r'^/\w+/v1', '', url.path) + ('?{0}'.format(url.query) if url.query else '')
+        data = request.body.decode('utf-8') if isinstance(request.body, bytes) else request.body
+        status, body = server.handle(request.method, uri, data)
+
+        response = requests.Response()
+        response.status_code = status
+        if body is not None:
+            response.headers['content-type'] = 'application/json'
+        response._content = json.dumps(body).encode('utf-8') if body is not None else b''
+        response.url = request.url
+        response.request = request
+        return response
+
+    monkeypatch.setattr(requests.adapters.HTTPAdapter, 'send', _send)
+    yield server
+    SynapseCassette.uninstall()
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    return str(tmp_path / 'cassette.json')
+
+
+def _record(path, fn):
+    SynapseCassette.install(SynapseCassette.RECORD)
+    with SynapseCassette(path, SynapseCassette.RECORD):
+        result = fn()
+    SynapseCassette.uninstall()
+    return result
+
+
+def _replay(path, fn):
+    SynapseCassette.install(SynapseCassette.REPLAY)
+    with SynapseCassette(path, SynapseCassette.REPLAY):
+        result = fn()
+    SynapseCassette.uninstall()
+    return result
+
+
+def _create_project():
+    client = SynapseCassette.client()
+    project = client.store(Project(name=SynapseCassette.uniq(uuid.uuid4().hex)))
+    folder = client.store(Folder(name='Folder', parent=project))
+    return project.name, project.id, client.get(folder.id).name
+
+
+def test_it_records_and_replays_the_synapse_calls(fake_transport, cassette_path):
+    recorded = _record(cassette_path, _create_project)
+    assert len(fake_transport.calls) > 0
+
+    fake_transport.reset_calls()
+    assert _replay(cassette_path, _create_project) == recorded
+    assert fake_transport.calls == []
+
+
+def test_it_fails_the_calls_that_were_not_recorded(fake_transport, cassette_path):
+    _record(cassette_path, lambda: SynapseCassette.client().store(Project(name='Project')))
+
+    with pytest.raises(CassetteError) as ex:
+        _replay(cassette_path, lambda: SynapseCassette.client().restGET('/entity/syn1'))
+    assert 'Record it again with --synapse-cassettes=record' in str(ex.value)
+
+
+def test_it_matches_the_calls_with_the_unique_values_normalized(fake_transport, cassette_path):
+    def _create(name):
+        return lambda: SynapseCassette.client().store(Project(name=name)).id
+
+    project_id = _record(cassette_path, _create('Project {0} 2020-01-02T03:04:05.678Z'.format(uuid.uuid4().hex)))
+    assert _replay(cassette_path, _create('Project {0} 2021-06-07T08:09:10.111Z'.format(uuid.uuid4().hex))) == \
+           project_id
+
+
+def test_it_does_not_record_the_secrets(fake_transport, cassette_path):
+    session = requests.Session()
+    _record(cassette_path, lambda: session.post('https://repo-prod.prod.sagebase.org/repo/v1/login',
+                                                data=json.dumps({'username': 'user', 'password': 'secret'})))
+
+    with open(cassette_path) as f:
+        cassette = f.read()
+    assert 'secret' not in cassette
+    assert SynapseCassette.REDACTED in cassette
+
+
+def test_it_records_and_replays_the_async_calls(fake_transport, cassette_path):
+    project = fake_transport.seed_project('Project')
+
+    async def _get(transport):
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.get('https://repo-prod.prod.sagebase.org/repo/v1/entity/{0}'.format(project['id']))
+            return response.json()['name']
+
+    with SynapseCassette(cassette_path, SynapseCassette.RECORD) as cassette:
+        assert asyncio.run(_get(cassette.async_transport(fake_transport.async_transport()))) == 'Project'
+
+    fake_transport.reset_calls()
+    with SynapseCassette(cassette_path, SynapseCassette.REPLAY) as cassette:
+        assert asyncio.run(_get(cassette.async_transport(fake_transport.async_transport()))) == 'Project'
+    assert fake_transport.calls == []
+
+
+def test_path_for():
+    assert SynapseCassette.path_for('tests/www/services/test_a.py::test_b[1-x]').endswith(
+        'cassettes/www/services/test_a/test_b_1-x_.json')
@@ -3,6 +3,8 @@ import os
 import pytest
 import synapseclient
 from synapseclient import Project, Folder, File, Team, Wiki
+from www.core import Synapse
+from tests.synapse_test_helper import SynapseTestHelper
 
 
 def test_test_id(syn_test_helper):
@@ -153,3 +155,47 @@ def test_create_wiki(syn_test_helper):
 
     syn_test_helper.dispose()
     assert len(syn_test_helper._trash) == 0
+
+
+def test_dispose_skips_the_objects_deleted_with_their_project(fake_synapse, syn_test_helper):
+    project = syn_test_helper.create_project()
+    folder = Synapse.client().store(Folder(name='Folder', parent=project))
+    sub_folder = Synapse.client().store(Folder(name='Sub Folder', parent=folder))
+    syn_test_helper.create_wiki(owner=project)
+    other_project = Synapse.client().store(Project(name=syn_test_helper.uniq_name()))
+    other_folder = Synapse.client().store(Folder(name='Other Folder', parent=other_project))
+    team = syn_test_helper.create_team()
+    syn_test_helper.dispose_of(folder, sub_folder, other_folder)
+    fake_synapse.reset_calls()
+
+    assert syn_test_helper.dispose() == []
+    assert syn_test_helper._trash == []
+
+    deleted = sorted(c['path'] for c in fake_synapse.calls if c['method'] == 'DELETE')
+    assert deleted == sorted(['/entity/{0}'.format(project.id), '/entity/{0}'.format(other_folder.id),
+                              '/team/{0}'.format(team.id)])
+    for entity in [project, folder, sub_folder, other_folder]:
+        assert entity.id not in fake_synapse.entities
+    assert project.id not in fake_synapse.wikis
+    assert team.id not in fake_synapse.teams
+    assert other_project.id in fake_synapse.entities
+
+
+def test_dispose_retries_and_reports_the_leaked_objects(fake_synapse, syn_test_helper, monkeypatch):
+    monkeypatch.setattr(SynapseTestHelper, 'DISPOSE_RETRY_SECONDS', 0)
+    project = syn_test_helper.create_project()
+    team = syn_test_helper.create_team()
+    fake_synapse.errors = {'team': 403}
+    fake_synapse.reset_calls()
+
+    leaked = syn_test_helper.dispose()
+    assert [obj for obj, error in leaked] == [team]
+    assert isinstance(leaked[0][1], synapseclient.core.exceptions.SynapseHTTPError)
+    assert len([c for c in fake_synapse.calls if c['path'] == '/team/{0}'.format(team.id)]) == \
+           SynapseTestHelper.DISPOSE_MAX_ATTEMPTS
+    assert team.id in fake_synapse.teams
+    assert project.id not in fake_synapse.entities
+
+    # An object already deleted is not leaked.
+    syn_test_helper.dispose_of(project)
+    assert syn_test_helper.dispose() == []
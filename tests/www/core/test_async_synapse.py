@@ -0,0 +1,182 @@
+import time
+import asyncio
+import pytest
+from www.core import Synapse, SynapseUnavailableError, DeadlineExceededError
+from www.core.deadline import Deadline
+from www.core.async_synapse import AsyncSynapseClient
+from tests.fake_synapse import FakeSynapseServer
+from tests.synapse_call_recorder import SynapseCallRecorder
+from synapseclient.core.exceptions import SynapseHTTPError, SynapseTimeoutError
+
+
+def run(fn, **kwargs):
+    """Runs a coroutine function with a client."""
+
+    async def _run():
+        async with AsyncSynapseClient(**kwargs) as client:
+            return await fn(client)
+
+    return asyncio.run(_run())
+
+
+def test_it_makes_the_calls_through_the_fake_server(fake_synapse):
+    project = fake_synapse.seed_project('Async Project')
+
+    with SynapseCallRecorder() as recorder:
+        entity = run(lambda client: client.get_entity(project['id']))
+
+    assert entity['name'] == 'Async Project'
+    assert fake_synapse.calls[-1]['path'] == '/entity/{0}'.format(project['id'])
+    assert recorder.count(method='GET', path='^/entity/syn') == 1
+
+
+def test_it_makes_the_calls_at_the_same_time(fake_synapse):
+    fake_synapse.latency = {'membershipInvitation': 0.05}
+    team = run(lambda client: client.create_team('Team'))
+    emails = ['user{0}@test.com'.format(i) for i in range(10)]
+
+    start = time.perf_counter()
+    run(lambda client: asyncio.gather(*[client.invite_to_team(team['id'], email=e) for e in emails]))
+    assert time.perf_counter() - start < 0.05 * len(emails) / 2
+    assert sorted(i['inviteeEmail'] for i in fake_synapse.invitations) == sorted(emails)
+
+
+def test_it_caps_the_calls_in_flight(fake_synapse):
+    fake_synapse.latency = {'membershipInvitation': 0.02}
+    team = run(lambda client: client.create_team('Team'))
+
+    start = time.perf_counter()
+    run(lambda client: asyncio.gather(*[client.invite_to_team(team['id'], user_id=i) for i in range(5)]),
+        max_in_flight=1)
+    assert time.perf_counter() - start >= 0.02 * 5
+
+
+def test_it_raises_synapse_errors(fake_synapse):
+    with pytest.raises(SynapseHTTPError) as ex:
+        run(lambda client: client.get_entity('syn999999'))
+    assert ex.value.response.status_code == 404
+
+    assert run(lambda client: client.find_entity_id('Does Not Exist')) is None
+
+
+def test_it_retries_throttled_calls(fake_synapse):
+    fake_synapse.errors = {'team': 429}
+
+    with pytest.raises(SynapseHTTPError):
+        run(lambda client: client.get_team('1'))
+    assert Synapse.governor.metrics()['retries'] == Synapse.governor.max_retries
+    assert Synapse.governor.metrics()['throttled'] == Synapse.governor.max_retries + 1
+
+
+def test_it_fails_fast_when_the_circuit_breaker_opens(fake_synapse):
+    fake_synapse.errors = {'entity': 500}
+
+    with pytest.raises(SynapseUnavailableError):
+        run(lambda client: client.get_entity('syn1'))
+    assert Synapse.circuit_breaker.state == Synapse.circuit_breaker.OPEN
+
+    calls = len(fake_synapse.calls)
+    with pytest.raises(SynapseUnavailableError):
+        run(lambda client: client.get_entity('syn1'))
+    assert len(fake_synapse.calls) == calls
+
+
+def test_it_does_not_start_calls_after_the_deadline(fake_synapse):
+    async def _get(client):
+        with Deadline(0):
+            return await client.get_entity('syn1')
+
+    with pytest.raises(DeadlineExceededError):
+        run(_get)
+    assert fake_synapse.calls == []
+
+
+def test_it_sets_the_permissions_on_an_entity(fake_synapse):
+    project = fake_synapse.seed_project()
+    folder = fake_synapse.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Folder', project['id'])
+
+    # The folder inherits its ACL, so it gets its own ACL.
+    run(lambda client: client.set_permissions(folder['id'], {'111': ['READ'], 222: ['READ', 'DOWNLOAD']}))
+    assert {(ra['principalId'], tuple(ra['accessType'])) for ra in fake_synapse.acls[folder['id']]['resourceAccess']} \
+           >= {(111, ('READ',)), (222, ('READ', 'DOWNLOAD'))}
+
+    # The project has its own ACL, so it is updated. An empty access type removes the principal.
+    run(lambda client: client.set_permissions(project['id'], {'111': ['READ']}))
+    run(lambda client: client.set_permissions(folder['id'], {'111': []}))
+    assert 111 in [ra['principalId'] for ra in fake_synapse.acls[project['id']]['resourceAccess']]
+    assert 111 not in [ra['principalId'] for ra in fake_synapse.acls[folder['id']]['resourceAccess']]
+
+
+def test_it_sets_the_permissions_on_a_team(fake_synapse):
+    team = run(lambda client: client.create_team('Team'))
+    run(lambda client: client.set_team_permissions(team['id'], {'111': Synapse.TEAM_MANAGER_PERMS}))
+    assert {'principalId': 111, 'accessType': Synapse.TEAM_MANAGER_PERMS} in \
+           fake_synapse.team_acls[team['id']]['resourceAccess']
+
+
+def test_it_gets_the_folder_that_already_exists(fake_synapse):
+    project = fake_synapse.seed_project()
+    folder = run(lambda client: client.create_folder('Folder', project['id']))
+    assert run(lambda client: client.create_folder('Folder', project['id']))['id'] == folder['id']
+
+
+def test_it_sets_the_storage_location(fake_synapse):
+    project = fake_synapse.seed_project()
+
+    run(lambda client: client.set_storage_location(project['id'], '1'))
+    assert fake_synapse.project_settings[(project['id'], 'upload')]['locations'] == ['1']
+
+    run(lambda client: client.set_storage_location(project['id'], '2'))
+    assert fake_synapse.project_settings[(project['id'], 'upload')]['locations'] == ['2']
+
+
+def test_it_appends_table_rows(fake_synapse):
+    table = fake_synapse.seed_table(fake_synapse.admin_project['id'], ['Name', 'Count'])
+
+    result = run(lambda client: client.append_table_rows(table['id'], [['A', 1], ['B', None]]))
+    assert result['results'][0]['rowsProcessed'] == 1
+
+    row_set = fake_synapse.table_rows[table['id']][0]['changes'][0]['toAppend']
+    assert [h['name'] for h in row_set['headers']] == ['Name', 'Count']
+    assert row_set['rows'] == [{'values': ['A', '1']}, {'values': ['B', None]}]
+
+
+def test_it_stops_waiting_for_a_job_that_does_not_finish(fake_synapse, monkeypatch):
+    async def _processing(client, uri, endpoint=None):
+        return {'jobState': 'PROCESSING'}
+
+    monkeypatch.setattr(AsyncSynapseClient, 'rest_get', _processing)
+    monkeypatch.setattr(AsyncSynapseClient, 'JOB_POLL_SECONDS', 0.01)
+    monkeypatch.setattr(AsyncSynapseClient, 'JOB_MAX_WAIT_SECONDS', 0.05)
+
+    with pytest.raises(SynapseTimeoutError) as ex:
+        run(lambda client: client._wait_for_job('/asynchronous/job/1'))
+    assert 'did not finish within' in str(ex.value)
+
+    async def _wait(client):
+        with Deadline(0.02):
+            return await client._wait_for_job('/asynchronous/job/1')
+
+    monkeypatch.setattr(AsyncSynapseClient, 'JOB_MAX_WAIT_SECONDS', 60)
+    with pytest.raises(DeadlineExceededError):
+        run(_wait)
+
+
+def test_it_creates_and_gets_wikis(fake_synapse):
+    project = fake_synapse.seed_project()
+
+    async def _create(client):
+        root = await client.create_wiki(project['id'], {'title': 'Root', 'markdown': '# Root'})
+        page = await client.create_wiki(project['id'], {
+            'title': 'Page',
+            'parentWikiId': root['id'],
+            'markdownFileHandleId': root['markdownFileHandleId']
+        })
+        return root, page
+
+    root, page = run(_create)
+    assert run(lambda client: client.get_wiki(project['id']))['id'] == root['id']
+    assert run(lambda client: client.get_wiki(project['id'], page['id']))['title'] == 'Page'
+
+    headers = run(lambda client: client.get_wiki_header_tree(project['id'], limit=1))
+    assert sorted(h['id'] for h in headers) == sorted([root['id'], page['id']])
@@ -0,0 +1,227 @@
+import pytest
+import os
+import requests
+from datetime import date
+from www.core.checkpoint import Checkpoint, CheckpointStore, CheckpointedService
+from www.core.deadline import Deadline
+from www.core.synapse import Synapse, SynapseCircuitBreaker
+from www.core.continuation import Continuation
+from tests.fake_synapse import FakeSynapseServer
+
+
+class FakeService:
+    def __init__(self):
+        self.project_id = None
+        self.calls = []
+
+    def _create_project(self):
+        self.calls.append('create_project')
+        self.project_id = 'syn123'
+        return True
+
+    def _create_team(self):
+        self.calls.append('create_team')
+        return False
+
+    def state(self):
+        return {'project_id': self.project_id}
+
+
+class FakeCheckpointedService(CheckpointedService):
+    OPERATION_NAME = 'Fake'
+    STEPS = [
+        ('create_project', []),
+        ('create_team', ['create_project']),
+        ('invite_emails', ['create_team']),
+        ('write_wiki', ['create_project'])
+    ]
+    PARAMETERS = ['name', 'start_date']
+    DATE_PARAMETERS = ['start_date']
+    STATE_FIELDS = ['team_name']
+
+    def __init__(self, name, start_date=None, operation_id=None, deadline=None, fail=None):
+        super().__init__(operation_id=operation_id, deadline=deadline)
+        self.config_id = '1'
+        self.name = name
+        self.start_date = start_date
+        self.fail = fail or []
+        self.calls = []
+
+    def _get_config(self):
+        return {'id': self.config_id}
+
+    def _write_synapse_log_file(self):
+        self.calls.append('write_synapse_log_file')
+        return True
+
+    def _step(self, name):
+        self.calls.append(name)
+        if name in self.fail:
+            self.errors.append('{0} failed'.format(name))
+            return False
+        return True
+
+    def _create_project(self):
+        return self._step('create_project')
+
+    def _create_team(self):
+        self.team_name = 'Team {0}'.format(self.name)
+        return self._step('create_team')
+
+    def _invite_emails(self):
+        return self._step('invite_emails')
+
+    def _write_wiki(self):
+        return self._step('write_wiki')
+
+
+def test_it_runs_the_declared_steps_after_their_required_steps(checkpoint_dir):
+    service = FakeCheckpointedService('A', fail=['create_team']).execute()
+
+    assert service.calls == ['create_project', 'create_team', 'write_wiki', 'write_synapse_log_file']
+    assert service.checkpoint.completed_steps == ['create_project', 'write_wiki']
+    assert service.resumable is True
+
+
+def test_it_resumes_with_the_saved_parameters_and_state(checkpoint_dir):
+    service = FakeCheckpointedService('A', start_date=date(2020, 1, 2), fail=['invite_emails']).execute()
+    checkpoint = CheckpointStore.load(service.operation_id)
+    assert checkpoint.parameters == {'name': 'A', 'start_date': '2020-01-02'}
+    assert checkpoint.state == {'team_name': 'Team A'}
+
+    resumed = FakeCheckpointedService.resume(service.operation_id)
+    assert resumed.start_date == date(2020, 1, 2)
+    assert resumed.team_name == 'Team A'
+    assert resumed.calls == ['invite_emails', 'write_synapse_log_file']
+    assert resumed.errors == []
+    assert CheckpointStore.load(service.operation_id) is None
+
+    with pytest.raises(Exception, match='Fake checkpoint not found'):
+        FakeCheckpointedService.resume('op404')
+
+
+def test_it_fails_fast_while_synapse_is_unavailable(checkpoint_dir, monkeypatch):
+    def _fail():
+        raise requests.exceptions.ConnectionError('down')
+
+    breaker = SynapseCircuitBreaker(failure_threshold=1)
+    monkeypatch.setattr(Synapse, 'circuit_breaker', breaker)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        breaker.call(_fail)
+
+    service = FakeCheckpointedService('A').execute()
+    assert service.calls == []
+    assert len(service.errors) == 1
+
+
+def test_it_continues_the_deferred_steps(checkpoint_dir, monkeypatch):
+    continued = []
+    monkeypatch.setattr(Continuation, 'start', classmethod(lambda cls, checkpoint: continued.append(checkpoint)))
+    monkeypatch.setattr(Continuation, 'is_available', classmethod(lambda cls: True))
+    monkeypatch.setitem(FakeCheckpointedService.STEP_SECONDS, 'invite_emails', 60)
+
+    service = FakeCheckpointedService('A', deadline=Deadline(30)).execute()
+    assert service.calls == ['create_project', 'create_team']
+    assert service.deferred_steps == ['invite_emails', 'write_wiki']
+    assert continued == [service.checkpoint]
+
+
+def test_it_saves_completed_steps(checkpoint_dir):
+    service = FakeService()
+    checkpoint = Checkpoint('op1', 'FakeService', {'name': 'test'})
+
+    assert checkpoint.run(service._create_project, service.state) is True
+    assert checkpoint.run(service._create_team, service.state) is False
+
+    loaded = CheckpointStore.load('op1')
+    assert loaded.service == 'FakeService'
+    assert loaded.parameters == {'name': 'test'}
+    assert loaded.completed_steps == ['create_project']
+    assert loaded.state == {'project_id': 'syn123'}
+
+
+def test_it_skips_completed_steps(checkpoint_dir):
+    service = FakeService()
+    checkpoint = Checkpoint('op1', 'FakeService', {}, completed_steps=['create_project'])
+
+    assert checkpoint.run(service._create_project, service.state) is True
+    assert service.calls == []
+
+
+def test_it_skips_steps_until_the_required_steps_complete(checkpoint_dir):
+    service = FakeService()
+    checkpoint = Checkpoint('op1', 'FakeService', {})
+
+    assert checkpoint.run(service._create_project, service.state, requires=['create_team']) is False
+    assert service.calls == []
+    assert checkpoint.completed_steps == []
+
+    checkpoint.completed_steps.append('create_team')
+    assert checkpoint.run(service._create_project, service.state, requires=['create_team']) is True
+
+
+def test_it_only_saves_completed_steps_locally(checkpoint_dir, monkeypatch):
+    monkeypatch.setenv('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID', 'syn1')
+    monkeypatch.setattr(Synapse, 'client', classmethod(lambda cls: pytest.fail('Synapse called')))
+    service = FakeService()
+    checkpoint = Checkpoint('op1', 'FakeService', {})
+
+    assert checkpoint.run(service._create_project, service.state) is True
+    assert checkpoint.shared is False
+    assert CheckpointStore.load('op1').completed_steps == ['create_project']
+
+    CheckpointStore.delete('op1', shared=False)
+    assert not os.path.isfile(os.path.join(checkpoint_dir, 'op1_checkpoint.json'))
+
+
+def test_it_shares_checkpoints_through_synapse(fake_synapse, checkpoint_dir, monkeypatch):
+    folder = fake_synapse.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Checkpoints', fake_synapse.admin_project['id'])
+    monkeypatch.setenv('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID', folder['id'])
+    checkpoint = Checkpoint('op1', 'FakeService', {})
+
+    CheckpointStore.save(checkpoint)
+    assert checkpoint.shared is True
+    assert CheckpointStore.load('op1').shared is True
+    assert any(e['name'] == 'op1_checkpoint.json' for e in fake_synapse.entities.values())
+
+
+def test_it_deletes_checkpoints(checkpoint_dir):
+    CheckpointStore.save(Checkpoint('op1', 'FakeService', {}))
+    assert os.path.isfile(os.path.join(checkpoint_dir, 'op1_checkpoint.json'))
+
+    CheckpointStore.delete('op1')
+    assert CheckpointStore.load('op1') is None
+
+
+def test_it_rejects_invalid_operation_ids(checkpoint_dir):
+    for operation_id in ['../op1', 'op/1', '', None]:
+        with pytest.raises(ValueError):
+            CheckpointStore.load(operation_id)
+
+
+def test_it_defers_steps_that_cannot_finish_before_the_deadline(checkpoint_dir):
+    service = FakeService()
+    checkpoint = Checkpoint('op1', 'FakeService', {})
+    deadline = Deadline(10)
+
+    assert checkpoint.run(service._create_project, service.state, deadline=deadline, step_seconds=20) is False
+    # Every step after a deferred step is deferred so the steps run in order.
+    assert checkpoint.run(service._create_team, service.state, deadline=deadline, step_seconds=0) is False
+
+    assert service.calls == []
+    assert checkpoint.deferred_steps == ['create_project', 'create_team']
+    assert checkpoint.completed_steps == []
+
+
+def test_it_activates_the_deadline_while_a_step_runs(checkpoint_dir):
+    deadline = Deadline(10)
+    active = []
+    checkpoint = Checkpoint('op1', 'FakeService', {})
+
+    def _create_project():
+        active.append(Deadline.current())
+        return True
+
+    assert checkpoint.run(_create_project, dict, deadline=deadline, step_seconds=1) is True
+    assert active == [deadline]
+    assert Deadline.current() is None
@@ -0,0 +1,69 @@
+import json
+import pytest
+from sls_tools.param_store import ParamStore, ParamStoreResult
+from www.core import Env
+from www.core.config_cache import ConfigCache
+
+KEY = 'TEST_CONFIG_CACHE_CONFIG'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    ConfigCache.clear()
+    yield
+    ConfigCache.clear()
+
+
+def test_it_versions_the_config(monkeypatch):
+    monkeypatch.setenv(KEY, json.dumps([{'id': '1'}]))
+    version, config = ConfigCache.get(KEY)
+    assert config == [{'id': '1'}]
+    assert ConfigCache.get(KEY) == (version, config)
+
+    monkeypatch.setenv(KEY, json.dumps([{'id': '2'}]))
+    new_version, config = ConfigCache.get(KEY)
+    assert new_version != version
+    assert config == [{'id': '2'}]
+
+
+def test_it_uses_the_default(monkeypatch):
+    monkeypatch.delenv(KEY, raising=False)
+    monkeypatch.setattr(ParamStore, '_get_from_ssm', classmethod(lambda cls, key: None))
+    assert ConfigCache.get(KEY)[1] == []
+
+
+def test_it_derives_values_once_per_version(monkeypatch):
+    calls = []
+
+    def _names(configs):
+        calls.append(1)
+        return [c['id'] for c in configs]
+
+    monkeypatch.setenv(KEY, json.dumps([{'id': '1'}]))
+    assert ConfigCache.derive(KEY, 'names', _names)[1] == ['1']
+    assert ConfigCache.derive(KEY, 'names', _names)[1] == ['1']
+    assert len(calls) == 1
+
+    monkeypatch.setenv(KEY, json.dumps([{'id': '2'}]))
+    assert ConfigCache.derive(KEY, 'names', _names)[1] == ['2']
+    assert len(calls) == 2
+
+
+def test_it_reads_ssm_values_once_per_ttl(monkeypatch):
+    reads = []
+
+    def _get(key, default=None, store=None):
+        reads.append(key)
+        return ParamStoreResult(key, json.dumps([{'id': str(len(reads))}]), ParamStore.Stores.SSM)
+
+    monkeypatch.setattr(ParamStore, 'get', _get)
+    monkeypatch.setattr(Env, 'SHARED_SSM_KEYS', [KEY])
+    assert ConfigCache.get(KEY)[1] == [{'id': '1'}]
+    assert ConfigCache.get(KEY)[1] == [{'id': '1'}]
+    assert len(reads) == 1
+
+    monkeypatch.setattr(ConfigCache, 'SSM_TTL', 0)
+    ConfigCache.clear()
+    ConfigCache.get(KEY)
+    ConfigCache.get(KEY)
+    assert len(reads) == 3
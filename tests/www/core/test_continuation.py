@@ -0,0 +1,96 @@
+import json
+import www.core.continuation as continuation
+from www.core.checkpoint import Checkpoint, CheckpointStore
+from www.core.continuation import Continuation
+from tests.fake_synapse import FakeSynapseServer
+
+
+class FakeLambdaClient:
+    def __init__(self):
+        self.invocations = []
+
+    def invoke(self, **kwargs):
+        self.invocations.append(kwargs)
+
+
+class FakeLambdaContext:
+    def get_remaining_time_in_millis(self):
+        return 120000
+
+
+class SyncThread:
+    def __init__(self, target, kwargs, daemon):
+        self.target = target
+        self.kwargs = kwargs
+
+    def start(self):
+        self.target(**self.kwargs)
+
+
+def test_it_invokes_the_lambda_function_asynchronously(fake_synapse, monkeypatch):
+    lambda_client = FakeLambdaClient()
+    folder = fake_synapse.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Checkpoints', fake_synapse.admin_project['id'])
+    monkeypatch.setenv('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID', folder['id'])
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'sls-ki-synapse-admin-test-www')
+    monkeypatch.setattr(continuation.boto3, 'client', lambda name: lambda_client)
+
+    checkpoint = Checkpoint('op1', 'CreateBasicSpaceService', {}, completed_steps=['create_project'])
+    assert Continuation.start(checkpoint) is None
+
+    assert CheckpointStore.load('op1').completed_steps == ['create_project']
+    # Saved where the container that runs the continuation can load it.
+    assert any(e['name'] == 'op1_checkpoint.json' for e in fake_synapse.entities.values())
+    assert len(lambda_client.invocations) == 1
+    invocation = lambda_client.invocations[0]
+    assert invocation['FunctionName'] == 'sls-ki-synapse-admin-test-www'
+    assert invocation['InvocationType'] == 'Event'
+    assert json.loads(invocation['Payload']) == {
+        'continuation': {'service': 'CreateBasicSpaceService', 'operation_id': 'op1'}
+    }
+
+
+def test_it_runs_in_a_thread_outside_of_lambda(checkpoint_dir, monkeypatch):
+    runs = []
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME', raising=False)
+    monkeypatch.setattr(continuation.threading, 'Thread', SyncThread)
+    monkeypatch.setattr(Continuation, 'run',
+                        classmethod(lambda cls, service, operation_id: runs.append((service, operation_id))))
+
+    assert Continuation.start(Checkpoint('op1', 'GrantDaaAccessService', {})) is None
+    assert runs == [('GrantDaaAccessService', 'op1')]
+
+
+def test_it_is_only_available_on_lambda_with_a_checkpoint_folder(checkpoint_dir, monkeypatch):
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME', raising=False)
+    assert Continuation.is_available()
+
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'sls-ki-synapse-admin-test-www')
+    assert not Continuation.is_available()
+    error = Continuation.start(Checkpoint('op1', 'CreateBasicSpaceService', {}))
+    assert 'SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID must be set' in error
+
+    monkeypatch.setenv('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID', 'syn1')
+    assert Continuation.is_available()
+
+
+def test_it_returns_an_error_for_unknown_services(checkpoint_dir):
+    error = Continuation.start(Checkpoint('op1', 'UnknownService', {}))
+    assert 'Service: UnknownService cannot be continued.' in error
+
+
+def test_it_handles_continuation_events(monkeypatch):
+    runs = []
+
+    def _run(cls, service, operation_id, deadline=None):
+        runs.append((service, operation_id, deadline))
+        raise Exception('Resume failed')
+
+    monkeypatch.setattr(Continuation, 'run', classmethod(_run))
+
+    event = {'continuation': {'service': 'CreateDcaSpaceService', 'operation_id': 'op1'}}
+    result = Continuation.handle_event(event, FakeLambdaContext())
+
+    assert result == {'operation_id': 'op1', 'errors': ['Resume failed']}
+    service, operation_id, deadline = runs[0]
+    assert (service, operation_id) == ('CreateDcaSpaceService', 'op1')
+    assert 110 < deadline.remaining() <= 120
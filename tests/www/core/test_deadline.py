@@ -0,0 +1,84 @@
+import pytest
+import time
+from www.core import Synapse, DeadlineExceededError
+from www.core.deadline import Deadline
+from www.core.synapse import SynapseGovernor, SynapseCircuitBreaker
+from tests.www.core.test_synapse_governor import FakeHTTPError, mk_fn
+import synapseclient as syn
+import requests
+
+
+def test_it_counts_down():
+    deadline = Deadline(0.05)
+    assert 0 < deadline.remaining() <= 0.05
+    assert deadline.has_time_for(0.01)
+    assert not deadline.has_time_for(1)
+    assert not deadline.expired()
+    deadline.check()
+
+    time.sleep(0.05)
+    assert deadline.remaining() == 0
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceededError):
+        deadline.check()
+
+
+def test_for_request_leaves_time_to_respond():
+    deadline = Deadline.for_request()
+    assert deadline.seconds == Deadline.API_GATEWAY_TIMEOUT - Deadline.RESPONSE_SECONDS
+
+
+def test_it_is_active_within_its_context():
+    outer = Deadline(10)
+    inner = Deadline(5)
+
+    assert Deadline.current() is None
+    with outer:
+        assert Deadline.current() is outer
+        with inner:
+            assert Deadline.current() is inner
+        assert Deadline.current() is outer
+    assert Deadline.current() is None
+
+
+def test_synapse_calls_check_the_deadline(fake_synapse):
+    with Deadline(10):
+        assert Synapse.client().store(syn.Project(name='Test Project')).id
+
+    fake_synapse.reset_calls()
+    with Deadline(0):
+        with pytest.raises(DeadlineExceededError):
+            Synapse.client().store(syn.Project(name='Another Project'))
+
+    assert fake_synapse.calls == []
+    # Running out of time is not a Synapse failure.
+    assert Synapse.circuit_breaker.state == Synapse.circuit_breaker.CLOSED
+
+
+def test_the_governor_does_not_back_off_past_the_deadline():
+    governor = SynapseGovernor(max_requests_per_second=0, backoff_base=0)
+    fn = mk_fn(FakeHTTPError(429, {'Retry-After': '5'}))
+
+    with Deadline(1):
+        with pytest.raises(FakeHTTPError):
+            governor.call(fn)
+    assert len(fn.calls) == 1
+
+
+def test_calls_cut_short_by_the_deadline_are_not_synapse_failures(fake_synapse, monkeypatch):
+    def _timeout(method, uri, data=None):
+        raise requests.exceptions.Timeout()
+
+    monkeypatch.setattr(fake_synapse, 'handle', _timeout)
+    monkeypatch.setattr(Synapse, 'circuit_breaker', SynapseCircuitBreaker(failure_threshold=1, slow_call_seconds=0))
+    Synapse.governor.max_retries = 0
+
+    with Deadline(5):
+        with pytest.raises(DeadlineExceededError):
+            Synapse.client().get('syn1')
+    assert Synapse.circuit_breaker.state == SynapseCircuitBreaker.CLOSED
+
+    # Without the deadline the call had the full timeout, so the timeout is a Synapse failure.
+    with pytest.raises(requests.exceptions.Timeout):
+        Synapse.client().get('syn1')
+    assert Synapse.circuit_breaker.state == SynapseCircuitBreaker.OPEN
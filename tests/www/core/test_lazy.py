@@ -0,0 +1,22 @@
+import sys
+import subprocess
+from www.core.lazy import lazy_import
+
+
+def test_it_loads_the_module_on_first_use():
+    sys.modules.pop('wave', None)
+
+    wave = lazy_import('wave')
+    assert type(wave).__name__ == '_LazyModule'
+
+    assert wave.WAVE_FORMAT_PCM == 1
+    assert type(wave).__name__ == 'module'
+    assert lazy_import('wave') is wave
+
+
+def test_the_app_does_not_load_the_synapse_stack_at_import_time():
+    code = ('import sys, www.server; '
+            'print("LOADED:" + ",".join(m for m in ["synapseclient.client", "pytz.tzfile", '
+            '"www.services.synapse_space.dca.create_dca_space_service"] if m in sys.modules))')
+    result = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    assert 'LOADED:\n' in result.stdout
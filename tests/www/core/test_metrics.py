@@ -0,0 +1,64 @@
+import pytest
+from www.core import Synapse
+from www.core.metrics import timed_step
+
+
+class FakeService:
+    def __init__(self):
+        self.errors = []
+        self.warnings = []
+        self.steps = []
+
+    @timed_step
+    def _step_success(self):
+        return True
+
+    @timed_step
+    def _step_warning(self):
+        self.warnings.append('warning')
+        return True
+
+    @timed_step
+    def _step_failed(self):
+        self.errors.append('error')
+        return False
+
+    @timed_step
+    def _step_exception(self):
+        raise Exception('Random Error...')
+
+    @timed_step
+    def _step_synapse_calls(self):
+        for _ in range(3):
+            Synapse._rest_call_stats.count = Synapse.rest_call_count() + 1
+        return True
+
+
+def test_it_records_the_outcome():
+    service = FakeService()
+    assert service._step_success() is True
+    assert service._step_warning() is True
+    assert service._step_failed() is False
+    with pytest.raises(Exception):
+        service._step_exception()
+
+    assert [s['step'] for s in service.steps] == ['step_success', 'step_warning', 'step_failed', 'step_exception']
+    assert [s['outcome'] for s in service.steps] == ['success', 'warning', 'failed', 'exception']
+    for step in service.steps:
+        assert step['duration_ms'] >= 0
+        assert step['synapse_calls'] == 0
+
+
+def test_it_records_the_synapse_call_count():
+    service = FakeService()
+    service._step_synapse_calls()
+    assert service.steps[0]['synapse_calls'] == 3
+
+
+def test_it_logs_the_metric(mocker):
+    mock = mocker.patch('www.core.metrics.logger')
+    FakeService()._step_success()
+    msg = mock.info.call_args[0][0]
+    assert msg.startswith('STEP_METRIC: ')
+    assert '"service": "FakeService"' in msg
+    assert '"step": "step_success"' in msg
@@ -0,0 +1,94 @@
+import re
+import gzip
+import json
+import pytest
+from flask import jsonify
+from www.core.responses import ResponseOptimizer
+
+BASE_URL = 'https://localhost'
+
+
+def get(client, path, **headers):
+    return client.get(path, base_url=BASE_URL, headers=headers)
+
+
+def static_url(client, filename):
+    res = get(client, '/')
+    return re.search(r'href="(/static/{0}\?v=\w+)"'.format(re.escape(filename)), res.get_data(as_text=True)).group(1)
+
+
+def test_it_gzips_responses_the_client_accepts(client):
+    url = static_url(client, 'css/base.css')
+    plain = get(client, url)
+    assert 'Content-Encoding' not in plain.headers
+
+    res = get(client, url, **{'Accept-Encoding': 'gzip, deflate'})
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in res.headers['Vary']
+    assert gzip.decompress(res.get_data()) == plain.get_data()
+
+
+def test_it_gzips_json_responses(client, test_app):
+    test_app.add_url_rule('/_test_json', 'test_json', lambda: jsonify(items=['item'] * 200))
+    res = get(client, '/_test_json', **{'Accept-Encoding': 'gzip'})
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(res.get_data())) == {'items': ['item'] * 200}
+
+
+def test_it_does_not_compress_html_pages(client):
+    # The pages carry the CSRF token next to the user's input (see: BREACH).
+    res = get(client, '/', **{'Accept-Encoding': 'gzip, br'})
+    assert res.status_code == 200
+    assert 'Content-Encoding' not in res.headers
+
+
+def test_it_does_not_compress_small_responses(client, monkeypatch):
+    monkeypatch.setattr(ResponseOptimizer, 'MIN_COMPRESS_SIZE', 10 ** 9)
+    res = get(client, static_url(client, 'css/base.css'), **{'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in res.headers
+
+
+def test_it_uses_brotli_when_installed(client):
+    brotli = pytest.importorskip('brotli')
+    url = static_url(client, 'css/base.css')
+    res = get(client, url, **{'Accept-Encoding': 'gzip, br'})
+    assert res.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(res.get_data()) == get(client, url).get_data()
+
+
+def test_it_returns_304_for_unchanged_views(client):
+    res = get(client, '/')
+    etag = res.headers['ETag']
+    assert not etag.startswith('W/')
+
+    res = get(client, '/', **{'If-None-Match': etag})
+    assert res.status_code == 304
+    assert res.get_data() == b''
+    assert 'Content-Security-Policy' in res.headers
+
+
+def test_it_adds_the_encoding_to_the_etag(client):
+    url = static_url(client, 'css/base.css')
+    etag = get(client, url, **{'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert etag.endswith('-gzip"')
+
+    # Each encoding has its own ETag.
+    assert get(client, url, **{'If-None-Match': etag}).status_code == 200
+
+
+def test_it_fingerprints_and_caches_static_files(client):
+    url = static_url(client, 'css/bootstrap.min.css')
+
+    res = get(client, url, **{'Accept-Encoding': 'gzip'})
+    assert res.status_code == 200
+    assert res.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in res.headers['Cache-Control']
+    assert 'max-age={0}'.format(ResponseOptimizer.STATIC_MAX_AGE) in res.headers['Cache-Control']
+
+    res = get(client, url, **{'Accept-Encoding': 'gzip', 'If-None-Match': res.headers['ETag']})
+    assert res.status_code == 304
+
+
+def test_it_does_not_cache_static_files_without_a_fingerprint(client):
+    res = get(client, '/static/css/base.css')
+    assert 'immutable' not in res.headers.get('Cache-Control', '')
@@ -0,0 +1,173 @@
+import time
+import fnmatch
+import pytest
+from sls_tools.param_store import ParamStore, ParamStoreResult
+from www.core import Env, Synapse
+from www.core.shared_cache import SharedCache, MemoryCacheBackend, DiskCacheBackend, RedisCacheBackend
+
+
+class FakeRedis:
+    """The part of the redis client used by RedisCacheBackend."""
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        if value is None or (value[1] is not None and time.monotonic() >= value[1]):
+            return None
+        return value[0].encode('utf-8')
+
+    def set(self, key, value, px=None):
+        self.values[key] = (value, None if px is None else time.monotonic() + px / 1000)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def scan_iter(self, match):
+        return [k for k in self.values if fnmatch.fnmatch(k, match)]
+
+
+@pytest.fixture(params=['memory', 'disk', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCacheBackend()
+    elif request.param == 'disk':
+        return DiskCacheBackend(str(tmp_path))
+    return RedisCacheBackend(client=FakeRedis())
+
+
+@pytest.fixture
+def shared_cache():
+    backend = MemoryCacheBackend()
+    SharedCache.set_backend(backend)
+    yield backend
+    SharedCache.set_backend(None)
+
+
+def test_it_gets_sets_and_deletes_values(backend):
+    assert backend.get('a') is None
+    backend.set('a', {'b': [1, 2]})
+    assert backend.get('a') == {'b': [1, 2]}
+
+    backend.delete('a')
+    assert backend.get('a') is None
+
+
+def test_it_expires_values(backend):
+    backend.set('a', 1, ttl=0.01)
+    backend.set('b', 2, ttl=0)
+    assert backend.get('b') is None
+    time.sleep(0.02)
+    assert backend.get('a') is None
+
+
+def test_it_clears_values_by_prefix(backend):
+    backend.set('ssm:A', 1)
+    backend.set('ssm:B', 2)
+    backend.set('synapse:C', 3)
+
+    backend.clear('ssm:')
+    assert backend.get('ssm:A') is None
+    assert backend.get('ssm:B') is None
+    assert backend.get('synapse:C') == 3
+
+
+def test_it_evicts_the_least_recently_used_values():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+    assert backend.get('a') == 1
+    assert backend.get('b') is None
+
+
+def test_it_shares_the_disk_values_between_processes(tmp_path):
+    DiskCacheBackend(str(tmp_path)).set('a', [1])
+    assert DiskCacheBackend(str(tmp_path)).get('a') == [1]
+
+
+def test_it_creates_the_backend_from_the_os_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv('SHARED_CACHE_BACKEND', 'disk')
+    monkeypatch.setenv('SHARED_CACHE_URL', str(tmp_path))
+    SharedCache.set_backend(None)
+    try:
+        assert isinstance(SharedCache.backend(), DiskCacheBackend)
+        assert SharedCache.backend().directory == str(tmp_path)
+    finally:
+        SharedCache.set_backend(None)
+
+
+def test_it_treats_backend_errors_as_misses(shared_cache, monkeypatch):
+    def _fail(*args, **kwargs):
+        raise ConnectionError('down')
+
+    monkeypatch.setattr(shared_cache, 'get', _fail)
+    monkeypatch.setattr(shared_cache, 'set', _fail)
+    assert SharedCache.get('a') is None
+    assert SharedCache.get_or_set('a', lambda: 1) == 1
+
+
+def test_it_shares_the_ssm_values(shared_cache, monkeypatch):
+    reads = []
+    get = ParamStore.get
+
+    def _get(key, default=None, store=None):
+        reads.append(key)
+        return ParamStoreResult(key, 'value', ParamStore.Stores.SSM)
+
+    monkeypatch.delenv('GOOGLE_CLIENT_ID', raising=False)
+    monkeypatch.setattr(ParamStore, 'get', _get)
+    assert Env.GOOGLE_CLIENT_ID() == 'value'
+    assert Env.GOOGLE_CLIENT_ID() == 'value'
+    assert reads == ['GOOGLE_CLIENT_ID']
+
+    # The OS values are read before the cache.
+    monkeypatch.setattr(ParamStore, 'get', get)
+    monkeypatch.setenv('GOOGLE_CLIENT_ID', 'os')
+    assert Env.GOOGLE_CLIENT_ID() == 'os'
+
+
+def test_it_does_not_share_the_secrets(shared_cache, monkeypatch):
+    reads = []
+
+    def _get(key, default=None, store=None):
+        reads.append(key)
+        return ParamStoreResult(key, 'secret', ParamStore.Stores.SSM)
+
+    monkeypatch.delenv('SYNAPSE_PASSWORD', raising=False)
+    monkeypatch.setattr(ParamStore, 'get', _get)
+    assert Env.SYNAPSE_PASSWORD() == 'secret'
+    assert Env.SYNAPSE_PASSWORD() == 'secret'
+    assert reads == ['SYNAPSE_PASSWORD', 'SYNAPSE_PASSWORD']
+    assert shared_cache.get(Env.SSM_CACHE_PREFIX + 'SYNAPSE_PASSWORD') is None
+
+    for key in ['SYNAPSE_PASSWORD', 'GOOGLE_CLIENT_SECRET', 'SECRET_KEY']:
+        assert key not in Env.SHARED_SSM_KEYS
+
+
+def test_it_shares_the_table_columns(fake_synapse, monkeypatch):
+    table = fake_synapse.seed_table(fake_synapse.admin_project['id'], ['Name', 'Count'])
+    assert Synapse.get_table_columns(table['id']) == ['Name', 'Count']
+
+    # Another worker.
+    monkeypatch.setattr(Synapse, 'TABLE_COL_CACHE', {})
+    fake_synapse.reset_calls()
+    assert Synapse.get_table_columns(table['id']) == ['Name', 'Count']
+    assert fake_synapse.calls == []
+
+
+def test_it_caches_the_taken_names(fake_synapse):
+    project = fake_synapse.seed_project('Taken Project')
+
+    assert Synapse.project_name_taken('Free Project') is False
+    assert Synapse.project_name_taken(project['name']) is True
+    fake_synapse.reset_calls()
+    assert Synapse.project_name_taken(project['name']) is True
+    assert fake_synapse.calls == []
+
+    # Names not found are looked up again.
+    fake_synapse.seed_project('Free Project')
+    assert Synapse.project_name_taken('Free Project') is True
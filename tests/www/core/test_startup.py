@@ -0,0 +1,73 @@
+import time
+import threading
+import pytest
+from www.core.startup import Startup
+from www import server
+
+
+def test_it_runs_the_tasks_at_the_same_time():
+    startup = Startup()
+    start = time.perf_counter()
+    for name in ['a', 'b', 'c']:
+        startup.start(name, lambda: time.sleep(0.2))
+
+    for name in ['a', 'b', 'c']:
+        startup.result(name)
+
+    assert time.perf_counter() - start < 0.5
+    assert set(startup.durations) == {'a', 'b', 'c'}
+
+
+def test_it_only_waits_for_the_task_it_needs():
+    startup = Startup()
+    slow_done = threading.Event()
+    startup.start('slow', lambda: slow_done.wait(5))
+    startup.start('fast', lambda: 'fast')
+
+    assert startup.result('fast', timeout=1) == 'fast'
+    assert not slow_done.is_set()
+    slow_done.set()
+    assert startup.result('slow') is True
+
+
+def test_it_runs_required_tasks_first():
+    startup = Startup()
+    order = []
+    startup.start('first', lambda: time.sleep(0.1) or order.append('first'))
+    startup.start('second', lambda: order.append('second'), requires=['first', 'not_started'])
+
+    startup.result('second')
+    assert order == ['first', 'second']
+
+
+def test_it_runs_tasks_whose_required_task_failed():
+    startup = Startup()
+    startup.start('first', lambda: 1 / 0)
+    startup.start('second', lambda: 'ran', requires=['first'])
+
+    assert startup.result('second') == 'ran'
+    with pytest.raises(ZeroDivisionError):
+        startup.result('first')
+
+
+def test_it_does_not_start_a_task_twice():
+    startup = Startup()
+    calls = []
+    first = startup.start('task', lambda: calls.append(1))
+    assert startup.start('task', lambda: calls.append(2)) is first
+
+    startup.result('task')
+    assert calls == [1]
+    assert startup.started('task')
+    assert not startup.started('other')
+
+
+def test_it_raises_for_tasks_that_were_not_started():
+    with pytest.raises(KeyError):
+        Startup().result('not_started')
+
+
+def test_the_app_starts_the_auth_client_and_secret_key():
+    assert server.get_auth_client() is server.get_auth_client()
+    assert server.app.secret_key == server.startup.result('secret_key')
+    assert not server.startup.started('synapse_client')
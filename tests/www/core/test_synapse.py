@@ -30,3 +30,9 @@ def test_date_to_synapse_date_timestamp():
     d = date(year=2020, month=1, day=1)
     ts = Synapse.date_to_synapse_date_timestamp(d)
     assert date.fromtimestamp(ts / 1000) == d
+
+
+def test_rest_call_count():
+    before = Synapse.rest_call_count()
+    Synapse.client().getUserProfile(refresh=True)
+    assert Synapse.rest_call_count() > before
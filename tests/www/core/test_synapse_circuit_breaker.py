@@ -0,0 +1,161 @@
+import pytest
+import time
+from www.core import Synapse, SynapseUnavailableError
+from www.core.synapse import SynapseCircuitBreaker
+from www.services.synapse_space.basic import CreateBasicSpaceService
+from tests.www.core.test_synapse_governor import FakeHTTPError
+
+
+def fail(status_code=502):
+    def _fn():
+        raise FakeHTTPError(status_code)
+
+    return _fn
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(FakeHTTPError):
+            breaker.call(fail())
+    assert breaker.state == SynapseCircuitBreaker.OPEN
+
+
+def test_it_opens_after_consecutive_failures():
+    breaker = SynapseCircuitBreaker(failure_threshold=3)
+
+    for _ in range(2):
+        with pytest.raises(FakeHTTPError):
+            breaker.call(fail())
+    assert breaker.state == SynapseCircuitBreaker.CLOSED
+
+    with pytest.raises(FakeHTTPError):
+        breaker.call(fail())
+    assert breaker.state == SynapseCircuitBreaker.OPEN
+    assert breaker.metrics()['opened'] == 1
+
+
+def test_a_success_resets_the_failure_count():
+    breaker = SynapseCircuitBreaker(failure_threshold=2)
+
+    with pytest.raises(FakeHTTPError):
+        breaker.call(fail())
+    breaker.call(lambda: None)
+    with pytest.raises(FakeHTTPError):
+        breaker.call(fail())
+
+    assert breaker.state == SynapseCircuitBreaker.CLOSED
+
+
+def test_it_does_not_count_client_errors():
+    breaker = SynapseCircuitBreaker(failure_threshold=2)
+
+    for _ in range(5):
+        with pytest.raises(FakeHTTPError):
+            breaker.call(fail(404))
+
+    assert breaker.state == SynapseCircuitBreaker.CLOSED
+
+
+def test_it_does_not_count_throttled_calls():
+    breaker = SynapseCircuitBreaker(failure_threshold=2)
+
+    for status_code in [429, 503] * 3:
+        with pytest.raises(FakeHTTPError):
+            breaker.call(fail(status_code))
+
+    assert breaker.state == SynapseCircuitBreaker.CLOSED
+
+
+def test_a_retried_throttled_call_does_not_open_it(fake_synapse):
+    fake_synapse.errors = {'entity': 503}
+    Synapse.governor.max_retries = Synapse.circuit_breaker.failure_threshold
+
+    with pytest.raises(Exception):
+        Synapse.client().get('syn1')
+
+    assert fake_synapse.call_counts()['entity'] == Synapse.circuit_breaker.failure_threshold + 1
+    assert Synapse.circuit_breaker.state == SynapseCircuitBreaker.CLOSED
+
+
+def test_it_counts_slow_calls_as_failures():
+    breaker = SynapseCircuitBreaker(failure_threshold=2, slow_call_seconds=0.01)
+
+    for _ in range(2):
+        assert breaker.call(lambda: time.sleep(0.01) or 'ok') == 'ok'
+
+    assert breaker.state == SynapseCircuitBreaker.OPEN
+    assert breaker.metrics()['slow_calls'] == 2
+
+
+def test_it_fails_fast_while_open():
+    breaker = SynapseCircuitBreaker(failure_threshold=1)
+    open_breaker(breaker)
+
+    calls = []
+    with pytest.raises(SynapseUnavailableError) as ex:
+        breaker.call(lambda: calls.append(1))
+    assert 'Synapse unavailable' in str(ex.value)
+    assert not calls
+
+    with pytest.raises(SynapseUnavailableError):
+        breaker.check()
+    assert breaker.metrics()['rejected'] == 1
+
+
+def test_a_successful_probe_closes_it():
+    breaker = SynapseCircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    open_breaker(breaker)
+
+    time.sleep(0.05)
+    breaker.check()
+    assert breaker.call(lambda: 'ok') == 'ok'
+
+    assert breaker.state == SynapseCircuitBreaker.CLOSED
+    assert breaker.metrics()['closed'] == 1
+
+
+def test_a_failed_probe_opens_it_again():
+    breaker = SynapseCircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    open_breaker(breaker)
+
+    time.sleep(0.05)
+    with pytest.raises(FakeHTTPError):
+        breaker.call(fail())
+
+    assert breaker.state == SynapseCircuitBreaker.OPEN
+    with pytest.raises(SynapseUnavailableError):
+        breaker.call(lambda: None)
+
+
+def test_it_only_lets_one_probe_through():
+    breaker = SynapseCircuitBreaker(failure_threshold=1, reset_timeout=0)
+    open_breaker(breaker)
+
+    def _probe():
+        with pytest.raises(SynapseUnavailableError):
+            breaker.call(lambda: None)
+        return 'ok'
+
+    assert breaker.call(_probe) == 'ok'
+    assert breaker.state == SynapseCircuitBreaker.CLOSED
+
+
+def test_services_and_validators_fail_fast_when_synapse_is_down(fake_synapse, set_basic_config, synapse_calls):
+    set_basic_config([{'id': '1', 'name': 'Basic', 'default': True}])
+    fake_synapse.errors = {'entity': 502}
+    Synapse.governor.max_retries = 10
+
+    service = CreateBasicSpaceService('1', 'Project', 'user@test.com').execute()
+    assert service.errors
+    assert Synapse.circuit_breaker.state == SynapseCircuitBreaker.OPEN
+    # The retries stop once the breaker opens.
+    assert fake_synapse.call_counts()['entity'] == Synapse.circuit_breaker.failure_threshold
+
+    synapse_calls.reset()
+    service = CreateBasicSpaceService('1', 'Project', 'user@test.com').execute()
+    assert len(service.errors) == 1
+    assert service.errors[0].startswith('Synapse unavailable')
+
+    error = CreateBasicSpaceService.Validations.validate_project_name('Project')
+    assert error.startswith('Synapse unavailable')
+    assert synapse_calls.count() == 0
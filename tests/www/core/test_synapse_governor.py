@@ -0,0 +1,127 @@
+import pytest
+import time
+import threading
+import requests
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from www.core import Synapse
+from www.core.synapse import SynapseGovernor
+import synapseclient as syn
+
+
+class FakeHTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__('HTTP {0}'.format(status_code))
+        self.response = requests.Response()
+        self.response.status_code = status_code
+        self.response.headers.update(headers or {})
+
+
+def mk_fn(*errors, result='ok'):
+    """Makes a function that raises each error in turn and then returns the result."""
+    calls = []
+
+    def _fn():
+        calls.append(time.perf_counter())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    _fn.calls = calls
+    return _fn
+
+
+def test_it_retries_throttled_calls():
+    governor = SynapseGovernor(max_requests_per_second=0, backoff_base=0)
+    fn = mk_fn(FakeHTTPError(429), FakeHTTPError(503), requests.exceptions.ConnectionError())
+
+    assert governor.call(fn) == 'ok'
+    assert len(fn.calls) == 4
+
+    metrics = governor.metrics()
+    assert metrics['calls'] == 4
+    assert metrics['retries'] == 3
+    assert metrics['throttled'] == 2
+    assert metrics['failures'] == 0
+
+
+def test_it_honors_retry_after():
+    governor = SynapseGovernor(max_requests_per_second=0, backoff_base=0)
+    fn = mk_fn(FakeHTTPError(429, {'Retry-After': '0.2'}))
+
+    assert governor.call(fn) == 'ok'
+    assert fn.calls[1] - fn.calls[0] >= 0.2
+
+
+def test_it_caps_retry_after_at_the_max_backoff():
+    governor = SynapseGovernor(max_requests_per_second=0, backoff_base=0, backoff_max=0.1)
+    fn = mk_fn(FakeHTTPError(429, {'Retry-After': '3600'}))
+
+    start = time.perf_counter()
+    assert governor.call(fn) == 'ok'
+    assert time.perf_counter() - start < 1
+
+
+def test_it_parses_retry_after():
+    assert SynapseGovernor._parse_retry_after('5') == 5
+    assert SynapseGovernor._parse_retry_after(None) is None
+    assert SynapseGovernor._parse_retry_after('not-a-date') is None
+    retry_at = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < SynapseGovernor._parse_retry_after(retry_at) <= 30
+
+
+def test_it_gives_up_after_max_retries():
+    governor = SynapseGovernor(max_requests_per_second=0, max_retries=2, backoff_base=0)
+    fn = mk_fn(*[FakeHTTPError(503)] * 5)
+
+    with pytest.raises(FakeHTTPError):
+        governor.call(fn)
+    assert len(fn.calls) == 3
+    assert governor.metrics()['failures'] == 1
+
+
+def test_it_does_not_retry_client_errors():
+    governor = SynapseGovernor(max_requests_per_second=0, backoff_base=0)
+    fn = mk_fn(FakeHTTPError(404))
+
+    with pytest.raises(FakeHTTPError):
+        governor.call(fn)
+    assert len(fn.calls) == 1
+
+
+def test_it_limits_the_request_rate():
+    governor = SynapseGovernor(max_requests_per_second=20, burst=1)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        governor.call(lambda: None)
+
+    assert time.perf_counter() - start >= 0.15
+    assert governor.metrics()['rate_limit_wait_seconds'] > 0
+
+
+def test_it_limits_the_calls_in_flight():
+    governor = SynapseGovernor(max_requests_per_second=0, max_in_flight=2)
+
+    threads = [threading.Thread(target=governor.call, args=(lambda: time.sleep(0.05),)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    metrics = governor.metrics()
+    assert metrics['calls'] == 6
+    assert metrics['max_in_flight'] == 2
+    assert metrics['in_flight_wait_seconds'] > 0
+
+
+def test_it_governs_the_synapse_client(fake_synapse):
+    fake_synapse.errors = {'team': 429}
+    fake_synapse.error_rate = 0.5
+    fake_synapse._random.seed(1)
+    Synapse.governor.max_retries = 20
+
+    team = Synapse.client().store(syn.Team(name='Test Team'))
+    assert team.id
+    assert Synapse.governor.metrics()['throttled'] > 0
+    assert Synapse.governor.metrics()['throttled'] == Synapse.governor.metrics()['retries']
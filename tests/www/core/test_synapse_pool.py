@@ -0,0 +1,123 @@
+import pytest
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from www.core import Synapse, SynapseUnavailableError
+from www.core.synapse_pool import SynapseClientPool
+
+
+class FakeClient:
+    def __init__(self):
+        self._requests_session = requests.Session()
+
+
+def test_it_creates_clients_up_to_the_max_size():
+    pool = SynapseClientPool(FakeClient, max_size=2, checkout_timeout=0)
+
+    first = pool.checkout()
+    second = pool.checkout()
+    assert first is not second
+    with pytest.raises(SynapseUnavailableError):
+        pool.checkout()
+
+    pool.checkin(first)
+    assert pool.checkout() is first
+    assert pool.metrics()['created'] == 2
+    assert pool.metrics()['in_use'] == 2
+
+
+def test_it_waits_for_a_client_to_be_checked_in():
+    pool = SynapseClientPool(FakeClient, max_size=1, checkout_timeout=5)
+    client = pool.checkout()
+
+    timer = threading.Timer(0.05, pool.checkin, args=[client])
+    timer.start()
+    assert pool.checkout() is client
+    assert pool.metrics()['wait_seconds'] >= 0.04
+
+
+def test_it_discards_unhealthy_and_old_clients():
+    pool = SynapseClientPool(FakeClient, max_size=1, max_age_seconds=60)
+
+    client = pool.checkout()
+    pool.checkin(client, healthy=False)
+    assert pool.checkout() is not client
+    assert pool.metrics()['size'] == 1
+
+    pool = SynapseClientPool(FakeClient, max_size=1, max_age_seconds=0.01)
+    client = pool.checkout()
+    time.sleep(0.02)
+    pool.checkin(client)
+    assert pool.checkout() is not client
+    assert pool.metrics()['discarded'] == 1
+
+
+def test_it_discards_the_clients_that_fail_the_health_check():
+    pool = SynapseClientPool(FakeClient, max_size=2)
+    clients = [pool.checkout(), pool.checkout()]
+    for client in clients:
+        pool.checkin(client)
+
+    def _ping(client):
+        if client is clients[0]:
+            raise requests.exceptions.ConnectionError()
+
+    assert pool.check_health(_ping) == 1
+    assert pool.metrics()['size'] == 1
+    assert pool.checkout() is clients[1]
+
+
+def test_it_gives_each_request_its_own_client(fake_synapse, monkeypatch):
+    monkeypatch.setenv('SYNAPSE_CLIENT_POOL_SIZE', '2')
+    shared = Synapse.client()
+    barrier = threading.Barrier(2)
+
+    def _request():
+        Synapse.checkout()
+        try:
+            barrier.wait(timeout=5)
+            client = Synapse.client()
+            client.restGET('/entity/{0}'.format(fake_synapse.admin_project['id']))
+            return client
+        finally:
+            Synapse.checkin()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        clients = list(executor.map(lambda _: _request(), range(2)))
+
+    assert clients[0] is not clients[1]
+    assert shared not in clients
+    assert Synapse.pool().metrics() == dict(Synapse.pool().metrics(), size=2, idle=2, in_use=0)
+    # Outside a request the shared client is used.
+    assert Synapse.client() is shared
+
+
+def test_it_replaces_a_client_whose_connection_failed(fake_synapse, monkeypatch):
+    monkeypatch.setenv('SYNAPSE_CLIENT_POOL_SIZE', '1')
+    Synapse.governor.max_retries = 0
+
+    def _handle(*args):
+        raise requests.exceptions.ConnectionError()
+
+    Synapse.checkout()
+    client = Synapse.client()
+    with monkeypatch.context() as m:
+        m.setattr(fake_synapse, 'handle', _handle)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.restGET('/entity/syn1')
+    Synapse.checkin()
+
+    Synapse.checkout()
+    assert Synapse.client() is not client
+    Synapse.checkin()
+
+
+def test_it_loads_the_table_columns_once(fake_synapse):
+    table = fake_synapse.seed_table(fake_synapse.admin_project['id'], ['Name', 'Count'])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: Synapse.get_table_columns(table['id']), range(16)))
+
+    assert all(r is results[0] for r in results)
+    assert results[0] == ['Name', 'Count']
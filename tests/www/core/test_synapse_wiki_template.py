@@ -0,0 +1,41 @@
+from www.core import Synapse
+
+
+def test_it_gets_the_wiki_template(fake_synapse):
+    project = fake_synapse.seed_project('Template')
+    fake_synapse.seed_wiki(project['id'], 'Title', '# Markdown')
+
+    wiki = Synapse.get_wiki_template(project['id'])
+    assert wiki['title'] == 'Title'
+    assert wiki['markdown'] == '# Markdown'
+
+
+def test_it_only_checks_the_etag_of_a_cached_wiki(fake_synapse):
+    project = fake_synapse.seed_project('Template')
+    fake_synapse.seed_wiki(project['id'], 'Title', '# Markdown')
+    Synapse.get_wiki_template(project['id'])
+
+    fake_synapse.reset_calls()
+    assert Synapse.get_wiki_template(project['id'])['markdown'] == '# Markdown'
+    assert fake_synapse.call_counts() == {'wiki': 1}
+    assert fake_synapse.calls[0]['path'].endswith('/wiki2')
+
+
+def test_it_downloads_a_wiki_that_changed(fake_synapse):
+    project = fake_synapse.seed_project('Template')
+    fake_synapse.seed_wiki(project['id'], 'Title', '# Markdown')
+    Synapse.get_wiki_template(project['id'])
+
+    # Replace the wiki, which changes its etag.
+    fake_synapse.wikis[project['id']].clear()
+    fake_synapse.seed_wiki(project['id'], 'Title', '# Changed')
+    assert Synapse.get_wiki_template(project['id'])['markdown'] == '# Changed'
+
+
+def test_it_gets_the_metadata_once_per_download(fake_synapse):
+    project = fake_synapse.seed_project('Template')
+    fake_synapse.seed_wiki(project['id'], 'Title', '# Markdown')
+
+    assert Synapse.get_wiki_template(project['id'])['markdown'] == '# Markdown'
+    assert [c['path'] for c in fake_synapse.calls if c['path'].endswith('/wiki2')] == \
+           ['/entity/{0}/wiki2'.format(project['id'])]
@@ -0,0 +1,61 @@
+import os
+import pytest
+from flask import Flask
+from www.core.template_cache import TemplateBytecodeCache
+
+
+@pytest.fixture
+def mk_app(tmpdir):
+    templates_dir = tmpdir.mkdir('templates')
+    templates_dir.join('page.html').write('<p>{{ value }}</p>')
+
+    def _mk(directory, packaged_dir):
+        app = Flask('test_template_cache', root_path=str(tmpdir))
+        app.jinja_options = dict(app.jinja_options,
+                                 bytecode_cache=TemplateBytecodeCache(directory=directory, packaged_dir=packaged_dir))
+        return app
+
+    yield _mk, templates_dir
+
+
+def test_it_loads_the_packaged_templates(mk_app, tmpdir):
+    _mk, _ = mk_app
+    packaged_dir = str(tmpdir.mkdir('packaged'))
+    runtime_dir = str(tmpdir.join('runtime'))
+
+    _mk(packaged_dir, packaged_dir).jinja_env.get_template('page.html')
+    assert len(os.listdir(packaged_dir)) == 1
+
+    template = _mk(runtime_dir, packaged_dir).jinja_env.get_template('page.html')
+    assert template.render(value='a') == '<p>a</p>'
+    # Nothing was compiled at runtime.
+    assert not os.path.exists(runtime_dir)
+
+
+def test_it_compiles_templates_that_changed(mk_app, tmpdir):
+    _mk, templates_dir = mk_app
+    packaged_dir = str(tmpdir.mkdir('packaged'))
+    runtime_dir = str(tmpdir.join('runtime'))
+
+    _mk(packaged_dir, packaged_dir).jinja_env.get_template('page.html')
+    templates_dir.join('page.html').write('<div>{{ value }}</div>')
+
+    template = _mk(runtime_dir, packaged_dir).jinja_env.get_template('page.html')
+    assert template.render(value='a') == '<div>a</div>'
+    assert len(os.listdir(runtime_dir)) == 1
+
+
+def test_it_compiles_templates_that_are_not_packaged(mk_app, tmpdir):
+    _mk, _ = mk_app
+    runtime_dir = str(tmpdir.join('runtime'))
+
+    template = _mk(runtime_dir, str(tmpdir.join('not_built'))).jinja_env.get_template('page.html')
+    assert template.render(value='a') == '<p>a</p>'
+    assert len(os.listdir(runtime_dir)) == 1
+
+
+def test_it_keys_templates_by_name_only():
+    cache = TemplateBytecodeCache()
+    assert cache.get_cache_key('page.html', '/build/www/templates/page.html') == \
+           cache.get_cache_key('page.html', '/var/task/www/templates/page.html')
+    assert cache.get_cache_key('page.html') != cache.get_cache_key('other.html')
@@ -0,0 +1,68 @@
+import gzip
+import pytest
+from www.core import Synapse
+from www.core.wiki_tree_copier import WikiTreeCopier
+
+
+@pytest.fixture
+def source(fake_synapse):
+    project = fake_synapse.seed_project('Template')
+    root = fake_synapse.seed_wiki(project['id'], 'Root', '# Root', attachments={'root.txt': b'root'})
+    child_1 = fake_synapse.seed_wiki(project['id'], 'Child 1', '# Child 1', parent_wiki_id=root['id'],
+                                     attachments={'child.txt': b'child'})
+    fake_synapse.seed_wiki(project['id'], 'Child 2', '# Child 2', parent_wiki_id=root['id'])
+    fake_synapse.seed_wiki(project['id'], 'Grandchild', '# Grandchild', parent_wiki_id=child_1['id'])
+    return project
+
+
+def markdown(server, wiki):
+    return gzip.decompress(server.file_contents[wiki['markdownFileHandleId']]).decode('utf-8')
+
+
+def test_it_copies_the_wiki_tree(fake_synapse, source):
+    target = fake_synapse.seed_project('Target')
+    new_ids = WikiTreeCopier(source['id'], target['id']).execute()
+    assert len(new_ids) == 4
+
+    wikis = {w['title']: w for w in fake_synapse.wikis[target['id']].values()}
+    assert set(wikis) == {'Root', 'Child 1', 'Child 2', 'Grandchild'}
+    assert wikis['Root']['markdown'] == '# Root'
+    assert markdown(fake_synapse, wikis['Grandchild']) == '# Grandchild'
+    assert wikis['Child 1']['parentWikiId'] == wikis['Root']['id']
+    assert wikis['Child 2']['parentWikiId'] == wikis['Root']['id']
+    assert wikis['Grandchild']['parentWikiId'] == wikis['Child 1']['id']
+
+    attachments = [fake_synapse.file_contents[h] for h in wikis['Child 1']['attachmentFileHandleIds']]
+    assert attachments == [b'child']
+    assert [fake_synapse.file_contents[h] for h in wikis['Root']['attachmentFileHandleIds']] == [b'root']
+
+
+def test_it_copies_the_file_handles_without_moving_bytes(fake_synapse, source):
+    target = fake_synapse.seed_project('Target')
+    # The root markdown is downloaded once per etag (see: Synapse.get_wiki_template).
+    Synapse.get_wiki_template(source['id'])
+    fake_synapse.reset_calls()
+    WikiTreeCopier(source['id'], target['id']).execute()
+
+    # One batch copy for every markdown and attachment, and no downloads or uploads.
+    copy_calls = [c for c in fake_synapse.calls if c['path'] == '/filehandles/copy']
+    assert len(copy_calls) == 1
+    assert not [c for c in fake_synapse.calls if 'multipart' in c['path'] or 'fileHandle/batch' in c['path']]
+
+
+def test_it_copies_a_wiki_without_sub_pages(fake_synapse):
+    source = fake_synapse.seed_project('Template')
+    fake_synapse.seed_wiki(source['id'], 'Root', '# Root')
+    target = fake_synapse.seed_project('Target')
+
+    WikiTreeCopier(source['id'], target['id']).execute()
+    assert [w['markdown'] for w in fake_synapse.wikis[target['id']].values()] == ['# Root']
+
+
+def test_it_raises_when_a_file_handle_cannot_be_copied(fake_synapse, source):
+    for wiki in fake_synapse.wikis[source['id']].values():
+        for file_handle_id in wiki['attachmentFileHandleIds']:
+            fake_synapse.file_handles.pop(file_handle_id)
+
+    with pytest.raises(Exception, match='Failed to copy wiki file handles'):
+        WikiTreeCopier(source['id'], fake_synapse.seed_project('Target')['id']).execute()
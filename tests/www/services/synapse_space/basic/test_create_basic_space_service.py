@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 import json
 from datetime import date, timedelta
 from www.core import Synapse, Env
@@ -101,12 +102,12 @@ def test_it_creates_the_team(mk_service, assert_basic_service_success):
     assert service.team.name == service.team_name
 
 
-def test_it_assigns_the_team_to_the_project(mk_service, assert_basic_service_success, syn_client):
+def test_it_assigns_the_team_to_the_project(mk_service, assert_basic_service_success, syn_test_helper):
     service = mk_service()
     assert service.execute() == service
     assert_basic_service_success(service)
 
-    syn_perms = syn_client.getPermissions(service.project, principalId=service.team.id)
+    syn_perms = syn_test_helper.wait_for_permissions(service.project, service.team.id)
     assert syn_perms
     syn_perms.sort() == Synapse.CAN_DOWNLOAD_PERMS.sort()
 
@@ -160,12 +161,41 @@ def test_it_writes_the_log_file_on_failure(mk_service,
     pass
 
 
+def test_it_resumes_from_the_first_step_that_did_not_complete(fake_synapse, set_basic_config):
+    set_basic_config([{'id': '1', 'name': 'Config 01'}])
+
+    fake_synapse.errors = {'acl': 400}
+    service = CreateBasicSpaceService('1', 'Resumed Project', 'user@test.com', team_name='Resumed Team')
+    service.execute()
+    assert len(service.errors) == 1
+    assert service.checkpoint.completed_steps == ['create_project', 'set_storage_location', 'create_team']
+
+    fake_synapse.errors = {}
+    resumed = CreateBasicSpaceService.resume(service.operation_id)
+    assert not resumed.errors
+    assert resumed.project.id == service.project.id
+    assert resumed.team.id == service.team.id
+    assert [s['step'] for s in resumed.steps] == ['assign_team_to_project', 'write_synapse_log_file']
+
+
+def test_it_executes_async(fake_synapse, set_basic_config):
+    set_basic_config([{'id': '1', 'name': 'Config 01'}])
+
+    service = CreateBasicSpaceService('1', 'Async Project', 'user@test.com', team_name='Async Team')
+    assert asyncio.run(service.execute_async()) == service
+    assert not service.errors
+    assert service.checkpoint.completed_steps == ['create_project', 'set_storage_location', 'create_team',
+                                                  'assign_team_to_project']
+    assert int(service.team.id) in [ra['principalId'] for ra in fake_synapse.acls[service.project.id]['resourceAccess']]
+
+
 ###############################################################################
 # Validations
 ###############################################################################
 
 def test_validations_validate_project_name(syn_test_helper):
     existing_project = syn_test_helper.create_project()
+    syn_test_helper.wait_for_project(existing_project.name)
     error = CreateBasicSpaceService.Validations.validate_project_name(existing_project.name)
     assert error == 'Project with name: "{0}" already exists.'.format(existing_project.name)
 
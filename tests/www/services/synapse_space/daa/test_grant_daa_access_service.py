@@ -1,10 +1,11 @@
 import pytest
-import time
+import asyncio
 import json
 from datetime import date, timedelta
 from www.core import Synapse, Env
 from www.services.synapse_space.daa import GrantDaaAccessService
 import synapseclient as syn
+from tests.fake_synapse import FakeSynapseServer
 
 
 @pytest.fixture
@@ -106,7 +107,7 @@ def test_it_does_not_create_duplicate_teams(mk_service, assert_basic_service_err
 
 def test_it_assigns_the_team_to_the_synapse_entities_with_can_download_access(mk_service,
                                                                               assert_basic_service_success,
-                                                                              syn_client):
+                                                                              syn_test_helper):
     service = mk_service(with_data_collection=True)
     assert service.execute() == service
     assert_basic_service_success(service)
@@ -114,7 +115,7 @@ def test_it_assigns_the_team_to_the_synapse_entities_with_can_download_access(mk
     assert service.data_collection is not None
 
     for syn_id in [c['id'] for c in service.data_collection['entities']]:
-        syn_perms = syn_client.getPermissions(syn_id, principalId=service.team.id)
+        syn_perms = syn_test_helper.wait_for_permissions(syn_id, service.team.id)
         assert syn_perms
         syn_perms.sort() == Synapse.CAN_DOWNLOAD_PERMS.sort()
 
@@ -294,25 +295,71 @@ def test_it_fails_if_the_access_agreement_table_does_not_have_the_required_colum
     assert 'Column: Organization does not exist in table' in service.errors[0]
 
 
+def test_it_resumes_from_the_first_step_that_did_not_complete(fake_synapse, set_daa_config):
+    entity = fake_synapse.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Data', fake_synapse.admin_project['id'])
+    table = fake_synapse.seed_table(fake_synapse.admin_project['id'], [
+        'Organization', 'Contact', 'Synapse_Team_ID', 'Granted_Entity_IDs', 'Agreement_Link', 'Start_Date', 'End_Date',
+        'Comments'
+    ])
+    set_daa_config([{
+        'id': '1',
+        'name': 'Config 01',
+        'agreement_table_id': table['id'],
+        'data_collections': [{'name': 'Collection 1', 'entities': [{'id': entity['id'], 'name': 'Data'}]}]
+    }])
+
+    fake_synapse.errors = {'table': 400}
+    service = GrantDaaAccessService('1', 'Resumed Team', 'Institution', 'INST', 'Collection 1', 'user@test.com')
+    service.execute()
+    assert len(service.errors) == 1
+    assert 'update_access_agreement_table' not in service.checkpoint.completed_steps
+
+    fake_synapse.errors = {}
+    resumed = GrantDaaAccessService.resume(service.operation_id)
+    assert not resumed.errors
+    assert resumed.team.id == service.team.id
+    assert resumed.data_collection['name'] == 'Collection 1'
+    assert [s['step'] for s in resumed.steps] == ['update_access_agreement_table', 'write_synapse_log_file']
+
+
+def test_it_executes_async(fake_synapse, set_daa_config):
+    entities = [fake_synapse.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Data {0}'.format(i),
+                                         fake_synapse.admin_project['id']) for i in range(3)]
+    set_daa_config([{
+        'id': '1',
+        'name': 'Config 01',
+        'team_manager_user_ids': ['111', '222'],
+        'data_collections': [{'name': 'Collection 1', 'entities': [{'id': e['id'], 'name': e['name']}
+                                                                   for e in entities]}]
+    }])
+
+    service = GrantDaaAccessService('1', 'Async Team', 'Institution', 'INST', 'Collection 1', 'user@test.com',
+                                    emails=['a@test.com', 'b@test.com'])
+    assert asyncio.run(service.execute_async()) == service
+    assert not service.errors
+    assert [s['step'] for s in service.steps] == ['create_team', 'grant_team_access', 'add_team_managers',
+                                                  'invite_emails_to_team', 'update_access_agreement_table',
+                                                  'write_synapse_log_file']
+    assert service.data_collection['name'] == 'Collection 1'
+
+    team_id = service.team.id
+    for entity in entities:
+        assert {'principalId': int(team_id), 'accessType': Synapse.CAN_DOWNLOAD_PERMS} in \
+               fake_synapse.acls[entity['id']]['resourceAccess']
+    assert sorted(i.get('inviteeId') or i.get('inviteeEmail') for i in fake_synapse.invitations) == \
+           ['111', '222', 'a@test.com', 'b@test.com']
+    managers = [ra['principalId'] for ra in fake_synapse.team_acls[team_id]['resourceAccess']
+                if ra['accessType'] == Synapse.TEAM_MANAGER_PERMS]
+    assert sorted(managers) == [111, 222]
+
+
 ###############################################################################
 # Validations
 ###############################################################################
 
-def test_validations_validate_team_name(syn_test_helper, syn_client):
+def test_validations_validate_team_name(syn_test_helper):
+    # Waits for the team to be available from Synapse.
     existing_team = syn_test_helper.create_team(prefix='Team ')
 
-    # Wait for the team to be available from Synapse before checking.
-    tries = 0
-    while True:
-        tries += 1
-        try:
-            syn_client.getTeam(existing_team.name)
-            break
-        except ValueError:
-            if tries >= 10:
-                break
-            else:
-                time.sleep(3)
-
     error = GrantDaaAccessService.Validations.validate_team_name(existing_team.name)
     assert error == 'Team with name: "{0}" already exists.'.format(existing_team.name)
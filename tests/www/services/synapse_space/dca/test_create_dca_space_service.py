@@ -1,9 +1,14 @@
 import pytest
 import json
+import asyncio
 from datetime import date, timedelta
 from www.core import Synapse, Env
 from www.services.synapse_space.dca import CreateDcaSpaceService
+from www.core.deadline import Deadline
+from www.core.checkpoint import CheckpointStore
+from www.core.continuation import Continuation
 import synapseclient as syn
+from tests.fake_synapse import FakeSynapseServer
 
 
 @pytest.fixture
@@ -125,12 +130,12 @@ def test_it_creates_the_team(mk_service, assert_basic_service_success):
     assert service.team.name == 'KiContributor_{0}'.format(service.project.name)
 
 
-def test_it_assigns_the_team_to_the_project(mk_service, assert_basic_service_success, syn_client):
+def test_it_assigns_the_team_to_the_project(mk_service, assert_basic_service_success, syn_test_helper):
     service = mk_service()
     assert service.execute() == service
     assert_basic_service_success(service)
 
-    syn_perms = syn_client.getPermissions(service.project, principalId=service.team.id)
+    syn_perms = syn_test_helper.wait_for_permissions(service.project, service.team.id)
     assert syn_perms
     syn_perms.sort() == Synapse.CAN_EDIT_AND_DELETE_PERMS.sort()
 
@@ -197,7 +202,7 @@ def test_it_grants_the_project_team_access_to_other_entities(mk_service,
     assert_basic_service_success(service)
 
     for item in perms_config:
-        syn_perms = syn_client.getPermissions(item['id'], principalId=service.team.id)
+        syn_perms = syn_test_helper.wait_for_permissions(item['id'], service.team.id)
         assert syn_perms
         syn_perms.sort() == Synapse.get_perms_by_code(item['permission']).sort()
 
@@ -222,7 +227,7 @@ def test_it_grants_principals_access_to_the_project(mk_service,
     assert_basic_service_success(service)
 
     for item in perms_config:
-        syn_perms = syn_client.getPermissions(service.project, principalId=item['id'])
+        syn_perms = syn_test_helper.wait_for_permissions(service.project, item['id'])
         assert syn_perms
         syn_perms.sort() == Synapse.get_perms_by_code(item['permission']).sort()
 
@@ -329,6 +334,14 @@ def test_it_writes_the_log_file_on_success(mk_service,
     assert jteam['id'] == service.team.id
     assert jteam['name'] == service.team.name
 
+    jsteps = jdata['steps']
+    assert jsteps
+    assert jsteps[0]['step'] == 'create_project'
+    for jstep in jsteps:
+        assert jstep['outcome'] in ['success', 'warning']
+        assert jstep['duration_ms'] >= 0
+        assert jstep['synapse_calls'] >= 0
+
 
 def test_it_writes_the_log_file_on_failure(mk_service,
                                            syn_test_helper,
@@ -445,11 +458,189 @@ def test_it_updates_the_scope_on_the_contributor_tracking_view(mk_service,
     assert service2.project.id.replace('syn', '') in view.properties.scopeIds
 
 
+def test_it_resumes_from_the_first_step_that_did_not_complete(fake_synapse, set_dca_config):
+    wiki_project = fake_synapse.seed_project()
+    fake_synapse.seed_wiki(wiki_project['id'], 'Wiki', '# Wiki')
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'wiki_project_id': wiki_project['id'], 'folder_names': ['A']}])
+
+    fake_synapse.errors = {'wiki': 400}
+    service = CreateDcaSpaceService('1', 'Resumed Project', 'Institution', 'INST', 'user@test.com')
+    service.execute()
+    assert len(service.errors) == 1
+    assert 'Error creating wiki' in service.errors[0]
+    assert 'create_project' in service.checkpoint.completed_steps
+    assert 'create_wiki' not in service.checkpoint.completed_steps
+
+    fake_synapse.errors = {}
+    fake_synapse.reset_calls()
+    resumed = CreateDcaSpaceService.resume(service.operation_id)
+    assert not resumed.errors
+    assert resumed.project.id == service.project.id
+    assert resumed.team.id == service.team.id
+    assert [s['step'] for s in resumed.steps] == ['create_wiki', 'write_synapse_log_file']
+    assert not any(c['method'] == 'POST' and c['path'] == '/team' for c in fake_synapse.calls)
+    assert len([e for e in fake_synapse.entities.values() if e['name'] == 'Resumed Project']) == 1
+
+    # The checkpoint is deleted once the operation succeeds.
+    with pytest.raises(Exception) as ex:
+        CreateDcaSpaceService.resume(service.operation_id)
+    assert 'checkpoint not found' in str(ex.value)
+
+
+def test_it_does_not_update_the_agreement_table_until_the_team_is_created(fake_synapse, set_dca_config):
+    table = fake_synapse.seed_table(fake_synapse.admin_project['id'], [
+        'Organization', 'Contact', 'Synapse_Project_ID', 'Synapse_Team_ID', 'Agreement_Link', 'Start_Date',
+        'End_Date', 'Comments'
+    ])
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'contribution_agreement_table_id': table['id']}])
+
+    fake_synapse.errors = {'team': 400}
+    service = CreateDcaSpaceService('1', 'Team Failed Project', 'Institution', 'INST', 'user@test.com')
+    service.execute()
+    assert 'Error creating team' in service.errors[0]
+    assert service.resumable
+    assert 'update_contribution_agreement_table' not in service.checkpoint.completed_steps
+    assert 'update_contribution_agreement_table' not in [s['step'] for s in service.steps]
+
+    fake_synapse.errors = {}
+    resumed = CreateDcaSpaceService.resume(service.operation_id)
+    assert not resumed.errors
+    assert [s['step'] for s in resumed.steps][:2] == ['create_team', 'assign_team_to_project']
+    assert 'update_contribution_agreement_table' in [s['step'] for s in resumed.steps]
+
+
+def test_it_is_not_resumable_when_no_step_completed(fake_synapse, set_dca_config):
+    set_dca_config([{'id': '1', 'name': 'Config 01'}])
+
+    fake_synapse.errors = {'entity': 400}
+    service = CreateDcaSpaceService('1', 'Failed Project', 'Institution', 'INST', 'user@test.com')
+    service.execute()
+    assert service.errors
+    assert not service.resumable
+
+
+def test_it_defers_the_steps_that_cannot_finish_before_the_deadline(fake_synapse, set_dca_config, monkeypatch):
+    wiki_project = fake_synapse.seed_project()
+    fake_synapse.seed_wiki(wiki_project['id'], 'Wiki', '# Wiki')
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'wiki_project_id': wiki_project['id'], 'folder_names': ['A']}])
+
+    continued = []
+    monkeypatch.setattr(Continuation, 'start', classmethod(lambda cls, checkpoint: continued.append(checkpoint)))
+    monkeypatch.setitem(CreateDcaSpaceService.STEP_SECONDS, 'create_wiki', 60)
+
+    service = CreateDcaSpaceService('1', 'Deferred Project', 'Institution', 'INST', 'user@test.com',
+                                    deadline=Deadline(30))
+    service.execute()
+    assert not service.errors
+    assert service.deferred_steps == ['create_wiki', 'update_contribution_agreement_table',
+                                      'update_contributor_tracking_scope']
+    assert continued == [service.checkpoint]
+    # The log file is written when the continuation finishes.
+    assert 'write_synapse_log_file' not in [s['step'] for s in service.steps]
+
+    CheckpointStore.save(service.checkpoint)
+    resumed = Continuation.run('CreateDcaSpaceService', service.operation_id)
+    assert not resumed.errors
+    assert resumed.project.id == service.project.id
+    assert [s['step'] for s in resumed.steps] == service.deferred_steps + ['write_synapse_log_file']
+
+
+def test_it_does_not_defer_steps_when_they_cannot_be_continued(fake_synapse, set_dca_config, monkeypatch):
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'folder_names': ['A']}])
+    # On Lambda without a checkpoint folder the continuation could not load the checkpoint.
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'sls-ki-synapse-admin-test-www')
+    monkeypatch.setitem(CreateDcaSpaceService.STEP_SECONDS, 'create_folders', 60)
+
+    service = CreateDcaSpaceService('1', 'Inline Project', 'Institution', 'INST', 'user@test.com',
+                                    deadline=Deadline(30))
+    service.execute()
+    assert not service.errors
+    assert service.deferred_steps == []
+    assert 'create_folders' in service.checkpoint.completed_steps
+
+
+def test_it_executes_async(fake_synapse, set_dca_config):
+    entities = [fake_synapse.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Data {0}'.format(i),
+                                         fake_synapse.admin_project['id']) for i in range(2)]
+    set_dca_config([{
+        'id': '1',
+        'name': 'Config 01',
+        'team_manager_user_ids': ['111', '222'],
+        'team_entity_access': [{'id': e['id'], 'permission': 'CAN_DOWNLOAD'} for e in entities],
+        'project_access': [{'id': '333', 'permission': 'CAN_VIEW'}, {'id': '444', 'permission': 'ADMIN'}],
+        'folder_names': ['A/B', 'A/C', 'D']
+    }])
+
+    service = CreateDcaSpaceService('1', 'Async Project', 'Institution', 'INST', 'user@test.com',
+                                    emails=['a@test.com', 'b@test.com'])
+    sync_service = CreateDcaSpaceService('1', 'Sync Project', 'Institution', 'INST', 'user@test.com',
+                                         emails=['a@test.com', 'b@test.com'])
+    assert asyncio.run(service.execute_async()) == service
+    sync_service.execute()
+    assert not service.errors
+    assert [s['step'] for s in service.steps] == [s['step'] for s in sync_service.steps]
+
+    team_id = service.team.id
+    invitations = [i for i in fake_synapse.invitations if i['teamId'] == team_id]
+    assert sorted(i.get('inviteeId') or i.get('inviteeEmail') for i in invitations) == \
+           ['111', '222', 'a@test.com', 'b@test.com']
+    managers = [ra['principalId'] for ra in fake_synapse.team_acls[team_id]['resourceAccess']
+                if ra['accessType'] == Synapse.TEAM_MANAGER_PERMS]
+    assert sorted(managers) == [111, 222]
+
+    for entity in entities:
+        assert int(team_id) in [ra['principalId'] for ra in fake_synapse.acls[entity['id']]['resourceAccess']]
+    project_principals = [ra['principalId'] for ra in fake_synapse.acls[service.project.id]['resourceAccess']]
+    assert {int(team_id), 333, 444} <= set(project_principals)
+
+    def _children(parent_id):
+        return {e['name']: e['id'] for e in fake_synapse.entities.values() if e.get('parentId') == parent_id}
+
+    project_folders = _children(service.project.id)
+    assert sorted(project_folders) == ['A', 'D']
+    assert sorted(_children(project_folders['A'])) == ['B', 'C']
+
+
+def test_execute_runs_the_async_steps_when_enabled(fake_synapse, set_dca_config, monkeypatch):
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'team_manager_user_ids': ['111'], 'folder_names': ['A']}])
+    monkeypatch.setenv('SYNAPSE_ASYNC_STEPS', 'true')
+    for step in ['_add_team_managers', '_invite_emails_to_team', '_create_folders']:
+        monkeypatch.setattr(CreateDcaSpaceService, step, lambda self: pytest.fail('The sync step was run.'))
+
+    service = CreateDcaSpaceService('1', 'Async Project', 'Institution', 'INST', 'user@test.com',
+                                    emails=['a@test.com'])
+    assert service.execute() == service
+    assert not service.errors
+    assert {'add_team_managers', 'invite_emails_to_team', 'create_folders'} <= \
+           set(service.checkpoint.completed_steps)
+    assert sorted(i.get('inviteeId') or i.get('inviteeEmail') for i in fake_synapse.invitations
+                  if i['teamId'] == service.team.id) == ['111', 'a@test.com']
+
+
+def test_it_resumes_an_async_operation(fake_synapse, set_dca_config):
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'folder_names': ['A']}])
+
+    fake_synapse.errors = {'membershipInvitation': 400}
+    service = CreateDcaSpaceService('1', 'Resumed Async Project', 'Institution', 'INST', 'user@test.com',
+                                    emails=['a@test.com'])
+    asyncio.run(service.execute_async())
+    assert 'Error inviting emails to team' in service.errors[0]
+    assert 'invite_emails_to_team' not in service.checkpoint.completed_steps
+    assert 'create_folders' in service.checkpoint.completed_steps
+
+    # The async steps complete the same steps as the sync steps, so the operation can be resumed either way.
+    fake_synapse.errors = {}
+    resumed = CreateDcaSpaceService.resume(service.operation_id)
+    assert not resumed.errors
+    assert [s['step'] for s in resumed.steps] == ['invite_emails_to_team', 'write_synapse_log_file']
+
+
 ###############################################################################
 # Validations
 ###############################################################################
 
 def test_validations_validate_project_name(syn_test_helper):
     existing_project = syn_test_helper.create_project()
+    syn_test_helper.wait_for_project(existing_project.name)
     error = CreateDcaSpaceService.Validations.validate_project_name(existing_project.name)
     assert error == 'Project with name: "{0}" already exists.'.format(existing_project.name)
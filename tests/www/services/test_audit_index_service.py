@@ -0,0 +1,161 @@
+import pytest
+import os
+import json
+import time
+import synapseclient as syn
+from www.services import AuditIndexService
+
+
+@pytest.fixture(autouse=True)
+def clear_index():
+    AuditIndexService.clear()
+    yield
+    AuditIndexService.clear()
+
+
+@pytest.fixture
+def log_folder(syn_test_helper, syn_client, monkeypatch):
+    project = syn_test_helper.create_project()
+    folder = syn_client.store(syn.Folder(name='Synapse Admin Log', parent=project))
+    monkeypatch.setenv('SYNAPSE_SPACE_LOG_FOLDER_ID', folder.id)
+    return folder
+
+
+@pytest.fixture
+def write_log_file(syn_client, log_folder, tmpdir):
+    def _write(file_name, data):
+        path = os.path.join(str(tmpdir), file_name)
+        with open(path, 'w') as f:
+            f.write(json.dumps(data))
+        return syn_client.store(syn.File(path, parent=log_folder))
+
+    yield _write
+
+
+def mk_log_data(institution_name, project_name=None, team_name=None):
+    return {
+        'parameters': {'user': 'test@test.com', 'institution_name': institution_name},
+        'project': {'id': 'syn1', 'name': project_name} if project_name else None,
+        'team': {'id': '1', 'name': team_name} if team_name else None,
+        'warnings': [],
+        'errors': []
+    }
+
+
+def test_it_indexes_the_log_files(write_log_file, monkeypatch):
+    write_log_file('20200101_010101_000001_dca_create_space.json', mk_log_data('Inst A', project_name='A_Smith'))
+    write_log_file('20200102_010101_000001_daa_grant_access.json', mk_log_data('Inst B', team_name='KiAccess_B'))
+    write_log_file('not_a_log_file.json', mk_log_data('Inst C'))
+
+    entries = AuditIndexService.entries()
+    assert len(entries) == 2
+    # Newest first.
+    assert entries[0]['operation'] == 'daa'
+    assert entries[0]['team_name'] == 'KiAccess_B'
+    assert entries[1]['operation'] == 'dca'
+    assert entries[1]['project_name'] == 'A_Smith'
+
+
+def test_it_updates_the_index_incrementally(write_log_file, syn_client, mocker):
+    write_log_file('20200101_010101_000001_dca_create_space.json', mk_log_data('Inst A'))
+    assert len(AuditIndexService.entries()) == 1
+
+    write_log_file('20200102_010101_000001_dca_create_space.json', mk_log_data('Inst B'))
+    AuditIndexService._last_refresh = None
+
+    spy = mocker.spy(syn_client, 'get')
+    assert len(AuditIndexService.entries()) == 2
+    # Only the new log file is downloaded.
+    assert spy.call_count == 1
+
+
+def test_it_loads_the_index_from_disk(write_log_file, syn_client, mocker):
+    write_log_file('20200101_010101_000001_dca_create_space.json', mk_log_data('Inst A'))
+    assert len(AuditIndexService.entries()) == 1
+
+    # Simulate a new container.
+    AuditIndexService._index = None
+    AuditIndexService._last_refresh = None
+
+    spy = mocker.spy(syn_client, 'get')
+    assert len(AuditIndexService.entries()) == 1
+    assert spy.call_count == 0
+
+
+def test_query(fake_synapse, monkeypatch):
+    monkeypatch.setenv('SYNAPSE_SPACE_LOG_FOLDER_ID', 'syn000')
+    AuditIndexService._load('syn000')
+    for i in range(1, 31):
+        file_name = '202001{0:02d}_010101_000001_{1}'.format(i, 'dca_create_space.json' if i % 2 else
+                                                             'daa_grant_access.json')
+        entry = AuditIndexService._build_entry('syn{0}'.format(i), file_name, mk_log_data('Institution {0}'.format(i)))
+        AuditIndexService._index['entries'][entry['id']] = entry
+    AuditIndexService._sort()
+    # Skip checking Synapse for new log files.
+    AuditIndexService._last_refresh = time.time()
+
+    entries = AuditIndexService.entries(refresh=False)
+    assert len(entries) == 30
+
+    results, total = AuditIndexService.query(search='INSTITUTION 30')
+    assert total == 1
+    assert results[0]['institution_name'] == 'Institution 30'
+
+    results, total = AuditIndexService.query(operation='dca', per_page=10)
+    assert total == 15
+    assert len(results) == 10
+    assert all(e['operation'] == 'dca' for e in results)
+
+    results, total = AuditIndexService.query(operation='dca', page=2, per_page=10)
+    assert total == 15
+    assert len(results) == 5
+
+
+@pytest.fixture
+def seed_log_files(fake_synapse):
+    def _seed(count, start=1):
+        for i in range(start, start + count):
+            file_name = '202001{0:02d}_010101_000001_dca_create_space.json'.format(i)
+            content = json.dumps(mk_log_data('Institution {0}'.format(i))).encode('utf-8')
+            fake_synapse.seed_file(fake_synapse.log_folder['id'], file_name, content)
+
+    yield _seed
+
+
+def test_it_limits_the_log_files_downloaded_per_refresh(seed_log_files, monkeypatch):
+    monkeypatch.setattr(AuditIndexService, 'MAX_FILES_PER_REFRESH', 3)
+    seed_log_files(5)
+
+    assert len(AuditIndexService.entries()) == 3
+    # The next request continues adding the log files without waiting for the refresh interval.
+    assert AuditIndexService._last_refresh is None
+    assert len(AuditIndexService.entries()) == 5
+    assert AuditIndexService._last_refresh is not None
+
+
+def test_it_saves_the_index_while_adding_log_files(seed_log_files, fake_synapse, monkeypatch):
+    monkeypatch.setattr(AuditIndexService, 'SAVE_EVERY', 2)
+    saves = []
+    monkeypatch.setattr(AuditIndexService, '_save', classmethod(lambda cls, folder_id: saves.append(
+        len(cls._index['entries']))))
+    seed_log_files(5)
+
+    AuditIndexService.entries()
+    assert saves == [2, 4, 5]
+
+
+def test_it_shares_the_index_through_the_log_folder(seed_log_files, fake_synapse):
+    seed_log_files(2)
+    assert len(AuditIndexService.entries()) == 2
+    assert any(e['name'] == AuditIndexService.SHARED_INDEX_FILE_NAME for e in fake_synapse.entities.values())
+
+
+def test_it_loads_the_shared_index(seed_log_files, fake_synapse):
+    entry = AuditIndexService._build_entry('syn1', '20200101_010101_000001_dca_create_space.json',
+                                           mk_log_data('Shared Inst'))
+    fake_synapse.seed_file(fake_synapse.log_folder['id'], AuditIndexService.SHARED_INDEX_FILE_NAME,
+                           json.dumps({'syn1': entry}).encode('utf-8'))
+
+    entries = AuditIndexService.entries(refresh=False)
+    assert [e['institution_name'] for e in entries] == ['Shared Inst']
+    assert os.path.isfile(AuditIndexService._index_path(fake_synapse.log_folder['id']))
@@ -36,6 +36,9 @@ def google_userinfo_url():
 @pytest.fixture
 def mk_stub_google_endpoints(request_base_url, google_provider_config_url, google_token_url, google_userinfo_url,
                              mk_uniq_real_email, mocker, monkeypatch):
+    # Don't use the provider config cached by other tests.
+    monkeypatch.setattr(AuthService, '_google_provider_config', None)
+
     def _mk(res_mock,
             with_all=False,
             with_provider_config=False,
@@ -141,6 +144,20 @@ def test_callback_raises_login_failure_error(mk_stub_google_endpoints, call_hand
             call_handle_callback_and_login()
 
 
+def test_get_google_provider_config_is_cached(monkeypatch):
+    monkeypatch.setattr(AuthService, '_google_provider_config', None)
+
+    with responses.RequestsMock() as res_mock:
+        res_mock.add(responses.GET, Env.GOOGLE_DISCOVERY_URL(), status=200, body=json.dumps({'issuer': 'a'}))
+        assert AuthService.get_google_provider_config() == {'issuer': 'a'}
+        assert AuthService.get_google_provider_config() == {'issuer': 'a'}
+        assert len(res_mock.calls) == 1
+
+        monkeypatch.setattr(AuthService, '_google_provider_config_expires', 0)
+        assert AuthService.get_google_provider_config() == {'issuer': 'a'}
+        assert len(res_mock.calls) == 2
+
+
 def test_user_allowed_login(monkeypatch):
     emails = ['user1@test.com', 'user2@test.com', 'user3@test.com']
 
@@ -1,4 +1,5 @@
 import pytest
+import asyncio
 from www.core import Env
 from www.services import EncryptSpaceService
 
@@ -33,6 +34,30 @@ def test_execute_errors(syn_client, fake_synapse_id, mocker):
         assert 'Error setting storage location:' in errors[0]
 
 
+def test_execute_async(fake_synapse):
+    project = fake_synapse.seed_project()
+    service = EncryptSpaceService(project['id'])
+
+    assert asyncio.run(service.execute_async()) == service
+    assert not service.errors
+    assert [s['step'] for s in service.steps] == ['set_storage_location']
+    assert fake_synapse.project_settings[(project['id'], 'upload')]['locations'] == \
+           [Env.SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID()]
+
+
+def test_execute_runs_async_when_enabled(fake_synapse, monkeypatch):
+    project = fake_synapse.seed_project()
+    service = EncryptSpaceService(project['id'])
+    monkeypatch.setenv('SYNAPSE_ASYNC_STEPS', 'true')
+    monkeypatch.setattr(service, '_set_storage_location', lambda: pytest.fail('The sync step was run.'))
+
+    assert service.execute() == service
+    assert not service.errors
+    assert [s['step'] for s in service.steps] == ['set_storage_location']
+    assert fake_synapse.project_settings[(project['id'], 'upload')]['locations'] == \
+           [Env.SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID()]
+
+
 ###############################################################################
 # Validations
 ###############################################################################
@@ -0,0 +1,152 @@
+import pytest
+import os
+import json
+from datetime import date, timedelta
+from www.server import app
+from www.services.synapse_space.dca import CreateDcaSpaceService
+from www.services.synapse_space.basic import CreateBasicSpaceService
+from www.services.synapse_space.daa import GrantDaaAccessService
+from www.services.synapse_space.encrypt_space_service import EncryptSpaceService
+from tests.fake_synapse import FakeSynapseServer
+
+# The maximum number of Synapse REST calls each service may make when executed with its template config.
+# Lower these when a change removes calls. Only raise them when the extra calls are intended.
+DCA_CREATE_BUDGET = 54
+BASIC_CREATE_BUDGET = 19
+DAA_GRANT_BUDGET = 21
+ENCRYPT_BUDGET = 2
+
+TABLE_COLUMNS = [
+    'Organization',
+    'Contact',
+    'Synapse_Project_ID',
+    'Synapse_Team_ID',
+    'Granted_Entity_IDs',
+    'Agreement_Link',
+    'Start_Date',
+    'End_Date',
+    'Comments'
+]
+
+
+def load_template_config(filename, server):
+    """Loads a config from the templates directory and fills it with entities seeded on the fake Synapse server.
+
+    The number of items in each list is kept so the budget follows the template.
+    """
+    with open(os.path.join(app.root_path, '..', 'templates', filename), mode='r') as f:
+        config = json.load(f)[0]
+
+    def _fill(key, value):
+        if isinstance(value, dict):
+            return {k: _fill(k, v) for k, v in value.items()}
+        elif isinstance(value, list):
+            return [_fill(key, v) for v in value]
+        elif key.endswith('table_id'):
+            return server.seed_table(server.admin_project['id'], TABLE_COLUMNS)['id']
+        elif key.endswith('view_id'):
+            return server.seed_view(server.admin_project['id'])['id']
+        elif key == 'wiki_project_id':
+            project = server.seed_project()
+            server.seed_wiki(project['id'], 'Wiki', '# Wiki')
+            return project['id']
+        elif value == 'syn000' or (key == 'id' and value == ''):
+            return server.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Entity', server.admin_project['id'])['id']
+        elif value == 0:
+            return 1
+        elif key == 'permission':
+            return 'CAN_VIEW'
+        elif value == '':
+            return 'Value'
+        return value
+
+    config = _fill('', config)
+    config['id'] = '1'
+    server.reset_calls()
+    return config
+
+
+@pytest.fixture(params=[False, True], ids=['local_checkpoints', 'synapse_checkpoints'])
+def checkpoint_folder(request, fake_synapse, monkeypatch):
+    """Runs the budget with and without the checkpoints being saved to Synapse."""
+    if request.param:
+        folder = fake_synapse.seed_entity(FakeSynapseServer.FOLDER_TYPE, 'Checkpoints', fake_synapse.admin_project['id'])
+        monkeypatch.setenv('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID', folder['id'])
+
+
+@pytest.mark.usefixtures('checkpoint_folder')
+def test_dca_create_space_budget(fake_synapse, set_dca_config, call_budget):
+    config = load_template_config('private.dca.create.space.json', fake_synapse)
+    set_dca_config([config])
+
+    service = CreateDcaSpaceService(config['id'], 'Project', 'Institution', 'INST', 'user@test.com',
+                                    agreement_url='https://test.com/doc.pdf',
+                                    emails=['user@test.com'],
+                                    start_date=date.today(),
+                                    end_date=date.today() + timedelta(days=30))
+
+    with call_budget(DCA_CREATE_BUDGET, 'DCA create'):
+        service.execute()
+    assert not service.errors
+
+
+@pytest.mark.usefixtures('checkpoint_folder')
+def test_basic_create_space_budget(fake_synapse, set_basic_config, call_budget):
+    config = load_template_config('private.basic.create.space.json', fake_synapse)
+    set_basic_config([config])
+
+    service = CreateBasicSpaceService(config['id'], 'Project', 'user@test.com', team_name='Team')
+
+    with call_budget(BASIC_CREATE_BUDGET, 'Basic create'):
+        service.execute()
+    assert not service.errors
+
+
+@pytest.mark.usefixtures('checkpoint_folder')
+def test_daa_grant_access_budget(fake_synapse, set_daa_config, call_budget):
+    config = load_template_config('private.daa.grant.access.json', fake_synapse)
+    set_daa_config([config])
+
+    service = GrantDaaAccessService(config['id'], 'Team', 'Institution', 'INST',
+                                    config['data_collections'][0]['name'], 'user@test.com',
+                                    agreement_url='https://test.com/doc.pdf',
+                                    emails=['user@test.com'],
+                                    start_date=date.today(),
+                                    end_date=date.today() + timedelta(days=30))
+
+    with call_budget(DAA_GRANT_BUDGET, 'DAA grant'):
+        service.execute()
+    assert not service.errors
+
+
+def test_encrypt_space_budget(fake_synapse, call_budget):
+    project = fake_synapse.seed_project()
+
+    service = EncryptSpaceService(project['id'])
+
+    with call_budget(ENCRYPT_BUDGET, 'Encrypt'):
+        service.execute()
+    assert not service.errors
+
+
+def test_it_reports_the_calls_when_over_budget(fake_synapse, call_budget):
+    project = fake_synapse.seed_project()
+
+    with pytest.raises(AssertionError) as ex:
+        with call_budget(1, 'Encrypt'):
+            EncryptSpaceService(project['id']).execute()
+
+    assert 'Synapse call budget exceeded for Encrypt: 2 calls (budget: 1)' in str(ex.value)
+    assert 'GET /projectSettings/{id}/type/upload: 1' in str(ex.value)
+
+
+def test_synapse_calls_records_method_path_and_latency(fake_synapse, synapse_calls):
+    fake_synapse.latency = {'projectSettings': 0.01}
+    project = fake_synapse.seed_project()
+
+    EncryptSpaceService(project['id']).execute()
+
+    assert synapse_calls.count() == 2
+    assert synapse_calls.count(method='GET', path='^/projectSettings') == 1
+    assert synapse_calls.count(method='POST', path='^/projectSettings') == 1
+    assert all(c['latency'] >= 0.01 for c in synapse_calls.calls)
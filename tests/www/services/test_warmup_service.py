@@ -0,0 +1,76 @@
+import json
+import time
+import threading
+import pytest
+from sls_tools.param_store import ParamStore
+from www.core import Synapse
+from www.services import AuthService
+from www.services.warmup_service import WarmupService
+
+
+@pytest.fixture
+def warmup(fake_synapse, monkeypatch):
+    table = fake_synapse.seed_table(fake_synapse.admin_project['id'], ['name', 'email'])
+    monkeypatch.setenv('SYNAPSE_SPACE_DCA_CREATE_CONFIG',
+                       json.dumps([{'contribution_agreement_table_id': table['id']}]))
+    monkeypatch.setenv('SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG', json.dumps([{'agreement_table_id': table['id']}]))
+    monkeypatch.setattr(AuthService, 'get_google_provider_config', classmethod(lambda cls: {}))
+    monkeypatch.setattr(Synapse, 'TABLE_COL_CACHE', {})
+    ssm_clients = []
+    monkeypatch.setattr(ParamStore, '_get_ssm_client', classmethod(
+        lambda cls: ssm_clients.append(threading.current_thread())))
+    table['ssm_clients'] = ssm_clients
+    WarmupService.reset()
+    yield table
+    WarmupService.reset()
+
+
+def test_it_runs_each_task_and_reports_how_long_it_took(warmup):
+    service = WarmupService().execute()
+
+    assert service.errors == []
+    assert service.already_warm is False
+    assert set(service.tasks) == {'create_ssm_client', 'read_ssm', 'login_synapse', 'load_table_columns',
+                                  'load_google_provider_config', 'compile_templates'}
+    for task in service.tasks.values():
+        assert task['outcome'] == 'success'
+        assert task['duration_ms'] >= 0
+    assert Synapse.TABLE_COL_CACHE[warmup['id']] == ['name', 'email']
+    # The SSM client is created once, before the tasks run in parallel.
+    assert warmup['ssm_clients'] == [threading.current_thread()]
+
+
+def test_it_does_nothing_when_already_warm(warmup, synapse_calls):
+    WarmupService().execute()
+    calls = len(synapse_calls.calls)
+
+    service = WarmupService().execute()
+    assert service.already_warm is True
+    assert service.tasks == {}
+    assert len(synapse_calls.calls) == calls
+
+
+def test_it_reports_errors_and_stays_cold(warmup, monkeypatch):
+    def _fail(cls):
+        raise Exception('Discovery failed')
+
+    monkeypatch.setattr(AuthService, 'get_google_provider_config', classmethod(_fail))
+
+    service = WarmupService().execute()
+    assert service.errors == ['Error warming up load_google_provider_config: Discovery failed']
+    assert service.tasks['load_google_provider_config']['outcome'] == 'failed'
+    assert service.tasks['login_synapse']['outcome'] == 'success'
+
+    # The errors are logged, not returned to the caller.
+    assert 'errors' not in service.to_dict()
+    assert 'Discovery failed' not in json.dumps(service.to_dict())
+
+    # A failed warmup is not retried right away.
+    service = WarmupService().execute()
+    assert service.skipped is True
+    assert service.tasks == {}
+
+    monkeypatch.setattr(WarmupService, '_last_attempt', time.monotonic() - WarmupService.RETRY_SECONDS)
+    service = WarmupService().execute()
+    assert service.already_warm is False
+    assert service.tasks
@@ -1,5 +1,7 @@
 import pytest
 import json
+from www.core.deadline import Deadline
+from www.views.synapse_space.dca.forms import CreateDcaSynapseSpaceForm
 
 
 @pytest.fixture
@@ -23,3 +25,75 @@ def test_it_redirects_to_login(client, url_path):
 def test_it_loads_the_page(client, url_path):
     res = client.get(url_path, follow_redirects=True)
     assert res.status_code == 200
+
+
+def test_it_requires_a_csrf_token_to_resume(client, checkpoint_dir):
+    res = client.post('/synapse_space/dca/resume/unknown', base_url='https://localhost')
+    assert res.status_code == 200
+    assert b'Invalid request.' in res.data
+
+
+def test_it_shows_an_error_when_resuming_an_unknown_operation(client, test_app, checkpoint_dir, monkeypatch):
+    monkeypatch.setitem(test_app.config, 'WTF_CSRF_ENABLED', False)
+    res = client.post('/synapse_space/dca/resume/unknown', base_url='https://localhost')
+    assert res.status_code == 200
+    assert b'DCA Create Space checkpoint not found for operation: unknown' in res.data
+    # There is nothing to resume.
+    assert b'/synapse_space/dca/resume/unknown' not in res.data
+
+
+def test_it_validates_within_the_request_deadline(client, test_app, monkeypatch):
+    active = []
+
+    def _validate(form):
+        active.append(Deadline.current())
+        return False
+
+    monkeypatch.setitem(test_app.config, 'WTF_CSRF_ENABLED', False)
+    monkeypatch.setattr(CreateDcaSynapseSpaceForm, 'validate_on_submit', _validate)
+    res = client.post('/synapse_space/dca/create', base_url='https://localhost')
+    assert res.status_code == 200
+    assert len(active) == 1
+    assert active[0].seconds == Deadline.API_GATEWAY_TIMEOUT - Deadline.RESPONSE_SECONDS
+
+
+def test_it_gets_the_additional_parties_with_an_etag(client, set_dca_config):
+    parties = [{'code': 'A', 'name': 'Party A'}]
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'additional_parties': parties}])
+
+    res = client.get('/synapse_space/dca/create/additional_parties/1', base_url='https://localhost')
+    assert res.status_code == 200
+    assert json.loads(res.data) == parties
+    assert 'private' in res.headers['Cache-Control']
+    etag = res.headers['ETag']
+
+    res = client.get('/synapse_space/dca/create/additional_parties/1', base_url='https://localhost',
+                     headers={'If-None-Match': etag})
+    assert res.status_code == 304
+
+    # The ETag changes with the config.
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'additional_parties': []}])
+    res = client.get('/synapse_space/dca/create/additional_parties/1', base_url='https://localhost',
+                     headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert json.loads(res.data) == []
+
+
+def test_it_does_not_find_the_additional_parties_of_an_unknown_config(client, set_dca_config):
+    set_dca_config([{'id': '1', 'name': 'Config 01', 'additional_parties': []}])
+    res = client.get('/synapse_space/dca/create/additional_parties/2', base_url='https://localhost')
+    assert res.status_code == 404
+
+
+def test_it_shows_the_additional_parties_of_the_submitted_config(client, test_app, set_dca_config, monkeypatch):
+    set_dca_config([
+        {'id': '1', 'name': 'Config 01', 'additional_parties': [{'code': 'A', 'name': 'Party A'}]},
+        {'id': '2', 'name': 'Config 02', 'additional_parties': [{'code': 'B', 'name': 'Party B'}]}
+    ])
+    assert b'Party A' in client.get('/synapse_space/dca/create', base_url='https://localhost').data
+
+    monkeypatch.setitem(test_app.config, 'WTF_CSRF_ENABLED', False)
+    monkeypatch.setattr(CreateDcaSynapseSpaceForm, 'validate_on_submit', lambda form: False)
+    res = client.post('/synapse_space/dca/create', base_url='https://localhost', data={'field_select_config': '2'})
+    assert b'Party B' in res.data
+    assert b'Party A' not in res.data
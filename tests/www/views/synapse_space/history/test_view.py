@@ -0,0 +1,31 @@
+import pytest
+from www.views.synapse_space.history.views import _page_links
+
+
+@pytest.fixture
+def url_path():
+    return '/synapse_space/history'
+
+
+@pytest.mark.usefixtures("login_enabled")
+def test_it_redirects_to_login(client, url_path):
+    res = client.get(url_path)
+    assert res.status_code == 302
+    assert res.location.endswith('/synapse_space/history')
+
+
+def test_it_loads_the_page(client, url_path):
+    res = client.get(url_path, follow_redirects=True)
+    assert res.status_code == 200
+
+
+def test_it_loads_the_page_with_filters(client, url_path):
+    res = client.get(url_path + '?field_search=test&field_operation=dca&page=2', follow_redirects=True)
+    assert res.status_code == 200
+
+
+def test_it_links_to_a_window_of_pages():
+    assert _page_links(1, 1) == [1]
+    assert _page_links(1, 4) == [1, 2, 3, 4]
+    assert _page_links(10, 40) == [1, None, 8, 9, 10, 11, 12, None, 40]
+    assert _page_links(40, 40) == [1, None, 38, 39, 40]
@@ -0,0 +1,53 @@
+import pytest
+from www.core.config_cache import ConfigCache
+from www.views.synapse_space.choices import ConfigChoices
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    ConfigCache.clear()
+    yield
+    ConfigCache.clear()
+
+
+DCA_CONFIGS = [
+    {'id': '1', 'name': 'Config 01', 'additional_parties': [{'code': 'A', 'name': 'Party A'}]},
+    {'id': '2', 'name': 'Config 02', 'additional_parties': [{'code': 'B', 'name': 'Party B'}]}
+]
+
+
+def test_it_gets_the_dca_choices(set_dca_config):
+    set_dca_config(DCA_CONFIGS)
+    assert ConfigChoices.dca_configs() == [('1', 'Config 01'), ('2', 'Config 02')]
+    assert ConfigChoices.dca_additional_parties(None) == [('A', 'Party A')]
+    assert ConfigChoices.dca_additional_parties('2') == [('B', 'Party B')]
+    assert ConfigChoices.dca_additional_parties('3') == []
+
+
+def test_it_gets_the_daa_choices(set_daa_config):
+    set_daa_config([{
+        'id': '1',
+        'name': 'Config 01',
+        'additional_parties': [{'code': 'A', 'name': 'Party A'}],
+        'data_collections': [{'name': 'Collection 1', 'entities': [{'name': 'E1'}, {'name': 'E2'}]}]
+    }])
+    assert ConfigChoices.daa_additional_parties() == [('A', 'Party A')]
+    assert ConfigChoices.daa_data_collections() == [('Collection 1', 'Collection 1 - [E1, E2]')]
+
+
+def test_it_derives_the_choices_once_per_config_version(set_dca_config, monkeypatch):
+    set_dca_config(DCA_CONFIGS)
+    ConfigChoices.dca_configs()
+
+    calls = []
+    orig_parties = ConfigChoices._parties.__func__
+    monkeypatch.setattr(ConfigChoices, '_parties', classmethod(lambda cls, c: calls.append(1) or orig_parties(cls, c)))
+
+    ConfigChoices.dca_configs()
+    ConfigChoices.dca_additional_parties('1')
+    assert calls == []
+
+    # The choices follow the config.
+    set_dca_config(DCA_CONFIGS[:1])
+    assert ConfigChoices.dca_configs() == [('1', 'Config 01')]
+    assert len(calls) == 1
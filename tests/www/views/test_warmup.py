@@ -0,0 +1,9 @@
+from www.services.warmup_service import WarmupService
+
+
+def test_it_warms_the_container(client, monkeypatch):
+    monkeypatch.setattr(WarmupService, '_warm', True)
+
+    res = client.get('/_warmup', base_url='https://localhost')
+    assert res.status_code == 200
+    assert res.get_json() == {'already_warm': True, 'skipped': False, 'tasks': {}}
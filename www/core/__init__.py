@@ -1,4 +1,5 @@
 from .env import Env
 from .synapse import Synapse
-from .exceptions import AuthEmailNotVerifiedError, AuthForbiddenError, AuthLoginFailureError
+from .exceptions import AuthEmailNotVerifiedError, AuthForbiddenError, AuthLoginFailureError, SynapseUnavailableError, \
+    DeadlineExceededError
 from .cookies import Cookies
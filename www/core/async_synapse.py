@@ -0,0 +1,570 @@
+import json
+import time
+import asyncio
+import functools
+import contextvars
+import requests
+from .synapse import Synapse
+from .deadline import Deadline
+from .lazy import lazy_import
+
+httpx = lazy_import('httpx')
+synapseclient = lazy_import('synapseclient')
+
+
+async def run_in_thread(fn, *args, **kwargs):
+    """Runs a blocking function (e.g., a synapseclient call) in the event loop's thread pool.
+
+    The function runs in a copy of the caller's context, so it sees the caller's active Deadline.
+
+    Args:
+        fn: The function to run.
+        *args: The arguments to call the function with.
+        **kwargs: The keyword arguments to call the function with.
+
+    Returns:
+        The result of the function.
+    """
+    context = contextvars.copy_context()
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, functools.partial(context.run, fn, *args, **kwargs))
+
+
+class AsyncSynapseClient:
+    """Makes Synapse REST calls from asyncio so many independent calls can be in flight without a thread each.
+
+    The calls are made on one pooled HTTP session with the endpoints and credentials of Synapse.client(). Like the
+    calls made through Synapse.client(), each call goes through the governor (rate limit and retries) and the circuit
+    breaker, checks the active Deadline, is counted and is reported to the REST call listeners.
+
+    Example:
+
+        async with AsyncSynapseClient() as client:
+            await asyncio.gather(*[client.invite_to_team(team_id, email=email) for email in emails])
+    """
+
+    # The most calls in flight at the same time, which is also the size of the connection pool.
+    MAX_IN_FLIGHT = 16
+
+    # Seconds between polls of an asynchronous job (e.g., a table append), doubled after each poll.
+    JOB_POLL_SECONDS = 0.1
+    JOB_POLL_MAX_SECONDS = 2
+
+    # The most seconds to wait for an asynchronous job to finish.
+    JOB_MAX_WAIT_SECONDS = 120
+
+    FOLDER_TYPE = 'org.sagebionetworks.repo.model.Folder'
+
+    _transport = None
+
+    def __init__(self, max_in_flight=None):
+        """Instantiates a new instance.
+
+        Args:
+            max_in_flight: The most calls in flight at the same time. Defaults to MAX_IN_FLIGHT.
+        """
+        self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+        self._syn_client = None
+        self._session = None
+        self._in_flight = None
+
+    @classmethod
+    def set_transport(cls, transport):
+        """Sets the HTTP transport the clients send their calls with.
+
+        Used to run the services against a different Synapse transport (e.g., the fake Synapse server in tests).
+
+        Args:
+            transport: The httpx.AsyncBaseTransport to use or None to send the calls to Synapse.
+
+        Returns:
+            None
+        """
+        cls._transport = transport
+
+    async def __aenter__(self):
+        # Logging in is blocking, so wait for it off the event loop.
+        self._syn_client = await run_in_thread(Synapse.client)
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._session = httpx.AsyncClient(transport=self._transport,
+                                          timeout=Synapse.REST_CALL_TIMEOUT,
+                                          limits=httpx.Limits(max_connections=self.max_in_flight,
+                                                              max_keepalive_connections=self.max_in_flight))
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._session.aclose()
+        self._session = None
+
+    ###########################################################################
+    # REST
+    ###########################################################################
+
+    async def rest(self, method, uri, body=None, endpoint=None):
+        """Makes a Synapse REST call.
+
+        Args:
+            method: The HTTP method (get, post, put, delete).
+            uri: The URI of the call, relative to the endpoint.
+            body: The request body (dict or None).
+            endpoint: The Synapse endpoint. Defaults to the repo endpoint.
+
+        Returns:
+            The response body (dict) or None if the response is empty.
+
+        Raises:
+            SynapseHTTPError: The call failed.
+        """
+        url = '{0}{1}'.format(endpoint or self._syn_client.repoEndpoint, uri)
+        data = json.dumps(body) if body is not None else None
+
+        async def _governed_attempt():
+            # Checked before the circuit breaker so running out of time does not count as a Synapse failure.
+            timeout = Synapse.REST_CALL_TIMEOUT
+            deadline = Deadline.current()
+            if deadline is not None:
+                deadline.check()
+                timeout = min(timeout, deadline.remaining())
+
+            return await Synapse.circuit_breaker.call_async(
+                lambda: self._attempt(method, uri, url, data, timeout, deadline))
+
+        return await Synapse.governor.call_async(_governed_attempt)
+
+    async def rest_get(self, uri, endpoint=None):
+        return await self.rest('get', uri, endpoint=endpoint)
+
+    async def rest_post(self, uri, body=None, endpoint=None):
+        return await self.rest('post', uri, body=body, endpoint=endpoint)
+
+    async def rest_put(self, uri, body=None, endpoint=None):
+        return await self.rest('put', uri, body=body, endpoint=endpoint)
+
+    async def rest_delete(self, uri, endpoint=None):
+        return await self.rest('delete', uri, endpoint=endpoint)
+
+    async def _attempt(self, method, uri, url, data, timeout, deadline):
+        async with self._in_flight:
+            Synapse._count_rest_call()
+            start = time.perf_counter()
+            error = None
+            try:
+                return await self._send(method, url, data, timeout, deadline)
+            except Exception as ex:
+                error = ex
+                raise
+            finally:
+                Synapse._notify_rest_call_listeners(method, uri, time.perf_counter() - start, error)
+
+    async def _send(self, method, url, data, timeout, deadline):
+        try:
+            response = await self._session.request(method.upper(), url, content=data,
+                                                   headers=self._syn_client._generate_headers(url),
+                                                   timeout=timeout)
+        except httpx.TimeoutException as ex:
+            if timeout < Synapse.REST_CALL_TIMEOUT:
+                # The call was cut short by the deadline, not by Synapse being slow.
+                raise deadline.exceeded_error() from ex
+            raise requests.exceptions.Timeout(str(ex)) from ex
+        except httpx.TransportError as ex:
+            raise requests.exceptions.ConnectionError(str(ex)) from ex
+
+        # Raise the same errors (with the same response) as the synapseclient so the governor, the circuit breaker
+        # and the callers handle them the same way.
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.reason = response.reason_phrase
+        result.headers.update(response.headers)
+        result._content = response.content
+        result.url = url
+        result.request = requests.Request(method.upper(), url).prepare()
+        synapseclient.core.exceptions._raise_for_status(result)
+
+        return result.json() if result.content else None
+
+    ###########################################################################
+    # Entity
+    ###########################################################################
+
+    async def get_entity(self, entity_id):
+        """Gets an entity.
+
+        Args:
+            entity_id: The ID of the entity.
+
+        Returns:
+            Dict
+        """
+        return await self.rest_get('/entity/{0}'.format(entity_id))
+
+    async def create_entity(self, entity):
+        """Creates an entity.
+
+        Args:
+            entity: Dict of the entity with its name, parentId and concreteType.
+
+        Returns:
+            Dict of the created entity.
+        """
+        return await self.rest_post('/entity', body=entity)
+
+    async def update_entity(self, entity):
+        """Updates an entity.
+
+        Args:
+            entity: Dict of the entity, with its current etag.
+
+        Returns:
+            Dict of the updated entity.
+        """
+        return await self.rest_put('/entity/{0}'.format(entity['id']), body=entity)
+
+    async def delete_entity(self, entity_id):
+        """Deletes an entity.
+
+        Args:
+            entity_id: The ID of the entity.
+
+        Returns:
+            None
+        """
+        await self.rest_delete('/entity/{0}'.format(entity_id))
+
+    async def find_entity_id(self, name, parent_id=None):
+        """Finds an entity by its name.
+
+        Args:
+            name: The name of the entity.
+            parent_id: The ID of the entity's parent. None to find a project.
+
+        Returns:
+            The ID of the entity or None if it does not exist.
+        """
+        try:
+            result = await self.rest_post('/entity/child', body={'parentId': parent_id, 'entityName': name})
+            return result.get('id')
+        except synapseclient.core.exceptions.SynapseHTTPError as ex:
+            if ex.response.status_code == 404:
+                return None
+            raise
+
+    async def create_folder(self, name, parent_id):
+        """Creates a folder, or gets the folder if it already exists (like synapseclient.Synapse.store).
+
+        Args:
+            name: The name of the folder.
+            parent_id: The ID of the project or folder to create the folder in.
+
+        Returns:
+            Dict of the folder.
+        """
+        try:
+            return await self.create_entity({'name': name, 'parentId': parent_id, 'concreteType': self.FOLDER_TYPE})
+        except synapseclient.core.exceptions.SynapseHTTPError as ex:
+            if ex.response.status_code != 409:
+                raise
+
+        return await self.get_entity(await self.find_entity_id(name, parent_id=parent_id))
+
+    ###########################################################################
+    # ACL
+    ###########################################################################
+
+    async def get_benefactor(self, entity_id):
+        """Gets the entity an entity gets its ACL from (which may be the entity itself).
+
+        Args:
+            entity_id: The ID of the entity.
+
+        Returns:
+            Dict with the benefactor's id and name.
+        """
+        return await self.rest_get('/entity/{0}/benefactor'.format(entity_id))
+
+    async def get_acl(self, entity_id):
+        """Gets the ACL of an entity that has its own ACL.
+
+        Args:
+            entity_id: The ID of the entity.
+
+        Returns:
+            Dict
+        """
+        return await self.rest_get('/entity/{0}/acl'.format(entity_id))
+
+    async def set_permissions(self, entity_id, permissions):
+        """Sets the permissions of principals on an entity, in one ACL update.
+
+        Works like synapseclient.Synapse.setPermissions: an entity that inherits its ACL gets its own ACL, starting
+        from the inherited one. Grants to the same entity must not run at the same time, each would overwrite the
+        other's ACL, so pass all the principals for an entity in one call.
+
+        Args:
+            entity_id: The ID of the entity.
+            permissions: Dict of principal ID to the list of access types (an empty list removes the principal).
+
+        Returns:
+            Dict of the updated ACL.
+        """
+        benefactor = await self.get_benefactor(entity_id)
+        acl = await self.get_acl(benefactor['id'])
+        self._apply_permissions(acl, permissions)
+
+        if benefactor['id'] == entity_id:
+            return await self.rest_put('/entity/{0}/acl'.format(entity_id), body=acl)
+        else:
+            acl = dict(acl, id=entity_id)
+            acl.pop('etag', None)
+            return await self.rest_post('/entity/{0}/acl'.format(entity_id), body=acl)
+
+    @staticmethod
+    def _apply_permissions(acl, permissions):
+        for principal_id, access_type in permissions.items():
+            principal_id = int(principal_id)
+            resource_access = [ra for ra in acl['resourceAccess'] if int(ra.get('principalId', -1)) != principal_id]
+            if access_type:
+                resource_access.append({'principalId': principal_id, 'accessType': list(access_type)})
+            acl['resourceAccess'] = resource_access
+
+    ###########################################################################
+    # Team
+    ###########################################################################
+
+    async def create_team(self, name, description=None):
+        """Creates a team.
+
+        Args:
+            name: The name of the team.
+            description: The description of the team.
+
+        Returns:
+            Dict of the created team.
+        """
+        return await self.rest_post('/team', body={'name': name, 'description': description})
+
+    async def get_team(self, team_id):
+        """Gets a team.
+
+        Args:
+            team_id: The ID of the team.
+
+        Returns:
+            Dict
+        """
+        return await self.rest_get('/team/{0}'.format(team_id))
+
+    async def get_team_acl(self, team_id):
+        """Gets the ACL of a team.
+
+        Args:
+            team_id: The ID of the team.
+
+        Returns:
+            Dict
+        """
+        return await self.rest_get('/team/{0}/acl'.format(team_id))
+
+    async def set_team_permissions(self, team_id, permissions):
+        """Sets the permissions of principals on a team, in one ACL update.
+
+        Args:
+            team_id: The ID of the team.
+            permissions: Dict of principal ID to the list of access types (an empty list removes the principal).
+
+        Returns:
+            Dict of the updated ACL.
+        """
+        acl = await self.get_team_acl(team_id)
+        self._apply_permissions(acl, permissions)
+        return await self.rest_put('/team/acl', body=acl)
+
+    async def invite_to_team(self, team_id, user_id=None, email=None):
+        """Invites a user (by ID) or an email to a team.
+
+        Args:
+            team_id: The ID of the team.
+            user_id: The ID of the user to invite.
+            email: The email to invite.
+
+        Returns:
+            Dict of the invitation.
+        """
+        body = {'teamId': team_id}
+        if user_id is not None:
+            body['inviteeId'] = user_id
+        if email is not None:
+            body['inviteeEmail'] = email
+        return await self.rest_post('/membershipInvitation', body=body)
+
+    ###########################################################################
+    # Table
+    ###########################################################################
+
+    async def get_table_columns(self, table_id):
+        """Gets the columns of a table.
+
+        Args:
+            table_id: The ID of the table.
+
+        Returns:
+            List of the column models.
+        """
+        return (await self.rest_get('/entity/{0}/column'.format(table_id)))['results']
+
+    async def append_table_rows(self, table_id, rows):
+        """Appends rows to a table and waits for the append to finish.
+
+        Args:
+            table_id: The ID of the table.
+            rows: List of the row values, in the order of the table's columns (see: Synapse.build_syn_table_row).
+
+        Returns:
+            Dict of the append job's response.
+        """
+        columns = await self.get_table_columns(table_id)
+        request = {
+            'concreteType': 'org.sagebionetworks.repo.model.table.TableUpdateTransactionRequest',
+            'entityId': table_id,
+            'changes': [{
+                'concreteType': 'org.sagebionetworks.repo.model.table.AppendableRowSetRequest',
+                'entityId': table_id,
+                'toAppend': {
+                    'concreteType': 'org.sagebionetworks.repo.model.table.RowSet',
+                    'tableId': table_id,
+                    'headers': [{'id': c['id'], 'name': c['name'], 'columnType': c['columnType']} for c in columns],
+                    'rows': [{'values': [None if v is None else str(v) for v in row]} for row in rows]
+                }
+            }]
+        }
+        job = await self.rest_post('/entity/{0}/table/transaction/async/start'.format(table_id), body=request)
+        return await self._wait_for_job('/entity/{0}/table/transaction/async/get/{1}'.format(table_id, job['token']))
+
+    async def _wait_for_job(self, uri):
+        poll_seconds = self.JOB_POLL_SECONDS
+        started_at = time.monotonic()
+        while True:
+            result = await self.rest_get(uri)
+            # Synapse returns the job status (with a jobState) while the job is still running.
+            if result and result.get('jobState') != 'PROCESSING':
+                return result
+
+            if time.monotonic() - started_at + poll_seconds > self.JOB_MAX_WAIT_SECONDS:
+                raise synapseclient.core.exceptions.SynapseTimeoutError(
+                    'Asynchronous job did not finish within {0} seconds: {1}'.format(self.JOB_MAX_WAIT_SECONDS, uri))
+            deadline = Deadline.current()
+            if deadline is not None and not deadline.has_time_for(poll_seconds):
+                raise deadline.exceeded_error()
+
+            await asyncio.sleep(poll_seconds)
+            poll_seconds = min(poll_seconds * 2, self.JOB_POLL_MAX_SECONDS)
+
+    ###########################################################################
+    # Wiki
+    ###########################################################################
+
+    async def get_wiki(self, owner_id, wiki_id=None):
+        """Gets a wiki page's metadata (the markdown is in the file handle: markdownFileHandleId).
+
+        Args:
+            owner_id: The ID of the entity that owns the wiki.
+            wiki_id: The ID of the page. None for the root page.
+
+        Returns:
+            Dict
+        """
+        if wiki_id is None:
+            return await self.rest_get('/entity/{0}/wiki2'.format(owner_id))
+        return await self.rest_get('/entity/{0}/wiki2/{1}'.format(owner_id, wiki_id))
+
+    async def get_wiki_header_tree(self, owner_id, limit=100):
+        """Gets the headers (id, title and parentId) of every page of an entity's wiki.
+
+        Args:
+            owner_id: The ID of the entity that owns the wiki.
+            limit: The number of headers to get per call.
+
+        Returns:
+            List of dicts.
+        """
+        headers = []
+        while True:
+            page = await self.rest_get('/entity/{0}/wikiheadertree?limit={1}&offset={2}'.format(
+                owner_id, limit, len(headers)))
+            headers += page['results']
+            if not page['results'] or len(headers) >= page.get('totalNumberOfResults', 0):
+                return headers
+
+    async def create_wiki(self, owner_id, wiki):
+        """Creates a wiki page.
+
+        Args:
+            owner_id: The ID of the entity to create the page on.
+            wiki: Dict of the page with its title, parentWikiId (None for the root page), attachmentFileHandleIds
+                and either its markdown or its markdownFileHandleId.
+
+        Returns:
+            Dict of the created page.
+        """
+        # Only the v1 API takes the markdown inline, the v2 API takes a file handle.
+        version = '' if 'markdown' in wiki else '2'
+        return await self.rest_post('/entity/{0}/wiki{1}'.format(owner_id, version), body=wiki)
+
+    ###########################################################################
+    # Project Settings
+    ###########################################################################
+
+    async def get_project_setting(self, project_id, setting_type):
+        """Gets a project setting.
+
+        Args:
+            project_id: The ID of the project.
+            setting_type: The type of the setting (upload, external_sync or requester_pays).
+
+        Returns:
+            Dict or None if the project does not have the setting.
+        """
+        return await self.rest_get('/projectSettings/{0}/type/{1}'.format(project_id, setting_type)) or None
+
+    async def create_project_setting(self, setting):
+        """Creates a project setting.
+
+        Args:
+            setting: Dict of the setting.
+
+        Returns:
+            Dict of the created setting.
+        """
+        return await self.rest_post('/projectSettings', body=setting)
+
+    async def update_project_setting(self, setting):
+        """Updates a project setting.
+
+        Args:
+            setting: Dict of the setting, with its current etag.
+
+        Returns:
+            None
+        """
+        await self.rest_put('/projectSettings', body=setting)
+
+    async def set_storage_location(self, project_id, storage_location_id):
+        """Sets the storage location of a project, like synapseclient.Synapse.setStorageLocation.
+
+        Args:
+            project_id: The ID of the project.
+            storage_location_id: The ID of the storage location.
+
+        Returns:
+            None
+        """
+        setting = await self.get_project_setting(project_id, 'upload')
+        if setting is not None:
+            setting['locations'] = [storage_location_id]
+            await self.update_project_setting(setting)
+        else:
+            await self.create_project_setting({
+                'concreteType': 'org.sagebionetworks.repo.model.project.UploadDestinationListSetting',
+                'settingsType': 'upload',
+                'locations': [storage_location_id],
+                'projectId': project_id
+            })
@@ -0,0 +1,527 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import uuid
+import asyncio
+import contextlib
+from datetime import datetime, date
+from .env import Env
+from .log import logger
+from .exceptions import SynapseUnavailableError
+from .synapse import Synapse
+from .metrics import step_name
+from .async_synapse import AsyncSynapseClient, run_in_thread
+from .lazy import lazy_import
+
+syn = lazy_import('synapseclient')
+
+
+class Checkpoint:
+    """The progress of a service operation so it can be resumed after a timeout or partial failure."""
+
+    def __init__(self, operation_id, service, parameters, completed_steps=None, state=None, shared=False):
+        """Instantiates a new instance.
+
+        Args:
+            operation_id: The ID of the operation.
+            service: The name of the service that is running the operation.
+            parameters: Dict of the parameters needed to re-create the service.
+            completed_steps: List of the names of the steps that have completed.
+            state: Dict of the state (project ID, team ID, etc.) built up by the completed steps.
+            shared: Whether the checkpoint has been saved to Synapse.
+        """
+        self.operation_id = operation_id
+        self.service = service
+        self.parameters = parameters
+        self.completed_steps = completed_steps or []
+        self.state = state or {}
+        self.shared = shared
+        # The steps that were not started in this run because the deadline would have passed.
+        self.deferred_steps = []
+
+    def is_complete(self, step_name):
+        return step_name in self.completed_steps
+
+    def run(self, step, get_state, deadline=None, step_seconds=0, requires=None):
+        """Runs a service step unless it has already completed.
+
+        The checkpoint is saved to the local temp directory after the step completes successfully. The services
+        save it to Synapse only when the operation fails or is continued in the background (see: CheckpointStore).
+
+        If there is not enough time left before the deadline the step is deferred, along with every step after it
+        so the steps still run in order when the operation is continued.
+
+        Args:
+            step: The bound service method to run. Must return True when it succeeds.
+            get_state: Function that returns the service state to save with the checkpoint.
+            deadline: The Deadline the step must finish by (None for no deadline).
+            step_seconds: The number of seconds the step is expected to take.
+            requires: List of the names of the steps that must have completed before this step can run.
+
+        Returns:
+            True if the step was already complete or completed successfully, False if the step was deferred or
+            a required step has not completed, otherwise the result of the step.
+        """
+        name = step_name(step)
+        if not self._can_run(name, deadline, step_seconds, requires):
+            return self.is_complete(name)
+
+        if deadline is not None:
+            with deadline:
+                result = step()
+        else:
+            result = step()
+
+        return self._complete(name, result, get_state)
+
+    async def run_async(self, step, get_state, deadline=None, step_seconds=0, requires=None):
+        """Same as run, for an async step or a step to run in the event loop's thread pool.
+
+        Args:
+            step: The bound service method to run. Async methods are awaited, other methods are run in the thread
+                pool so they do not block the event loop. Must return True when it succeeds.
+            get_state: Function that returns the service state to save with the checkpoint.
+            deadline: The Deadline the step must finish by (None for no deadline).
+            step_seconds: The number of seconds the step is expected to take.
+            requires: List of the names of the steps that must have completed before this step can run.
+
+        Returns:
+            The same as run.
+        """
+        name = step_name(step)
+        if not self._can_run(name, deadline, step_seconds, requires):
+            return self.is_complete(name)
+
+        # The deadline is a context variable so it only applies to this task (and the thread running the step).
+        with deadline or contextlib.nullcontext():
+            if asyncio.iscoroutinefunction(step):
+                result = await step()
+            else:
+                result = await run_in_thread(step)
+
+        return self._complete(name, result, get_state)
+
+    def _can_run(self, name, deadline, step_seconds, requires):
+        """Gets if a step should run now: it has not completed, is not deferred and its required steps completed."""
+        if self.is_complete(name):
+            logger.info('Skipping completed step: {0} for operation: {1}'.format(name, self.operation_id))
+            return False
+
+        if self.deferred_steps or (deadline is not None and not deadline.has_time_for(step_seconds)):
+            logger.info('Deferring step: {0} for operation: {1}'.format(name, self.operation_id))
+            self.deferred_steps.append(name)
+            return False
+
+        missing_steps = [n for n in (requires or []) if not self.is_complete(n)]
+        if missing_steps:
+            # Leave the step for the resume so it doesn't complete with data missing from the required steps.
+            logger.info('Skipping step: {0} until: {1} complete for operation: {2}'.format(
+                name, ', '.join(missing_steps), self.operation_id))
+            return False
+
+        return True
+
+    def _complete(self, name, result, get_state):
+        if result:
+            self.completed_steps.append(name)
+            self.state = get_state()
+            CheckpointStore.save(self, shared=False)
+
+        return result
+
+    def to_dict(self):
+        return {
+            'operation_id': self.operation_id,
+            'service': self.service,
+            'parameters': self.parameters,
+            'completed_steps': self.completed_steps,
+            'state': self.state,
+            'shared': self.shared
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['operation_id'],
+                   data['service'],
+                   data['parameters'],
+                   completed_steps=data.get('completed_steps'),
+                   state=data.get('state'),
+                   shared=data.get('shared', False))
+
+
+class CheckpointStore:
+    """Persists checkpoints to the local temp directory and, if SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID is set, to Synapse.
+
+    The local copy lets a warm container resume without calling Synapse, the Synapse copy lets any container resume.
+    Saving to Synapse takes several REST calls so it is only done when an operation needs to be resumed
+    (it failed or is continued in the background), not after every step.
+    """
+
+    LOCAL_DIR = os.path.join(tempfile.gettempdir(), 'synapseCheckpoints')
+
+    @classmethod
+    def save(cls, checkpoint, shared=True):
+        """Saves a checkpoint.
+
+        Failing to save a checkpoint does not fail the operation, it only means the operation cannot be resumed.
+
+        Args:
+            checkpoint: The Checkpoint to save.
+            shared: Whether to also save the checkpoint to Synapse (if SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID is set).
+
+        Returns:
+            None
+        """
+        folder_id = Env.SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID() if shared else None
+        if folder_id:
+            checkpoint.shared = True
+
+        content = json.dumps(checkpoint.to_dict())
+
+        try:
+            os.makedirs(cls.LOCAL_DIR, exist_ok=True)
+            path = cls._local_path(checkpoint.operation_id)
+            tmp_path = '{0}.tmp'.format(path)
+            with open(tmp_path, mode='w') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except Exception as ex:
+            logger.exception(ex)
+
+        if folder_id:
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                file_path = os.path.join(tmp_dir, cls._file_name(checkpoint.operation_id))
+                with open(file_path, mode='w') as f:
+                    f.write(content)
+                Synapse.client().store(syn.File(file_path, parent=folder_id))
+            except Exception as ex:
+                logger.exception(ex)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def load(cls, operation_id):
+        """Loads a checkpoint.
+
+        Args:
+            operation_id: The ID of the operation.
+
+        Returns:
+            Checkpoint or None.
+        """
+        path = cls._local_path(operation_id)
+        if os.path.isfile(path):
+            with open(path, mode='r') as f:
+                return Checkpoint.from_dict(json.loads(f.read()))
+
+        syn_file_id = cls._find_synapse_file(operation_id)
+        if syn_file_id:
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                syn_file = Synapse.client().get(syn_file_id, downloadLocation=tmp_dir)
+                with open(syn_file.path, mode='r') as f:
+                    return Checkpoint.from_dict(json.loads(f.read()))
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return None
+
+    @classmethod
+    def delete(cls, operation_id, shared=True):
+        """Deletes a checkpoint.
+
+        Args:
+            operation_id: The ID of the operation.
+            shared: Whether the checkpoint may have been saved to Synapse.
+
+        Returns:
+            None
+        """
+        path = cls._local_path(operation_id)
+        if os.path.isfile(path):
+            os.remove(path)
+
+        if not shared:
+            return
+
+        try:
+            syn_file_id = cls._find_synapse_file(operation_id)
+            if syn_file_id:
+                Synapse.client().delete(syn_file_id)
+        except Exception as ex:
+            logger.exception(ex)
+
+    @classmethod
+    def _find_synapse_file(cls, operation_id):
+        folder_id = Env.SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID()
+        if folder_id:
+            return Synapse.client().findEntityId(cls._file_name(operation_id), parent=folder_id)
+        return None
+
+    @classmethod
+    def _file_name(cls, operation_id):
+        if not re.fullmatch(r'[A-Za-z0-9_\-]+', operation_id or ''):
+            raise ValueError('Invalid operation ID: {0}'.format(operation_id))
+        return '{0}_checkpoint.json'.format(operation_id)
+
+    @classmethod
+    def _local_path(cls, operation_id):
+        return os.path.join(cls.LOCAL_DIR, cls._file_name(operation_id))
+
+
+class CheckpointedService:
+    """Base class of the services that run their steps through a Checkpoint, so an operation that timed out or
+    partially failed can be resumed and the steps that cannot finish before the deadline can be deferred.
+
+    Each service declares its steps (STEPS), the parameters it is re-created with when it is resumed (PARAMETERS)
+    and the state its steps build up (STATE_FIELDS). It has a config_id, and implements _get_config and
+    _write_synapse_log_file.
+    """
+
+    # The name of the operation used in the error messages (e.g., "DCA Create Space").
+    OPERATION_NAME = None
+
+    # The steps in the order they run: the name of the step (the name of its method without the leading underscore)
+    # and the names of the steps that must have completed before it can run.
+    STEPS = []
+
+    # The number of seconds each step is expected to take, used to defer the steps that cannot finish before the
+    # request deadline. Steps that are not listed take DEFAULT_STEP_SECONDS.
+    STEP_SECONDS = {}
+    DEFAULT_STEP_SECONDS = 1
+
+    # The constructor parameters saved with the checkpoint, and the ones that are dates (saved as ISO strings).
+    PARAMETERS = []
+    DATE_PARAMETERS = []
+
+    # The attributes the steps build up, saved with the checkpoint after each step. The Synapse objects are saved
+    # by their ID (e.g., "project_id") and loaded again when the operation is resumed.
+    STATE_FIELDS = []
+    STATE_LOADERS = {
+        'project': lambda project_id: Synapse.client().get(syn.Project(id=project_id)),
+        'team': lambda team_id: Synapse.client().getTeam(team_id)
+    }
+
+    def __init__(self, operation_id=None, deadline=None):
+        """Instantiates a new instance.
+
+        Args:
+            operation_id: The ID used to checkpoint the operation. A new ID is generated if not set.
+            deadline: The Deadline to finish by. Steps that cannot finish in time are continued in the background.
+        """
+        self.start_time = datetime.now()
+        self.operation_id = operation_id or uuid.uuid4().hex
+        self.checkpoint = None
+        self.deadline = deadline
+        self.config = None
+        self.errors = []
+        self.warnings = []
+        self.steps = []
+        self._async_client = None
+        for field in self.STATE_FIELDS:
+            setattr(self, field, None)
+
+    def execute(self):
+        """Runs the steps that have not completed.
+
+        This method does not do validation. It expects all validation to have been done and passed already.
+        When SYNAPSE_ASYNC_STEPS is set the steps are run with execute_async.
+
+        Returns:
+            Self
+        """
+        if Env.SYNAPSE_ASYNC_STEPS():
+            return asyncio.run(self.execute_async())
+
+        if not self._start():
+            return self
+
+        if self._load_checkpoint():
+            for name, requires in self.STEPS:
+                self._run_step(getattr(self, '_{0}'.format(name)), requires=requires)
+
+        return self._finish()
+
+    async def execute_async(self):
+        """Same as execute, but runs on an event loop so a Lambda can run many operations at once.
+
+        The steps that have an async variant (e.g., _invite_emails_to_team_async) make their Synapse calls at the same
+        time with an AsyncSynapseClient. The other steps run in the event loop's thread pool.
+
+        Returns:
+            Self
+        """
+        if not self._start():
+            return self
+
+        async with AsyncSynapseClient() as self._async_client:
+            if await run_in_thread(self._load_checkpoint):
+                for name, requires in self.STEPS:
+                    step = getattr(self, '_{0}_async'.format(name), None) or getattr(self, '_{0}'.format(name))
+                    await self._run_step_async(step, requires=requires)
+
+        return await run_in_thread(self._finish)
+
+    def _start(self):
+        """Loads the config and clears the results of a previous run.
+
+        Returns:
+            False if Synapse is unavailable, otherwise True.
+        """
+        from .continuation import Continuation
+
+        self.config = self._get_config()
+        if self.config is None:
+            raise Exception('{0} config not found for ID: {1}'.format(self.OPERATION_NAME, self.config_id))
+
+        for field in self.STATE_FIELDS:
+            setattr(self, field, None)
+        self.errors = []
+        self.warnings = []
+        self.steps = []
+
+        try:
+            Synapse.circuit_breaker.check()
+        except SynapseUnavailableError as ex:
+            # Fail fast instead of waiting on calls that would time out.
+            self.errors.append(str(ex))
+            return False
+
+        if self.deadline is not None and not Continuation.is_available():
+            # Deferred steps could not be continued in another container, so run every step in this request.
+            logger.warning('Continuations are not available, running operation: {0} without a deadline.'.format(
+                self.operation_id))
+            self.deadline = None
+
+        return True
+
+    def _finish(self):
+        """Writes the log file and deletes the checkpoint, or continues the operation in the background
+        if steps were deferred. The continuation writes the log file when it finishes.
+
+        Operations with errors are not continued, they are left for the user to resume.
+        """
+        from .continuation import Continuation
+
+        if self.deferred_steps and not self.errors:
+            error = Continuation.start(self.checkpoint)
+            if error:
+                self.errors.append(error)
+            return self
+
+        self._write_synapse_log_file()
+
+        if not self.errors:
+            CheckpointStore.delete(self.operation_id, shared=self.checkpoint.shared)
+        elif self.resumable:
+            # Save the checkpoint where any container can load it so the operation can be resumed.
+            CheckpointStore.save(self.checkpoint)
+
+        return self
+
+    def _get_config(self):
+        """Gets the config of the service by its config_id.
+
+        Returns:
+            Dict or None if the config was not found.
+        """
+        raise NotImplementedError()
+
+    def _write_synapse_log_file(self):
+        raise NotImplementedError()
+
+    @classmethod
+    def resume(cls, operation_id, deadline=None):
+        """Resumes an operation that timed out or partially failed.
+
+        The steps that completed are skipped and execution continues from the first step that did not complete.
+
+        Args:
+            operation_id: The ID of the operation to resume.
+            deadline: The Deadline to finish by.
+
+        Returns:
+            The service.
+        """
+        checkpoint = CheckpointStore.load(operation_id)
+        if checkpoint is None or checkpoint.service != cls.__name__:
+            raise Exception('{0} checkpoint not found for operation: {1}'.format(cls.OPERATION_NAME, operation_id))
+
+        parameters = dict(checkpoint.parameters)
+        for key in cls.DATE_PARAMETERS:
+            if parameters.get(key):
+                parameters[key] = date.fromisoformat(parameters[key])
+
+        service = cls(operation_id=operation_id, deadline=deadline, **parameters)
+        service.checkpoint = checkpoint
+        return service.execute()
+
+    @property
+    def deferred_steps(self):
+        """Gets the steps that were deferred to the background continuation."""
+        return self.checkpoint.deferred_steps if self.checkpoint else []
+
+    @property
+    def resumable(self):
+        """Gets whether the operation failed after a step completed, so it can be resumed."""
+        return bool(self.errors and self.checkpoint and self.checkpoint.completed_steps)
+
+    def _load_checkpoint(self):
+        """Continues the resumed checkpoint (or starts a new one) and restores the state of the completed steps."""
+        errors = []
+        try:
+            # New operations start a new checkpoint, resume() sets the checkpoint it loaded.
+            if self.checkpoint is None:
+                self.checkpoint = Checkpoint(self.operation_id, type(self).__name__, self._get_parameters())
+            else:
+                logger.info('Resuming operation: {0} after steps: {1}'.format(self.operation_id,
+                                                                              self.checkpoint.completed_steps))
+                self._set_state(self.checkpoint.state)
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error loading checkpoint for operation: {0}: {1}'.format(self.operation_id, ex))
+
+        self.errors += errors
+        return not errors
+
+    def _run_step(self, step, requires=None):
+        step_seconds = self.STEP_SECONDS.get(step_name(step), self.DEFAULT_STEP_SECONDS)
+        return self.checkpoint.run(step, self._get_state, deadline=self.deadline, step_seconds=step_seconds,
+                                   requires=requires)
+
+    async def _run_step_async(self, step, requires=None):
+        step_seconds = self.STEP_SECONDS.get(step_name(step), self.DEFAULT_STEP_SECONDS)
+        return await self.checkpoint.run_async(step, self._get_state, deadline=self.deadline,
+                                               step_seconds=step_seconds, requires=requires)
+
+    def _get_parameters(self):
+        parameters = {name: getattr(self, name) for name in self.PARAMETERS}
+        for key in self.DATE_PARAMETERS:
+            parameters[key] = parameters[key].isoformat() if parameters[key] else None
+        return parameters
+
+    def _get_state(self):
+        state = {}
+        for field in self.STATE_FIELDS:
+            value = getattr(self, field)
+            if field in self.STATE_LOADERS:
+                state['{0}_id'.format(field)] = value.id if value else None
+            else:
+                state[field] = value
+        return state
+
+    def _set_state(self, state):
+        for field in self.STATE_FIELDS:
+            if field in self.STATE_LOADERS:
+                syn_id = state.get('{0}_id'.format(field))
+                if syn_id:
+                    setattr(self, field, self.STATE_LOADERS[field](syn_id))
+            else:
+                setattr(self, field, state.get(field))
+
+    def _add_warning(self, msg):
+        logger.warning(msg)
+        self.warnings.append(msg)
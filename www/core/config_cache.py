@@ -0,0 +1,86 @@
+import json
+import hashlib
+import threading
+from .env import Env
+from .shared_cache import SharedCache
+
+
+class ConfigCache:
+    """Caches the JSON configs (e.g., SYNAPSE_SPACE_DCA_CREATE_CONFIG) and the values derived from them.
+
+    Each config has a version (a hash of its JSON), and a config is only parsed, and each derived value only
+    computed, once per version. Values from the OS environment are cheap to read, so they are read every time.
+    Values from SSM are kept in the SharedCache (see: Env.get_param) and read again every SSM_TTL seconds, so SSM
+    changes show up within SSM_TTL seconds.
+
+    The cached values are shared by every request, do not modify them.
+    """
+
+    # How long (in seconds) to use a config read from SSM before reading it again.
+    SSM_TTL = 60
+
+    _configs = {}
+    _derived = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, key, default='[]'):
+        """Gets a JSON config.
+
+        Args:
+            key: The name of the config (e.g., SYNAPSE_SPACE_DCA_CREATE_CONFIG).
+            default: The JSON to use when the config is not set.
+
+        Returns:
+            Tuple of the config version and the parsed config.
+        """
+        raw = cls._read(key, default)
+        version = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+        with cls._lock:
+            cached = cls._configs.get(key)
+            if cached and cached[0] == version:
+                return cached
+
+        config = json.loads(raw)
+        with cls._lock:
+            cls._configs[key] = (version, config)
+        return version, config
+
+    @classmethod
+    def derive(cls, key, name, fn, default='[]'):
+        """Gets a value computed from a JSON config, computing it only when the config changes.
+
+        Args:
+            key: The name of the config (e.g., SYNAPSE_SPACE_DCA_CREATE_CONFIG).
+            name: The name of the derived value. Unique per config.
+            fn: Function that takes the parsed config and returns the value.
+            default: The JSON to use when the config is not set.
+
+        Returns:
+            Tuple of the config version and the value.
+        """
+        version, config = cls.get(key, default=default)
+
+        with cls._lock:
+            cached = cls._derived.get((key, name))
+            if cached and cached[0] == version:
+                return cached
+
+        value = fn(config)
+        with cls._lock:
+            cls._derived[(key, name)] = (version, value)
+        return version, value
+
+    @classmethod
+    def clear(cls):
+        """Clears the cached configs, derived values and SSM values."""
+        SharedCache.clear(Env.SSM_CACHE_PREFIX)
+        with cls._lock:
+            cls._configs.clear()
+            cls._derived.clear()
+
+    @classmethod
+    def _read(cls, key, default):
+        result = Env.get_param(key, default, ttl=cls.SSM_TTL)
+        return result.value if isinstance(result.value, str) else json.dumps(result.value)
@@ -0,0 +1,121 @@
+import os
+import json
+import importlib
+import threading
+import boto3
+from .env import Env
+from .log import logger
+from .deadline import Deadline
+from .checkpoint import CheckpointStore
+
+
+class Continuation:
+    """Continues the deferred steps of a service operation after the response has been sent.
+
+    On Lambda the function invokes itself asynchronously with a continuation event (see: www/handler.py),
+    anywhere else the operation is continued in a background thread.
+    """
+
+    EVENT_KEY = 'continuation'
+
+    # The services that can be continued, by name, and the module they are in.
+    SERVICES = {
+        'CreateDcaSpaceService': 'www.services.synapse_space.dca',
+        'CreateBasicSpaceService': 'www.services.synapse_space.basic',
+        'GrantDaaAccessService': 'www.services.synapse_space.daa'
+    }
+
+    @classmethod
+    def is_available(cls):
+        """Gets if deferred steps can be continued in the background.
+
+        On Lambda the continuation can run in a different container, which can only load the checkpoint
+        if it was saved to SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID.
+
+        Returns:
+            Boolean
+        """
+        return not os.environ.get('AWS_LAMBDA_FUNCTION_NAME') or bool(Env.SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID())
+
+    @classmethod
+    def start(cls, checkpoint):
+        """Saves the checkpoint and continues the operation in the background.
+
+        Args:
+            checkpoint: The Checkpoint of the operation to continue.
+
+        Returns:
+            An error string or None.
+        """
+        error = None
+        try:
+            if checkpoint.service not in cls.SERVICES:
+                raise Exception('Service: {0} cannot be continued.'.format(checkpoint.service))
+
+            if not cls.is_available():
+                raise Exception('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID must be set to continue operations on Lambda.')
+
+            CheckpointStore.save(checkpoint)
+
+            payload = {'service': checkpoint.service, 'operation_id': checkpoint.operation_id}
+            function_name = os.environ.get('AWS_LAMBDA_FUNCTION_NAME')
+
+            if function_name:
+                boto3.client('lambda').invoke(FunctionName=function_name,
+                                              InvocationType='Event',
+                                              Payload=json.dumps({cls.EVENT_KEY: payload}))
+            else:
+                threading.Thread(target=cls._run_in_thread, kwargs=payload, daemon=True).start()
+
+            logger.info('Continuing operation: {0} in the background after steps: {1}'.format(
+                checkpoint.operation_id, checkpoint.completed_steps))
+        except Exception as ex:
+            logger.exception(ex)
+            error = 'Error continuing operation: {0} in the background: {1}'.format(checkpoint.operation_id, ex)
+
+        return error
+
+    @classmethod
+    def run(cls, service, operation_id, deadline=None):
+        """Resumes an operation.
+
+        Args:
+            service: The name of the service running the operation.
+            operation_id: The ID of the operation.
+            deadline: The Deadline to continue the operation within (None for no deadline).
+
+        Returns:
+            The service.
+        """
+        service_cls = getattr(importlib.import_module(cls.SERVICES[service]), service)
+        return service_cls.resume(operation_id, deadline=deadline)
+
+    @classmethod
+    def _run_in_thread(cls, service, operation_id):
+        try:
+            cls.run(service, operation_id)
+        except Exception as ex:
+            logger.exception(ex)
+
+    @classmethod
+    def handle_event(cls, event, context):
+        """Runs a continuation event sent to the Lambda function by start().
+
+        Args:
+            event: The Lambda event.
+            context: The Lambda context.
+
+        Returns:
+            Dict with the operation ID and errors.
+        """
+        payload = event[cls.EVENT_KEY]
+        deadline = Deadline(context.get_remaining_time_in_millis() / 1000 - Deadline.RESPONSE_SECONDS)
+
+        try:
+            service = cls.run(payload['service'], payload['operation_id'], deadline=deadline)
+            errors = service.errors
+        except Exception as ex:
+            logger.exception(ex)
+            errors = [str(ex)]
+
+        return {'operation_id': payload['operation_id'], 'errors': errors}
@@ -0,0 +1,93 @@
+import time
+import contextvars
+from .exceptions import DeadlineExceededError
+
+
+class Deadline:
+    """The time left to handle a request.
+
+    API Gateway cuts requests off after 29 seconds, so the views create a deadline that the services check before
+    each step. Steps that cannot finish in time are deferred to a background continuation instead.
+
+    While a deadline is active (used as a context manager) every Synapse call made by the thread (or the asyncio task)
+    checks it.
+    """
+
+    API_GATEWAY_TIMEOUT = 29
+
+    # Time kept back to write the log file and render the response.
+    RESPONSE_SECONDS = 4
+
+    # A context variable (not a thread local) so concurrent asyncio tasks on one thread each see their own deadline.
+    _current = contextvars.ContextVar('deadline', default=None)
+
+    def __init__(self, seconds):
+        """Instantiates a new instance.
+
+        Args:
+            seconds: The number of seconds from now until the deadline.
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._tokens = []
+
+    @classmethod
+    def for_request(cls):
+        """Gets a deadline for the current web request.
+
+        Returns:
+            Deadline
+        """
+        return cls(cls.API_GATEWAY_TIMEOUT - cls.RESPONSE_SECONDS)
+
+    @classmethod
+    def current(cls):
+        """Gets the deadline active on the current thread or asyncio task.
+
+        Returns:
+            Deadline or None.
+        """
+        return cls._current.get()
+
+    def remaining(self):
+        """Gets the number of seconds left until the deadline.
+
+        Returns:
+            Float
+        """
+        return max(self.expires_at - time.monotonic(), 0)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def has_time_for(self, seconds):
+        """Gets if there is time left to do something that takes the given number of seconds.
+
+        Args:
+            seconds: The expected duration.
+
+        Returns:
+            Boolean
+        """
+        return self.remaining() > seconds
+
+    def check(self):
+        """Raises DeadlineExceededError if the deadline has passed."""
+        if self.expired():
+            raise self.exceeded_error()
+
+    def exceeded_error(self):
+        """Gets the error raised when work does not finish before the deadline.
+
+        Returns:
+            DeadlineExceededError
+        """
+        return DeadlineExceededError(
+            'Request deadline exceeded: the request did not complete within {0} seconds.'.format(self.seconds))
+
+    def __enter__(self):
+        self._tokens.append(Deadline._current.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Deadline._current.reset(self._tokens.pop())
@@ -1,9 +1,64 @@
-from sls_tools.param_store import ParamStore
+from sls_tools.param_store import ParamStore, ParamStoreResult
+import os
 import uuid
 import json
 
 
 class Env:
+    # How long (in seconds) to use a value read from SSM before reading it again.
+    SSM_TTL = 60
+
+    # The prefix of the SSM values in the SharedCache.
+    SSM_CACHE_PREFIX = 'ssm:'
+
+    # The SSM values that are kept in the SharedCache. The disk and redis backends store the values in plain text,
+    # so secrets (e.g., SYNAPSE_PASSWORD, GOOGLE_CLIENT_SECRET, SECRET_KEY) must never be added here.
+    SHARED_SSM_KEYS = [
+        'LOG_LEVEL',
+        'SYNAPSE_USERNAME',
+        'GOOGLE_CLIENT_ID',
+        'GOOGLE_DISCOVERY_URL',
+        'LOGIN_WHITELIST',
+        'SYNAPSE_SPACE_LOG_FOLDER_ID',
+        'SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID',
+        'SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID',
+        'SYNAPSE_SPACE_DCA_CREATE_CONFIG',
+        'SYNAPSE_SPACE_BASIC_CREATE_CONFIG',
+        'SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG'
+    ]
+
+    @staticmethod
+    def get_param(key, default=None, ttl=None):
+        """Gets a value from the OS or SSM.
+
+        Values read from SSM are kept in the SharedCache for ttl seconds, so the workers sharing the cache read SSM
+        once per ttl instead of on every call. Only the keys in SHARED_SSM_KEYS are cached, the others (the secrets)
+        are read from SSM on every call.
+
+        Args:
+            key: The name of the value.
+            default: The value to return when the value is not set.
+            ttl: Seconds to use a value read from SSM. Defaults to SSM_TTL.
+
+        Returns:
+            ParamStoreResult
+        """
+        if key not in Env.SHARED_SSM_KEYS:
+            return ParamStore.get(key, default)
+
+        from .shared_cache import SharedCache
+
+        cache_key = Env.SSM_CACHE_PREFIX + key
+        if key not in os.environ:
+            cached = SharedCache.get(cache_key)
+            if cached is not None:
+                return ParamStoreResult(key, cached, ParamStore.Stores.SSM)
+
+        result = ParamStore.get(key, default)
+        if result.store == ParamStore.Stores.SSM:
+            SharedCache.set(cache_key, result.value, ttl=Env.SSM_TTL if ttl is None else ttl)
+        return result
+
     @staticmethod
     def FLASK_ENV(default='development'):
         """This variable must be set on the OS (not on SSM)"""
@@ -34,49 +89,73 @@ class Env:
         """This variable must be set on the OS (not on SSM)"""
         return ParamStore.get('SERVICE_STAGE', default=default, store=ParamStore.Stores.OS).value
 
+    @staticmethod
+    def SYNAPSE_CLIENT_POOL_SIZE(default=0):
+        """This variable must be set on the OS (not on SSM)"""
+        return ParamStore.get('SYNAPSE_CLIENT_POOL_SIZE', default=default, store=ParamStore.Stores.OS).to_int()
+
+    @staticmethod
+    def SYNAPSE_ASYNC_STEPS(default=False):
+        """This variable must be set on the OS (not on SSM)"""
+        return ParamStore.get('SYNAPSE_ASYNC_STEPS', default=default, store=ParamStore.Stores.OS).to_bool()
+
+    @staticmethod
+    def SHARED_CACHE_BACKEND(default='memory'):
+        """This variable must be set on the OS (not on SSM)"""
+        return ParamStore.get('SHARED_CACHE_BACKEND', default=default, store=ParamStore.Stores.OS).value
+
+    @staticmethod
+    def SHARED_CACHE_URL(default=None):
+        """This variable must be set on the OS (not on SSM)"""
+        return ParamStore.get('SHARED_CACHE_URL', default=default, store=ParamStore.Stores.OS).value
+
     @staticmethod
     def SECRET_KEY(default=str(uuid.uuid4())):
-        return ParamStore.get('SECRET_KEY', default).value
+        return Env.get_param('SECRET_KEY', default).value
 
     @staticmethod
     def LOG_LEVEL(default=None):
-        return ParamStore.get('LOG_LEVEL', default).value
+        return Env.get_param('LOG_LEVEL', default).value
 
     @staticmethod
     def SYNAPSE_USERNAME(default=None):
-        return ParamStore.get('SYNAPSE_USERNAME', default).value
+        return Env.get_param('SYNAPSE_USERNAME', default).value
 
     @staticmethod
     def SYNAPSE_PASSWORD(default=None):
-        return ParamStore.get('SYNAPSE_PASSWORD', default).value
+        return Env.get_param('SYNAPSE_PASSWORD', default).value
 
     @staticmethod
     def GOOGLE_CLIENT_ID(default=None):
-        return ParamStore.get('GOOGLE_CLIENT_ID', default).value
+        return Env.get_param('GOOGLE_CLIENT_ID', default).value
 
     @staticmethod
     def GOOGLE_CLIENT_SECRET(default=None):
-        return ParamStore.get('GOOGLE_CLIENT_SECRET', default).value
+        return Env.get_param('GOOGLE_CLIENT_SECRET', default).value
 
     @staticmethod
     def GOOGLE_DISCOVERY_URL(default='https://accounts.google.com/.well-known/openid-configuration'):
-        return ParamStore.get('GOOGLE_DISCOVERY_URL', default).value
+        return Env.get_param('GOOGLE_DISCOVERY_URL', default).value
 
     @staticmethod
     def LOGIN_WHITELIST(default=[]):
-        return ParamStore.get('LOGIN_WHITELIST', default).to_list(delimiter=',')
+        return Env.get_param('LOGIN_WHITELIST', default).to_list(delimiter=',')
 
     @staticmethod
     def SYNAPSE_SPACE_LOG_FOLDER_ID(default=None):
-        return ParamStore.get('SYNAPSE_SPACE_LOG_FOLDER_ID', default).value
+        return Env.get_param('SYNAPSE_SPACE_LOG_FOLDER_ID', default).value
+
+    @staticmethod
+    def SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID(default=None):
+        return Env.get_param('SYNAPSE_SPACE_CHECKPOINT_FOLDER_ID', default).value
 
     @staticmethod
     def SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID(default=None):
-        return ParamStore.get('SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID', default).to_int()
+        return Env.get_param('SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID', default).to_int()
 
     @staticmethod
     def SYNAPSE_SPACE_DCA_CREATE_CONFIG(default='[]'):
-        return ParamStore.get('SYNAPSE_SPACE_DCA_CREATE_CONFIG', default).to_json()
+        return Env.get_param('SYNAPSE_SPACE_DCA_CREATE_CONFIG', default).to_json()
 
     @staticmethod
     def SYNAPSE_SPACE_DCA_CREATE_CONFIG_by_id(id):
@@ -85,7 +164,7 @@ class Env:
 
     @staticmethod
     def SYNAPSE_SPACE_BASIC_CREATE_CONFIG(default='[]'):
-        return ParamStore.get('SYNAPSE_SPACE_BASIC_CREATE_CONFIG', default).to_json()
+        return Env.get_param('SYNAPSE_SPACE_BASIC_CREATE_CONFIG', default).to_json()
 
     @staticmethod
     def SYNAPSE_SPACE_BASIC_CREATE_CONFIG_by_id(id):
@@ -94,7 +173,7 @@ class Env:
 
     @staticmethod
     def SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG(default='[]'):
-        return ParamStore.get('SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG', default).to_json()
+        return Env.get_param('SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG', default).to_json()
 
     @staticmethod
     def SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG_by_id(id):
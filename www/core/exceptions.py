@@ -11,3 +11,13 @@ class AuthForbiddenError(ValueError):
 class AuthLoginFailureError(ValueError):
     """Raised when an unknown login failure occurs."""
     pass
+
+
+class SynapseUnavailableError(Exception):
+    """Raised when a Synapse call is rejected because the circuit breaker is open."""
+    pass
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a Synapse call is started after the request deadline has passed."""
+    pass
@@ -0,0 +1,29 @@
+import sys
+import importlib.util
+
+
+def lazy_import(name):
+    """Imports a module the first time one of its attributes is used.
+
+    Used for modules that are slow to import (e.g., synapseclient) and not needed by every request,
+    so a cold start only pays for them when they are used. Use scripts/profile_imports.py to find them.
+
+    Args:
+        name: The full name of the module.
+
+    Returns:
+        The module (loaded or not).
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError('No module named: {0}'.format(name), name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
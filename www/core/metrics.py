@@ -0,0 +1,79 @@
+import time
+import json
+import asyncio
+import functools
+from .log import logger
+from .synapse import Synapse
+
+
+def step_name(step):
+    """Gets the name of a service step: the name of its method without the leading underscore.
+
+    The async variant of a step (e.g., _invite_emails_to_team_async) has the same name as the step, so either can
+    complete the step for the checkpoint.
+
+    Args:
+        step: The step method.
+
+    Returns:
+        String
+    """
+    name = step.__name__.lstrip('_')
+    return name[:-len('_async')] if name.endswith('_async') else name
+
+
+def timed_step(fn):
+    """Decorates a service step so its duration, Synapse call count and outcome are recorded.
+
+    The metrics are appended to the service's "steps" list and logged as a STEP_METRIC.
+    The outcome is "success", "warning" (warnings were added), "failed" (errors were added)
+    or "exception" (the step raised). Async steps are timed until they finish.
+    """
+    name = step_name(fn)
+
+    def _start(self):
+        return len(self.errors), len(getattr(self, 'warnings', [])), Synapse.rest_call_count(), time.perf_counter()
+
+    def _outcome(self, started):
+        if len(self.errors) > started[0]:
+            return 'failed'
+        elif len(getattr(self, 'warnings', [])) > started[1]:
+            return 'warning'
+        return 'success'
+
+    def _record(self, started, outcome):
+        metric = {
+            'step': name,
+            'duration_ms': round((time.perf_counter() - started[3]) * 1000, 1),
+            'synapse_calls': Synapse.rest_call_count() - started[2],
+            'outcome': outcome
+        }
+        self.steps.append(metric)
+        logger.info('STEP_METRIC: {0}'.format(json.dumps(dict(service=type(self).__name__, **metric))))
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(self, *args, **kwargs):
+            started = _start(self)
+            outcome = 'exception'
+            try:
+                result = await fn(self, *args, **kwargs)
+                outcome = _outcome(self, started)
+                return result
+            finally:
+                _record(self, started, outcome)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        started = _start(self)
+        outcome = 'exception'
+        try:
+            result = fn(self, *args, **kwargs)
+            outcome = _outcome(self, started)
+            return result
+        finally:
+            _record(self, started, outcome)
+
+    return wrapper
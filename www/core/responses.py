@@ -0,0 +1,175 @@
+import os
+import gzip
+import hashlib
+import threading
+from flask import request, current_app
+
+
+class ResponseOptimizer:
+    """Compresses responses and lets browsers reuse the responses they already have.
+
+    - Static files and JSON responses are compressed with brotli (when the brotli package is installed) or gzip,
+      depending on the request's Accept-Encoding header. The HTML pages are not compressed: they carry the CSRF token
+      next to the user's input, and compressing the two together leaks the token to a BREACH attack.
+    - GET responses get a strong ETag (of the bytes sent, unless the view set one) and a 304 when the request's
+      If-None-Match matches. Compressed responses add the encoding to the ETag.
+    - url_for('static', ...) adds a fingerprint of the file's content, and fingerprinted static files are
+      cached by the browser for STATIC_MAX_AGE seconds.
+
+    Only the body, Content-Encoding, ETag, Vary and Cache-Control are changed, so the headers set by Talisman
+    (e.g., the CSP) are sent as is, including on 304 responses.
+    """
+
+    # Responses smaller than this (in bytes) are not worth compressing.
+    MIN_COMPRESS_SIZE = 500
+
+    # The mimetypes of the static files that are compressed. Images and fonts are already compressed.
+    COMPRESSIBLE_MIMETYPES = [
+        'text/html',
+        'text/css',
+        'text/plain',
+        'text/javascript',
+        'application/javascript',
+        'application/json',
+        'image/svg+xml'
+    ]
+
+    # The mimetypes of the view responses that are compressed. They do not contain secrets (e.g., the CSRF token).
+    COMPRESSIBLE_VIEW_MIMETYPES = [
+        'application/json'
+    ]
+
+    # How long (in seconds) the browser can cache fingerprinted static files. Their URL changes with their content.
+    STATIC_MAX_AGE = 31536000
+
+    # The query parameter url_for('static', ...) uses for the fingerprint.
+    FINGERPRINT_PARAM = 'v'
+
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5
+
+    _brotli_module = False
+    _fingerprints = {}
+    _compressed_static = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        """Registers the request hooks with the app.
+
+        Args:
+            app: The Flask app.
+
+        Returns:
+            None
+        """
+        app.url_defaults(cls._add_fingerprint)
+        app.after_request(cls.process_response)
+
+    @classmethod
+    def encodings(cls):
+        """Gets the supported content encodings in order of preference."""
+        return ['br', 'gzip'] if cls._brotli() else ['gzip']
+
+    @classmethod
+    def process_response(cls, response):
+        """Compresses the response and adds the cache headers.
+
+        Args:
+            response: The response to process.
+
+        Returns:
+            The response to send.
+        """
+        # Static files are sent from a file wrapper, which is not a generator even though it looks streamed.
+        streamed = response.is_streamed and not response.direct_passthrough
+        if request.method not in ['GET', 'HEAD'] or response.status_code != 200 or streamed:
+            return response
+
+        if request.endpoint == 'static' and request.args.get(cls.FINGERPRINT_PARAM):
+            response.cache_control.public = True
+            response.cache_control.max_age = cls.STATIC_MAX_AGE
+            response.cache_control.immutable = True
+
+        # The ETag set by the view (or by Flask for static files) identifies the uncompressed content.
+        etag = response.get_etag()[0]
+        cls._compress(response, etag)
+
+        if etag:
+            encoding = response.headers.get('Content-Encoding')
+            response.set_etag('{0}-{1}'.format(etag, encoding) if encoding else etag)
+        else:
+            response.add_etag()
+
+        return response.make_conditional(request)
+
+    @classmethod
+    def _compress(cls, response, etag):
+        mimetypes = cls.COMPRESSIBLE_MIMETYPES if request.endpoint == 'static' else cls.COMPRESSIBLE_VIEW_MIMETYPES
+        if response.mimetype not in mimetypes or 'Content-Encoding' in response.headers:
+            return
+
+        response.vary.add('Accept-Encoding')
+
+        encoding = request.accept_encodings.best_match(cls.encodings())
+        if not encoding:
+            return
+
+        # Flask sends static files straight from the file, so read them in to compress them.
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < cls.MIN_COMPRESS_SIZE:
+            return
+
+        # Static files only change on deploy, so they are only compressed once per container.
+        cache_key = (request.path, etag, encoding) if etag and request.endpoint == 'static' else None
+        compressed = cls._compressed_static.get(cache_key) if cache_key else None
+
+        if compressed is None:
+            if encoding == 'br':
+                compressed = cls._brotli().compress(data, quality=cls.BROTLI_QUALITY)
+            else:
+                # mtime=0 so the same content always compresses to the same bytes (and ETag).
+                compressed = gzip.compress(data, compresslevel=cls.GZIP_LEVEL, mtime=0)
+
+            if cache_key:
+                with cls._lock:
+                    cls._compressed_static[cache_key] = compressed
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+
+    @classmethod
+    def _add_fingerprint(cls, endpoint, values):
+        if endpoint != 'static' or 'filename' not in values or cls.FINGERPRINT_PARAM in values:
+            return
+
+        fingerprint = cls._fingerprint(os.path.join(current_app.static_folder, values['filename']))
+        if fingerprint:
+            values[cls.FINGERPRINT_PARAM] = fingerprint
+
+    @classmethod
+    def _fingerprint(cls, path):
+        if path not in cls._fingerprints:
+            try:
+                with open(path, 'rb') as f:
+                    fingerprint = hashlib.md5(f.read()).hexdigest()[:12]
+            except OSError:
+                fingerprint = None
+
+            with cls._lock:
+                cls._fingerprints[path] = fingerprint
+
+        return cls._fingerprints[path]
+
+    @classmethod
+    def _brotli(cls):
+        # brotli is optional, gzip is used when it is not installed.
+        if cls._brotli_module is False:
+            try:
+                import brotli
+                cls._brotli_module = brotli
+            except ImportError:
+                cls._brotli_module = None
+
+        return cls._brotli_module
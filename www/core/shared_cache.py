@@ -0,0 +1,295 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class MemoryCacheBackend:
+    """Keeps the values in the process, evicting the least recently used values once it holds max_entries.
+
+    The values are shared by the threads of a process, and by the workers of a server that loads the app before
+    forking them (see: gunicorn.conf.py), but values set after the fork are not shared.
+    """
+
+    MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and time.monotonic() >= entry[1]:
+                del self._values[key]
+                return None
+            self._values.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._values[key] = (value, None if ttl is None else time.monotonic() + ttl)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self, prefix=''):
+        with self._lock:
+            for key in [k for k in self._values if k.startswith(prefix)]:
+                del self._values[key]
+
+
+class DiskCacheBackend:
+    """Keeps the values as JSON files in a directory (in /tmp by default), so they are shared by all the processes
+    on the host.
+
+    Each value is written to a temporary file and moved into place, so readers never see a partial value.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'shared_cache')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry['key'] != key:
+            return None
+        if entry['expires'] is not None and time.time() >= entry['expires']:
+            self._remove(path)
+            return None
+        return entry['value']
+
+    def set(self, key, value, ttl=None):
+        entry = {'key': key, 'value': value, 'expires': None if ttl is None else time.time() + ttl}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+    def delete(self, key):
+        self._remove(self._path(key))
+
+    def clear(self, prefix=''):
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    key = json.load(f)['key']
+            except (OSError, ValueError, KeyError):
+                continue
+            if key.startswith(prefix):
+                self._remove(path)
+
+    def _path(self, key):
+        return os.path.join(self.directory, '{0}.json'.format(hashlib.sha1(key.encode('utf-8')).hexdigest()))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class RedisCacheBackend:
+    """Keeps the values as JSON in Redis, or any server that speaks the Redis protocol (e.g., a local Valkey or
+    KeyDB), so they are shared by all the workers on all the hosts.
+
+    Requires the redis package.
+    """
+
+    NAMESPACE = 'synapse-space:'
+
+    def __init__(self, url=None, client=None):
+        """Instantiates a new instance.
+
+        Args:
+            url: The URL of the server (e.g., redis://localhost:6379/0).
+            client: The Redis client to use instead of connecting to the URL.
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+
+    def get(self, key):
+        value = self.client.get(self.NAMESPACE + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        # Redis expires keys in whole milliseconds and rejects 0, so expire the value right away instead.
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+        else:
+            self.client.set(self.NAMESPACE + key, json.dumps(value), px=None if ttl is None else int(ttl * 1000))
+
+    def delete(self, key):
+        self.client.delete(self.NAMESPACE + key)
+
+    def clear(self, prefix=''):
+        keys = list(self.client.scan_iter(match='{0}{1}*'.format(self.NAMESPACE, prefix)))
+        if keys:
+            self.client.delete(*keys)
+
+
+class SharedCache:
+    """The cache shared by the requests, threads and (depending on the backend) the workers of the app.
+
+    The backend is set by SHARED_CACHE_BACKEND on the OS:
+
+    - memory (default): MemoryCacheBackend.
+    - disk: DiskCacheBackend in the SHARED_CACHE_URL directory (a directory in /tmp by default).
+    - redis: RedisCacheBackend at SHARED_CACHE_URL.
+
+    The values must be JSON serializable, and the cached values must not be modified. Errors from the backend are
+    logged and treated as cache misses so an unavailable cache only makes the app slower.
+    """
+
+    BACKENDS = {
+        'memory': lambda url: MemoryCacheBackend(),
+        'disk': lambda url: DiskCacheBackend(url),
+        'redis': lambda url: RedisCacheBackend(url)
+    }
+
+    _backend = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def backend(cls):
+        """Gets the backend, creating it from the OS environment the first time.
+
+        Returns:
+            The backend.
+        """
+        if cls._backend is None:
+            from .env import Env
+            with cls._lock:
+                if cls._backend is None:
+                    name = Env.SHARED_CACHE_BACKEND()
+                    if name not in cls.BACKENDS:
+                        raise Exception('Invalid SHARED_CACHE_BACKEND: {0}'.format(name))
+                    cls._backend = cls.BACKENDS[name](Env.SHARED_CACHE_URL())
+        return cls._backend
+
+    @classmethod
+    def set_backend(cls, backend):
+        """Sets the backend.
+
+        Args:
+            backend: The backend to use or None to create it from the OS environment again.
+
+        Returns:
+            None
+        """
+        with cls._lock:
+            cls._backend = backend
+
+    @classmethod
+    def get(cls, key):
+        """Gets a value.
+
+        Args:
+            key: The key of the value.
+
+        Returns:
+            The value or None if it is not cached or has expired.
+        """
+        try:
+            return cls.backend().get(key)
+        except Exception as ex:
+            cls._warn('Shared cache get failed for {0}: {1}'.format(key, ex))
+            return None
+
+    @classmethod
+    def set(cls, key, value, ttl=None):
+        """Sets a value.
+
+        Args:
+            key: The key of the value.
+            value: The value. Must be JSON serializable and not None.
+            ttl: Seconds to keep the value or None to keep it until it is evicted.
+
+        Returns:
+            None
+        """
+        try:
+            cls.backend().set(key, value, ttl=ttl)
+        except Exception as ex:
+            cls._warn('Shared cache set failed for {0}: {1}'.format(key, ex))
+
+    @classmethod
+    def get_or_set(cls, key, fn, ttl=None):
+        """Gets a value, calling a function to get it and caching it when it is not cached.
+
+        Args:
+            key: The key of the value.
+            fn: The function that gets the value. None is returned without being cached.
+            ttl: Seconds to keep the value or None to keep it until it is evicted.
+
+        Returns:
+            The value.
+        """
+        value = cls.get(key)
+        if value is None:
+            value = fn()
+            if value is not None:
+                cls.set(key, value, ttl=ttl)
+        return value
+
+    @classmethod
+    def delete(cls, key):
+        """Deletes a value.
+
+        Args:
+            key: The key of the value.
+
+        Returns:
+            None
+        """
+        try:
+            cls.backend().delete(key)
+        except Exception as ex:
+            cls._warn('Shared cache delete failed for {0}: {1}'.format(key, ex))
+
+    @classmethod
+    def clear(cls, prefix=''):
+        """Deletes the values whose keys start with a prefix.
+
+        Args:
+            prefix: The prefix of the keys to delete. All the values are deleted by default.
+
+        Returns:
+            None
+        """
+        try:
+            cls.backend().clear(prefix)
+        except Exception as ex:
+            cls._warn('Shared cache clear failed for {0}: {1}'.format(prefix, ex))
+
+    @staticmethod
+    def _warn(message):
+        # Imported here since the logger reads its level through Env, which uses the cache.
+        from .log import logger
+        logger.warning(message)
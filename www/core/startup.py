@@ -0,0 +1,88 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class Startup:
+    """Runs the independent parts of a cold start at the same time.
+
+    Each task runs in its own thread as soon as it is started. Code that needs a result waits for that one task only,
+    so the cold start takes as long as its slowest task instead of all of them added up.
+    """
+
+    # The most tasks that can run at the same time.
+    MAX_WORKERS = 8
+
+    def __init__(self, max_workers=None):
+        """Instantiates a new instance.
+
+        Args:
+            max_workers: The most tasks that can run at the same time. Defaults to MAX_WORKERS.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or self.MAX_WORKERS,
+                                            thread_name_prefix='startup')
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.durations = {}
+
+    def start(self, name, fn, requires=None):
+        """Starts running a task in the background. Starting a task that was already started does nothing.
+
+        Args:
+            name: The name used to get the task's result.
+            fn: The function to run.
+            requires: Names of the started tasks that must finish before this task runs.
+                      Names that were not started are ignored.
+
+        Returns:
+            Future
+        """
+        with self._lock:
+            if name not in self._futures:
+                required = [self._futures[r] for r in (requires or []) if r in self._futures]
+                self._futures[name] = self._executor.submit(self._run, name, fn, required)
+            return self._futures[name]
+
+    def started(self, name):
+        """Gets if a task was started."""
+        with self._lock:
+            return name in self._futures
+
+    def result(self, name, timeout=None):
+        """Waits for a task to finish and gets its result.
+
+        Args:
+            name: The name of the task.
+            timeout: The most seconds to wait or None to wait until the task finishes.
+
+        Returns:
+            The value returned by the task.
+
+        Raises:
+            KeyError if the task was not started, the exception raised by the task, or TimeoutError.
+        """
+        with self._lock:
+            future = self._futures[name]
+        return future.result(timeout=timeout)
+
+    def _run(self, name, fn, required):
+        from .log import logger
+
+        # The tasks this task requires log their own errors, so only wait for them to finish.
+        wait(required)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            return fn()
+        except Exception as ex:
+            error = ex
+            logger.exception(ex)
+            raise
+        finally:
+            self.durations[name] = round((time.perf_counter() - start) * 1000, 1)
+            logger.info('STARTUP_TASK: {0}'.format({
+                'name': name,
+                'duration_ms': self.durations[name],
+                'outcome': 'failed' if error else 'success'
+            }))
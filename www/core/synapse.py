@@ -1,13 +1,484 @@
 from . import Env
+from .exceptions import SynapseUnavailableError, DeadlineExceededError
+from .deadline import Deadline
+from .shared_cache import SharedCache
+from .lazy import lazy_import
 import os
+import gzip
+import json
+import asyncio
+import math
+import random
 import tempfile
+import threading
+import time
+import email.utils
+import contextvars
 from datetime import datetime
-import pytz
-import synapseclient
+import requests
+
+pytz = lazy_import('pytz')
+synapseclient = lazy_import('synapseclient')
+
+
+class SynapseGovernor:
+    """Rate limits, caps the concurrency of and retries the calls made to Synapse.
+
+    - A token bucket limits the number of calls started per second.
+    - A semaphore limits the number of calls in flight.
+    - Throttled (429/503) and failed calls are retried with exponential backoff and full jitter,
+      waiting at least as long as the Retry-After header asks.
+    """
+
+    MAX_REQUESTS_PER_SECOND = 10
+    BURST = 10
+    MAX_IN_FLIGHT = 8
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30
+    RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+    THROTTLE_STATUS_CODES = [429, 503]
+    RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def __init__(self, max_requests_per_second=None, burst=None, max_in_flight=None, max_retries=None,
+                 backoff_base=None, backoff_max=None):
+        """Instantiates a new instance. Any argument not set uses the class default.
+
+        Args:
+            max_requests_per_second: The number of calls that can be started per second (None or 0 for no limit).
+            burst: The number of calls that can be started at once before the rate limit applies.
+            max_in_flight: The maximum number of calls in flight at the same time.
+            max_retries: The number of times to retry a throttled or failed call.
+            backoff_base: The backoff (in seconds) before the first retry.
+            backoff_max: The maximum backoff (in seconds) between retries.
+        """
+        self.max_requests_per_second = self.MAX_REQUESTS_PER_SECOND if max_requests_per_second is None \
+            else max_requests_per_second
+        self.burst = burst or self.BURST
+        self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = self.BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = self.BACKOFF_MAX if backoff_max is None else backoff_max
+
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._in_flight_count = 0
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._random = random.Random()
+        self.reset_metrics()
+
+    def call(self, fn):
+        """Calls a function that makes a Synapse request, governed by the rate limit, concurrency cap and retries.
+
+        Args:
+            fn: The function to call.
+
+        Returns:
+            The result of the function.
+        """
+        attempt = 0
+        while True:
+            self._acquire_token()
+            self._acquire_in_flight()
+            try:
+                self._count('calls')
+                return fn()
+            except Exception as ex:
+                delay = self._get_retry_delay(ex, attempt)
+                if delay is None:
+                    self._count('failures')
+                    raise
+            finally:
+                self._release_in_flight()
+
+            attempt += 1
+            self._count('retries')
+            self._count('backoff_seconds', delay)
+            time.sleep(delay)
+
+    async def call_async(self, fn):
+        """Same as call, for a function that returns an awaitable (see: AsyncSynapseClient).
+
+        The calls share the rate limit with call. The number of calls in flight is capped by the caller,
+        since the governor's semaphore would block the event loop.
+
+        Args:
+            fn: The function to call.
+
+        Returns:
+            The result of the awaitable.
+        """
+        attempt = 0
+        while True:
+            wait = self._take_token()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self._take_token()
+
+            try:
+                self._count('calls')
+                return await fn()
+            except Exception as ex:
+                delay = self._get_retry_delay(ex, attempt)
+                if delay is None:
+                    self._count('failures')
+                    raise
+
+            attempt += 1
+            self._count('retries')
+            self._count('backoff_seconds', delay)
+            await asyncio.sleep(delay)
+
+    def metrics(self):
+        """Gets a copy of the throttling metrics.
+
+        Returns:
+            Dict
+        """
+        with self._lock:
+            return dict(self._metrics)
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics = {
+                'calls': 0,
+                'retries': 0,
+                'failures': 0,
+                'throttled': 0,
+                'rate_limit_wait_seconds': 0.0,
+                'in_flight_wait_seconds': 0.0,
+                'backoff_seconds': 0.0,
+                'max_in_flight': 0
+            }
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._metrics[name] += value
+
+    def _acquire_token(self):
+        """Waits until the token bucket has a token for the call."""
+        wait = self._take_token()
+        while wait:
+            time.sleep(wait)
+            wait = self._take_token()
+
+    def _take_token(self):
+        """Takes a token from the token bucket.
+
+        Returns:
+            0 if a token was taken, otherwise the number of seconds to wait before trying again.
+        """
+        if not self.max_requests_per_second:
+            return 0
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst),
+                               self._tokens + (now - self._last_refill) * self.max_requests_per_second)
+            self._last_refill = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+
+            wait = (1 - self._tokens) / self.max_requests_per_second
+            self._metrics['rate_limit_wait_seconds'] += wait
+            return wait
+
+    def _acquire_in_flight(self):
+        if not self._in_flight.acquire(blocking=False):
+            start = time.perf_counter()
+            self._in_flight.acquire()
+            self._count('in_flight_wait_seconds', time.perf_counter() - start)
+
+        with self._lock:
+            self._in_flight_count += 1
+            self._metrics['max_in_flight'] = max(self._metrics['max_in_flight'], self._in_flight_count)
+
+    def _release_in_flight(self):
+        with self._lock:
+            self._in_flight_count -= 1
+        self._in_flight.release()
+
+    def _get_retry_delay(self, ex, attempt):
+        """Gets how long to wait before retrying a failed call.
+
+        Args:
+            ex: The exception raised by the call.
+            attempt: The number of retries already made.
+
+        Returns:
+            The number of seconds to wait or None if the call should not be retried.
+        """
+        response = getattr(ex, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+
+        if status_code in self.THROTTLE_STATUS_CODES:
+            # Imported here since the log level is not available until the environment is loaded.
+            from .log import logger
+            self._count('throttled')
+            logger.warning('SYNAPSE_THROTTLED: {0}'.format(json.dumps({'status_code': status_code,
+                                                                          'attempt': attempt + 1})))
+
+        if attempt >= self.max_retries:
+            return None
+
+        if status_code not in self.RETRY_STATUS_CODES and not isinstance(ex, self.RETRY_EXCEPTIONS):
+            return None
+
+        delay = self._random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+        retry_after = self._parse_retry_after(response.headers.get('Retry-After') if response is not None else None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+
+        # Don't wait past the request deadline.
+        deadline = Deadline.current()
+        if deadline is not None and not deadline.has_time_for(delay):
+            return None
+
+        return delay
+
+    @staticmethod
+    def _parse_retry_after(value):
+        """Parses a Retry-After header (seconds or an HTTP date) into seconds."""
+        if not value:
+            return None
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+            return max((retry_at - datetime.now(retry_at.tzinfo)).total_seconds(), 0)
+        except (TypeError, ValueError):
+            return None
+
+
+class SynapseCircuitBreaker:
+    """Fails Synapse calls fast while Synapse is unavailable.
+
+    - closed: Calls go through. The breaker opens after FAILURE_THRESHOLD consecutive failed or slow calls.
+      Throttled calls (429/503) do not count as failed calls.
+    - open: Calls fail immediately with SynapseUnavailableError until RESET_TIMEOUT seconds have passed.
+    - half_open: A single probe call is let through. The breaker closes if it succeeds and opens again if it fails.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    FAILURE_THRESHOLD = 5
+    SLOW_CALL_SECONDS = 10
+    RESET_TIMEOUT = 30
+    # 503 is not included since Synapse uses it (and 429) to throttle callers, see: SynapseGovernor.
+    # A throttled call means Synapse is up, so it does not count as a failure.
+    FAILURE_STATUS_CODES = [500, 502, 504]
+    FAILURE_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+    def __init__(self, failure_threshold=None, slow_call_seconds=None, reset_timeout=None):
+        """Instantiates a new instance. Any argument not set uses the class default.
+
+        Args:
+            failure_threshold: The number of consecutive failed or slow calls that opens the breaker.
+            slow_call_seconds: Calls that take at least this many seconds count as failures.
+            reset_timeout: The number of seconds the breaker stays open before a probe call is let through.
+        """
+        self.failure_threshold = failure_threshold or self.FAILURE_THRESHOLD
+        self.slow_call_seconds = self.SLOW_CALL_SECONDS if slow_call_seconds is None else slow_call_seconds
+        self.reset_timeout = self.RESET_TIMEOUT if reset_timeout is None else reset_timeout
+
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.reset_metrics()
+
+    def call(self, fn):
+        """Calls a function that makes a Synapse request unless the breaker is open.
+
+        Args:
+            fn: The function to call.
+
+        Returns:
+            The result of the function.
+
+        Raises:
+            SynapseUnavailableError: The breaker is open.
+        """
+        self._before_call()
+
+        start = time.monotonic()
+        try:
+            result = fn()
+        except DeadlineExceededError:
+            # Running out of request time says nothing about Synapse, so the call is not counted.
+            self._release_probe()
+            raise
+        except Exception as ex:
+            self._after_call(self._is_failure(ex), time.monotonic() - start)
+            raise
+
+        self._after_call(False, time.monotonic() - start)
+        return result
+
+    async def call_async(self, fn):
+        """Same as call, for a function that returns an awaitable (see: AsyncSynapseClient).
+
+        Args:
+            fn: The function to call.
+
+        Returns:
+            The result of the awaitable.
+
+        Raises:
+            SynapseUnavailableError: The breaker is open.
+        """
+        self._before_call()
+
+        start = time.monotonic()
+        try:
+            result = await fn()
+        except DeadlineExceededError:
+            self._release_probe()
+            raise
+        except Exception as ex:
+            self._after_call(self._is_failure(ex), time.monotonic() - start)
+            raise
+
+        self._after_call(False, time.monotonic() - start)
+        return result
+
+    def check(self):
+        """Fails fast if the breaker is open, without making a call.
+
+        Raises:
+            SynapseUnavailableError: The breaker is open.
+        """
+        with self._lock:
+            if self.state == self.OPEN and self._seconds_until_probe() > 0:
+                raise self._unavailable_error()
+
+    def reset(self):
+        """Closes the breaker."""
+        with self._lock:
+            self.state = self.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def metrics(self):
+        """Gets a copy of the breaker metrics.
+
+        Returns:
+            Dict
+        """
+        with self._lock:
+            return dict(self._metrics, state=self.state)
+
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics = {
+                'opened': 0,
+                'closed': 0,
+                'rejected': 0,
+                'slow_calls': 0
+            }
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._seconds_until_probe() > 0:
+                    self._metrics['rejected'] += 1
+                    raise self._unavailable_error()
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = True
+            elif self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._metrics['rejected'] += 1
+                    raise self._unavailable_error()
+                self._probe_in_flight = True
+
+    def _release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _after_call(self, failed, duration):
+        if duration >= self.slow_call_seconds:
+            failed = True
+            with self._lock:
+                self._metrics['slow_calls'] += 1
+
+        with self._lock:
+            was_half_open = self.state == self.HALF_OPEN
+            self._probe_in_flight = False
+
+            if failed:
+                self._consecutive_failures += 1
+                if was_half_open or \
+                        (self.state == self.CLOSED and self._consecutive_failures >= self.failure_threshold):
+                    self.state = self.OPEN
+                    self._opened_at = time.monotonic()
+                    self._metrics['opened'] += 1
+                    self._log('SYNAPSE_CIRCUIT_OPEN', {'consecutive_failures': self._consecutive_failures,
+                                                       'probe': was_half_open})
+            else:
+                self._consecutive_failures = 0
+                if was_half_open:
+                    self.state = self.CLOSED
+                    self._opened_at = None
+                    self._metrics['closed'] += 1
+                    self._log('SYNAPSE_CIRCUIT_CLOSED', {})
+
+    def _is_failure(self, ex):
+        """Gets if an exception means Synapse is unavailable (as opposed to a bad request, not found, etc.)."""
+        status_code = getattr(getattr(ex, 'response', None), 'status_code', None)
+        return status_code in self.FAILURE_STATUS_CODES or isinstance(ex, self.FAILURE_EXCEPTIONS)
+
+    def _seconds_until_probe(self):
+        return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0)
+
+    def _unavailable_error(self):
+        return SynapseUnavailableError(
+            'Synapse unavailable: Synapse is not responding. Please try again in {0} seconds.'.format(
+                max(math.ceil(self._seconds_until_probe()), 1)))
+
+    @staticmethod
+    def _log(name, data):
+        # Imported here since the log level is not available until the environment is loaded.
+        from .log import logger
+        logger.warning('{0}: {1}'.format(name, json.dumps(data)))
 
 
 class Synapse:
     _synapse_client = None
+    _client_lock = threading.Lock()
+
+    # The pool of clients checked out by the requests when the server handles requests on several threads
+    # (see: Env.SYNAPSE_CLIENT_POOL_SIZE). None until it is first used.
+    _pool = None
+    _client_factory = None
+    _checked_out = contextvars.ContextVar('synapse_client', default=None)
+
+    # Locks the caches shared by the threads (TABLE_COL_CACHE and WIKI_TEMPLATE_CACHE).
+    _cache_lock = threading.Lock()
+
+    # The prefix of the Synapse values in the SharedCache (table columns and names).
+    SHARED_CACHE_PREFIX = 'synapse:'
+
+    # Seconds a project or team name found in Synapse is known to be taken without asking Synapse again.
+    # Names not found are not cached so a name taken by someone else is seen right away.
+    NAME_CACHE_TTL = 300
+
+    # Every Synapse REST call made through client() goes through the governor and the circuit breaker.
+    governor = SynapseGovernor()
+    circuit_breaker = SynapseCircuitBreaker()
+
+    # Seconds before a REST call is abandoned, so a hung call fails (and counts toward the circuit breaker)
+    # instead of running until the Lambda times out.
+    REST_CALL_TIMEOUT = 20
 
     ALL_PERM_CODES = ['ADMIN', 'CAN_EDIT_AND_DELETE', 'CAN_EDIT', 'CAN_DOWNLOAD', 'CAN_VIEW']
 
@@ -63,23 +534,391 @@ class Synapse:
 
     @classmethod
     def client(cls):
-        """Gets a logged in instance of the synapseclient."""
+        """Gets a logged in instance of the synapseclient.
+
+        Gets the client checked out by the current request (see: checkout) or the shared client when the pool is
+        disabled or no client is checked out.
+
+        The login can be started while the app starts (see: www/server.py), so callers wait for a login that is
+        already running instead of logging in again.
+        """
+        return cls._checked_out.get() or cls._shared_client()
+
+    @classmethod
+    def _shared_client(cls):
         if not cls._synapse_client:
-            # Lambda can only write to /tmp so update the CACHE_ROOT_DIR.
-            synapseclient.core.cache.CACHE_ROOT_DIR = os.path.join(tempfile.gettempdir(), 'synapseCache')
+            with cls._client_lock:
+                if not cls._synapse_client:
+                    # Lambda can only write to /tmp so update the CACHE_ROOT_DIR.
+                    synapseclient.core.cache.CACHE_ROOT_DIR = os.path.join(tempfile.gettempdir(), 'synapseCache')
 
-            # Multiprocessing is not supported on Lambda.
-            synapseclient.core.config.single_threaded = True
+                    # Multiprocessing is not supported on Lambda.
+                    synapseclient.core.config.single_threaded = True
 
-            syn_user = Env.SYNAPSE_USERNAME()
-            syn_pass = Env.SYNAPSE_PASSWORD()
-            cls._synapse_client = synapseclient.Synapse(skip_checks=True)
-            cls._synapse_client.login(syn_user, syn_pass, silent=True)
+                    syn_user = Env.SYNAPSE_USERNAME()
+                    syn_pass = Env.SYNAPSE_PASSWORD()
+                    client = cls._instrument(synapseclient.Synapse(skip_checks=True))
+                    client.login(syn_user, syn_pass, silent=True)
+                    cls._synapse_client = client
 
         return cls._synapse_client
 
+    @classmethod
+    def set_client(cls, client, factory=None):
+        """Sets the synapseclient returned by client().
+
+        Used to run the services against a different Synapse transport (e.g., the fake Synapse server in tests).
+
+        Args:
+            client: The synapseclient to use or None to go back to a logged in client.
+            factory: The function that creates the clients of the pool or None to create clients that share
+                the login of the shared client.
+
+        Returns:
+            None
+        """
+        cls._synapse_client = cls._instrument(client) if client is not None else None
+        cls._client_factory = factory
+        cls.close_pool()
+        with cls._cache_lock:
+            cls.TABLE_COL_CACHE = {}
+            cls.WIKI_TEMPLATE_CACHE = {}
+        SharedCache.clear(cls.SHARED_CACHE_PREFIX)
+
+    @classmethod
+    def reset_connections(cls):
+        """Closes the connections of the shared client and the pool, keeping the login.
+
+        Called in each worker forked from a process that has already used the client (see: gunicorn.conf.py),
+        since the workers cannot share the parent's sockets. New connections are opened as they are needed.
+
+        Returns:
+            None
+        """
+        cls.close_pool()
+        client = cls._synapse_client
+        if client is not None:
+            client._requests_session.close()
+
+    @classmethod
+    def pool(cls):
+        """Gets the pool of clients checked out by the requests.
+
+        Returns:
+            SynapseClientPool or None if the pool is disabled (Env.SYNAPSE_CLIENT_POOL_SIZE is 0).
+        """
+        if cls._pool is None:
+            size = Env.SYNAPSE_CLIENT_POOL_SIZE()
+            if not size:
+                return None
+
+            with cls._client_lock:
+                if cls._pool is None:
+                    from .synapse_pool import SynapseClientPool
+                    cls._pool = SynapseClientPool(cls._new_pooled_client, max_size=size)
+
+        return cls._pool
+
+    @classmethod
+    def close_pool(cls):
+        """Closes the pool of clients. A new pool is created the next time one is needed.
+
+        Returns:
+            None
+        """
+        with cls._client_lock:
+            pool, cls._pool = cls._pool, None
+        if pool is not None:
+            pool.close()
+
+    @classmethod
+    def checkout(cls):
+        """Checks out a client from the pool for the current request, so client() returns it until checkin().
+
+        Does nothing when the pool is disabled or the current request already has a client.
+
+        Returns:
+            None
+        """
+        pool = cls.pool()
+        if pool is not None and cls._checked_out.get() is None:
+            cls._checked_out.set(pool.checkout())
+
+    @classmethod
+    def checkin(cls, error=None):
+        """Checks the current request's client back into the pool.
+
+        Args:
+            error: The exception that ended the request, if any. A client whose connection to Synapse failed is
+                replaced.
+
+        Returns:
+            None
+        """
+        client = cls._checked_out.get()
+        if client is None:
+            return
+
+        cls._checked_out.set(None)
+        pool = cls._pool
+        if pool is not None:
+            pool.checkin(client, healthy=not isinstance(error, cls.circuit_breaker.FAILURE_EXCEPTIONS))
+
+    @classmethod
+    def _new_pooled_client(cls):
+        if cls._client_factory is not None:
+            client = cls._client_factory()
+        else:
+            # Each client has its own requests session and shares the login of the shared client.
+            client = synapseclient.Synapse(skip_checks=True)
+            client.credentials = cls._shared_client().credentials
+        return cls._instrument(client)
+
+    _rest_call_stats = threading.local()
+
+    @classmethod
+    def rest_call_count(cls):
+        """Gets the number of Synapse REST calls made by the current thread.
+
+        Returns:
+            Integer
+        """
+        return getattr(cls._rest_call_stats, 'count', 0)
+
+    _rest_call_listeners = []
+
+    @classmethod
+    def add_rest_call_listener(cls, listener):
+        """Adds a function that is called after every Synapse REST call.
+
+        The listener is called with the HTTP method, the URI, the duration in seconds and the exception raised
+        by the call (or None).
+
+        Args:
+            listener: The function to call.
+
+        Returns:
+            None
+        """
+        cls._rest_call_listeners.append(listener)
+
+    @classmethod
+    def remove_rest_call_listener(cls, listener):
+        """Removes a function added with add_rest_call_listener.
+
+        Args:
+            listener: The function to remove.
+
+        Returns:
+            None
+        """
+        if listener in cls._rest_call_listeners:
+            cls._rest_call_listeners.remove(listener)
+
+    @classmethod
+    def _count_rest_call(cls):
+        cls._rest_call_stats.count = cls.rest_call_count() + 1
+
+    @classmethod
+    def _notify_rest_call_listeners(cls, method, uri, duration, error):
+        for listener in list(cls._rest_call_listeners):
+            listener(method, uri, duration, error)
+
+    @classmethod
+    def _instrument(cls, client):
+        """Wraps the REST transport of a synapseclient so every call goes through the governor and the circuit
+        breaker, is counted and is reported to the listeners.
+
+        The synapseclient's own retries are disabled, the governor retries throttled and failed calls.
+        Each attempt goes through the circuit breaker so the retries stop as soon as the breaker opens,
+        and checks the active Deadline so no call is started (or left running) after the request deadline.
+
+        Args:
+            client: The synapseclient to instrument.
+
+        Returns:
+            The client.
+        """
+        rest_call = client._rest_call
+
+        def _attempt(method, uri, *args, **kwargs):
+            cls._count_rest_call()
+            start = time.perf_counter()
+            error = None
+            try:
+                return rest_call(method, uri, *args, **kwargs)
+            except Exception as ex:
+                error = ex
+                if isinstance(ex, cls.circuit_breaker.FAILURE_EXCEPTIONS):
+                    # Replaced when it is checked back into the pool.
+                    client._connection_failed = True
+                raise
+            finally:
+                cls._notify_rest_call_listeners(method, uri, time.perf_counter() - start, error)
+
+        def _instrumented_rest_call(method, uri, data, endpoint, headers, retryPolicy, requests_session, **kwargs):
+            retryPolicy = dict(retryPolicy or {}, retries=0)
+            timeout = kwargs.pop('timeout', cls.REST_CALL_TIMEOUT)
+
+            def _governed_attempt():
+                # Checked before the circuit breaker so running out of time does not count as a Synapse failure.
+                attempt_timeout = timeout
+                deadline = Deadline.current()
+                if deadline is not None:
+                    deadline.check()
+                    attempt_timeout = min(timeout, deadline.remaining())
+
+                def _deadline_attempt():
+                    try:
+                        return _attempt(method, uri, data, endpoint, headers, retryPolicy, requests_session,
+                                        timeout=attempt_timeout, **kwargs)
+                    except requests.exceptions.Timeout as ex:
+                        if attempt_timeout < timeout:
+                            # The call was cut short by the deadline, not by Synapse being slow.
+                            raise deadline.exceeded_error() from ex
+                        raise
+
+                return cls.circuit_breaker.call(_deadline_attempt)
+
+            return cls.governor.call(_governed_attempt)
+
+        client._rest_call = _instrumented_rest_call
+        return client
+
     TABLE_COL_CACHE = {}
 
+    @classmethod
+    def get_table_columns(cls, syn_table_id):
+        """Gets the column names of a Synapse Table. The names are cached for the life of the container,
+        and in the SharedCache so the other workers do not load them again.
+
+        Args:
+            syn_table_id: The ID of the Synapse table.
+
+        Returns:
+            List of column names.
+        """
+        with cls._cache_lock:
+            columns = cls.TABLE_COL_CACHE.get(syn_table_id)
+
+        if columns is None:
+            # Not loaded under the lock so a slow call does not block the other tables.
+            columns = SharedCache.get_or_set(
+                '{0}table_columns:{1}'.format(cls.SHARED_CACHE_PREFIX, syn_table_id),
+                lambda: [c['name'] for c in list(Synapse.client().getTableColumns(syn_table_id))])
+            with cls._cache_lock:
+                columns = cls.TABLE_COL_CACHE.setdefault(syn_table_id, columns)
+
+        return columns
+
+    @classmethod
+    def project_name_taken(cls, project_name):
+        """Gets if a project with a name exists.
+
+        Taken names are cached in the SharedCache for NAME_CACHE_TTL seconds.
+
+        Args:
+            project_name: The name of the project.
+
+        Returns:
+            Boolean
+        """
+
+        def _find():
+            syn_project_id = Synapse.client().findEntityId(project_name)
+            if syn_project_id and Synapse.client().get(synapseclient.Project(id=syn_project_id)):
+                return syn_project_id
+            return None
+
+        return cls._find_name('project', project_name, _find) is not None
+
+    @classmethod
+    def team_name_taken(cls, team_name):
+        """Gets if a team with a name exists.
+
+        Taken names are cached in the SharedCache for NAME_CACHE_TTL seconds.
+
+        Args:
+            team_name: The name of the team.
+
+        Returns:
+            Boolean
+        """
+
+        def _find():
+            try:
+                team = Synapse.client().getTeam(team_name)
+            except ValueError:
+                # Can't find team error
+                return None
+            return team.id if team else None
+
+        return cls._find_name('team', team_name, _find) is not None
+
+    @classmethod
+    def _find_name(cls, kind, name, find):
+        key = '{0}{1}_name:{2}'.format(cls.SHARED_CACHE_PREFIX, kind, name)
+        return SharedCache.get_or_set(key, find, ttl=cls.NAME_CACHE_TTL)
+
+    WIKI_TEMPLATE_CACHE = {}
+
+    @classmethod
+    def get_wiki_template(cls, owner_id):
+        """Gets the title and markdown of an entity's root wiki, to copy into other entities.
+
+        The wiki's markdown is cached by its markdown file handle ID for the life of the container. Each call only
+        gets the wiki's metadata, and the markdown is only downloaded again when its file handle has changed.
+
+        Args:
+            owner_id: The ID of the entity that owns the wiki.
+
+        Returns:
+            Dict with the wiki's id, etag, title, markdown and attachmentFileHandleIds.
+        """
+        wiki = Synapse.client().restGET('/entity/{0}/wiki2'.format(owner_id))
+
+        with cls._cache_lock:
+            cached = cls.WIKI_TEMPLATE_CACHE.get(owner_id)
+
+        if cached is not None and cached['etag'] == wiki.get('etag'):
+            return cached
+
+        if cached is not None and cached['markdownFileHandleId'] == wiki.get('markdownFileHandleId'):
+            markdown = cached['markdown']
+        else:
+            markdown = cls._download_wiki_markdown(wiki)
+
+        cached = {
+            'id': wiki.get('id'),
+            'etag': wiki.get('etag'),
+            'title': wiki.get('title'),
+            'markdown': markdown,
+            'markdownFileHandleId': wiki.get('markdownFileHandleId'),
+            'attachmentFileHandleIds': list(wiki.get('attachmentFileHandleIds') or [])
+        }
+        with cls._cache_lock:
+            cls.WIKI_TEMPLATE_CACHE[owner_id] = cached
+
+        return cached
+
+    @classmethod
+    def _download_wiki_markdown(cls, wiki):
+        # The same download as getWiki, without getting the wiki's metadata again.
+        client = Synapse.client()
+        handle_id = wiki['markdownFileHandleId']
+        path = client.cache.get(handle_id)
+        if not path:
+            cache_dir = client.cache.get_cache_dir(handle_id)
+            os.makedirs(cache_dir, exist_ok=True)
+            path = client._downloadFileHandle(handle_id, wiki['id'], 'WikiMarkdown',
+                                              os.path.join(cache_dir, '{0}.md'.format(handle_id)))
+        try:
+            with gzip.open(path) as f:
+                return f.read().decode('utf-8')
+        except IOError:
+            with open(path, mode='rb') as f:
+                return f.read().decode('utf-8')
+
     @classmethod
     def build_syn_table_row(cls, syn_table_id, row_data):
         """Builds an array of row values for a Synapse Table.
@@ -91,11 +930,7 @@ class Synapse:
         Returns:
             Array
         """
-        if syn_table_id not in cls.TABLE_COL_CACHE:
-            cls.TABLE_COL_CACHE[syn_table_id] = [c['name'] for c in
-                                                 list(Synapse.client().getTableColumns(syn_table_id))]
-
-        table_columns = cls.TABLE_COL_CACHE[syn_table_id]
+        table_columns = cls.get_table_columns(syn_table_id)
 
         # Make sure the specified fields exist in the table.
         for column in row_data:
@@ -0,0 +1,177 @@
+import time
+import threading
+from .exceptions import SynapseUnavailableError
+from .log import logger
+
+
+class SynapseClientPool:
+    """A bounded pool of synapseclients for servers that handle requests on several threads (e.g., gunicorn threads).
+
+    A synapseclient keeps per-instance state (its requests session, cache and credentials) that is not safe to share
+    between threads making calls at the same time, so each request checks out its own client and checks it back in
+    when it is done. Clients are created as they are needed, up to max_size. When all of them are checked out,
+    checkout() waits up to checkout_timeout seconds for one to be checked in.
+
+    Clients that failed to connect, or that are older than max_age_seconds, are discarded when they are checked in
+    so the next checkout gets a new client (with a new connection pool).
+    """
+
+    MAX_SIZE = 8
+    CHECKOUT_TIMEOUT = 30
+    MAX_AGE_SECONDS = 3600
+
+    def __init__(self, factory, max_size=None, checkout_timeout=None, max_age_seconds=None):
+        """Instantiates a new instance. Any argument not set uses the class default.
+
+        Args:
+            factory: The function that creates a logged in synapseclient.
+            max_size: The most clients in the pool (checked out or idle).
+            checkout_timeout: Seconds to wait for a client when all of them are checked out.
+            max_age_seconds: Seconds a client is reused before it is replaced.
+        """
+        self.factory = factory
+        self.max_size = max_size or self.MAX_SIZE
+        self.checkout_timeout = self.CHECKOUT_TIMEOUT if checkout_timeout is None else checkout_timeout
+        self.max_age_seconds = max_age_seconds or self.MAX_AGE_SECONDS
+
+        self._condition = threading.Condition()
+        self._idle = []
+        self._created_at = {}
+        self._creating = 0
+        self._closed = False
+        self._metrics = {'created': 0, 'discarded': 0, 'checkouts': 0, 'wait_seconds': 0.0}
+
+    def checkout(self):
+        """Gets an idle client, creates one if the pool is not full or waits for one to be checked in.
+
+        Returns:
+            A synapseclient.
+
+        Raises:
+            SynapseUnavailableError: All the clients stayed checked out for checkout_timeout seconds.
+        """
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise SynapseUnavailableError('The Synapse client pool is closed.')
+
+                if self._idle:
+                    client = self._idle.pop()
+                    self._count_checkout(start)
+                    return client
+
+                if len(self._created_at) + self._creating < self.max_size:
+                    self._creating += 1
+                    self._count_checkout(start)
+                    break
+
+                remaining = self.checkout_timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    raise SynapseUnavailableError(
+                        'All {0} Synapse clients are busy. Try again later.'.format(self.max_size))
+                self._condition.wait(remaining)
+
+        # Created outside the lock since logging in makes a call to Synapse.
+        try:
+            client = self.factory()
+        except Exception:
+            with self._condition:
+                self._creating -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._creating -= 1
+            self._created_at[id(client)] = time.monotonic()
+            self._metrics['created'] += 1
+        return client
+
+    def checkin(self, client, healthy=True):
+        """Returns a checked out client to the pool.
+
+        Args:
+            client: The client from checkout().
+            healthy: False if the client failed to connect to Synapse, so it is replaced.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            if id(client) not in self._created_at:
+                return
+
+            if self._closed or not healthy or getattr(client, '_connection_failed', False) or self._expired(client):
+                self._discard(client)
+            else:
+                self._idle.append(client)
+            self._condition.notify()
+
+    def check_health(self, ping):
+        """Calls a function with each idle client and discards the clients it raises for.
+
+        Args:
+            ping: The function to call with a client (e.g., one that gets the user's profile).
+
+        Returns:
+            The number of clients discarded.
+        """
+        with self._condition:
+            clients, self._idle = self._idle, []
+
+        discarded = 0
+        for client in clients:
+            try:
+                ping(client)
+                healthy = True
+            except Exception as ex:
+                logger.warning('Discarding an unhealthy Synapse client: {0}'.format(ex))
+                healthy = False
+                discarded += 1
+            self.checkin(client, healthy=healthy)
+
+        return discarded
+
+    def close(self):
+        """Discards the idle clients. Clients checked out are discarded when they are checked in.
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self._closed = True
+            for client in self._idle:
+                self._discard(client)
+            self._idle = []
+            self._condition.notify_all()
+
+    def metrics(self):
+        """Gets the size of the pool and how it was used.
+
+        Returns:
+            Dict
+        """
+        with self._condition:
+            return dict(self._metrics,
+                        size=len(self._created_at),
+                        idle=len(self._idle),
+                        in_use=len(self._created_at) - len(self._idle),
+                        max_size=self.max_size)
+
+    def _count_checkout(self, start):
+        self._metrics['checkouts'] += 1
+        self._metrics['wait_seconds'] += time.monotonic() - start
+
+    def _expired(self, client):
+        return time.monotonic() - self._created_at[id(client)] >= self.max_age_seconds
+
+    def _discard(self, client):
+        self._created_at.pop(id(client), None)
+        self._metrics['discarded'] += 1
+
+        session = getattr(client, '_requests_session', None)
+        if session is not None:
+            try:
+                session.close()
+            except Exception as ex:
+                logger.warning('Failed to close a Synapse client session: {0}'.format(ex))
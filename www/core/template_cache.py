@@ -0,0 +1,64 @@
+import os
+import errno
+import tempfile
+from hashlib import sha1
+from jinja2 import BytecodeCache
+
+
+class TemplateBytecodeCache(BytecodeCache):
+    """Jinja bytecode cache that loads the templates compiled by scripts/build_template_cache.py.
+
+    Cached templates are keyed by the template name instead of its absolute path, so the templates compiled when
+    packaging are used on Lambda. Jinja checks the source checksum and the Python version of a cached template
+    before using it, and compiles the template from the file system when it is missing or out of date.
+    Templates compiled at runtime are written to a temp directory because the package is read-only on Lambda.
+    """
+
+    # The directory the build step writes the compiled templates to. Packaged with the function.
+    PACKAGED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'template_cache')
+
+    def __init__(self, directory=None, packaged_dir=None):
+        """Instantiates a new instance.
+
+        Args:
+            directory: The directory to write compiled templates to. Defaults to a directory in the temp directory.
+            packaged_dir: The directory to load the packaged templates from. Defaults to PACKAGED_DIR.
+        """
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'template_cache')
+        self.packaged_dir = packaged_dir or self.PACKAGED_DIR
+
+    def get_cache_key(self, name, filename=None):
+        return sha1(name.encode('utf-8')).hexdigest()
+
+    def load_bytecode(self, bucket):
+        for directory in [self.directory, self.packaged_dir]:
+            path = self._get_path(directory, bucket)
+            if not os.path.isfile(path):
+                continue
+
+            with open(path, 'rb') as f:
+                bucket.load_bytecode(f)
+
+            if bucket.code is not None:
+                return
+
+    def dump_bytecode(self, bucket):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._get_path(self.directory, bucket), 'wb') as f:
+                bucket.write_bytecode(f)
+        except OSError as ex:
+            # The template still renders, it is just compiled again by the next cold start.
+            if ex.errno not in [errno.EACCES, errno.EROFS, errno.ENOSPC]:
+                raise
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.cache'):
+                os.remove(os.path.join(self.directory, filename))
+
+    def _get_path(self, directory, bucket):
+        return os.path.join(directory, '{0}.cache'.format(bucket.key))
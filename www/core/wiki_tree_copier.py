@@ -0,0 +1,108 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from .synapse import Synapse
+from .lazy import lazy_import
+
+synapseutils = lazy_import('synapseutils')
+
+
+class WikiTreeCopier:
+    """Copies an entity's wiki, with its sub-pages and attachments, to another entity.
+
+    The sub-page markdown and the attachments are copied by copying their file handles on the server, so no files are
+    downloaded or uploaded. The root page's markdown comes from Synapse.get_wiki_template (cached per etag).
+    The pages of each level of the tree are created at the same time.
+
+    Links in the markdown to other pages of the source wiki still point to the source wiki.
+    """
+
+    # The most pages created at the same time.
+    MAX_WORKERS = 8
+
+    # The number of wiki headers to get per call.
+    HEADER_PAGE_SIZE = 100
+
+    def __init__(self, source_owner_id, target_owner_id, max_workers=None):
+        """Instantiates a new instance.
+
+        Args:
+            source_owner_id: The ID of the entity whose wiki is copied.
+            target_owner_id: The ID of the entity to copy the wiki to. It must not have a wiki.
+            max_workers: The most pages created at the same time. Defaults to MAX_WORKERS.
+        """
+        self.source_owner_id = source_owner_id
+        self.target_owner_id = target_owner_id
+        self.max_workers = max_workers or self.MAX_WORKERS
+
+    def execute(self):
+        """Copies the wiki.
+
+        Returns:
+            Dict of the new page IDs by source page ID.
+        """
+        root = Synapse.get_wiki_template(self.source_owner_id)
+        headers = [h for h in self._get_headers() if h['id'] != root['id']]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pages = {p['id']: p for p in executor.map(self._get_page, [h['id'] for h in headers])}
+            new_handle_ids = self._copy_file_handles(root, pages.values())
+
+            new_root = self._post('/entity/{0}/wiki'.format(self.target_owner_id), {
+                'title': root['title'],
+                'markdown': root['markdown'],
+                'attachmentFileHandleIds': [new_handle_ids[h] for h in root['attachmentFileHandleIds']]
+            })
+            new_ids = {root['id']: new_root['id']}
+
+            # Create the pages a level at a time, since each page needs its parent's new ID.
+            level = [h['id'] for h in headers if h.get('parentId') == root['id']]
+            while level:
+                created = executor.map(lambda page_id: self._create_page(pages[page_id], new_ids, new_handle_ids),
+                                       level)
+                new_ids.update(zip(level, [p['id'] for p in created]))
+                level = [h['id'] for h in headers if h.get('parentId') in level]
+
+        return new_ids
+
+    def _get_headers(self):
+        headers = []
+        while True:
+            page = Synapse.client().restGET('/entity/{0}/wikiheadertree?limit={1}&offset={2}'.format(
+                self.source_owner_id, self.HEADER_PAGE_SIZE, len(headers)))
+            headers += page['results']
+            if not page['results'] or len(headers) >= page.get('totalNumberOfResults', 0):
+                return headers
+
+    def _get_page(self, page_id):
+        return Synapse.client().restGET('/entity/{0}/wiki2/{1}'.format(self.source_owner_id, page_id))
+
+    def _copy_file_handles(self, root, pages):
+        to_copy = [(h, 'WikiAttachment', root['id']) for h in root['attachmentFileHandleIds']]
+        for page in pages:
+            to_copy.append((page['markdownFileHandleId'], 'WikiMarkdown', page['id']))
+            to_copy += [(h, 'WikiAttachment', page['id']) for h in page.get('attachmentFileHandleIds') or []]
+
+        if not to_copy:
+            return {}
+
+        handle_ids, object_types, object_ids = zip(*to_copy)
+        results = synapseutils.copyFileHandles(Synapse.client(), list(handle_ids), list(object_types),
+                                               list(object_ids))
+
+        failed = [r for r in results if r.get('failureCode')]
+        if failed:
+            raise Exception('Failed to copy wiki file handles: {0}'.format(
+                ', '.join('{0} ({1})'.format(r['originalFileHandleId'], r['failureCode']) for r in failed)))
+
+        return {r['originalFileHandleId']: r['newFileHandle']['id'] for r in results}
+
+    def _create_page(self, page, new_ids, new_handle_ids):
+        return self._post('/entity/{0}/wiki2'.format(self.target_owner_id), {
+            'title': page.get('title'),
+            'parentWikiId': new_ids[page['parentWikiId']],
+            'markdownFileHandleId': new_handle_ids[page['markdownFileHandleId']],
+            'attachmentFileHandleIds': [new_handle_ids[h] for h in page.get('attachmentFileHandleIds') or []]
+        })
+
+    def _post(self, uri, body):
+        return Synapse.client().restPOST(uri, body=json.dumps(body))
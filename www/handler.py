@@ -0,0 +1,20 @@
+import wsgi_handler
+from www.core.continuation import Continuation
+
+WARMUP_EVENT_KEY = 'warmup'
+
+
+def handler(event, context):
+    """The Lambda handler.
+
+    Continuation events (sent by the function to itself) continue a deferred service operation,
+    scheduled warmup events warm the container, everything else is a web request handled by the Flask app.
+    """
+    if event.get(WARMUP_EVENT_KEY):
+        from www.services.warmup_service import WarmupService
+        return WarmupService().execute().to_dict()
+
+    if Continuation.EVENT_KEY in event:
+        return Continuation.handle_event(event, context)
+
+    return wsgi_handler.handler(event, context)
@@ -3,15 +3,49 @@ from oauthlib.oauth2 import WebApplicationClient
 from flask import Flask
 from flask_talisman import Talisman
 from www.models import User
+import os
 import www.config as config
-from www.core import Env
+from sls_tools.param_store import ParamStore
+from www.core import Env, Synapse
+from www.core.startup import Startup
+from www.core.template_cache import TemplateBytecodeCache
+from www.core.responses import ResponseOptimizer
 
 # Load the config if running an applicable environment.
 config.load_local_if_applicable()
 
+# Start the independent network calls now and only wait for them where their results are used.
+startup = Startup()
+
+# On Lambda the first requests also need the Synapse login and the Google auth provider configuration.
+# Locally they are left to the requests that use them.
+prefetch = bool(os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+# The values read from SSM while the app starts. The FLASK_* flags are only read from the OS environment.
+STARTUP_SSM_KEYS = ['SECRET_KEY', 'GOOGLE_CLIENT_ID']
+PREFETCH_SSM_KEYS = ['SYNAPSE_USERNAME', 'SYNAPSE_PASSWORD', 'GOOGLE_DISCOVERY_URL']
+
+# boto3 clients are not safe to create from several threads at once,
+# so the SSM client is created before the tasks that read from SSM run.
+if any(key not in os.environ for key in STARTUP_SSM_KEYS + (PREFETCH_SSM_KEYS if prefetch else [])):
+    startup.start('ssm_client', ParamStore._get_ssm_client)
+
+startup.start('secret_key', Env.SECRET_KEY, requires=['ssm_client'])
+startup.start('auth_client', lambda: WebApplicationClient(Env.GOOGLE_CLIENT_ID()), requires=['ssm_client'])
+
+if prefetch:
+    from www.services.auth_service import AuthService
+
+    startup.start('synapse_client', Synapse.client, requires=['ssm_client'])
+    startup.start('google_provider_config', AuthService.get_google_provider_config, requires=['ssm_client'])
+
 # Flask app setup.
 app = Flask(__name__)
 Talisman(app)
+ResponseOptimizer.init_app(app)
+
+# Load the templates compiled by scripts/build_template_cache.py instead of compiling them on the first render.
+app.jinja_options = dict(app.jinja_options, bytecode_cache=TemplateBytecodeCache())
 
 # User session management setup.
 login_manager = LoginManager()
@@ -19,8 +53,10 @@ login_manager.login_view = 'login'
 login_manager.refresh_view = 'login'
 login_manager.session_protection = "strong"
 
-# OAuth 2 client setup.
-auth_client = WebApplicationClient(Env.GOOGLE_CLIENT_ID())
+
+def get_auth_client():
+    """Gets the OAuth 2 client, waiting for it to be created if the app is still starting."""
+    return startup.result('auth_client')
 
 
 def init_all():
@@ -31,7 +67,6 @@ def init_all():
 
 
 with app.app_context():
-    app.secret_key = Env.SECRET_KEY()
     app.testing = Env.FLASK_TESTING()
     app.config['LOGIN_DISABLED'] = Env.FLASK_LOGIN_DISABLED()
     app.debug = Env.FLASK_DEBUG()
@@ -41,6 +76,21 @@ with app.app_context():
     # Load the views AFTER the app has been instantiated.
     import www.views
 
+    # Read while the views were loading.
+    app.secret_key = startup.result('secret_key')
+
+
+# Each request gets its own Synapse client when the server handles requests on several threads
+# (see: Env.SYNAPSE_CLIENT_POOL_SIZE). Does nothing on Lambda.
+@app.before_request
+def checkout_synapse_client():
+    Synapse.checkout()
+
+
+@app.teardown_request
+def checkin_synapse_client(exc):
+    Synapse.checkin(exc)
+
 
 # Flask-Login helper to retrieve a User object.
 @login_manager.user_loader
@@ -1,2 +1,3 @@
 from .auth_service import AuthService
 from www.services.synapse_space.encrypt_space_service import EncryptSpaceService
+from www.services.synapse_space.audit_index_service import AuditIndexService
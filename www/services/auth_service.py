@@ -3,6 +3,8 @@ from www.core import Env, AuthEmailNotVerifiedError, AuthForbiddenError, AuthLog
 from www.models import User
 from www.core.log import logger
 import json
+import time
+import threading
 import requests
 from flask_login import login_user, logout_user
 
@@ -27,7 +29,7 @@ class AuthService:
 
         # Use library to construct the request for Google login and provide
         # scopes that let you retrieve user's profile from Google
-        request_uri = server.auth_client.prepare_request_uri(
+        request_uri = server.get_auth_client().prepare_request_uri(
             authorization_endpoint,
             redirect_uri=request_base_url + "/callback",
             scope=["openid", "email", "profile"],
@@ -55,7 +57,7 @@ class AuthService:
         token_endpoint = google_provider_cfg["token_endpoint"]
 
         # Prepare and send a request to get tokens.
-        token_url, headers, body = server.auth_client.prepare_token_request(
+        token_url, headers, body = server.get_auth_client().prepare_token_request(
             token_endpoint,
             authorization_response=request_url,
             redirect_url=request_base_url,
@@ -69,13 +71,13 @@ class AuthService:
         )
 
         # Parse the tokens
-        server.auth_client.parse_request_body_response(json.dumps(token_response.json()))
+        server.get_auth_client().parse_request_body_response(json.dumps(token_response.json()))
 
         # Now that we have tokens let's find and hit the URL
         # from Google that gives the user's profile information,
         # including their Google profile image and email.
         userinfo_endpoint = google_provider_cfg["userinfo_endpoint"]
-        uri, headers, body = server.auth_client.add_token(userinfo_endpoint)
+        uri, headers, body = server.get_auth_client().add_token(userinfo_endpoint)
         userinfo_response = requests.get(uri, headers=headers, data=body)
 
         res_json = userinfo_response.json()
@@ -134,11 +136,28 @@ class AuthService:
         """
         return logout_user()
 
+    # How long (in seconds) to cache the Google auth provider configuration.
+    GOOGLE_PROVIDER_CONFIG_TTL = 3600
+
+    _google_provider_config = None
+    _google_provider_config_expires = 0
+    _google_provider_config_lock = threading.Lock()
+
     @classmethod
     def get_google_provider_config(cls):
         """Gets the Google auth provider configuration.
 
+        The configuration rarely changes so it is cached for GOOGLE_PROVIDER_CONFIG_TTL seconds.
+        Callers wait for a fetch that is already running (e.g., started by www/server.py) instead of fetching again.
+
         Returns:
             Google config has a hash.
         """
-        return requests.get(Env.GOOGLE_DISCOVERY_URL()).json()
+        with cls._google_provider_config_lock:
+            if cls._google_provider_config is None or time.monotonic() >= cls._google_provider_config_expires:
+                response = requests.get(Env.GOOGLE_DISCOVERY_URL())
+                response.raise_for_status()
+                cls._google_provider_config = response.json()
+                cls._google_provider_config_expires = time.monotonic() + cls.GOOGLE_PROVIDER_CONFIG_TTL
+
+        return cls._google_provider_config
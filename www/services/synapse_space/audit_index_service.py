@@ -0,0 +1,296 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from www.core import Env
+from www.core.log import logger
+from www.core.synapse import Synapse
+from www.core.lazy import lazy_import
+
+syn = lazy_import('synapseclient')
+
+
+class AuditIndexService:
+    """Maintains a searchable index of the operation log files written to SYNAPSE_SPACE_LOG_FOLDER_ID.
+
+    The index is kept in memory and persisted to the local temp directory so warm (and re-started) containers
+    only need to download the log files that were written since the last refresh. A copy is also stored in the
+    log folder (as SHARED_INDEX_FILE_NAME) so new containers start from the shared copy instead of downloading
+    every log file.
+
+    Each refresh downloads at most MAX_FILES_PER_REFRESH log files for up to REFRESH_SECONDS, the remaining files
+    are added by the following refreshes.
+    """
+
+    # Maps the log file name suffix to the operation type.
+    OPERATIONS = {
+        '_dca_create_space.json': 'dca',
+        '_basic_create_space.json': 'basic',
+        '_daa_grant_access.json': 'daa'
+    }
+
+    OPERATION_NAMES = {
+        'dca': 'Create Synapse Space (DCA)',
+        'basic': 'Create Synapse Space (Basic)',
+        'daa': 'Grant Synapse Access (DAA)'
+    }
+
+    # How long (in seconds) to wait before checking the log folder for new log files.
+    REFRESH_INTERVAL = 60
+
+    # The most log files to download in one refresh.
+    MAX_FILES_PER_REFRESH = 100
+
+    # The longest (in seconds) one refresh will spend downloading log files.
+    REFRESH_SECONDS = 10
+
+    # Save the index after this many log files are added so the work is kept if the request times out.
+    SAVE_EVERY = 10
+
+    # The name of the index file stored in the log folder.
+    SHARED_INDEX_FILE_NAME = '_audit_index.json'
+
+    INDEX_DIR = os.path.join(tempfile.gettempdir(), 'synapseAuditIndex')
+
+    _index = None
+    _last_refresh = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def query(cls, search=None, operation=None, page=1, per_page=25):
+        """Searches the audit index.
+
+        Args:
+            search: Text to match against the institution, project, team, data collection, user and comments.
+            operation: Only include entries for this operation type (dca, basic, daa).
+            page: The page of results to return (1 based).
+            per_page: The number of results per page.
+
+        Returns:
+            List of matching entries for the page and the total number of matching entries.
+        """
+        entries = cls.entries()
+
+        if operation:
+            entries = [e for e in entries if e['operation'] == operation]
+
+        if search:
+            terms = search.lower().split()
+            entries = [e for e in entries if all(term in e['search_text'] for term in terms)]
+
+        page = max(page or 1, 1)
+        start = (page - 1) * per_page
+        return entries[start:start + per_page], len(entries)
+
+    @classmethod
+    def entries(cls, refresh=True):
+        """Gets all the entries in the audit index, newest first.
+
+        Args:
+            refresh: Whether to check the log folder for new log files if the refresh interval has passed.
+
+        Returns:
+            List of entries.
+        """
+        with cls._lock:
+            folder_id = Env.SYNAPSE_SPACE_LOG_FOLDER_ID()
+
+            if not folder_id:
+                logger.warning(
+                    'Environment Variable: SYNAPSE_SPACE_LOG_FOLDER_ID not set. Audit index will be empty.')
+                return []
+
+            if cls._index is None or cls._index.get('folder_id') != folder_id:
+                cls._index = cls._load(folder_id)
+                cls._last_refresh = None
+
+            if refresh and (cls._last_refresh is None or time.time() - cls._last_refresh >= cls.REFRESH_INTERVAL):
+                cls._refresh(folder_id)
+
+            return cls._index['sorted']
+
+    @classmethod
+    def clear(cls):
+        """Clears the in-memory and on-disk index."""
+        with cls._lock:
+            cls._index = None
+            cls._last_refresh = None
+            shutil.rmtree(cls.INDEX_DIR, ignore_errors=True)
+
+    @classmethod
+    def _refresh(cls, folder_id):
+        """Adds the log files in the folder that are not already in the index.
+
+        If there are more log files than one refresh can download the refresh interval is not started
+        so the next request continues adding them.
+        """
+        entries = cls._index['entries']
+        new_files = []
+
+        for child in Synapse.client().getChildren(folder_id, includeTypes=['file']):
+            if child['id'] not in entries and cls._get_operation(child['name']):
+                new_files.append(child)
+
+        processed = 0
+        added = 0
+
+        if new_files:
+            logger.info('Adding {0} log file(s) to the audit index for folder: {1}'.format(len(new_files), folder_id))
+            started = time.time()
+            tmp_dir = tempfile.mkdtemp()
+            try:
+                for child in new_files[:cls.MAX_FILES_PER_REFRESH]:
+                    if time.time() - started >= cls.REFRESH_SECONDS:
+                        break
+                    processed += 1
+                    try:
+                        syn_file = Synapse.client().get(child['id'], downloadLocation=tmp_dir)
+                        with open(syn_file.path, mode='r') as f:
+                            data = json.loads(f.read())
+                        entries[child['id']] = cls._build_entry(child['id'], child['name'], data)
+                        added += 1
+                    except Exception as ex:
+                        logger.exception(ex)
+
+                    if added and added % cls.SAVE_EVERY == 0:
+                        cls._save(folder_id)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            if added:
+                cls._sort()
+                cls._save(folder_id)
+                cls._save_shared(folder_id)
+
+        if processed < len(new_files):
+            logger.info('{0} log file(s) left to add to the audit index for folder: {1}'.format(
+                len(new_files) - processed, folder_id))
+            cls._last_refresh = None
+        else:
+            cls._last_refresh = time.time()
+
+    @classmethod
+    def _get_operation(cls, file_name):
+        return next((op for suffix, op in cls.OPERATIONS.items() if file_name.endswith(suffix)), None)
+
+    @classmethod
+    def _build_entry(cls, file_id, file_name, data):
+        """Builds an index entry from the contents of a log file."""
+        parameters = data.get('parameters') or {}
+        project = data.get('project') or {}
+        team = data.get('team') or {}
+
+        try:
+            created_on = datetime.strptime(file_name[:22], '%Y%m%d_%H%M%S_%f').isoformat()
+        except ValueError:
+            created_on = None
+
+        entry = {
+            'id': file_id,
+            'name': file_name,
+            'operation': cls._get_operation(file_name),
+            'created_on': created_on,
+            'user': parameters.get('user'),
+            'institution_name': parameters.get('institution_name'),
+            'institution_short_name': parameters.get('institution_short_name'),
+            'data_collection_name': parameters.get('data_collection_name'),
+            'comments': parameters.get('comments'),
+            'project_id': project.get('id'),
+            'project_name': project.get('name') or parameters.get('project_name'),
+            'team_id': team.get('id'),
+            'team_name': team.get('name') or parameters.get('team_name'),
+            'errors': len(data.get('errors') or []),
+            'warnings': len(data.get('warnings') or [])
+        }
+
+        entry['search_text'] = ' '.join(str(entry[key]) for key in [
+            'id',
+            'user',
+            'institution_name',
+            'institution_short_name',
+            'data_collection_name',
+            'comments',
+            'project_id',
+            'project_name',
+            'team_id',
+            'team_name'
+        ] if entry[key] is not None).lower()
+
+        return entry
+
+    @classmethod
+    def _sort(cls):
+        cls._index['sorted'] = sorted(cls._index['entries'].values(),
+                                      key=lambda e: e['created_on'] or '',
+                                      reverse=True)
+
+    @classmethod
+    def _index_path(cls, folder_id):
+        return os.path.join(cls.INDEX_DIR, '{0}.json'.format(folder_id))
+
+    @classmethod
+    def _load(cls, folder_id):
+        """Loads the index for a folder from disk, from the log folder or starts a new one."""
+        cls._index = {'folder_id': folder_id, 'entries': {}}
+        path = cls._index_path(folder_id)
+
+        try:
+            if os.path.isfile(path):
+                with open(path, mode='r') as f:
+                    cls._index['entries'] = json.loads(f.read())
+            else:
+                cls._index['entries'] = cls._load_shared(folder_id)
+        except Exception as ex:
+            logger.exception(ex)
+
+        cls._sort()
+        return cls._index
+
+    @classmethod
+    def _save(cls, folder_id):
+        """Writes the index for a folder to disk."""
+        try:
+            os.makedirs(cls.INDEX_DIR, exist_ok=True)
+            path = cls._index_path(folder_id)
+            tmp_path = '{0}.tmp'.format(path)
+            with open(tmp_path, mode='w') as f:
+                f.write(json.dumps(cls._index['entries']))
+            os.replace(tmp_path, path)
+        except Exception as ex:
+            logger.exception(ex)
+
+    @classmethod
+    def _load_shared(cls, folder_id):
+        """Loads the entries from the index file in the log folder."""
+        syn_file_id = Synapse.client().findEntityId(cls.SHARED_INDEX_FILE_NAME, parent=folder_id)
+        if not syn_file_id:
+            return {}
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            syn_file = Synapse.client().get(syn_file_id, downloadLocation=tmp_dir)
+            with open(syn_file.path, mode='r') as f:
+                entries = json.loads(f.read())
+            # Keep a local copy so re-started containers don't download it again.
+            cls._index['entries'] = entries
+            cls._save(folder_id)
+            return entries
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def _save_shared(cls, folder_id):
+        """Writes the index to the log folder so other containers can load it."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(tmp_dir, cls.SHARED_INDEX_FILE_NAME)
+            with open(file_path, mode='w') as f:
+                f.write(json.dumps(cls._index['entries']))
+            Synapse.client().store(syn.File(file_path, parent=folder_id))
+        except Exception as ex:
+            logger.exception(ex)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
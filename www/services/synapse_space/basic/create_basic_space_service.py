@@ -2,15 +2,33 @@ import os
 import json
 import shutil
 import tempfile
-from datetime import datetime
-from www.core import Env
+from www.core import Env, SynapseUnavailableError
 from www.core.log import logger
 from www.core.synapse import Synapse
-import synapseclient as syn
+from www.core.checkpoint import CheckpointedService
+from www.core.metrics import timed_step
+from www.core.lazy import lazy_import
 
+syn = lazy_import('synapseclient')
 
-class CreateBasicSpaceService:
-    def __init__(self, config_id, project_name, user_identifier, team_name=None, comments=None):
+
+class CreateBasicSpaceService(CheckpointedService):
+    """Creates a new blank Synapse space."""
+
+    OPERATION_NAME = 'Basic Create Space'
+
+    STEPS = [
+        ('create_project', []),
+        ('set_storage_location', ['create_project']),
+        ('create_team', ['create_project']),
+        ('assign_team_to_project', ['create_team'])
+    ]
+
+    PARAMETERS = ['config_id', 'project_name', 'user_identifier', 'team_name', 'comments']
+    STATE_FIELDS = ['project', 'team']
+
+    def __init__(self, config_id, project_name, user_identifier, team_name=None, comments=None, operation_id=None,
+                 deadline=None):
         """Instantiates a new instance.
 
         Args:
@@ -19,54 +37,20 @@ class CreateBasicSpaceService:
             user_identifier: The identifier (id, email, etc.) of the user creating the space.
             team_name: Name of the Synapse team to create and share on the project.
             comments: Open comments field.
+            operation_id: The ID used to checkpoint the operation. A new ID is generated if not set.
+            deadline: The Deadline to finish by. Steps that cannot finish in time are continued in the background.
         """
-
-        self.start_time = datetime.now()
+        super().__init__(operation_id=operation_id, deadline=deadline)
         self.config_id = config_id
-        self.config = None
         self.project_name = project_name
         self.team_name = team_name
         self.user_identifier = user_identifier
         self.comments = comments
-        self.project = None
-        self.team = None
-        self.errors = []
-        self.warnings = []
-
-    def execute(self):
-        """Creates a new blank Synapse space.
-
-        This method does not do validation. It expects all validation to have been done and passed already.
-
-        Returns:
-            Self
-        """
-        self.config = Env.SYNAPSE_SPACE_BASIC_CREATE_CONFIG_by_id(self.config_id)
-        if self.config is None:
-            raise Exception('Basic Create Space config not found for ID: {0}'.format(self.config_id))
-
-        self.project = None
-        self.team = None
-        self.errors = []
-        self.warnings = []
-
-        if not self._create_project():
-            self._write_synapse_log_file()
-            return self
-
-        self._set_storage_location()
-
-        if self._create_team():
-            self._assign_team_to_project()
-
-        self._write_synapse_log_file()
-
-        return self
 
-    def _add_warning(self, msg):
-        logger.warning(msg)
-        self.warnings.append(msg)
+    def _get_config(self):
+        return Env.SYNAPSE_SPACE_BASIC_CREATE_CONFIG_by_id(self.config_id)
 
+    @timed_step
     def _write_synapse_log_file(self):
         errors = []
         try:
@@ -77,6 +61,7 @@ class CreateBasicSpaceService:
 
                 try:
                     data = {
+                        'operation_id': self.operation_id,
                         'parameters': {
                             'user': self.user_identifier,
                             'project_name': self.project_name,
@@ -94,6 +79,7 @@ class CreateBasicSpaceService:
                             'id': self.team.id if self.team else None,
                             'name': self.team.name if self.team else None
                         },
+                        'steps': self.steps,
                         'warnings': self.warnings,
                         'errors': self.errors
                     }
@@ -119,6 +105,7 @@ class CreateBasicSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
     def _create_project(self):
         errors = []
         error = self.Validations.validate_project_name(self.project_name)
@@ -136,6 +123,7 @@ class CreateBasicSpaceService:
         self.errors += errors
         return self.project and not errors
 
+    @timed_step
     def _set_storage_location(self):
         errors = []
         try:
@@ -156,6 +144,7 @@ class CreateBasicSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
     def _create_team(self):
         errors = []
         if self.team_name:
@@ -170,6 +159,7 @@ class CreateBasicSpaceService:
         self.errors += errors
         return self.team and not errors
 
+    @timed_step
     def _assign_team_to_project(self):
         errors = []
         try:
@@ -197,11 +187,10 @@ class CreateBasicSpaceService:
 
             error = None
             try:
-                syn_project_id = Synapse.client().findEntityId(project_name)
-                if syn_project_id:
-                    project = Synapse.client().get(syn.Project(id=syn_project_id))
-                    if project:
-                        error = 'Project with name: "{0}" already exists.'.format(project_name)
+                if Synapse.project_name_taken(project_name):
+                    error = 'Project with name: "{0}" already exists.'.format(project_name)
+            except SynapseUnavailableError as ex:
+                error = str(ex)
             except Exception as ex:
                 logger.exception(ex)
                 error = 'Error validating project name: {0}'.format(ex)
@@ -220,12 +209,10 @@ class CreateBasicSpaceService:
             """
             error = None
             try:
-                team = Synapse.client().getTeam(team_name)
-                if team:
+                if Synapse.team_name_taken(team_name):
                     error = 'Team with name: "{0}" already exists.'.format(team_name)
-            except ValueError:
-                # Can't find team error
-                pass
+            except SynapseUnavailableError as ex:
+                error = str(ex)
             except Exception as ex:
                 logger.exception(ex)
                 error = 'Error validating team name: {0}'.format(ex)
@@ -1,18 +1,47 @@
 import os
 import json
+import asyncio
 import shutil
 import tempfile
-from datetime import datetime
-from www.core import Env
+from www.core import Env, SynapseUnavailableError
 from www.core.log import logger
 from www.core.synapse import Synapse
-import synapseclient as syn
+from www.core.checkpoint import CheckpointedService
+from www.core.metrics import timed_step
+from www.core.lazy import lazy_import
 
+syn = lazy_import('synapseclient')
+
+
+class GrantDaaAccessService(CheckpointedService):
+    """Creates a new Synapse team for data access."""
+
+    OPERATION_NAME = 'DAA Grant Access'
+
+    STEPS = [
+        ('create_team', []),
+        ('grant_team_access', ['create_team']),
+        ('add_team_managers', ['create_team']),
+        ('invite_emails_to_team', ['create_team']),
+        # The table row needs the team ID.
+        ('update_access_agreement_table', ['create_team'])
+    ]
+
+    STEP_SECONDS = {
+        'grant_team_access': 3,
+        'invite_emails_to_team': 3,
+        'update_access_agreement_table': 5
+    }
+
+    PARAMETERS = ['config_id', 'team_name', 'institution_name', 'institution_short_name', 'data_collection_name',
+                  'user_identifier', 'agreement_url', 'emails', 'start_date', 'end_date', 'comments']
+    DATE_PARAMETERS = ['start_date', 'end_date']
+    STATE_FIELDS = ['team', 'data_collection']
 
-class GrantDaaAccessService:
     def __init__(self, config_id, team_name, institution_name, institution_short_name, data_collection_name,
                  user_identifier,
-                 agreement_url=None, emails=None, start_date=None, end_date=None, comments=None):
+                 agreement_url=None, emails=None, start_date=None, end_date=None, comments=None, operation_id=None,
+                 deadline=None):
         """Instantiates a new instance.
 
         Args:
@@ -27,11 +56,11 @@ class GrantDaaAccessService:
             start_date: The start date of the agreement.
             end_date: The end date of the agreement.
             comments: Open comments field.
+            operation_id: The ID used to checkpoint the operation. A new ID is generated if not set.
+            deadline: The Deadline to finish by. Steps that cannot finish in time are continued in the background.
         """
-
-        self.start_time = datetime.now()
+        super().__init__(operation_id=operation_id, deadline=deadline)
         self.config_id = config_id
-        self.config = None
         self.team_name = team_name
         self.institution_name = institution_name
         self.institution_short_name = institution_short_name
@@ -42,42 +71,11 @@ class GrantDaaAccessService:
         self.start_date = start_date
         self.end_date = end_date
         self.comments = comments
-        self.team = None
-        self.data_collection = None
-        self.errors = []
-        self.warnings = []
-
-    def execute(self):
-        """Creates a new Synapse team for data access.
-
-        This method does not do validation. It expects all validation to have been done and passed already.
-
-        Returns:
-            Self
-        """
-
-        self.config = Env.SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG_by_id(self.config_id)
-        if self.config is None:
-            raise Exception('DAA Grant Access config not found for ID: {0}'.format(self.config_id))
-        self.team = None
-        self.errors = []
-        self.warnings = []
-
-        if self._create_team():
-            self._grant_team_access()
-            self._add_team_managers()
-            self._invite_emails_to_team()
-
-        self._update_tracking_tables()
-
-        self._write_synapse_log_file()
 
-        return self
-
-    def _add_warning(self, msg):
-        logger.warning(msg)
-        self.warnings.append(msg)
+    def _get_config(self):
+        return Env.SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG_by_id(self.config_id)
 
+    @timed_step
     def _write_synapse_log_file(self):
         errors = []
         try:
@@ -88,6 +86,7 @@ class GrantDaaAccessService:
 
                 try:
                     data = {
+                        'operation_id': self.operation_id,
                         'parameters': {
                             'user': self.user_identifier,
                             'team_name': self.team_name,
@@ -107,6 +106,7 @@ class GrantDaaAccessService:
                             'name': self.team.name if self.team else None
                         },
                         'data_collection': self.data_collection,
+                        'steps': self.steps,
                         'warnings': self.warnings,
                         'errors': self.errors
                     }
@@ -132,6 +132,7 @@ class GrantDaaAccessService:
         self.errors += errors
         return not errors
 
+    @timed_step
     def _create_team(self):
         errors = []
         try:
@@ -145,6 +146,7 @@ class GrantDaaAccessService:
         self.errors += errors
         return self.team and not errors
 
+    @timed_step
     def _grant_team_access(self):
         errors = []
         try:
@@ -172,6 +174,35 @@ class GrantDaaAccessService:
         self.errors += errors
         return not errors
 
+    @timed_step
+    async def _grant_team_access_async(self):
+        errors = []
+        try:
+
+            if self.config.get('data_collections', None):
+                self.data_collection = Env.get_daa_grant_access_data_collection_by_name(self.config,
+                                                                                        self.data_collection_name)
+                name = self.data_collection['name']
+                ids = [c['id'] for c in self.data_collection['entities']]
+                permissions = {self.team.id: Synapse.CAN_DOWNLOAD_PERMS}
+
+                logger.info(
+                    'Granting team: {0} CAN DOWNLOAD permission to entities: {1} for data collection: {2}'.format(
+                        self.team.name, ids, name))
+                await asyncio.gather(*[self._async_client.set_permissions(syn_id, permissions)
+                                       for syn_id in dict.fromkeys(ids)])
+                logger.info('Team: {0} granted access to entities: {1}'.format(self.team.name, ids))
+            else:
+                self._add_warning(
+                    'Config Variable: data_collections not set. Data collection will not be shared with team.')
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error sharing data collection with team: {0}'.format(ex))
+
+        self.errors += errors
+        return not errors
+
+    @timed_step
     def _add_team_managers(self):
         errors = []
         try:
@@ -203,6 +234,34 @@ class GrantDaaAccessService:
         self.errors += errors
         return not errors
 
+    @timed_step
+    async def _add_team_managers_async(self):
+        errors = []
+        try:
+            user_ids = self.config.get('team_manager_user_ids', None)
+
+            if user_ids:
+                logger.info('Inviting users: {0} to team: {1}.'.format(user_ids, self.team.id))
+                await asyncio.gather(*[self._async_client.invite_to_team(self.team.id, user_id=user_id)
+                                       for user_id in user_ids])
+                logger.info('Users: {0} invited to team: {1}'.format(user_ids, self.team.id))
+
+                # One ACL update for all the managers, concurrent updates would overwrite each other.
+                logger.info('Setting users: {0} as managers on team: {1}.'.format(user_ids, self.team.id))
+                await self._async_client.set_team_permissions(
+                    self.team.id, {user_id: Synapse.TEAM_MANAGER_PERMS for user_id in user_ids})
+                logger.info('Users: {0} have been given manager access on team: {1}.'.format(user_ids, self.team.id))
+            else:
+                self._add_warning(
+                    'Config Variable: team_manager_user_ids not set. Team managers will not be added to the project team.')
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error adding managers to the team: {0}'.format(ex))
+
+        self.errors += errors
+        return not errors
+
+    @timed_step
     def _invite_emails_to_team(self):
         errors = []
         if self.emails:
@@ -224,14 +283,25 @@ class GrantDaaAccessService:
         self.errors += errors
         return not errors
 
-    def _update_tracking_tables(self):
-        result = False
-
-        if not self._update_access_agreement_table():
-            result = False
+    @timed_step
+    async def _invite_emails_to_team_async(self):
+        errors = []
+        if self.emails:
+            try:
+                logger.info('Inviting emails: {0} to team: {1}'.format(self.emails, self.team.id))
+                await asyncio.gather(*[self._async_client.invite_to_team(self.team.id, email=email)
+                                       for email in self.emails])
+                logger.info('Emails: {0} invited to team: {1}'.format(self.emails, self.team.id))
+            except Exception as ex:
+                logger.exception(ex)
+                errors.append('Error inviting emails to team: {0}'.format(ex))
+        else:
+            self._add_warning('No emails specified. No users will be invited to the team.')
 
-        return result
+        self.errors += errors
+        return not errors
 
+    @timed_step
     def _update_access_agreement_table(self):
         errors = []
         try:
@@ -276,12 +346,10 @@ class GrantDaaAccessService:
             """
             error = None
             try:
-                team = Synapse.client().getTeam(team_name)
-                if team:
+                if Synapse.team_name_taken(team_name):
                     error = 'Team with name: "{0}" already exists.'.format(team_name)
-            except ValueError:
-                # Can't find team error
-                pass
+            except SynapseUnavailableError as ex:
+                error = str(ex)
             except Exception as ex:
                 logger.exception(ex)
                 error = 'Error validating team name: {0}'.format(ex)
@@ -1,17 +1,57 @@
 import os
 import json
+import asyncio
 import shutil
 import tempfile
-from datetime import datetime
-from www.core import Env
+from www.core import Env, SynapseUnavailableError
 from www.core.log import logger
 from www.core.synapse import Synapse
-import synapseclient as syn
+from www.core.checkpoint import CheckpointedService
+from www.core.metrics import timed_step
+from www.core.lazy import lazy_import
+from www.core.wiki_tree_copier import WikiTreeCopier
+
+syn = lazy_import('synapseclient')
+
+
+class CreateDcaSpaceService(CheckpointedService):
+    """Creates a new Synapse space for data contribution."""
+
+    OPERATION_NAME = 'DCA Create Space'
+
+    STEPS = [
+        ('create_project', []),
+        ('set_storage_location', ['create_project']),
+        ('create_team', ['create_project']),
+        ('assign_team_to_project', ['create_team']),
+        ('add_team_managers', ['create_team']),
+        ('invite_emails_to_team', ['create_team']),
+        ('grant_team_access_to_entities', ['create_team']),
+        ('grant_principals_access_to_project', ['create_project']),
+        ('create_folders', ['create_project']),
+        ('create_wiki', ['create_project']),
+        # The table row needs the team ID.
+        ('update_contribution_agreement_table', ['create_project', 'create_team']),
+        ('update_contributor_tracking_scope', ['create_project'])
+    ]
+
+    STEP_SECONDS = {
+        'invite_emails_to_team': 3,
+        'grant_team_access_to_entities': 3,
+        'create_folders': 3,
+        'create_wiki': 5,
+        'update_contribution_agreement_table': 5,
+        'update_contributor_tracking_scope': 5
+    }
+
+    PARAMETERS = ['config_id', 'project_name', 'institution_name', 'institution_short_name', 'user_identifier',
+                  'agreement_url', 'emails', 'start_date', 'end_date', 'comments']
+    DATE_PARAMETERS = ['start_date', 'end_date']
+    STATE_FIELDS = ['project', 'team']
 
-
-class CreateDcaSpaceService:
     def __init__(self, config_id, project_name, institution_name, institution_short_name, user_identifier,
-                 agreement_url=None, emails=None, start_date=None, end_date=None, comments=None):
+                 agreement_url=None, emails=None, start_date=None, end_date=None, comments=None, operation_id=None,
+                 deadline=None):
         """Instantiates a new instance.
 
         Args:
@@ -25,11 +65,11 @@ class CreateDcaSpaceService:
             start_date: The start date of the agreement.
             end_date: The end date of the agreement.
             comments: Open comments field.
+            operation_id: The ID used to checkpoint the operation. A new ID is generated if not set.
+            deadline: The Deadline to finish by. Steps that cannot finish in time are continued in the background.
         """
-
-        self.start_time = datetime.now()
+        super().__init__(operation_id=operation_id, deadline=deadline)
         self.config_id = config_id
-        self.config = None
         self.project_name = project_name
         self.institution_name = institution_name
         self.institution_short_name = institution_short_name
@@ -39,56 +79,11 @@ class CreateDcaSpaceService:
         self.start_date = start_date
         self.end_date = end_date
         self.comments = comments
-        self.project = None
-        self.team = None
-        self.errors = []
-        self.warnings = []
-
-    def execute(self):
-        """Creates a new Synapse space for data contribution.
-
-        This method does not do validation. It expects all validation to have been done and passed already.
-
-        Returns:
-            Self
-        """
-
-        self.config = Env.SYNAPSE_SPACE_DCA_CREATE_CONFIG_by_id(self.config_id)
-        if self.config is None:
-            raise Exception('DCA Create Space config not found for ID: {0}'.format(self.config_id))
-        self.project = None
-        self.team = None
-        self.errors = []
-        self.warnings = []
-
-        if not self._create_project():
-            self._write_synapse_log_file()
-            return self
-
-        self._set_storage_location()
-
-        if self._create_team():
-            self._assign_team_to_project()
-            self._add_team_managers()
-            self._invite_emails_to_team()
-            self._grant_team_access_to_entities()
-
-        self._grant_principals_access_to_project()
-
-        self._create_folders()
 
-        self._create_wiki()
-
-        self._update_tracking_tables()
-
-        self._write_synapse_log_file()
-
-        return self
-
-    def _add_warning(self, msg):
-        logger.warning(msg)
-        self.warnings.append(msg)
+    def _get_config(self):
+        return Env.SYNAPSE_SPACE_DCA_CREATE_CONFIG_by_id(self.config_id)
 
+    @timed_step
     def _write_synapse_log_file(self):
         errors = []
         try:
@@ -99,6 +94,7 @@ class CreateDcaSpaceService:
 
                 try:
                     data = {
+                        'operation_id': self.operation_id,
                         'parameters': {
                             'user': self.user_identifier,
                             'project_name': self.project_name,
@@ -121,6 +117,7 @@ class CreateDcaSpaceService:
                             'id': self.team.id if self.team else None,
                             'name': self.team.name if self.team else None
                         },
+                        'steps': self.steps,
                         'warnings': self.warnings,
                         'errors': self.errors
                     }
@@ -146,6 +143,7 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
     def _create_project(self):
         errors = []
         error = self.Validations.validate_project_name(self.project_name)
@@ -163,6 +161,7 @@ class CreateDcaSpaceService:
         self.errors += errors
         return self.project and not errors
 
+    @timed_step
     def _set_storage_location(self):
         errors = []
         try:
@@ -183,6 +182,7 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
     def _create_team(self):
         errors = []
         team_name = 'KiContributor_{0}'.format(self.project.name)
@@ -197,6 +197,7 @@ class CreateDcaSpaceService:
         self.errors += errors
         return self.team and not errors
 
+    @timed_step
     def _assign_team_to_project(self):
         errors = []
         try:
@@ -210,6 +211,7 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
     def _add_team_managers(self):
         errors = []
         try:
@@ -241,6 +243,34 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
+    async def _add_team_managers_async(self):
+        errors = []
+        try:
+            user_ids = self.config.get('team_manager_user_ids', None)
+
+            if user_ids:
+                logger.info('Inviting users: {0} to team: {1}.'.format(user_ids, self.team.id))
+                await asyncio.gather(*[self._async_client.invite_to_team(self.team.id, user_id=user_id)
+                                       for user_id in user_ids])
+                logger.info('Users: {0} invited to team: {1}'.format(user_ids, self.team.id))
+
+                # One ACL update for all the managers, concurrent updates would overwrite each other.
+                logger.info('Setting users: {0} as managers on team: {1}.'.format(user_ids, self.team.id))
+                await self._async_client.set_team_permissions(
+                    self.team.id, {user_id: Synapse.TEAM_MANAGER_PERMS for user_id in user_ids})
+                logger.info('Users: {0} have been given manager access on team: {1}.'.format(user_ids, self.team.id))
+            else:
+                self._add_warning(
+                    'Config Variable: team_manager_user_ids not set. Team managers will not be added to the project team.')
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error adding managers to the project team: {0}'.format(ex))
+
+        self.errors += errors
+        return not errors
+
+    @timed_step
     def _invite_emails_to_team(self):
         errors = []
         if self.emails:
@@ -262,6 +292,25 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
+    async def _invite_emails_to_team_async(self):
+        errors = []
+        if self.emails:
+            try:
+                logger.info('Inviting emails: {0} to team: {1}'.format(self.emails, self.team.id))
+                await asyncio.gather(*[self._async_client.invite_to_team(self.team.id, email=email)
+                                       for email in self.emails])
+                logger.info('Emails: {0} invited to team: {1}'.format(self.emails, self.team.id))
+            except Exception as ex:
+                logger.exception(ex)
+                errors.append('Error inviting emails to team: {0}'.format(ex))
+        else:
+            self._add_warning('No emails specified. No users will be invited to this project.')
+
+        self.errors += errors
+        return not errors
+
+    @timed_step
     def _grant_team_access_to_entities(self):
         errors = []
         try:
@@ -289,6 +338,35 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
+    async def _grant_team_access_to_entities_async(self):
+        errors = []
+        try:
+            config = self.config.get('team_entity_access', None)
+
+            if config:
+                # The entities are shared at the same time, with one ACL update per entity.
+                permissions_by_entity = {}
+                for item in config:
+                    permissions_by_entity.setdefault(item['id'], {})[self.team.id] = \
+                        Synapse.get_perms_by_code(item['permission'])
+
+                entity_ids = list(permissions_by_entity)
+                logger.info('Granting team: {0} access to entities: {1}'.format(self.team.name, entity_ids))
+                await asyncio.gather(*[self._async_client.set_permissions(entity_id, permissions)
+                                       for entity_id, permissions in permissions_by_entity.items()])
+                logger.info('Team: {0} granted access to entities: {1}'.format(self.team.name, entity_ids))
+            else:
+                self._add_warning(
+                    'Config Variable: team_entity_access not set. Project team will not be shared on other entities.')
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error sharing project team with entities: {0}'.format(ex))
+
+        self.errors += errors
+        return not errors
+
+    @timed_step
     def _grant_principals_access_to_project(self):
         errors = []
         try:
@@ -316,6 +394,29 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
+    async def _grant_principals_access_to_project_async(self):
+        errors = []
+        try:
+            config = self.config.get('project_access', None)
+
+            if config:
+                permissions = {item['id']: Synapse.get_perms_by_code(item['permission']) for item in config}
+
+                logger.info('Assigning principals: {0} to project: {1}'.format(list(permissions), self.project.id))
+                await self._async_client.set_permissions(self.project.id, permissions)
+                logger.info('Principals: {0} assigned to project: {1}'.format(list(permissions), self.project.id))
+            else:
+                self._add_warning(
+                    'Config Variable: project_access not set. Principals will not be added to this project.')
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error adding principals to project: {0}'.format(ex))
+
+        self.errors += errors
+        return not errors
+
+    @timed_step
     def _create_folders(self):
         errors = []
         try:
@@ -340,23 +441,51 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
+    async def _create_folders_async(self):
+        errors = []
+        try:
+            folder_names = self.config.get('folder_names', None)
+
+            if folder_names:
+                paths = [tuple(filter(None, folder_path.split('/'))) for folder_path in folder_names]
+                folder_ids = {(): self.project.id}
+
+                # Create the folders a level at a time, since each folder needs its parent's ID.
+                depth = 1
+                level = sorted({path[:depth] for path in paths if len(path) >= depth})
+                while level:
+                    logger.info('Creating folders: {0} in project: {1}'.format(
+                        ['/'.join(path) for path in level], self.project.id))
+                    folders = await asyncio.gather(*[self._async_client.create_folder(path[-1], folder_ids[path[:-1]])
+                                                     for path in level])
+                    folder_ids.update(zip(level, [folder['id'] for folder in folders]))
+
+                    depth += 1
+                    level = sorted({path[:depth] for path in paths if len(path) >= depth})
+
+                logger.info('Folders: {0} created in project: {1}'.format(folder_names, self.project.id))
+            else:
+                self._add_warning(
+                    'Config Variable: folder_names not set. Folders will not be created in this project.')
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error creating folders: {0}'.format(ex))
+
+        self.errors += errors
+        return not errors
+
+    @timed_step
     def _create_wiki(self):
         errors = []
         try:
             source_wiki_project_id = self.config.get('wiki_project_id', None)
 
             if source_wiki_project_id:
-                source_wiki = Synapse.client().getWiki(source_wiki_project_id)
-
-                # TODO: Do we need to handle attachments on the wiki?
-                new_wiki = syn.Wiki(
-                    owner=self.project,
-                    title=source_wiki.get('title'),
-                    markdown=source_wiki.get('markdown')
-                )
                 logger.info('Importing wiki from project: {0} into project: {1}'.format(source_wiki_project_id,
                                                                                         self.project.id))
-                Synapse.client().store(new_wiki)
+                # Copies the sub-pages and attachments too.
+                WikiTreeCopier(source_wiki_project_id, self.project.id).execute()
                 logger.info('Wiki imported from project: {0} into project: {1}'.format(source_wiki_project_id,
                                                                                        self.project.id))
             else:
@@ -369,17 +498,7 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
-    def _update_tracking_tables(self):
-        result = False
-
-        if not self._update_contribution_agreement_table():
-            result = False
-
-        if not self._update_contributor_tracking_scope():
-            result = False
-
-        return result
-
+    @timed_step
     def _update_contribution_agreement_table(self):
         errors = []
         try:
@@ -412,6 +531,7 @@ class CreateDcaSpaceService:
         self.errors += errors
         return not errors
 
+    @timed_step
     def _update_contributor_tracking_scope(self):
         """Add the project to the KiData_Contributor_Tracking table's scope so the files in the project are included.
         """
@@ -450,11 +570,10 @@ class CreateDcaSpaceService:
 
             error = None
             try:
-                syn_project_id = Synapse.client().findEntityId(project_name)
-                if syn_project_id:
-                    project = Synapse.client().get(syn.Project(id=syn_project_id))
-                    if project:
-                        error = 'Project with name: "{0}" already exists.'.format(project_name)
+                if Synapse.project_name_taken(project_name):
+                    error = 'Project with name: "{0}" already exists.'.format(project_name)
+            except SynapseUnavailableError as ex:
+                error = str(ex)
             except Exception as ex:
                 logger.exception(ex)
                 error = 'Error validating project name: {0}'.format(ex)
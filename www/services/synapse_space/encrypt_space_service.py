@@ -1,7 +1,11 @@
-from www.core import Synapse, Env
+import asyncio
+from www.core import Synapse, Env, SynapseUnavailableError
 from www.core.log import logger
-import synapseclient as syn
-from synapseclient.core.exceptions import SynapseHTTPError
+from www.core.metrics import timed_step
+from www.core.async_synapse import AsyncSynapseClient
+from www.core.lazy import lazy_import
+
+syn = lazy_import('synapseclient')
 
 
 class EncryptSpaceService:
@@ -13,17 +17,58 @@ class EncryptSpaceService:
         """
         self.project_id = project_id
         self.errors = []
+        self.steps = []
+        self._async_client = None
 
     def execute(self):
         """Sets the storage location of the Project.
 
         This method does not do validation. It expects all validation to have been done and passed already.
+        When SYNAPSE_ASYNC_STEPS is set the storage location is set with execute_async.
+
+        Returns:
+            Self
+        """
+        if Env.SYNAPSE_ASYNC_STEPS():
+            return asyncio.run(self.execute_async())
+
+        self.errors = []
+        self.steps = []
+
+        try:
+            Synapse.circuit_breaker.check()
+        except SynapseUnavailableError as ex:
+            # Fail fast instead of waiting on calls that would time out.
+            self.errors.append(str(ex))
+            return self
+
+        self._set_storage_location()
+
+        return self
+
+    async def execute_async(self):
+        """Same as execute, but runs on an event loop so a Lambda can run many operations at once.
 
         Returns:
             Self
         """
         self.errors = []
+        self.steps = []
 
+        try:
+            Synapse.circuit_breaker.check()
+        except SynapseUnavailableError as ex:
+            self.errors.append(str(ex))
+            return self
+
+        async with AsyncSynapseClient() as self._async_client:
+            await self._set_storage_location_async()
+
+        return self
+
+    @timed_step
+    def _set_storage_location(self):
+        errors = []
         try:
             storage_location_id = Env.SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID()
             if storage_location_id:
@@ -32,13 +77,34 @@ class EncryptSpaceService:
                 Synapse.client().setStorageLocation(self.project_id, storage_location_id)
                 logger.info('Storage location set on project: {0}'.format(self.project_id))
             else:
-                self.errors.append(
+                errors.append(
                     'Environment Variable: SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID not set. Storage location cannot be set.')
         except Exception as ex:
             logger.exception(ex)
-            self.errors.append('Error setting storage location: {0}'.format(ex))
+            errors.append('Error setting storage location: {0}'.format(ex))
 
-        return self
+        self.errors += errors
+        return not errors
+
+    @timed_step
+    async def _set_storage_location_async(self):
+        errors = []
+        try:
+            storage_location_id = Env.SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID()
+            if storage_location_id:
+                logger.info(
+                    'Setting storage location on project: {0} to: {1}'.format(self.project_id, storage_location_id))
+                await self._async_client.set_storage_location(self.project_id, storage_location_id)
+                logger.info('Storage location set on project: {0}'.format(self.project_id))
+            else:
+                errors.append(
+                    'Environment Variable: SYNAPSE_ENCRYPTED_STORAGE_LOCATION_ID not set. Storage location cannot be set.')
+        except Exception as ex:
+            logger.exception(ex)
+            errors.append('Error setting storage location: {0}'.format(ex))
+
+        self.errors += errors
+        return not errors
 
     class Validations:
 
@@ -72,7 +138,9 @@ class EncryptSpaceService:
             error = None
             try:
                 project = Synapse.client().get(syn.Project(id=project_id))
-            except SynapseHTTPError as ex:
+            except SynapseUnavailableError as ex:
+                error = str(ex)
+            except syn.core.exceptions.SynapseHTTPError as ex:
                 logger.exception(ex)
                 if ex.response.status_code == 404:
                     error = 'Synapse project ID: {0} does not exist.'.format(project_id)
@@ -106,7 +174,9 @@ class EncryptSpaceService:
                     storage_ids = storage_setting.get('locations')
                     if storage_id in storage_ids:
                         error = 'Storage location already set for Synapse project: {0}'.format(project_id)
-            except SynapseHTTPError as ex:
+            except SynapseUnavailableError as ex:
+                error = str(ex)
+            except syn.core.exceptions.SynapseHTTPError as ex:
                 logger.exception(ex)
                 if ex.response.status_code == 403:
                     error = 'This service (Synapse user: {0}) does not have administrator access to Synapse project: {0}'.format(
@@ -0,0 +1,146 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sls_tools.param_store import ParamStore
+from www.core import Env, Synapse
+from www.core.log import logger
+from .auth_service import AuthService
+
+
+class WarmupService:
+    """Does the work the first request after a cold start would otherwise pay for.
+
+    The tasks run in parallel threads. Tasks that depend on each other (the table columns need the Synapse login)
+    run in order in the same thread. Once a container is warm, warming it again does nothing. A container that
+    failed to warm up is not warmed again for RETRY_SECONDS.
+
+    The warmup can be triggered by anyone, so to_dict() only reports the outcome and duration of each task.
+    The errors are logged.
+    """
+
+    # The Env values read from SSM by the first requests.
+    SSM_KEYS = [
+        'SECRET_KEY',
+        'GOOGLE_CLIENT_ID',
+        'GOOGLE_CLIENT_SECRET',
+        'LOGIN_WHITELIST',
+        'SYNAPSE_SPACE_DCA_CREATE_CONFIG',
+        'SYNAPSE_SPACE_BASIC_CREATE_CONFIG',
+        'SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG'
+    ]
+
+    # How long (in seconds) to wait before warming up again after a warmup fails.
+    RETRY_SECONDS = 60
+
+    _warm = False
+    _last_attempt = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.already_warm = False
+        self.skipped = False
+        self.tasks = {}
+        self.errors = []
+
+    def execute(self):
+        """Warms the container unless it is already warm.
+
+        Returns:
+            Self
+        """
+        with self._lock:
+            if WarmupService._warm:
+                self.already_warm = True
+                return self
+
+            if WarmupService._last_attempt is not None and \
+                    time.monotonic() - WarmupService._last_attempt < self.RETRY_SECONDS:
+                self.skipped = True
+                return self
+
+            WarmupService._last_attempt = time.monotonic()
+            self.tasks = {}
+            self.errors = []
+
+            # boto3 clients are not safe to create from several threads at once, so the SSM client used
+            # by Env is created before the tasks that read Env start.
+            self._run_task(self._create_ssm_client)
+
+            chains = [
+                [self._read_ssm],
+                [self._login_synapse, self._load_table_columns],
+                [self._load_google_provider_config],
+                [self._compile_templates]
+            ]
+
+            with ThreadPoolExecutor(max_workers=len(chains)) as executor:
+                for future in [executor.submit(self._run_chain, chain) for chain in chains]:
+                    future.result()
+
+            WarmupService._warm = not self.errors
+            logger.info('WARMUP_RESULT: {0}'.format(dict(self.to_dict(), errors=self.errors)))
+
+        return self
+
+    def to_dict(self):
+        return {
+            'already_warm': self.already_warm,
+            'skipped': self.skipped,
+            'tasks': self.tasks
+        }
+
+    @classmethod
+    def reset(cls):
+        """Marks the container as cold so the next warmup runs the tasks again."""
+        with cls._lock:
+            cls._warm = False
+            cls._last_attempt = None
+
+    def _run_chain(self, chain):
+        """Runs tasks in order, stopping at the first task that fails."""
+        for task in chain:
+            if not self._run_task(task):
+                break
+
+    def _run_task(self, task):
+        name = task.__name__.lstrip('_')
+        start = time.perf_counter()
+        error = None
+        try:
+            task()
+        except Exception as ex:
+            logger.exception(ex)
+            error = 'Error warming up {0}: {1}'.format(name, ex)
+            self.errors.append(error)
+
+        self.tasks[name] = {
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+            'outcome': 'failed' if error else 'success'
+        }
+        return error is None
+
+    def _create_ssm_client(self):
+        ParamStore._get_ssm_client()
+
+    def _read_ssm(self):
+        for key in self.SSM_KEYS:
+            getattr(Env, key)()
+
+    def _login_synapse(self):
+        Synapse.client()
+
+    def _load_table_columns(self):
+        table_ids = [c.get('contribution_agreement_table_id') for c in Env.SYNAPSE_SPACE_DCA_CREATE_CONFIG()] + \
+                    [c.get('agreement_table_id') for c in Env.SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG()]
+
+        for table_id in set(filter(None, table_ids)):
+            Synapse.get_table_columns(table_id)
+
+    def _load_google_provider_config(self):
+        AuthService.get_google_provider_config()
+
+    def _compile_templates(self):
+        from www import server
+        jinja_env = server.app.jinja_env
+        for name in jinja_env.list_templates(extensions=['html']):
+            jinja_env.get_template(name)
@@ -4,3 +4,4 @@ from .synapse_space import views
 from .synapse_space.daa import views
 from .synapse_space.dca import views
 from .synapse_space.basic import views
+from .synapse_space.history import views
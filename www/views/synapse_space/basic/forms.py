@@ -1,7 +1,10 @@
 from flask_wtf import FlaskForm
 from wtforms import SubmitField, StringField, TextAreaField
 from wtforms.validators import DataRequired, ValidationError, Optional
-from www.services.synapse_space.basic import CreateBasicSpaceService
+from www.core.lazy import lazy_import
+
+# Loaded on first use so requests that don't use the service don't pay for importing it.
+basic_services = lazy_import('www.services.synapse_space.basic')
 
 
 class CreateBasicSynapseSpaceForm(FlaskForm):
@@ -14,12 +17,12 @@ class CreateBasicSynapseSpaceForm(FlaskForm):
     # Validation Methods
     def validate_field_project_name(self, field):
         if field.data:
-            error = CreateBasicSpaceService.Validations.validate_project_name(field.data)
+            error = basic_services.CreateBasicSpaceService.Validations.validate_project_name(field.data)
             if error:
                 raise ValidationError(error)
 
     def validate_field_team_name(self, field):
         if field.data:
-            error = CreateBasicSpaceService.Validations.validate_team_name(field.data)
+            error = basic_services.CreateBasicSpaceService.Validations.validate_team_name(field.data)
             if error:
                 raise ValidationError(error)
@@ -1,34 +1,90 @@
 from flask import current_app as app, request, jsonify
 from flask import render_template, redirect, url_for, flash
 from flask_login import fresh_login_required
-from www.services.synapse_space.basic import CreateBasicSpaceService
+from ....core.lazy import lazy_import
 from .forms import CreateBasicSynapseSpaceForm
-from ....core import Cookies, Env
+from ..forms import ResumeOperationForm
+from ....core import Cookies, Env, SynapseUnavailableError
+from ....core.deadline import Deadline
+
+# Loaded on first use so requests that don't use the service don't pay for importing it.
+basic_services = lazy_import('www.services.synapse_space.basic')
 
 
 @app.route("/synapse_space/basic/create", methods=('GET', 'POST'))
 @fresh_login_required
 def synapse_space_basic_create():
+    # Started first so the deadline includes everything the request does.
+    deadline = Deadline.for_request()
     form = CreateBasicSynapseSpaceForm()
     errors = []
+    operation_id = None
     user_email = Cookies.user_email_get(request)
 
     config = Env.get_default_basic_create_config()
 
-    if form.validate_on_submit():
-        service = CreateBasicSpaceService(config['id'],
-                                          form.field_project_name.data,
-                                          user_email,
-                                          team_name=form.field_team_name.data,
-                                          comments=form.field_comments.data)
+    # Validation calls Synapse, so it runs within the request deadline too.
+    with deadline:
+        valid = form.validate_on_submit()
+
+    if valid:
+        service = basic_services.CreateBasicSpaceService(config['id'],
+                                                         form.field_project_name.data,
+                                                         user_email,
+                                                         team_name=form.field_team_name.data,
+                                                         comments=form.field_comments.data,
+                                                         deadline=deadline)
 
         errors = service.execute().errors
+        # Only offer to resume operations that saved a checkpoint.
+        operation_id = service.operation_id if service.resumable else None
 
         if not errors:
-            flash('Synapse project created successfully: {0} ({1})'.format(service.project.name, service.project.id))
+            _flash_created(service)
             return redirect(url_for('synapse_space_basic_create'))
 
     return render_template('synapse_space/basic/create.html',
                            user=user_email,
                            form=form,
-                           errors=errors)
+                           errors=errors,
+                           operation_id=operation_id)
+
+
+@app.route("/synapse_space/basic/resume/<operation_id>", methods=['POST'])
+@fresh_login_required
+def synapse_space_basic_resume(operation_id):
+    deadline = Deadline.for_request()
+    errors = []
+
+    if ResumeOperationForm().validate_on_submit():
+        try:
+            service = basic_services.CreateBasicSpaceService.resume(operation_id, deadline=deadline)
+            errors = service.errors
+        except SynapseUnavailableError as ex:
+            # The checkpoint could not be loaded yet, let the user try again.
+            errors = [str(ex)]
+        except Exception as ex:
+            errors = [str(ex)]
+            operation_id = None
+
+        if not errors:
+            _flash_created(service)
+            return redirect(url_for('synapse_space_basic_create'))
+    else:
+        errors = ['Invalid request.']
+
+    return render_template('synapse_space/basic/create.html',
+                           user=Cookies.user_email_get(request),
+                           form=CreateBasicSynapseSpaceForm(),
+                           errors=errors,
+                           operation_id=operation_id)
+
+
+def _flash_created(service):
+    if not service.deferred_steps:
+        flash('Synapse project created successfully: {0} ({1})'.format(service.project.name, service.project.id))
+    elif service.project:
+        flash('Synapse project created: {0} ({1}). The remaining steps, starting with: {2}, are running in the '
+              'background.'.format(service.project.name, service.project.id, service.deferred_steps[0]))
+    else:
+        flash('Synapse project: {0} is being created in the background.'.format(service.project_name))
@@ -0,0 +1,95 @@
+import json
+from ...core.config_cache import ConfigCache
+
+
+class ConfigChoices:
+    """The select and checkbox choices of the forms.
+
+    The choices are derived from the configs once per config version (see: ConfigCache), so the forms get fresh
+    choices after a config changes without building them on every request.
+    """
+
+    DCA_CONFIG = 'SYNAPSE_SPACE_DCA_CREATE_CONFIG'
+    DAA_CONFIG = 'SYNAPSE_SPACE_DAA_GRANT_ACCESS_CONFIG'
+
+    @classmethod
+    def dca_configs(cls):
+        """Gets the DCA create config choices.
+
+        Returns:
+            List of (config id, config name).
+        """
+        return list(cls._dca()['configs'])
+
+    @classmethod
+    def dca_additional_parties(cls, config_id):
+        """Gets the additional party choices of a DCA create config.
+
+        Args:
+            config_id: The ID of the config or None for the first config.
+
+        Returns:
+            List of (party code, party name).
+        """
+        choices = cls._dca()
+        if config_id is None and choices['configs']:
+            config_id = choices['configs'][0][0]
+        return list(choices['additional_parties'].get(config_id, []))
+
+    @classmethod
+    def dca_additional_parties_json(cls):
+        """Gets the additional parties of each DCA create config as JSON.
+
+        Returns:
+            Tuple of the config version and a dict of the JSON by config id.
+        """
+        return ConfigCache.derive(cls.DCA_CONFIG, 'additional_parties_json', lambda configs: {
+            c['id']: json.dumps(c.get('additional_parties', [])) for c in configs
+        })
+
+    @classmethod
+    def daa_additional_parties(cls):
+        """Gets the additional party choices of the default DAA grant access config.
+
+        Returns:
+            List of (party code, party name).
+        """
+        return list(cls._daa()['additional_parties'])
+
+    @classmethod
+    def daa_data_collections(cls):
+        """Gets the data collection choices of the default DAA grant access config.
+
+        Returns:
+            List of (collection name, collection name with its entity names).
+        """
+        return list(cls._daa()['data_collections'])
+
+    @classmethod
+    def _dca(cls):
+        return ConfigCache.derive(cls.DCA_CONFIG, 'choices', lambda configs: {
+            'configs': [(c['id'], c['name']) for c in configs],
+            'additional_parties': {c['id']: cls._parties(c) for c in configs}
+        })[1]
+
+    @classmethod
+    def _daa(cls):
+        def _choices(configs):
+            # We only have one config now so use the first config (see: Env.get_default_daa_grant_access_config).
+            config = configs[0] if configs else {}
+
+            data_collections = []
+            for collection in config.get('data_collections', []):
+                entity_names = ', '.join([e['name'] for e in collection['entities']])
+                data_collections.append((collection['name'], '{0} - [{1}]'.format(collection['name'], entity_names)))
+
+            return {
+                'additional_parties': cls._parties(config),
+                'data_collections': data_collections
+            }
+
+        return ConfigCache.derive(cls.DAA_CONFIG, 'choices', _choices)[1]
+
+    @classmethod
+    def _parties(cls, config):
+        return [(p['code'], p['name']) for p in config.get('additional_parties', [])]
@@ -5,16 +5,20 @@ from wtforms.validators import DataRequired, ValidationError, URL, Optional
 
 from www.core import Env
 from ...components import MultiCheckboxField
-from www.services.synapse_space.daa import GrantDaaAccessService
+from ..choices import ConfigChoices
+from www.core.lazy import lazy_import
 import re
 
+# Loaded on first use so requests that don't use the service don't pay for importing it.
+daa_services = lazy_import('www.services.synapse_space.daa')
+
 
 class GrantDaaSynapseAccessForm(FlaskForm):
     # Form Fields
     field_institution_name = StringField('Institution Name', validators=[DataRequired()])
     field_institution_short_name = StringField('Institution Short Name', validators=[DataRequired()])
 
-    # Choices are setup in the view.
+    # Choices are set when the form is instantiated so they follow the config.
     field_institution_add_party = MultiCheckboxField('Institution Additional Party', validators=[Optional()])
     field_data_collection = SelectField('Data Collection', validators=[DataRequired()])
 
@@ -30,6 +34,11 @@ class GrantDaaSynapseAccessForm(FlaskForm):
     valid_emails = []
     invalid_emails = []
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.field_institution_add_party.choices = ConfigChoices.daa_additional_parties()
+        self.field_data_collection.choices = ConfigChoices.daa_data_collections()
+
     # Validation Methods
     def validate_field_institution_short_name(self, field):
         self.try_set_team_name()
@@ -98,6 +107,6 @@ class GrantDaaSynapseAccessForm(FlaskForm):
 
     def try_validate_team_name(self):
         if self.team_name:
-            error = GrantDaaAccessService.Validations.validate_team_name(self.team_name)
+            error = daa_services.GrantDaaAccessService.Validations.validate_team_name(self.team_name)
             if error:
                 raise ValidationError(error)
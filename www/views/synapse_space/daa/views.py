@@ -1,50 +1,96 @@
 from flask import current_app as app, request
 from flask import render_template, redirect, url_for, flash
 from flask_login import fresh_login_required
-from www.services.synapse_space.daa import GrantDaaAccessService
+from ....core.lazy import lazy_import
 from .forms import GrantDaaSynapseAccessForm
-from ....core import Cookies, Env
+from ..forms import ResumeOperationForm
+from ....core import Cookies, Env, SynapseUnavailableError
+from ....core.deadline import Deadline
+
+# Loaded on first use so requests that don't use the service don't pay for importing it.
+daa_services = lazy_import('www.services.synapse_space.daa')
 
 
 @app.route("/synapse_space/daa/grant", methods=('GET', 'POST'))
 @fresh_login_required
 def synapse_space_daa_grant():
+    # Started first so the deadline includes everything the request does.
+    deadline = Deadline.for_request()
     form = GrantDaaSynapseAccessForm()
     errors = []
+    operation_id = None
     user_email = Cookies.user_email_get(request)
 
     config = Env.get_default_daa_grant_access_config()
 
-    add_parties = [(c['code'], c['name']) for c in config.get('additional_parties', [])]
-    form.field_institution_add_party.choices = add_parties
-
-    dc_choices = []
-    for collection in config.get('data_collections', []):
-        entity_names = ', '.join([e['name'] for e in collection['entities']])
-        display_name = '{0} - [{1}]'.format(collection['name'], entity_names)
-        dc_choices.append((collection['name'], display_name))
-    form.field_data_collection.choices = dc_choices
-
-    if form.validate_on_submit():
-        service = GrantDaaAccessService(config['id'],
-                                        form.team_name,
-                                        form.field_institution_name.data,
-                                        form.field_institution_short_name.data,
-                                        form.field_data_collection.data,
-                                        user_email,
-                                        agreement_url=form.field_agreement_url.data,
-                                        emails=form.valid_emails,
-                                        start_date=form.field_start_date.data,
-                                        end_date=form.field_end_date.data,
-                                        comments=form.field_comments.data)
+    # Validation calls Synapse, so it runs within the request deadline too.
+    with deadline:
+        valid = form.validate_on_submit()
+
+    if valid:
+        service = daa_services.GrantDaaAccessService(config['id'],
+                                                     form.team_name,
+                                                     form.field_institution_name.data,
+                                                     form.field_institution_short_name.data,
+                                                     form.field_data_collection.data,
+                                                     user_email,
+                                                     agreement_url=form.field_agreement_url.data,
+                                                     emails=form.valid_emails,
+                                                     start_date=form.field_start_date.data,
+                                                     end_date=form.field_end_date.data,
+                                                     comments=form.field_comments.data,
+                                                     deadline=deadline)
 
         errors = service.execute().errors
+        # Only offer to resume operations that saved a checkpoint.
+        operation_id = service.operation_id if service.resumable else None
 
         if not errors:
-            flash('Synapse team created successfully: {0} ({1})'.format(service.team.name, service.team.id))
+            _flash_created(service)
             return redirect(url_for('synapse_space_daa_grant'))
 
     return render_template('synapse_space/daa/grant.html',
                            user=user_email,
                            form=form,
-                           errors=errors)
+                           errors=errors,
+                           operation_id=operation_id)
+
+
+@app.route("/synapse_space/daa/resume/<operation_id>", methods=['POST'])
+@fresh_login_required
+def synapse_space_daa_resume(operation_id):
+    deadline = Deadline.for_request()
+    errors = []
+
+    if ResumeOperationForm().validate_on_submit():
+        try:
+            service = daa_services.GrantDaaAccessService.resume(operation_id, deadline=deadline)
+            errors = service.errors
+        except SynapseUnavailableError as ex:
+            # The checkpoint could not be loaded yet, let the user try again.
+            errors = [str(ex)]
+        except Exception as ex:
+            errors = [str(ex)]
+            operation_id = None
+
+        if not errors:
+            _flash_created(service)
+            return redirect(url_for('synapse_space_daa_grant'))
+    else:
+        errors = ['Invalid request.']
+
+    return render_template('synapse_space/daa/grant.html',
+                           user=Cookies.user_email_get(request),
+                           form=GrantDaaSynapseAccessForm(),
+                           errors=errors,
+                           operation_id=operation_id)
+
+
+def _flash_created(service):
+    if not service.deferred_steps:
+        flash('Synapse team created successfully: {0} ({1})'.format(service.team.name, service.team.id))
+    elif service.team:
+        flash('Synapse team created: {0} ({1}). The remaining steps, starting with: {2}, are running in the '
+              'background.'.format(service.team.name, service.team.id, service.deferred_steps[0]))
+    else:
+        flash('Synapse team: {0} is being created in the background.'.format(service.team_name))
@@ -3,21 +3,24 @@ from wtforms import SubmitField, StringField, TextAreaField, SelectField
 from wtforms.fields.html5 import DateField
 from wtforms.validators import DataRequired, ValidationError, URL, Optional, Length
 from ...components import MultiCheckboxField
-from www.services.synapse_space.dca import CreateDcaSpaceService
-from www.core import Env
+from ..choices import ConfigChoices
+from www.core.lazy import lazy_import
 import re
 
+# Loaded on first use so requests that don't use the service don't pay for importing it.
+dca_services = lazy_import('www.services.synapse_space.dca')
+
 
 class CreateDcaSynapseSpaceForm(FlaskForm):
     # Form Fields
-    config = Env.SYNAPSE_SPACE_DCA_CREATE_CONFIG() or []
+    # Choices are set when the form is instantiated so they follow the config.
     field_select_config = SelectField('Select Configuration',
-                                      choices=[(c['id'], c['name']) for c in config],
+                                      choices=[],
                                       validators=[DataRequired()])
 
     field_institution_name = StringField('Institution Name', validators=[DataRequired()])
     field_institution_short_name = StringField('Institution Short Name', validators=[DataRequired()])
-    # Choices are set in the view and Javascript.
+    # Choices are set when the form is instantiated and in the Javascript.
     field_institution_add_party = MultiCheckboxField('Institution Additional Party',
                                                      choices=[],
                                                      validators=[Optional()])
@@ -36,6 +39,14 @@ class CreateDcaSynapseSpaceForm(FlaskForm):
     valid_emails = []
     invalid_emails = []
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.field_select_config.choices = ConfigChoices.dca_configs()
+
+        # The additional parties of the submitted config, or of the first config.
+        config_id = self.field_select_config.data if self.is_submitted() and self.field_select_config.data else None
+        self.field_institution_add_party.choices = ConfigChoices.dca_additional_parties(config_id)
+
     # Validation Methods
     def validate_field_institution_short_name(self, field):
         self.try_set_project_name()
@@ -94,6 +105,6 @@ class CreateDcaSynapseSpaceForm(FlaskForm):
 
     def try_validate_project_name(self):
         if self.project_name:
-            error = CreateDcaSpaceService.Validations.validate_project_name(self.project_name)
+            error = dca_services.CreateDcaSpaceService.Validations.validate_project_name(self.project_name)
             if error:
                 raise ValidationError(error)
@@ -1,54 +1,110 @@
-from flask import current_app as app, request, jsonify
+from flask import current_app as app, request, abort
 from flask import render_template, redirect, url_for, flash
 from flask_login import fresh_login_required
-from www.services.synapse_space.dca import CreateDcaSpaceService
+from ....core.lazy import lazy_import
 from .forms import CreateDcaSynapseSpaceForm
-from ....core import Cookies, Env
+from ..forms import ResumeOperationForm
+from ....core import Cookies, SynapseUnavailableError
+from ....core.deadline import Deadline
+from ....core.config_cache import ConfigCache
+from ..choices import ConfigChoices
+
+# Loaded on first use so requests that don't use the service don't pay for importing it.
+dca_services = lazy_import('www.services.synapse_space.dca')
 
 
 @app.route("/synapse_space/dca/create", methods=('GET', 'POST'))
 @fresh_login_required
 def synapse_space_dca_create():
+    # Started first so the deadline includes everything the request does.
+    deadline = Deadline.for_request()
     form = CreateDcaSynapseSpaceForm()
     errors = []
+    operation_id = None
     user_email = Cookies.user_email_get(request)
 
-    if request.method == 'POST':
-        config_id = form.field_select_config.data
-    else:
-        config_id = Env.SYNAPSE_SPACE_DCA_CREATE_CONFIG()[0]['id']
-
-    add_parties = [(c['code'], c['name']) for c in
-                   Env.SYNAPSE_SPACE_DCA_CREATE_CONFIG_by_id(config_id).get('additional_parties', [])]
+    # Validation calls Synapse, so it runs within the request deadline too.
+    with deadline:
+        valid = form.validate_on_submit()
 
-    form.field_institution_add_party.choices = add_parties
-
-    if form.validate_on_submit():
-        service = CreateDcaSpaceService(form.field_select_config.data,
-                                        form.project_name,
-                                        form.field_institution_name.data,
-                                        form.field_institution_short_name.data,
-                                        user_email,
-                                        agreement_url=form.field_agreement_url.data,
-                                        emails=form.valid_emails,
-                                        start_date=form.field_start_date.data,
-                                        end_date=form.field_end_date.data,
-                                        comments=form.field_comments.data)
+    if valid:
+        service = dca_services.CreateDcaSpaceService(form.field_select_config.data,
+                                                     form.project_name,
+                                                     form.field_institution_name.data,
+                                                     form.field_institution_short_name.data,
+                                                     user_email,
+                                                     agreement_url=form.field_agreement_url.data,
+                                                     emails=form.valid_emails,
+                                                     start_date=form.field_start_date.data,
+                                                     end_date=form.field_end_date.data,
+                                                     comments=form.field_comments.data,
+                                                     deadline=deadline)
 
         errors = service.execute().errors
+        # Only offer to resume operations that saved a checkpoint.
+        operation_id = service.operation_id if service.resumable else None
 
         if not errors:
-            flash('Synapse project created successfully: {0} ({1})'.format(service.project.name, service.project.id))
+            _flash_created(service)
             return redirect(url_for('synapse_space_dca_create'))
 
     return render_template('synapse_space/dca/create.html',
                            user=user_email,
                            form=form,
-                           errors=errors)
+                           errors=errors,
+                           operation_id=operation_id)
+
+
+@app.route("/synapse_space/dca/resume/<operation_id>", methods=['POST'])
+@fresh_login_required
+def synapse_space_dca_resume(operation_id):
+    deadline = Deadline.for_request()
+    errors = []
+
+    if ResumeOperationForm().validate_on_submit():
+        try:
+            service = dca_services.CreateDcaSpaceService.resume(operation_id, deadline=deadline)
+            errors = service.errors
+        except SynapseUnavailableError as ex:
+            # The checkpoint could not be loaded yet, let the user try again.
+            errors = [str(ex)]
+        except Exception as ex:
+            errors = [str(ex)]
+            operation_id = None
+
+        if not errors:
+            _flash_created(service)
+            return redirect(url_for('synapse_space_dca_create'))
+    else:
+        errors = ['Invalid request.']
+
+    return render_template('synapse_space/dca/create.html',
+                           user=Cookies.user_email_get(request),
+                           form=CreateDcaSynapseSpaceForm(),
+                           errors=errors,
+                           operation_id=operation_id)
 
 
 @app.route("/synapse_space/dca/create/additional_parties/<config_id>")
 @fresh_login_required
 def additional_parties(config_id):
-    config = Env.SYNAPSE_SPACE_DCA_CREATE_CONFIG_by_id(config_id)
-    return jsonify(config.get('additional_parties', []))
+    version, parties_json = ConfigChoices.dca_additional_parties_json()
+    if config_id not in parties_json:
+        abort(404)
+
+    response = app.response_class(parties_json[config_id], mimetype='application/json')
+    # The ETag changes when the config changes, so the browser only downloads the parties again after a change.
+    response.set_etag('{0}-{1}'.format(version, config_id))
+    response.cache_control.private = True
+    response.cache_control.max_age = ConfigCache.SSM_TTL
+    return response
+
+
+def _flash_created(service):
+    if not service.deferred_steps:
+        flash('Synapse project created successfully: {0} ({1})'.format(service.project.name, service.project.id))
+    elif service.project:
+        flash('Synapse project created: {0} ({1}). The remaining steps, starting with: {2}, are running in the '
+              'background.'.format(service.project.name, service.project.id, service.deferred_steps[0]))
+    else:
+        flash('Synapse project: {0} is being created in the background.'.format(service.project_name))
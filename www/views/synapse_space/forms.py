@@ -27,3 +27,8 @@ class EncryptSynapseSpaceForm(FlaskForm):
         else:
             self.can_encrypt = True
             self.project_name = project.name
+
+
+class ResumeOperationForm(FlaskForm):
+    """Validates the CSRF token when resuming an operation that did not complete."""
+    pass
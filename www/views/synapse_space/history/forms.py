@@ -0,0 +1,17 @@
+from flask_wtf import FlaskForm
+from wtforms import SubmitField, StringField, SelectField
+from wtforms.validators import Optional
+from www.services import AuditIndexService
+
+
+class SynapseSpaceHistoryForm(FlaskForm):
+    class Meta:
+        # The form is submitted with GET so the results can be linked to.
+        csrf = False
+
+    # Form Fields
+    field_search = StringField('Search', validators=[Optional()])
+    field_operation = SelectField('Operation',
+                                  choices=[('', 'All Operations')] + list(AuditIndexService.OPERATION_NAMES.items()),
+                                  validators=[Optional()])
+    field_submit = SubmitField('Search')
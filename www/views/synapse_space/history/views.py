@@ -0,0 +1,56 @@
+from flask import current_app as app, request
+from flask import render_template
+from flask_login import fresh_login_required
+from www.services import AuditIndexService
+from .forms import SynapseSpaceHistoryForm
+from ....core import Cookies
+
+PER_PAGE = 25
+
+# The number of page links to show on each side of the current page.
+PAGE_WINDOW = 2
+
+
+def _page_links(page, pages):
+    """Gets the page numbers to link to: the first, last and pages around the current page.
+
+    None marks a gap between page numbers.
+    """
+    shown = [p for p in range(1, pages + 1) if p in (1, pages) or abs(p - page) <= PAGE_WINDOW]
+    links = []
+    for p in shown:
+        if links and p - links[-1] > 1:
+            links.append(None)
+        links.append(p)
+    return links
+
+
+@app.route("/synapse_space/history", methods=('GET',))
+@fresh_login_required
+def synapse_space_history():
+    form = SynapseSpaceHistoryForm(request.args)
+    errors = []
+    entries = []
+    total = 0
+    page = request.args.get('page', 1, type=int)
+
+    try:
+        entries, total = AuditIndexService.query(search=form.field_search.data,
+                                                 operation=form.field_operation.data,
+                                                 page=page,
+                                                 per_page=PER_PAGE)
+    except Exception as ex:
+        errors.append('Error loading operation history: {0}'.format(ex))
+
+    pages = max((total + PER_PAGE - 1) // PER_PAGE, 1)
+
+    return render_template('synapse_space/history/index.html',
+                           user=Cookies.user_email_get(request),
+                           form=form,
+                           errors=errors,
+                           entries=entries,
+                           operation_names=AuditIndexService.OPERATION_NAMES,
+                           page=page,
+                           pages=pages,
+                           page_links=_page_links(page, pages),
+                           total=total)
@@ -1,7 +1,13 @@
-from flask import current_app as app, request, render_template
+from flask import current_app as app, request, render_template, jsonify
 from ..core import Cookies
 
 
 @app.route("/")
 def home():
     return render_template("home.html", user=Cookies.user_email_get(request))
+
+
+@app.route("/_warmup")
+def warmup():
+    from ..services.warmup_service import WarmupService
+    return jsonify(WarmupService().execute().to_dict())